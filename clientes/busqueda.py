@@ -0,0 +1,25 @@
+"""
+Búsqueda de clientes por nombre, documento o email (ver core/busqueda.py).
+"""
+import re
+
+from django.db.models import FloatField, Value
+
+from core.busqueda import filtrar_por_texto, solo_digitos
+
+# Un documento escrito completo (DNI de 8 dígitos, RUC de 11), con o sin separadores
+PATRON_DOCUMENTO = re.compile(r'^[\d.\-\s]{8,}$')
+
+
+def buscar_clientes(queryset, consulta):
+    """
+    Filtra `queryset` (de Cliente) por `consulta` y lo ordena por relevancia
+    (anotación `rango`). Si la consulta es un número de documento completo
+    se busca primero por igualdad sobre el índice único del documento.
+    """
+    consulta = (consulta or '').strip()
+    if PATRON_DOCUMENTO.match(consulta):
+        exactos = queryset.filter(numero_documento__in={consulta, solo_digitos(consulta)})
+        if exactos.exists():
+            return exactos.annotate(rango=Value(1.0, output_field=FloatField()))
+    return filtrar_por_texto(queryset, 'texto_busqueda', consulta)
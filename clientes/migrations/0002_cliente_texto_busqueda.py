@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:41
+
+from django.db import migrations, models
+
+from core.busqueda import normalizar_texto, solo_digitos
+
+
+def rellenar_texto_busqueda(apps, schema_editor):
+    """Calcula texto_busqueda de los clientes existentes (misma regla que Cliente.calcular_texto_busqueda)."""
+    Cliente = apps.get_model('clientes', 'Cliente')
+    db = schema_editor.connection.alias
+    lote = []
+    for cliente in Cliente.objects.using(db).order_by('pk').iterator(chunk_size=2000):
+        partes = [
+            normalizar_texto(cliente.nombres),
+            normalizar_texto(cliente.apellidos),
+            solo_digitos(cliente.numero_documento),
+            normalizar_texto(cliente.email),
+        ]
+        cliente.texto_busqueda = ' '.join(parte for parte in partes if parte)
+        lote.append(cliente)
+        if len(lote) >= 2000:
+            Cliente.objects.using(db).bulk_update(lote, ['texto_busqueda'])
+            lote = []
+    if lote:
+        Cliente.objects.using(db).bulk_update(lote, ['texto_busqueda'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='texto_busqueda',
+            field=models.CharField(blank=True, default='', editable=False, max_length=700, verbose_name='Texto de búsqueda'),
+        ),
+        migrations.RunPython(rellenar_texto_busqueda, migrations.RunPython.noop),
+    ]
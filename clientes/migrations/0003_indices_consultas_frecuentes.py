@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:49
+
+from django.db import migrations, models
+
+from core.migraciones import AgregarIndiceConcurrente
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY (PostgreSQL) no puede ir dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('clientes', '0002_cliente_texto_busqueda'),
+    ]
+
+    operations = [
+        AgregarIndiceConcurrente(
+            model_name='cliente',
+            index=models.Index(fields=['fecha_creacion', 'id'], name='cliente_creacion_id_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:05
+
+from django.db import migrations
+
+from core.migraciones import SQLSegunMotor
+
+INDICE_TRIGRAMAS = 'clientes_cliente_texto_busqueda_trgm'
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY (PostgreSQL) no puede ir dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('clientes', '0003_indices_consultas_frecuentes'),
+    ]
+
+    # Solo PostgreSQL: en otros motores la búsqueda usa LIKE sin índice
+    # (ver core/busqueda.py). CONCURRENTLY no bloquea las escrituras sobre
+    # clientes_cliente mientras se construye el índice
+    operations = [
+        SQLSegunMotor(
+            sql=[
+                'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDICE_TRIGRAMAS} '
+                f'ON clientes_cliente USING gin (texto_busqueda gin_trgm_ops)',
+            ],
+            reverse_sql=f'DROP INDEX CONCURRENTLY IF EXISTS {INDICE_TRIGRAMAS}',
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from core.models import TimestampModel  # <-- Importamos nuestra auditoría
+from core.busqueda import normalizar_texto, solo_digitos
 
 class TipoDocumento(TimestampModel):
     """
@@ -62,6 +63,19 @@ class Cliente(TimestampModel):
         blank=True, 
         verbose_name="Teléfono"
     )
+    # Nombres, apellidos, documento y email normalizados (ver core/busqueda.py).
+    # Se recalcula en save(); tiene un índice de trigramas en PostgreSQL
+    # (migración 0004_indice_trigramas)
+    texto_busqueda = models.CharField(
+        max_length=700,
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name="Texto de búsqueda"
+    )
+
+    # Campos de los que sale texto_busqueda
+    CAMPOS_BUSQUEDA = ('nombres', 'apellidos', 'numero_documento', 'email')
     
     # Campo calculado para búsquedas fáciles
     @property
@@ -71,9 +85,33 @@ class Cliente(TimestampModel):
     def __str__(self):
         return self.nombre_completo
 
+    def calcular_texto_busqueda(self):
+        """
+        Texto normalizado para buscar al cliente: 'jose perez 12345678 jperez@mail.com'.
+        Usar también al crear clientes con bulk_create, que no pasa por save().
+        """
+        partes = [
+            normalizar_texto(self.nombres),
+            normalizar_texto(self.apellidos),
+            solo_digitos(self.numero_documento),
+            normalizar_texto(self.email),
+        ]
+        return ' '.join(parte for parte in partes if parte)
+
+    def save(self, *args, **kwargs):
+        self.texto_busqueda = self.calcular_texto_busqueda()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(self.CAMPOS_BUSQUEDA):
+            kwargs['update_fields'] = {*update_fields, 'texto_busqueda'}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Cliente"
         verbose_name_plural = "Clientes"
+        indexes = [
+            # Paginación por llave de lista_clientes
+            models.Index(fields=['fecha_creacion', 'id'], name='cliente_creacion_id_idx'),
+        ]
 
 
 class Direccion(TimestampModel):
@@ -1,3 +1,165 @@
+from django.core import signing
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from core.busqueda import normalizar_texto
+from core.paginacion import SALT_CURSOR
+from core.pruebas import PresupuestoConsultasMixin
+from prestamos.datos_prueba import crear_prestamo, sembrar_cartera
+from .busqueda import buscar_clientes
+from .models import Cliente
+from .views import CLIENTES_POR_PAGINA
+
+# Consultas máximas por vista. Incluyen sesión y usuario.
+PRESUPUESTO_LISTA_CLIENTES = 5
+PRESUPUESTO_DETALLE_CLIENTE = 6
+
+
+class PresupuestoVistasClientesTests(PresupuestoConsultasMixin, TestCase):
+    """Los listados de clientes no hacen consultas por fila."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cartera = sembrar_cartera()
+        cls.cliente = cls.cartera.clientes[0]
+
+    def setUp(self):
+        self.client.force_login(self.cartera.usuario)
+
+    def ampliar_cartera(self):
+        sembrar_cartera(clientes=5, cartera=self.cartera)
+
+    def test_lista_clientes(self):
+        url = reverse('clientes:lista_clientes')
+        self.assertPresupuesto(url, PRESUPUESTO_LISTA_CLIENTES)
+        self.assertConsultasNoCrecen(url, self.ampliar_cartera)
+
+    def test_lista_clientes_con_filtros(self):
+        url = reverse('clientes:lista_clientes')
+        datos = {'q': 'nombre', 'tipo_documento': self.cartera.tipo_documento.pk}
+        self.assertPresupuesto(url, PRESUPUESTO_LISTA_CLIENTES, datos=datos)
+        self.assertConsultasNoCrecen(url, self.ampliar_cartera, datos=datos)
+
+    def test_detalle_cliente(self):
+        url = reverse('clientes:detalle_cliente', args=[self.cliente.pk])
+        self.assertPresupuesto(url, PRESUPUESTO_DETALLE_CLIENTE)
+
+    def test_detalle_cliente_no_depende_de_sus_prestamos(self):
+        url = reverse('clientes:detalle_cliente', args=[self.cliente.pk])
+        self.assertConsultasNoCrecen(
+            url, lambda: [crear_prestamo(self.cartera, self.cliente) for _ in range(3)]
+        )
+
+
+class PaginacionClientesTests(TestCase):
+    """lista_clientes pagina por llave con cursores firmados."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cartera = sembrar_cartera(clientes=CLIENTES_POR_PAGINA * 2 + 3, prestamos_por_cliente=0)
+        crear_prestamo(cls.cartera, cls.cartera.clientes[-1])
+
+    def setUp(self):
+        self.client.force_login(self.cartera.usuario)
+        self.url = reverse('clientes:lista_clientes')
+
+    def pagina(self, **datos):
+        return self.client.get(self.url, datos).context['clientes']
+
+    def test_recorre_todas_las_paginas_sin_repetir(self):
+        pagina = self.pagina()
+        paginas = [pagina]
+        while pagina.hay_siguiente:
+            pagina = self.pagina(cursor=pagina.cursor_siguiente)
+            paginas.append(pagina)
+
+        self.assertEqual([len(pagina) for pagina in paginas], [CLIENTES_POR_PAGINA] * 2 + [3])
+        self.assertEqual(paginas[0].total, Cliente.objects.count())
+        ids = [cliente.pk for pagina in paginas for cliente in pagina]
+        self.assertEqual(ids, list(Cliente.objects.order_by('-fecha_creacion', '-id').values_list('pk', flat=True)))
+
+        # Volver desde la última página da la anterior
+        anterior = self.pagina(cursor=paginas[-1].cursor_anterior)
+        self.assertEqual([c.pk for c in anterior], [c.pk for c in paginas[1]])
+        self.assertFalse(paginas[0].hay_anterior)
+
+    def test_datos_anotados(self):
+        primero = self.pagina().objetos[0]
+        self.assertEqual(primero.pk, self.cartera.clientes[-1].pk)
+        self.assertEqual(primero.num_direcciones, 1)
+        self.assertEqual(primero.direccion_distrito, 'Miraflores')
+        self.assertEqual(primero.num_prestamos, 1)
+        self.assertEqual(primero.ultimo_prestamo, primero.prestamos.get().fecha_emision)
+
+    def test_cursor_manipulado_vuelve_al_principio(self):
+        primera = [cliente.pk for cliente in self.pagina()]
+        cursor = self.pagina().cursor_siguiente
+
+        for manipulado in (
+            cursor[:-2] + ('A' if cursor[-2] != 'A' else 'B') + cursor[-1],
+            'no-es-un-cursor',
+            # Firmado, pero con valores que no son del orden del listado
+            signing.dumps({'v': ['ayer', 'x'], 'd': 'siguiente'}, salt=SALT_CURSOR),
+            signing.dumps({'v': ['2026-01-01T00:00:00'], 'd': 'siguiente'}, salt=SALT_CURSOR),
+            # Firmado para otro propósito
+            signing.dumps({'v': [], 'd': 'siguiente'}),
+        ):
+            with self.subTest(cursor=manipulado):
+                respuesta = self.client.get(self.url, {'cursor': manipulado})
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertEqual([cliente.pk for cliente in respuesta.context['clientes']], primera)
+
+
+class BusquedaClientesTests(TestCase):
+    """Búsqueda sin tildes ni mayúsculas, y por documento exacto."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cartera = sembrar_cartera(clientes=3, prestamos_por_cliente=0)
+
+        def crear(nombres, apellidos, documento):
+            return Cliente.objects.create(
+                tipo_documento=cls.cartera.tipo_documento,
+                numero_documento=documento,
+                nombres=nombres,
+                apellidos=apellidos,
+            )
+
+        cls.jose = crear('José', 'Pérez Ñique', '45678912')
+        cls.josefina = crear('Josefina', 'Perales', '45678913')
+        cls.ana = crear('Ana María', 'NÚÑEZ', '20123456789')
+
+    def buscar(self, consulta):
+        return list(buscar_clientes(Cliente.objects.all(), consulta))
+
+    def test_normalizar_texto(self):
+        self.assertEqual(normalizar_texto('  José  PÉREZ Ñique '), 'jose perez nique')
+        self.assertEqual(self.jose.texto_busqueda, 'jose perez nique 45678912')
+
+    def test_sin_tildes_ni_mayusculas(self):
+        for consulta in ('jose perez', 'JOSÉ PÉREZ', 'perez jose', 'ñique'):
+            with self.subTest(consulta=consulta):
+                self.assertEqual(self.buscar(consulta), [self.jose])
+        self.assertEqual(self.buscar('nunez'), [self.ana])
+        self.assertEqual(self.buscar('maria'), [self.ana])
+
+    def test_mas_relevantes_primero(self):
+        # 'jose' está al inicio del texto de los dos
+        self.assertEqual(set(self.buscar('jose')), {self.jose, self.josefina})
+        self.assertEqual(self.buscar('perales')[0], self.josefina)
+
+    def test_documento_exacto(self):
+        for consulta in ('45678912', '45.678.912', '45-678-912'):
+            with self.subTest(consulta=consulta):
+                resultado = buscar_clientes(Cliente.objects.all(), consulta)
+                self.assertEqual(list(resultado), [self.jose])
+                self.assertEqual(resultado[0].rango, 1.0)
+        # Un documento que no existe completo se busca como texto
+        self.assertEqual(set(self.buscar('4567891')), {self.jose, self.josefina})
+        self.assertEqual(self.buscar('99999999'), [])
+
+    def test_desde_la_vista(self):
+        self.client.force_login(self.cartera.usuario)
+        respuesta = self.client.get(reverse('clientes:lista_clientes'), {'q': 'Nuñez'})
+        self.assertEqual([cliente.pk for cliente in respuesta.context['clientes']], [self.ana.pk])
+        self.assertEqual(respuesta.context['clientes'].total, 1)
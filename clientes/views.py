@@ -1,45 +1,90 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from core.paginacion import contar, paginar_keyset
+from core.replicas import lectura_en_replica
+from prestamos.models import Préstamo
 from .models import Cliente, TipoDocumento, Direccion
+from .busqueda import buscar_clientes
 from .forms import ClienteForm, DireccionForm, TipoDocumentoForm
 
 
+# Clientes por página en lista_clientes
+CLIENTES_POR_PAGINA = 25
+
+
+def _clientes_anotados():
+    """
+    Clientes con los datos que muestra el listado ya calculados en la misma
+    consulta (subconsultas correlacionadas), para no consultar direcciones
+    ni préstamos fila por fila.
+    """
+    direcciones = Direccion.objects.filter(cliente=OuterRef('pk'))
+    primera_direccion = direcciones.order_by('pk')
+    prestamos = Préstamo.objects.filter(cliente=OuterRef('pk'))
+    return Cliente.objects.select_related('tipo_documento').annotate(
+        num_direcciones=Coalesce(
+            Subquery(direcciones.values('cliente').annotate(n=Count('pk')).values('n')[:1]), 0
+        ),
+        direccion_distrito=Subquery(primera_direccion.values('distrito')[:1]),
+        direccion_ciudad=Subquery(primera_direccion.values('ciudad')[:1]),
+        direccion_es_principal=Subquery(primera_direccion.values('es_principal')[:1]),
+        num_prestamos=Coalesce(
+            Subquery(prestamos.values('cliente').annotate(n=Count('pk')).values('n')[:1]), 0
+        ),
+        ultimo_prestamo=Subquery(prestamos.order_by('-fecha_emision').values('fecha_emision')[:1]),
+    )
+
+
 @login_required
+@lectura_en_replica
 def lista_clientes(request):
     """
-    Muestra una lista de todos los clientes con búsqueda y filtros.
+    Muestra una lista paginada de clientes con búsqueda y filtros.
+    La paginación es por llave (fecha_creacion, id), o por relevancia al
+    buscar, y el total es estimado o acotado, así el costo por página no
+    depende del tamaño de la cartera.
     """
-    clientes_list = Cliente.objects.select_related('tipo_documento').prefetch_related('direcciones').order_by('-fecha_creacion')
-    
-    # Búsqueda
-    query = request.GET.get('q')
-    if query:
-        clientes_list = clientes_list.filter(
-            Q(nombres__icontains=query) |
-            Q(apellidos__icontains=query) |
-            Q(numero_documento__icontains=query) |
-            Q(email__icontains=query)
-        )
+    clientes_list = _clientes_anotados()
     
     # Filtro por tipo de documento
     tipo_doc = request.GET.get('tipo_documento')
+    tipo_doc_selected = None
     if tipo_doc and tipo_doc != '':
         try:
-            clientes_list = clientes_list.filter(tipo_documento_id=int(tipo_doc))
+            tipo_doc_selected = int(tipo_doc)
+            clientes_list = clientes_list.filter(tipo_documento_id=tipo_doc_selected)
         except (ValueError, TypeError):
             # Si el valor no es un entero válido, ignorar el filtro
             pass
     
+    # Búsqueda (documento exacto o texto normalizado; ver clientes/busqueda.py):
+    # los más relevantes primero
+    query = request.GET.get('q')
+    orden = ('-fecha_creacion', '-id')
+    if query:
+        clientes_list = buscar_clientes(clientes_list, query)
+        orden = ('-rango', *orden)
+    
+    pagina = paginar_keyset(
+        clientes_list,
+        cursor=request.GET.get('cursor'),
+        orden=orden,
+        tamano=CLIENTES_POR_PAGINA,
+    )
+    # Total estimado o acotado (ver core/paginacion.py)
+    contar(pagina, clientes_list, 'clientes:lista')
+    
     # Obtener tipos de documento para el filtro
     tipos_documento = TipoDocumento.objects.all()
     
     context = {
-        'clientes': clientes_list,
+        'clientes': pagina,
         'tipos_documento': tipos_documento,
         'query': query,
-        'tipo_doc_selected': int(tipo_doc) if tipo_doc and tipo_doc != '' else None,
+        'tipo_doc_selected': tipo_doc_selected,
         'titulo_pagina': 'Lista de Clientes'
     }
     
@@ -56,12 +101,13 @@ def detalle_cliente(request, pk):
         pk=pk
     )
     
-    # Obtener préstamos del cliente
-    prestamos = cliente.prestamos.select_related('tasa_interes').order_by('-fecha_emision')[:10]
+    # Obtener préstamos del cliente (los últimos 10, evaluados una sola vez)
+    prestamos = list(cliente.prestamos.select_related('tasa_interes').order_by('-fecha_emision')[:10])
     
     context = {
         'cliente': cliente,
         'prestamos': prestamos,
+        'total_prestamos': cliente.prestamos.count(),
         'titulo_pagina': f'Detalle Cliente - {cliente.nombre_completo}'
     }
     
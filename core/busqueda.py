@@ -0,0 +1,84 @@
+"""
+Búsqueda de texto sobre columnas normalizadas.
+
+Los modelos buscables guardan una columna con el texto ya normalizado
+(minúsculas, sin tildes, documento solo con dígitos) que se mantiene al
+guardar. Así la búsqueda no necesita funciones sobre la columna (UPPER,
+unaccent, CAST) y puede usar un índice:
+
+- PostgreSQL: índice GIN con gin_trgm_ops (extensión pg_trgm). Sirve tanto
+  para LIKE '%texto%' como para el operador de similitud por palabra (<%),
+  que tolera errores de tipeo. Los resultados se ordenan por
+  word_similarity.
+- Otros motores (SQLite en desarrollo): LIKE sobre la columna normalizada,
+  ordenando primero las coincidencias al inicio del texto o de una palabra.
+"""
+import re
+import unicodedata
+
+from django.db import connections
+from django.db.models import BooleanField, Case, FloatField, Func, IntegerField, Q, Value, When
+
+# Largo mínimo del término para usar similitud por trigramas (con menos
+# caracteres casi todo se parece y el índice no descarta filas)
+MINIMO_TRIGRAMAS = 3
+
+
+def normalizar_texto(valor):
+    """'  José  PÉREZ ' -> 'jose perez' (sin tildes, minúsculas, espacios simples)."""
+    if not valor:
+        return ''
+    descompuesto = unicodedata.normalize('NFKD', str(valor))
+    sin_tildes = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_tildes.lower().split())
+
+
+def solo_digitos(valor):
+    """'12.345.678-K' -> '12345678'"""
+    return re.sub(r'\D', '', valor or '')
+
+
+class _PalabraSimilar(Func):
+    """termino <% columna (pg_trgm): alguna palabra de la columna se parece al término."""
+    arg_joiner = ' <%% '
+    template = '%(expressions)s'
+    output_field = BooleanField()
+
+
+class _SimilitudPalabra(Func):
+    """word_similarity(termino, columna) entre 0 y 1 (pg_trgm)."""
+    function = 'word_similarity'
+    output_field = FloatField()
+
+
+def filtrar_por_texto(queryset, campo, consulta):
+    """
+    Filtra `queryset` por la columna normalizada `campo` y anota `rango`
+    (mayor es mejor). Cada palabra de la consulta debe aparecer en la
+    columna; en PostgreSQL también se aceptan coincidencias aproximadas.
+    Devuelve el queryset ordenado por rango (de mayor a menor).
+    """
+    termino = normalizar_texto(consulta)
+    if not termino:
+        return queryset.annotate(rango=Value(0.0, output_field=FloatField()))
+
+    contiene_todo = Q()
+    for palabra in termino.split():
+        contiene_todo &= Q(**{f'{campo}__contains': palabra})
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        filtro = contiene_todo
+        if len(termino) >= MINIMO_TRIGRAMAS:
+            filtro |= Q(_PalabraSimilar(Value(termino), campo))
+        rango = _SimilitudPalabra(Value(termino), campo)
+    else:
+        rango = Case(
+            When(**{f'{campo}__startswith': termino}, then=Value(2)),
+            When(**{f'{campo}__contains': f' {termino}'}, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+        filtro = contiene_todo
+
+    return queryset.filter(filtro).annotate(rango=rango).order_by('-rango')
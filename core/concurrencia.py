@@ -0,0 +1,79 @@
+"""
+Consultas independientes en paralelo desde vistas async.
+
+El ORM async de Django (aget, aaggregate, async for...) ejecuta todas las
+consultas de una petición en el mismo hilo y con la misma conexión, una
+detrás de otra: con asyncio.gather no se gana nada. reunir() ejecuta cada
+consulta en un hilo de un pool propio (sync_to_async con
+thread_sensitive=False), y por lo tanto con la conexión de ese hilo. El pool
+tiene CORE_CONSULTAS_CONCURRENTES hilos por proceso: es el límite de
+consultas simultáneas (y de conexiones extra a la base), y los hilos, con
+sus conexiones, se reutilizan entre peticiones. Una petición tarda entonces
+lo que su consulta más lenta y no la suma de todas.
+
+Si la conexión de la petición está dentro de una transacción (tests con
+TestCase, ATOMIC_REQUESTS), las consultas se ejecutan en secuencia por esa
+misma conexión: en otra conexión no verían los datos sin confirmar.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, connections
+
+from .middleware import medicion_actual
+
+# Consultas simultáneas por proceso (cada una ocupa una conexión a la base).
+# 1 = siempre en secuencia
+LIMITE_CONCURRENCIA = getattr(settings, 'CORE_CONSULTAS_CONCURRENTES', 4)
+
+_pool = ThreadPoolExecutor(max_workers=max(1, LIMITE_CONCURRENCIA), thread_name_prefix='consultas')
+
+
+async def reunir(consultas):
+    """
+    Ejecuta las funciones (síncronas, sin argumentos) de `consultas`
+    ({nombre: función}) y devuelve {nombre: resultado}.
+    """
+    if LIMITE_CONCURRENCIA <= 1 or len(consultas) <= 1 or await sync_to_async(_en_transaccion)():
+        return await sync_to_async(_en_secuencia)(consultas)
+
+    resultados = await asyncio.gather(*(
+        sync_to_async(_en_hilo_del_pool(funcion), thread_sensitive=False, executor=_pool)()
+        for funcion in consultas.values()
+    ))
+    return dict(zip(consultas, resultados))
+
+
+def _en_transaccion():
+    return connection.in_atomic_block
+
+
+def _en_secuencia(consultas):
+    return {nombre: funcion() for nombre, funcion in consultas.items()}
+
+
+def _en_hilo_del_pool(funcion):
+    """
+    Envuelve `funcion` para el pool: sus consultas se suman a la
+    medición de la petición (core/middleware.py). Los hilos del pool son
+    pocos y duran lo que el proceso, así que conservan su conexión (sin
+    importar CONN_MAX_AGE) salvo después de un error.
+    """
+    @functools.wraps(funcion)
+    def envoltura():
+        medicion = medicion_actual.get()
+        try:
+            with ExitStack() as pila:
+                if medicion is not None:
+                    for conexion in connections.all():
+                        pila.enter_context(conexion.execute_wrapper(medicion))
+                return funcion()
+        except Exception:
+            # La conexión puede haber quedado inutilizable: se abre otra la próxima vez
+            connections.close_all()
+            raise
+    return envoltura
@@ -0,0 +1,144 @@
+"""
+Presupuesto de consultas por vista.
+
+PresupuestoConsultasMiddleware mide en cada petición:
+- consultas: cantidad de sentencias SQL (en todas las conexiones),
+- sql: milisegundos dentro de la base de datos,
+- render: milisegundos fuera de la base (lógica de la vista y plantilla),
+- total: milisegundos de la petición completa.
+
+Si alguna medida supera el presupuesto de la vista (settings.PRESUPUESTO_VISTAS,
+por nombre de URL como 'prestamos:dashboard', con 'default' para el resto)
+se registra una advertencia en el logger 'core.presupuesto'. A los usuarios
+staff se les devuelven las medidas en la cabecera Server-Timing (visible en
+las herramientas de desarrollo del navegador).
+
+Funciona en modo sync y async: bajo ASGI no obliga a las vistas async
+(dashboard, reportes) a pasar por async_to_sync. En modo async los
+contadores se instalan en el hilo de las consultas de la petición (el de
+sync_to_async), y medicion_actual los lleva a los hilos de core/concurrencia.py.
+"""
+import logging
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('core.presupuesto')
+
+PRESUPUESTO_POR_DEFECTO = {'consultas': 30, 'sql_ms': 250, 'total_ms': 1000}
+
+# Medición de la petición en curso, para sumar también las consultas que se
+# ejecutan en otros hilos (ver core/concurrencia.py)
+medicion_actual = ContextVar('medicion_actual', default=None)
+
+
+class MedicionConsultas:
+    """execute_wrapper que cuenta las consultas y acumula su duración."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.sql = 0.0 # segundos (sumados entre hilos: puede superar al total)
+        self._candado = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            with self._candado:
+                self.sql += duracion
+                self.consultas += 1
+
+
+def presupuesto_de(nombre_vista):
+    """Presupuesto de la vista: el 'default' de settings, pisado por el de la vista."""
+    presupuestos = getattr(settings, 'PRESUPUESTO_VISTAS', {})
+    return {
+        **PRESUPUESTO_POR_DEFECTO,
+        **presupuestos.get('default', {}),
+        **presupuestos.get(nombre_vista, {}),
+    }
+
+
+def _medir_conexiones(medicion):
+    """Instala `medicion` en las conexiones del hilo actual; se quita al cerrar la pila."""
+    pila = ExitStack()
+    for conexion in connections.all():
+        pila.enter_context(conexion.execute_wrapper(medicion))
+    return pila
+
+
+class PresupuestoConsultasMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        medicion = MedicionConsultas()
+        inicio = time.perf_counter()
+        token = medicion_actual.set(medicion)
+        try:
+            with _medir_conexiones(medicion):
+                response = self.get_response(request)
+        finally:
+            medicion_actual.reset(token)
+        usuario = getattr(request, 'user', None)
+        es_staff = usuario is not None and usuario.is_staff
+        return self._informar(request, response, medicion, time.perf_counter() - inicio, es_staff)
+
+    async def __acall__(self, request):
+        medicion = MedicionConsultas()
+        inicio = time.perf_counter()
+        token = medicion_actual.set(medicion)
+        # El ORM async y sync_to_async consultan desde el hilo de la petición
+        pila = await sync_to_async(_medir_conexiones)(medicion)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(pila.close)()
+            medicion_actual.reset(token)
+        total = time.perf_counter() - inicio
+        # request.user consultaría la sesión desde el event loop
+        usuario = await request.auser() if hasattr(request, 'auser') else None
+        es_staff = usuario is not None and usuario.is_staff
+        return self._informar(request, response, medicion, total, es_staff)
+
+    def _informar(self, request, response, medicion, total, es_staff):
+        """Registra si la vista se pasó del presupuesto y agrega Server-Timing para staff."""
+        medidas = {
+            'consultas': medicion.consultas,
+            'sql_ms': medicion.sql * 1000,
+            'total_ms': total * 1000,
+        }
+        medidas['render_ms'] = medidas['total_ms'] - medidas['sql_ms']
+        nombre_vista = request.resolver_match.view_name if request.resolver_match else request.path
+
+        presupuesto = presupuesto_de(nombre_vista)
+        excedidas = [clave for clave, limite in presupuesto.items() if medidas[clave] > limite]
+        if excedidas:
+            logger.warning(
+                'Vista %s fuera de presupuesto (%s): %d consultas, sql %.1f ms, render %.1f ms, total %.1f ms',
+                nombre_vista, ', '.join(excedidas), medidas['consultas'],
+                medidas['sql_ms'], medidas['render_ms'], medidas['total_ms'],
+            )
+
+        if es_staff:
+            response['Server-Timing'] = (
+                f'sql;dur={medidas["sql_ms"]:.1f};desc="{medidas["consultas"]} consultas", '
+                f'render;dur={medidas["render_ms"]:.1f}, '
+                f'total;dur={medidas["total_ms"]:.1f}'
+            )
+        return response
@@ -0,0 +1,72 @@
+"""
+Operaciones de migración compartidas por las apps.
+"""
+from django.db import migrations
+
+
+class AgregarIndiceConcurrente(migrations.AddIndex):
+    """
+    AddIndex que en PostgreSQL usa CREATE INDEX CONCURRENTLY, para no
+    bloquear escrituras sobre tablas grandes mientras se construye el
+    índice. En otros motores es un AddIndex normal.
+
+    Como CONCURRENTLY no puede ir dentro de una transacción, la migración
+    que la use debe declarar atomic = False. Equivale a
+    django.contrib.postgres.operations.AddIndexConcurrently, sin exigir
+    PostgreSQL en desarrollo.
+    """
+
+    def describe(self):
+        return f'{super().describe()} (concurrente en PostgreSQL)'
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, **_concurrente(schema_editor))
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, **_concurrente(schema_editor))
+
+
+def _concurrente(schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        return {'concurrently': True}
+    return {}
+
+
+class SQLSegunMotor(migrations.RunSQL):
+    """
+    RunSQL que solo se ejecuta en los motores de `motores` (o, con
+    excluir=True, en todos los demás). Para SQL propio de PostgreSQL
+    (secuencias, vistas materializadas) que en SQLite no aplica o se
+    escribe distinto.
+    """
+
+    def __init__(self, sql, reverse_sql=None, motores=('postgresql',), excluir=False, **kwargs):
+        super().__init__(sql, reverse_sql, **kwargs)
+        self.motores = tuple(motores)
+        self.excluir = excluir
+
+    def deconstruct(self):
+        nombre, args, kwargs = super().deconstruct()
+        kwargs['motores'] = self.motores
+        if self.excluir:
+            kwargs['excluir'] = True
+        return nombre, args, kwargs
+
+    def _aplica(self, schema_editor):
+        return (schema_editor.connection.vendor in self.motores) != self.excluir
+
+    def describe(self):
+        motores = ', '.join(self.motores)
+        return f'{super().describe()} ({"excepto en " if self.excluir else "solo en "}{motores})'
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if self._aplica(schema_editor):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if self._aplica(schema_editor):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
@@ -0,0 +1,215 @@
+"""
+Paginación por llave (keyset) para listados grandes.
+
+En lugar de OFFSET (que obliga a la base de datos a recorrer y descartar
+todas las filas anteriores), cada página continúa desde los valores de
+orden de la última fila de la página anterior:
+
+    WHERE (fecha_creacion, id) < (:fecha, :id) ORDER BY fecha_creacion DESC, id DESC LIMIT n
+
+El cursor de la página siguiente/anterior viaja firmado en la URL. El
+orden puede incluir anotaciones (por ejemplo el rango de una búsqueda),
+siempre que el último campo sea único.
+
+El total se obtiene aparte (ver contar), porque un COUNT(*) exacto sobre
+toda la tabla cuesta tanto como recorrerla:
+- Sin filtros, en PostgreSQL: estimación de pg_class.reltuples.
+- Con filtros: conteo acotado a TOPE_CONTEO filas ("más de 1000").
+"""
+import hashlib
+
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import Q
+
+SALT_CURSOR = 'core.paginacion.cursor'
+# Filas que se cuentan como máximo en un listado filtrado
+TOPE_CONTEO = 1000
+# Por debajo de esta estimación se cuenta exacto (la tabla es chica o
+# nunca fue analizada y reltuples no es confiable)
+MINIMO_ESTIMACION = 10000
+
+
+class PaginaKeyset:
+    """
+    Una página de resultados. Se itera como una lista y expone los cursores
+    para ir a la página siguiente o anterior.
+    """
+
+    def __init__(self, objetos, cursor_siguiente=None, cursor_anterior=None):
+        self.objetos = objetos
+        self.cursor_siguiente = cursor_siguiente
+        self.cursor_anterior = cursor_anterior
+        self.total = None
+        # El total es una estimación (reltuples) o un mínimo (conteo acotado)
+        self.total_estimado = False
+        self.total_es_minimo = False
+
+    @property
+    def hay_siguiente(self):
+        return self.cursor_siguiente is not None
+
+    @property
+    def hay_anterior(self):
+        return self.cursor_anterior is not None
+
+    @property
+    def hay_otras_paginas(self):
+        return self.hay_siguiente or self.hay_anterior
+
+    @property
+    def total_legible(self):
+        """'125', '~1.250.000' o 'más de 1000', según cómo se obtuvo el total."""
+        if self.total is None:
+            return ''
+        if self.total_es_minimo:
+            return f'más de {self.total}'
+        if self.total_estimado:
+            return f'~{self.total:,}'.replace(',', '.')
+        return str(self.total)
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+    def __bool__(self):
+        return bool(self.objetos)
+
+
+def _campos(orden):
+    """('-fecha_creacion', '-id') -> [('fecha_creacion', True), ('id', True)]"""
+    return [(campo.lstrip('-'), campo.startswith('-')) for campo in orden]
+
+
+def _codificar_cursor(objeto, orden, direccion):
+    valores = [str(getattr(objeto, campo)) for campo, _ in _campos(orden)]
+    return signing.dumps({'v': valores, 'd': direccion}, salt=SALT_CURSOR, compress=True)
+
+
+def _campo_de_orden(queryset, campo):
+    """Campo del modelo o de una anotación, para convertir el valor del cursor."""
+    if campo in queryset.query.annotations:
+        return queryset.query.annotations[campo].output_field
+    return queryset.model._meta.get_field(campo)
+
+
+def _decodificar_cursor(queryset, cursor, orden):
+    """Devuelve (valores, direccion) o (None, 'siguiente') si el cursor no es válido."""
+    if not cursor:
+        return None, 'siguiente'
+    try:
+        datos = signing.loads(cursor, salt=SALT_CURSOR)
+        valores = [
+            _campo_de_orden(queryset, campo).to_python(valor)
+            for (campo, _), valor in zip(_campos(orden), datos['v'], strict=True)
+        ]
+    except (signing.BadSignature, KeyError, TypeError, ValueError, FieldDoesNotExist, ValidationError):
+        # Cursor manipulado o de otro listado: empezar desde el principio
+        return None, 'siguiente'
+    return valores, datos.get('d', 'siguiente')
+
+
+def _filtro_despues_de(orden, valores, invertir):
+    """
+    Condición "fila posterior al cursor" en el orden dado (o anterior, si
+    `invertir`): (a > x) OR (a = x AND b > y) ... con el sentido de cada campo.
+    """
+    condicion = Q()
+    iguales = Q()
+    for (campo, descendente), valor in zip(_campos(orden), valores):
+        mayor = descendente == invertir
+        condicion |= iguales & Q(**{f'{campo}__{"gt" if mayor else "lt"}': valor})
+        iguales &= Q(**{campo: valor})
+    # Rango redundante sobre el primer campo: ayuda al planificador a usar el índice
+    primer_campo, primer_desc = _campos(orden)[0]
+    rango = 'gte' if primer_desc == invertir else 'lte'
+    return Q(**{f'{primer_campo}__{rango}': valores[0]}) & condicion
+
+
+def paginar_keyset(queryset, cursor=None, orden=('-fecha_creacion', '-id'), tamano=20):
+    """
+    Devuelve una PaginaKeyset de `queryset` ordenado por `orden` (el último
+    campo debe ser único, normalmente el id), a partir de `cursor`.
+    """
+    valores, direccion = _decodificar_cursor(queryset, cursor, orden)
+    retroceder = valores is not None and direccion == 'anterior'
+
+    consulta = queryset
+    if valores is not None:
+        consulta = consulta.filter(_filtro_despues_de(orden, valores, invertir=retroceder))
+    if retroceder:
+        # Recorrer hacia atrás en orden inverso y dar vuelta el resultado
+        inverso = [campo[1:] if campo.startswith('-') else f'-{campo}' for campo in orden]
+        consulta = consulta.order_by(*inverso)
+    else:
+        consulta = consulta.order_by(*orden)
+
+    objetos = list(consulta[:tamano + 1])
+    hay_mas = len(objetos) > tamano
+    objetos = objetos[:tamano]
+    if retroceder:
+        objetos.reverse()
+
+    if not objetos:
+        return PaginaKeyset([])
+
+    if retroceder:
+        hay_siguiente, hay_anterior = True, hay_mas
+    else:
+        hay_siguiente, hay_anterior = hay_mas, valores is not None
+    return PaginaKeyset(
+        objetos,
+        cursor_siguiente=_codificar_cursor(objetos[-1], orden, 'siguiente') if hay_siguiente else None,
+        cursor_anterior=_codificar_cursor(objetos[0], orden, 'anterior') if hay_anterior else None,
+    )
+
+
+def conteo_en_cache(queryset, prefijo, timeout=300):
+    """
+    COUNT(*) de `queryset` guardado en caché por `timeout` segundos. La
+    clave incluye el SQL de la consulta, así cada combinación de filtros
+    tiene su propio conteo.
+    """
+    sql, parametros = queryset.query.sql_with_params()
+    huella = hashlib.sha1(f'{sql}|{parametros!r}'.encode()).hexdigest()
+    return cache.get_or_set(f'{prefijo}:conteo:{huella}', queryset.count, timeout)
+
+
+def _estimacion_postgresql(queryset):
+    """Filas estimadas de la tabla del modelo según las estadísticas de PostgreSQL."""
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)',
+            [queryset.model._meta.db_table],
+        )
+        fila = cursor.fetchone()
+    return fila[0] if fila else -1
+
+
+def contar(pagina, queryset, prefijo, tope=TOPE_CONTEO):
+    """
+    Completa pagina.total para `queryset` sin contar la tabla entera:
+    - Sin filtros: estimación de reltuples en PostgreSQL (si la tabla es
+      grande) o conteo en caché.
+    - Con filtros: cuenta hasta `tope` filas; si hay más, el total queda
+      como mínimo ("más de `tope`").
+    """
+    if not queryset.query.where:
+        if connections[queryset.db].vendor == 'postgresql':
+            estimacion = _estimacion_postgresql(queryset)
+            if estimacion >= MINIMO_ESTIMACION:
+                pagina.total = estimacion
+                pagina.total_estimado = True
+                return pagina
+        pagina.total = conteo_en_cache(queryset, prefijo)
+        return pagina
+
+    # Conteo acotado: SELECT COUNT(*) FROM (... LIMIT tope + 1)
+    total = queryset.order_by().values('pk')[:tope + 1].count()
+    pagina.total = min(total, tope)
+    pagina.total_es_minimo = total > tope
+    return pagina
@@ -0,0 +1,39 @@
+"""
+Utilidades para tests: presupuesto de consultas por vista.
+"""
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class PresupuestoConsultasMixin:
+    """
+    Para TestCase: mide las consultas de una petición y verifica que no
+    superen el presupuesto ni crezcan con la cantidad de datos (N+1).
+    """
+
+    def consultas_de(self, url, metodo='get', datos=None):
+        """Devuelve (cantidad de consultas, respuesta). Limpia la caché antes."""
+        cache.clear()
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = getattr(self.client, metodo)(url, datos or {})
+        self.assertLess(respuesta.status_code, 400, f'{url} respondió {respuesta.status_code}')
+        return len(consultas), respuesta
+
+    def assertPresupuesto(self, url, maximo, metodo='get', datos=None):
+        cantidad, respuesta = self.consultas_de(url, metodo, datos)
+        self.assertLessEqual(
+            cantidad, maximo,
+            f'{url} ejecutó {cantidad} consultas (presupuesto: {maximo})',
+        )
+        return cantidad, respuesta
+
+    def assertConsultasNoCrecen(self, url, agregar_datos, metodo='get', datos=None):
+        """La misma petición hace las mismas consultas antes y después de agregar_datos()."""
+        antes, _ = self.consultas_de(url, metodo, datos)
+        agregar_datos()
+        despues, _ = self.consultas_de(url, metodo, datos)
+        self.assertEqual(
+            antes, despues,
+            f'{url}: {antes} consultas con menos datos y {despues} con más (¿N+1?)',
+        )
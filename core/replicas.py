@@ -0,0 +1,176 @@
+"""
+Lecturas en la réplica de la base de datos.
+
+Las vistas de solo lectura (dashboard, reportes, listados, exportaciones)
+se marcan con @lectura_en_replica: mientras se ejecutan, RouterReplicas
+manda sus lecturas al alias CORE_REPLICA ('replica') y no compiten con las
+escrituras de registrar_pago en la base principal. Todo lo demás (y
+registrar_pago siempre) lee y escribe en 'default'.
+
+- Si la vista escribe algo (un modelo enrutado, con el ORM), desde ese
+  momento y hasta el final de la petición todas las lecturas vuelven a la
+  principal: la réplica puede ir unos instantes por detrás y no vería lo
+  recién escrito.
+- Dentro de una transacción de la principal también se lee de la principal.
+- Solo se enrutan los modelos de CORE_REPLICA_APPS, salvo los de
+  CORE_REPLICA_EXCLUIDOS (la cola de tareas, que debe verse al instante).
+  Sesiones y usuarios se leen siempre de la principal.
+- Si CORE_REPLICA no está en DATABASES, el decorador no hace nada.
+
+Para probarlo en local alcanzan dos bases SQLite (o PostgreSQL) con los
+mismos datos; en los tests, la réplica se declara como espejo de la
+principal ('TEST': {'MIRROR': 'default'}).
+
+El estado se guarda en una ContextVar: llega a los hilos de sync_to_async y
+a los de core.concurrencia.reunir, y cada petición tiene el suyo.
+"""
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Alias de la réplica en DATABASES
+ALIAS = getattr(settings, 'CORE_REPLICA', 'replica')
+# Apps cuyos modelos se pueden leer de la réplica
+APPS = frozenset(getattr(settings, 'CORE_REPLICA_APPS', ('prestamos', 'clientes')))
+# Modelos ('app.modelo') que se leen siempre de la principal
+EXCLUIDOS = frozenset(getattr(settings, 'CORE_REPLICA_EXCLUIDOS', ('prestamos.tarea',)))
+
+
+class _Lectura:
+    """Estado de una petición marcada con @lectura_en_replica."""
+
+    def __init__(self):
+        self.escribio = False
+
+
+_lectura_actual = ContextVar('lectura_en_replica', default=None)
+
+
+def replica_configurada():
+    return ALIAS in settings.DATABASES
+
+
+def _enrutado(modelo):
+    return modelo._meta.app_label in APPS and modelo._meta.label_lower not in EXCLUIDOS
+
+
+class RouterReplicas:
+    """Router de DATABASE_ROUTERS (ver el docstring del módulo)."""
+
+    def db_for_read(self, model, **hints):
+        lectura = _lectura_actual.get()
+        if (
+            lectura is None
+            or lectura.escribio
+            or not _enrutado(model)
+            or not replica_configurada()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return ALIAS
+
+    def db_for_write(self, model, **hints):
+        lectura = _lectura_actual.get()
+        if lectura is not None and _enrutado(model):
+            # Lo que se lea después tiene que ver esta escritura
+            lectura.escribio = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica y principal tienen los mismos datos
+        bases = {DEFAULT_DB_ALIAS, ALIAS}
+        if obj1._state.db in bases and obj2._state.db in bases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplica recibe el esquema por la replicación de la base
+        if db == ALIAS:
+            return False
+        return None
+
+
+@contextmanager
+def en_replica():
+    """Lee de la réplica dentro del bloque (para tareas y comandos)."""
+    token = _lectura_actual.set(_Lectura())
+    try:
+        yield
+    finally:
+        _lectura_actual.reset(token)
+
+
+@contextmanager
+def en_principal():
+    """Lee de la principal dentro del bloque, aunque se esté en @lectura_en_replica."""
+    token = _lectura_actual.set(None)
+    try:
+        yield
+    finally:
+        _lectura_actual.reset(token)
+
+
+def _iterar_en(estado, contenido):
+    # El contenido de una StreamingHttpResponse se lee después de que la
+    # vista devuelve la respuesta: cada trozo se genera con el estado de la vista
+    iterador = iter(contenido)
+    while True:
+        token = _lectura_actual.set(estado)
+        try:
+            trozo = next(iterador)
+        except StopIteration:
+            return
+        finally:
+            _lectura_actual.reset(token)
+        yield trozo
+
+
+def _continuar_en_replica(respuesta, estado):
+    if respuesta.streaming and not respuesta.is_async:
+        respuesta.streaming_content = _iterar_en(estado, respuesta.streaming_content)
+    return respuesta
+
+
+def lectura_en_replica(vista):
+    """
+    Decorador de vistas (síncronas o async) de solo lectura: sus consultas
+    van a la réplica hasta que escriban algo.
+    """
+    if iscoroutinefunction(vista):
+        async def envoltura(request, *args, **kwargs):
+            estado = _Lectura()
+            token = _lectura_actual.set(estado)
+            try:
+                respuesta = await vista(request, *args, **kwargs)
+            finally:
+                _lectura_actual.reset(token)
+            return _continuar_en_replica(respuesta, estado)
+    else:
+        def envoltura(request, *args, **kwargs):
+            estado = _Lectura()
+            token = _lectura_actual.set(estado)
+            try:
+                respuesta = vista(request, *args, **kwargs)
+            finally:
+                _lectura_actual.reset(token)
+            return _continuar_en_replica(respuesta, estado)
+
+    return functools.wraps(vista)(envoltura)
+
+
+def solo_principal(vista):
+    """Decorador de vistas que deben leer y escribir siempre en la principal (registrar_pago)."""
+    if iscoroutinefunction(vista):
+        async def envoltura(request, *args, **kwargs):
+            with en_principal():
+                return await vista(request, *args, **kwargs)
+    else:
+        def envoltura(request, *args, **kwargs):
+            with en_principal():
+                return vista(request, *args, **kwargs)
+
+    return functools.wraps(vista)(envoltura)
@@ -1,3 +1,147 @@
-from django.test import TestCase
+import functools
+import time
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from prestamos.datos_prueba import crear_usuario
+from .concurrencia import reunir
+from .middleware import PresupuestoConsultasMiddleware, presupuesto_de
+from .migraciones import SQLSegunMotor
+from .replicas import RouterReplicas, en_principal, lectura_en_replica
+
+
+class PresupuestoConsultasMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cajero = crear_usuario()
+        cls.supervisor = crear_usuario(email='supervisor@prestamos.test', staff=True)
+
+    def test_cabecera_server_timing_solo_para_staff(self):
+        url = reverse('accounts:perfil')
+        self.client.force_login(self.cajero)
+        self.assertNotIn('Server-Timing', self.client.get(url))
+
+        self.client.force_login(self.supervisor)
+        cabecera = self.client.get(url)['Server-Timing']
+        self.assertIn('sql;dur=', cabecera)
+        self.assertIn('consultas"', cabecera)
+        self.assertIn('render;dur=', cabecera)
+        self.assertIn('total;dur=', cabecera)
+
+    @override_settings(PRESUPUESTO_VISTAS={'accounts:perfil': {'consultas': 0}})
+    def test_registra_vistas_fuera_de_presupuesto(self):
+        self.client.force_login(self.cajero)
+        with self.assertLogs('core.presupuesto', 'WARNING') as registro:
+            self.client.get(reverse('accounts:perfil'))
+        self.assertIn('accounts:perfil', registro.output[0])
+        self.assertIn('consultas', registro.output[0])
+
+    @override_settings(PRESUPUESTO_VISTAS={'default': {'consultas': 5}, 'prestamos:dashboard': {'sql_ms': 10}})
+    def test_presupuesto_combina_default_y_vista(self):
+        presupuesto = presupuesto_de('prestamos:dashboard')
+        self.assertEqual(presupuesto['consultas'], 5)
+        self.assertEqual(presupuesto['sql_ms'], 10)
+        self.assertIn('total_ms', presupuesto)
+
+    def test_no_adapta_las_vistas_async(self):
+        async def vista_async(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(PresupuestoConsultasMiddleware(vista_async)))
+        self.assertFalse(iscoroutinefunction(PresupuestoConsultasMiddleware(lambda request: HttpResponse())))
+
+    async def test_cuenta_las_consultas_en_modo_async(self):
+        await self.async_client.aforce_login(self.supervisor)
+        cabecera = (await self.async_client.get(reverse('accounts:perfil')))['Server-Timing']
+        self.assertNotIn('desc="0 consultas"', cabecera)
+
+
+class ReunirTests(SimpleTestCase):
+
+    def test_consultas_en_paralelo(self):
+        consultas = {nombre: functools.partial(self.demorar, nombre) for nombre in 'abc'}
+        inicio = time.perf_counter()
+        resultados = async_to_sync(reunir)(consultas)
+        self.assertLess(time.perf_counter() - inicio, 0.25)
+        self.assertEqual(resultados, {'a': 'A', 'b': 'B', 'c': 'C'})
+
+    @staticmethod
+    def demorar(nombre):
+        time.sleep(0.1)
+        return nombre.upper()
+
+
+class SQLSegunMotorTests(SimpleTestCase):
+
+    def ejecutar(self, operacion, vendor, reversa=False):
+        editor = mock.Mock()
+        editor.connection.vendor = vendor
+        editor.connection.alias = 'default'
+        metodo = operacion.database_backwards if reversa else operacion.database_forwards
+        metodo('prestamos', editor, None, None)
+        return [llamada.args[0] for llamada in editor.execute.call_args_list]
+
+    def test_solo_en_los_motores_indicados(self):
+        operacion = SQLSegunMotor(['CREATE SEQUENCE s'], reverse_sql=['DROP SEQUENCE s'])
+        self.assertEqual(self.ejecutar(operacion, 'postgresql'), ['CREATE SEQUENCE s'])
+        self.assertEqual(self.ejecutar(operacion, 'postgresql', reversa=True), ['DROP SEQUENCE s'])
+        self.assertEqual(self.ejecutar(operacion, 'sqlite'), [])
+
+    def test_excluir_invierte_la_condicion(self):
+        operacion = SQLSegunMotor(['CREATE TABLE t (a integer)'], excluir=True)
+        self.assertEqual(self.ejecutar(operacion, 'sqlite'), ['CREATE TABLE t (a integer)'])
+        self.assertEqual(self.ejecutar(operacion, 'postgresql'), [])
+
+
+@mock.patch.dict(settings.DATABASES, {'replica': {}})
+class RouterReplicasTests(SimpleTestCase):
+    """Decisiones del router (sin consultas: ver ReplicaTests en prestamos)."""
+
+    router = RouterReplicas()
+
+    def leer(self, modelo=None):
+        from prestamos.models import Préstamo
+        return self.router.db_for_read(modelo or Préstamo)
+
+    def test_solo_las_vistas_marcadas_leen_de_la_replica(self):
+        from prestamos.models import Tarea
+
+        @lectura_en_replica
+        def vista(request):
+            with en_principal():
+                principal = self.leer()
+            return HttpResponse(' '.join([self.leer(), self.leer(Tarea), self.leer(User), principal]))
+
+        self.assertEqual(vista(None).content, b'replica default default default')
+        self.assertEqual(self.leer(), 'default')
+        self.assertEqual(async_to_sync(lectura_en_replica(self.avista))(None).content, b'replica')
+
+    async def avista(self, request):
+        return HttpResponse(self.leer())
+
+    def test_despues_de_escribir_se_lee_de_la_principal(self):
+        from prestamos.models import Pago, Tarea
+
+        @lectura_en_replica
+        def vista(request):
+            antes = self.leer()
+            self.router.db_for_write(Tarea) # La cola no cuenta
+            intermedio = self.leer()
+            self.router.db_for_write(Pago)
+            return HttpResponse(' '.join([antes, intermedio, self.leer()]))
+
+        self.assertEqual(vista(None).content, b'replica replica default')
+
+    def test_streaming_se_genera_en_la_replica(self):
+        @lectura_en_replica
+        def vista(request):
+            return StreamingHttpResponse(self.leer() for _ in range(2))
+
+        self.assertEqual(b''.join(vista(None).streaming_content), b'replicareplica')
@@ -3,7 +3,8 @@ from django.contrib import admin
 # Importamos todos los modelos desde el paquete 'models'
 from .models import (
     TasaInteres, MetodoPago, CuentaBancaria, Préstamo,
-    PlanPago, Pago, DetallePago, Mora
+    PlanPago, Pago, DetallePago, Mora, ContadorSecuencia, MarcaProceso,
+    ContadorKPI, Tarea
 )
 
 # Clases Admin simples para empezar (podemos personalizarlas luego)
@@ -30,11 +31,15 @@ class PlanPagoInline(admin.TabularInline):
     ordering = ('numero_cuota',)
 
 class PrestamoAdmin(admin.ModelAdmin):
-    list_display = ('id', 'cliente', 'monto_solicitado', 'numero_cuotas', 'estado', 'fecha_emision')
+    list_display = ('id', 'cliente', 'monto_solicitado', 'numero_cuotas', 'estado', 'saldo_pendiente_total', 'proxima_fecha_vencimiento', 'fecha_emision')
     search_fields = ('id__startswith', 'cliente__nombres', 'cliente__apellidos', 'cliente__numero_documento')
     list_filter = ('estado', 'frecuencia_pago', 'tasa_interes')
     date_hierarchy = 'fecha_emision'
-    readonly_fields = ('monto_total_interes', 'monto_total_pagar', 'fecha_creacion', 'fecha_actualizacion', 'creado_por')
+    readonly_fields = (
+        'monto_total_interes', 'monto_total_pagar',
+        'saldo_pendiente_total', 'total_pagado', 'cuotas_pagadas', 'intereses_reales', 'proxima_fecha_vencimiento',
+        'fecha_creacion', 'fecha_actualizacion', 'creado_por'
+    )
     inlines = [PlanPagoInline] # Mostrar el plan de pagos asociado
 
     # Podríamos añadir una acción para "Generar Plan de Pagos" si no lo hacemos automático al guardar
@@ -54,6 +59,19 @@ class PagoAdmin(admin.ModelAdmin):
     readonly_fields = ('fecha_creacion', 'fecha_actualizacion', 'registrado_por')
     inlines = [DetallePagoInline]
 
+class ContadorKPIAdmin(admin.ModelAdmin):
+    list_display = ('metrica', 'mes', 'valor', 'fecha_actualizacion')
+    list_filter = ('metrica',)
+    readonly_fields = ('fecha_creacion', 'fecha_actualizacion')
+
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'nombre', 'estado', 'progreso', 'intentos', 'creado_por', 'fecha_creacion', 'terminada')
+    list_filter = ('estado', 'nombre')
+    readonly_fields = (
+        'intentos', 'progreso', 'mensaje', 'resultado', 'error', 'trabajador', 'reservada_hasta',
+        'iniciada', 'terminada', 'creado_por', 'fecha_creacion', 'fecha_actualizacion'
+    )
+
 
 # Registramos todos los modelos
 admin.site.register(TasaInteres, TasaInteresAdmin)
@@ -61,7 +79,11 @@ admin.site.register(MetodoPago, MetodoPagoAdmin)
 admin.site.register(CuentaBancaria, CuentaBancariaAdmin)
 admin.site.register(Préstamo, PrestamoAdmin)
 admin.site.register(Pago, PagoAdmin)
+admin.site.register(ContadorKPI, ContadorKPIAdmin)
+admin.site.register(Tarea, TareaAdmin)
 # Registramos los otros sin personalización por ahora
 admin.site.register(PlanPago)
 admin.site.register(DetallePago)
-admin.site.register(Mora)
\ No newline at end of file
+admin.site.register(Mora)
+admin.site.register(ContadorSecuencia)
+admin.site.register(MarcaProceso)
\ No newline at end of file
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class PrestamosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'prestamos'
+
+    def ready(self):
+        # Contadores del dashboard para altas/bajas fuera de save()
+        from . import signals  # noqa: F401
+        # Registro de las tareas de la cola (prestamos/cola.py)
+        from . import tareas  # noqa: F401
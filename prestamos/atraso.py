@@ -0,0 +1,126 @@
+"""
+Reporte de antigüedad de la morosidad (aging) y cartera en riesgo (PAR).
+
+Los días de atraso de un préstamo se cuentan desde su cuota impaga más
+antigua (Préstamo.proxima_fecha_vencimiento) y el saldo es el del préstamo
+completo (Préstamo.saldo_pendiente_total, capital más intereses), como se
+mide la cartera en riesgo: PAR30 es la parte del saldo de la cartera que
+está en préstamos con más de 30 días de atraso.
+
+Los dos campos se mantienen desnormalizados en la misma transacción que
+modifica las cuotas (ver prestamos/saldos.py), así que el reporte es una
+sola consulta agrupada sobre los préstamos cobrables (una fila por préstamo
+en lugar de una por cuota), con una suma condicional por tramo.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .importacion import ESTADOS_PRESTAMO_COBRABLES
+
+CERO = Decimal('0.00')
+
+# (nombre, días mínimos de atraso, días máximos o None)
+TRAMOS = [
+    ('Al día', 0, 0),
+    ('1-30 días', 1, 30),
+    ('31-60 días', 31, 60),
+    ('61-90 días', 61, 90),
+    ('Más de 90 días', 91, None),
+]
+
+# Agrupaciones: (campos de values(), cómo mostrar cada grupo)
+DIMENSIONES = {
+    'tasa': (['tasa_interes_id', 'tasa_interes__nombre'], lambda fila: fila['tasa_interes__nombre']),
+    'frecuencia': (['frecuencia_pago'], lambda fila: fila['frecuencia_pago']),
+    'creado_por': (
+        ['creado_por_id', 'creado_por__nombre_completo'],
+        lambda fila: fila['creado_por__nombre_completo'] or 'Sin usuario',
+    ),
+}
+
+
+def _condicion(fecha, minimo, maximo):
+    """Préstamos con entre `minimo` y `maximo` días de atraso a `fecha`."""
+    if minimo == 0:
+        return Q(proxima_fecha_vencimiento__isnull=True) | Q(proxima_fecha_vencimiento__gte=fecha)
+    condicion = Q(proxima_fecha_vencimiento__lte=fecha - timedelta(days=minimo))
+    if maximo is not None:
+        condicion &= Q(proxima_fecha_vencimiento__gte=fecha - timedelta(days=maximo))
+    return condicion
+
+
+def _ratio(parte, total):
+    return (parte / total * 100).quantize(Decimal('0.01')) if total else CERO
+
+
+def _resumir(grupo, fila):
+    tramos = [
+        {
+            'nombre': nombre,
+            'prestamos': fila[f'prestamos_{indice}'],
+            'saldo': fila[f'saldo_{indice}'].quantize(Decimal('0.01')),
+        }
+        for indice, (nombre, _, _) in enumerate(TRAMOS)
+    ]
+    prestamos = sum(tramo['prestamos'] for tramo in tramos)
+    saldo = sum((tramo['saldo'] for tramo in tramos), CERO)
+    # Tramos con más de 30 y más de 90 días de atraso
+    par30 = sum((tramo['saldo'] for tramo, (_, minimo, _) in zip(tramos, TRAMOS) if minimo > 30), CERO)
+    par90 = sum((tramo['saldo'] for tramo, (_, minimo, _) in zip(tramos, TRAMOS) if minimo > 90), CERO)
+    return {
+        'grupo': grupo,
+        'tramos': tramos,
+        'prestamos': prestamos,
+        'saldo': saldo,
+        'prestamos_en_atraso': prestamos - tramos[0]['prestamos'],
+        'saldo_en_atraso': saldo - tramos[0]['saldo'],
+        'par30': _ratio(par30, saldo),
+        'par90': _ratio(par90, saldo),
+    }
+
+
+def antiguedad_cartera(fecha=None, por=None):
+    """
+    Préstamos y saldo por tramo de atraso a `fecha` (hoy por defecto), con
+    PAR30 y PAR90 en porcentaje. Con `por` (una clave de DIMENSIONES)
+    devuelve además una fila por grupo. Una sola consulta.
+    """
+    from .models import Préstamo
+
+    if por is not None and por not in DIMENSIONES:
+        raise ValueError(f'Agrupación no válida: {por}')
+    fecha = fecha or timezone.localdate()
+
+    agregados = {}
+    for indice, (_, minimo, maximo) in enumerate(TRAMOS):
+        condicion = _condicion(fecha, minimo, maximo)
+        agregados[f'prestamos_{indice}'] = Count('pk', filter=condicion)
+        agregados[f'saldo_{indice}'] = Coalesce(Sum('saldo_pendiente_total', filter=condicion), CERO)
+
+    prestamos = Préstamo.objects.filter(estado__in=ESTADOS_PRESTAMO_COBRABLES, saldo_pendiente_total__gt=0)
+    if por is None:
+        filas = [('Cartera', prestamos.aggregate(**agregados))]
+    else:
+        campos, nombre_grupo = DIMENSIONES[por]
+        filas = [
+            (nombre_grupo(fila), fila)
+            for fila in prestamos.values(*campos).annotate(**agregados).order_by(*campos)
+        ]
+
+    grupos = [_resumir(grupo, fila) for grupo, fila in filas]
+    total = {
+        f'{campo}_{indice}': sum((fila[f'{campo}_{indice}'] for _, fila in filas), 0 if campo == 'prestamos' else CERO)
+        for indice in range(len(TRAMOS))
+        for campo in ('prestamos', 'saldo')
+    }
+    return {
+        'fecha': fecha,
+        'por': por,
+        'tramos': [nombre for nombre, _, _ in TRAMOS],
+        'grupos': grupos if por is not None else [],
+        'total': _resumir('Cartera', total),
+    }
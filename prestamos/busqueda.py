@@ -0,0 +1,40 @@
+"""
+Búsqueda de préstamos por número, id o datos del cliente (ver core/busqueda.py).
+"""
+import re
+import uuid
+
+from django.db.models import FloatField, Q, Value
+
+from core.busqueda import filtrar_por_texto, solo_digitos
+
+# '1234', '#1234' o un documento con separadores
+PATRON_NUMERO = re.compile(r'^#?\s*\d[\d.\-\s]*$')
+
+
+def buscar_prestamos(queryset, consulta):
+    """
+    Filtra `queryset` (de Préstamo) por `consulta` y lo ordena por relevancia
+    (anotación `rango`). Caminos exactos, sobre índices únicos:
+    - UUID completo: por id.
+    - Número: numero_prestamo o documento del cliente.
+    Si no hay coincidencia exacta se busca en el texto normalizado del cliente.
+    """
+    consulta = (consulta or '').strip()
+    exacto = Value(1.0, output_field=FloatField())
+
+    try:
+        return queryset.filter(id=uuid.UUID(consulta)).annotate(rango=exacto)
+    except ValueError:
+        pass
+
+    if PATRON_NUMERO.match(consulta):
+        digitos = solo_digitos(consulta)
+        exactos = queryset.filter(
+            Q(numero_prestamo=int(digitos)) |
+            Q(cliente__numero_documento__in={consulta.lstrip('#'), digitos})
+        )
+        if exactos.exists():
+            return exactos.annotate(rango=exacto)
+
+    return filtrar_por_texto(queryset, 'cliente__texto_busqueda', consulta)
@@ -0,0 +1,130 @@
+"""
+Caché de los bloques agregados del dashboard y de reportes.
+
+- Claves versionadas: todas las claves incluyen una versión global que se
+  incrementa (invalidar()) cuando cambian préstamos, pagos o cuotas. Los
+  valores de versiones anteriores dejan de usarse sin tener que borrarlos.
+- Stale-while-revalidate: cada valor se considera fresco durante
+  PRESTAMOS_CACHE_FRESCURA segundos. Si está vencido o es de una versión
+  anterior, una sola petición lo recalcula (single-flight, con un candado
+  tomado con cache.add) y las demás siguen sirviendo el último valor
+  conocido mientras tanto.
+- Bloques calculados en la cola: consultar() devuelve lo que haya sin
+  calcular nada y la tarea lo guarda con guardar() (ver el reporte de
+  cancelación en prestamos/views.py).
+
+Funciona con cualquier backend de caché de Django (Redis en producción,
+locmem en desarrollo y pruebas).
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+PREFIJO = 'prestamos:agregados'
+CLAVE_VERSION = f'{PREFIJO}:version'
+# Segundos que un valor se sirve sin recalcular
+FRESCURA = getattr(settings, 'PRESTAMOS_CACHE_FRESCURA', 300)
+# Segundos que se conserva el último valor conocido (para servirlo vencido)
+VIGENCIA_MAXIMA = getattr(settings, 'PRESTAMOS_CACHE_VIGENCIA_MAXIMA', 24 * 3600)
+# Duración máxima del candado de recálculo (por si el proceso muere)
+DURACION_CANDADO = 60
+# Cuánto espera una petición sin valor previo a que otra termine de calcular
+ESPERA_MAXIMA = 5.0
+
+
+def version_actual():
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, 1, None)
+        version = cache.get(CLAVE_VERSION, 1)
+    return version
+
+
+def invalidar():
+    """
+    Marca como desactualizados todos los bloques (nueva versión de claves).
+    Dentro de una transacción se aplica al confirmarla, para que nadie
+    recalcule con datos aún no visibles.
+    """
+    def incrementar_version():
+        try:
+            cache.incr(CLAVE_VERSION)
+        except ValueError: # La clave no existe (caché vacía o expulsada)
+            cache.add(CLAVE_VERSION, 1, None)
+
+    transaction.on_commit(incrementar_version)
+
+
+def _claves(nombre, version):
+    return f'{PREFIJO}:{nombre}:v{version}', f'{PREFIJO}:{nombre}:ultimo'
+
+
+def obtener(nombre, calcular):
+    """
+    Devuelve el bloque `nombre`, calculándolo con `calcular()` solo si no
+    hay un valor fresco de la versión actual y nadie más lo está calculando.
+    """
+    clave, clave_ultimo = _claves(nombre, version_actual())
+
+    entrada = cache.get(clave)
+    if entrada is not None and entrada['expira'] > time.time():
+        return entrada['valor']
+
+    # Valor a servir si otra petición ya está recalculando: el de esta
+    # versión aunque esté vencido, o el último conocido de otra versión
+    anterior = entrada or cache.get(clave_ultimo)
+
+    candado = f'{PREFIJO}:{nombre}:candado'
+    if cache.add(candado, 1, DURACION_CANDADO):
+        try:
+            return _calcular_y_guardar(calcular, clave, clave_ultimo)
+        finally:
+            cache.delete(candado)
+
+    if anterior is not None:
+        return anterior['valor']
+
+    # Primera carga (sin valor previo): esperar a quien está calculando
+    limite = time.monotonic() + ESPERA_MAXIMA
+    while time.monotonic() < limite:
+        time.sleep(0.05)
+        entrada = cache.get(clave)
+        if entrada is not None:
+            return entrada['valor']
+    return calcular()
+
+
+def _calcular_y_guardar(calcular, clave, clave_ultimo):
+    valor = calcular()
+    _guardar(valor, clave, clave_ultimo)
+    return valor
+
+
+def _guardar(valor, clave, clave_ultimo):
+    entrada = {'valor': valor, 'expira': time.time() + FRESCURA}
+    cache.set_many({clave: entrada, clave_ultimo: entrada}, VIGENCIA_MAXIMA)
+
+
+def consultar(nombre):
+    """
+    (valor, fresco) del bloque `nombre` sin calcularlo: el valor fresco de la
+    versión actual, o el último conocido con fresco=False (None si nunca se
+    calculó). Para bloques que recalcula una tarea de la cola.
+    """
+    clave, clave_ultimo = _claves(nombre, version_actual())
+    entrada = cache.get(clave)
+    if entrada is not None and entrada['expira'] > time.time():
+        return entrada['valor'], True
+    anterior = entrada or cache.get(clave_ultimo)
+    return (anterior['valor'] if anterior is not None else None), False
+
+
+def guardar(nombre, valor, version):
+    """
+    Guarda el bloque `nombre` calculado con los datos de `version` (leída
+    con version_actual() antes de calcular: si mientras tanto hubo cambios,
+    el valor queda como último conocido pero no como fresco).
+    """
+    _guardar(valor, *_claves(nombre, version))
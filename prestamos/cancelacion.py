@@ -0,0 +1,199 @@
+"""
+Cotización de la cancelación anticipada de préstamos (sin escribir nada).
+
+Cuánto hay que pagar en una fecha para dejar un préstamo en cero, con la
+misma regla que aplica Pago.save() al registrar el pago: el interés de las
+cuotas que aún no vencen se reduce a los días transcurridos de su período
+(Ley N.º 29571 - Art. 85, ver prestamos/distribucion.py). Pagar el total
+cotizado en esa fecha cancela todas las cuotas.
+
+- cotizar_cancelacion(prestamo, fecha): un préstamo, con el detalle por
+  cuota (una consulta).
+- cotizar_cartera(fecha): todos los préstamos cobrables, por lotes de
+  préstamos (dos consultas por lote: préstamos y cronogramas).
+- totales_cartera(fecha): la suma de las cotizaciones de la cartera. La
+  calcula la tarea prestamos.totales_cancelacion, fuera de la petición, y
+  el reporte la lee de la caché (ver prestamos/cache_agregados.py).
+
+Ambas leen el cronograma como filas de values_list, sin instanciar PlanPago.
+"""
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from datetime import date
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.utils import timezone
+
+from .distribucion import ESTADOS_CUOTA_PENDIENTE, fechas_base_interes, saldo_a_la_fecha
+from .importacion import ESTADOS_PRESTAMO_COBRABLES
+
+# Préstamos por lote en cotizar_cartera
+TAMANO_LOTE = getattr(settings, 'PRESTAMOS_CANCELACION_LOTE', 1000)
+
+CERO = Decimal('0.00')
+CAMPOS_TOTALES = ('capital', 'interes', 'interes_condonado', 'pagado', 'total')
+CAMPOS_CUOTA = [
+    'prestamo_id',
+    'numero_cuota',
+    'fecha_vencimiento',
+    'monto_capital',
+    'monto_interes',
+    'monto_pagado',
+    'saldo_pendiente',
+    'estado',
+]
+
+
+@dataclass
+class CuotaCotizada:
+    numero_cuota: int
+    fecha_vencimiento: date
+    capital: Decimal
+    interes: Decimal # El que se cobra en la fecha (reducido si aún no vence)
+    interes_condonado: Decimal # Lo que se descuenta por pago anticipado
+    pagado: Decimal # Pagos parciales anteriores
+    saldo: Decimal # A pagar en la fecha
+
+
+@dataclass
+class Cotizacion:
+    prestamo_id: object
+    numero_prestamo: str
+    fecha: date
+    cliente: str = ''
+    cuotas_pendientes: int = 0
+    capital: Decimal = CERO
+    interes: Decimal = CERO
+    interes_condonado: Decimal = CERO
+    pagado: Decimal = CERO
+    total: Decimal = CERO # Monto que cancela el préstamo en la fecha
+    cuotas: list = field(default_factory=list) # CuotaCotizada (vacía sin detalle)
+
+    def como_dict(self):
+        return asdict(self)
+
+
+def cotizar(cotizacion, cronograma, fecha_emision, detalle=True):
+    """
+    Completa `cotizacion` (con su fecha ya fijada) a partir del cronograma
+    completo del préstamo. Sin consultas: también sirve para cronogramas en
+    memoria.
+    """
+    fechas_base = fechas_base_interes(cronograma, fecha_emision)
+    for cuota in sorted(cronograma, key=lambda c: c.numero_cuota):
+        # Las mismas cuotas que cubriría el pago en calcular_distribucion
+        if cuota.estado not in ESTADOS_CUOTA_PENDIENTE or cuota.saldo_pendiente <= CERO:
+            continue
+        saldo, interes = saldo_a_la_fecha(cuota, fechas_base[cuota.numero_cuota], cotizacion.fecha)
+        if saldo <= CERO:
+            continue
+        condonado = CERO if interes is None else cuota.monto_interes - interes
+        interes = cuota.monto_interes if interes is None else interes
+        pagado = cuota.monto_pagado or CERO
+
+        cotizacion.cuotas_pendientes += 1
+        cotizacion.capital += cuota.monto_capital
+        cotizacion.interes += interes
+        cotizacion.interes_condonado += condonado
+        cotizacion.pagado += pagado
+        cotizacion.total += saldo
+        if detalle:
+            cotizacion.cuotas.append(CuotaCotizada(
+                numero_cuota=cuota.numero_cuota,
+                fecha_vencimiento=cuota.fecha_vencimiento,
+                capital=cuota.monto_capital,
+                interes=interes,
+                interes_condonado=condonado,
+                pagado=pagado,
+                saldo=saldo,
+            ))
+    return cotizacion
+
+
+def cotizar_cancelacion(prestamo, fecha=None):
+    """Cotización con detalle por cuota de un préstamo a la fecha (hoy por defecto)."""
+    from .models import PlanPago
+
+    cronograma = PlanPago.objects.filter(prestamo_id=prestamo.pk).values_list(*CAMPOS_CUOTA, named=True)
+    cotizacion = Cotizacion(
+        prestamo_id=prestamo.pk,
+        numero_prestamo=prestamo.numero_prestamo,
+        fecha=fecha or timezone.localdate(),
+    )
+    return cotizar(cotizacion, list(cronograma), prestamo.fecha_emision)
+
+
+def cotizar_cartera(fecha=None, prestamos=None, tamano_lote=TAMANO_LOTE, detalle=False):
+    """
+    Genera la cotización a la fecha de cada préstamo de `prestamos` (un
+    queryset; por defecto, los cobrables), en orden de id. Sin detalle por
+    cuota salvo que se pida: la cartera completa cabe así en memoria.
+    """
+    from .models import PlanPago, Préstamo
+
+    fecha = fecha or timezone.localdate()
+    if prestamos is None:
+        prestamos = Préstamo.objects.filter(estado__in=ESTADOS_PRESTAMO_COBRABLES)
+    filas = prestamos.order_by('pk').values_list(
+        'pk', 'numero_prestamo', 'fecha_emision', 'cliente__nombres', 'cliente__apellidos', named=True
+    )
+
+    ultimo = None
+    while True:
+        lote = list((filas if ultimo is None else filas.filter(pk__gt=ultimo))[:tamano_lote])
+        if not lote:
+            return
+        ultimo = lote[-1].pk
+
+        cronogramas = defaultdict(list)
+        for cuota in PlanPago.objects.filter(
+            prestamo_id__in=[fila.pk for fila in lote]
+        ).order_by().values_list(*CAMPOS_CUOTA, named=True):
+            cronogramas[cuota.prestamo_id].append(cuota)
+
+        for fila in lote:
+            cotizacion = Cotizacion(
+                prestamo_id=fila.pk,
+                numero_prestamo=fila.numero_prestamo,
+                fecha=fecha,
+                cliente=f'{fila.cliente__nombres} {fila.cliente__apellidos}',
+            )
+            yield cotizar(cotizacion, cronogramas[fila.pk], fila.fecha_emision, detalle=detalle)
+
+
+def prestamos_por_cancelar():
+    """
+    Préstamos cobrables con saldo, los que lista el reporte de cancelación.
+    Se recorren por (numero_prestamo, id), con el índice parcial
+    prestamo_cobrable_numero_idx; todo préstamo recibe su número al crearse.
+    """
+    from .models import Préstamo
+
+    return Préstamo.objects.filter(
+        estado__in=ESTADOS_PRESTAMO_COBRABLES, saldo_pendiente_total__gt=0, numero_prestamo__isnull=False
+    )
+
+
+def fechas_de_reporte(hoy=None):
+    """
+    Fechas que admite el reporte de cancelación: hoy y el fin de este mes y
+    del siguiente. Son pocas a propósito: cada una tiene sus totales en caché.
+    """
+    hoy = hoy or timezone.localdate()
+    fin_de_mes = hoy + relativedelta(day=31)
+    return list(dict.fromkeys([hoy, fin_de_mes, fin_de_mes + relativedelta(months=1, day=31)]))
+
+
+def totales_cartera(fecha=None):
+    """Préstamos con algo por cancelar a `fecha` y la suma de sus cotizaciones."""
+    totales = dict.fromkeys(CAMPOS_TOTALES, CERO)
+    totales['prestamos'] = 0
+    for cotizacion in cotizar_cartera(fecha, prestamos=prestamos_por_cancelar()):
+        if cotizacion.total <= CERO:
+            continue
+        totales['prestamos'] += 1
+        for campo in CAMPOS_TOTALES:
+            totales[campo] += getattr(cotizacion, campo)
+    return totales
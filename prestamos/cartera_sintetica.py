@@ -0,0 +1,277 @@
+"""
+Generador de carteras sintéticas para pruebas de rendimiento.
+
+Crea clientes, préstamos con sus cronogramas (calculados con el mismo
+motor que la aplicación, prestamos/cronograma.py) e historiales de pago
+realistas, todo con bulk_create por lotes. Con la misma semilla, la misma
+fecha de corte (`hasta`) y la misma base de partida produce siempre la
+misma cartera (salvo los identificadores UUID).
+
+Los historiales siguen tres perfiles de cliente:
+- puntual: paga cada cuota alrededor de su vencimiento,
+- irregular: paga con atraso, a veces solo una parte, a veces no paga,
+- moroso: paga las primeras cuotas y deja de pagar.
+
+bulk_create no pasa por save() ni dispara señales: los saldos del
+préstamo se calculan aquí (saldos.totales_cronograma) y los contadores
+del dashboard se reconcilian al final (ver el comando generar_cartera).
+"""
+import random
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.utils import timezone
+
+from clientes.models import Cliente, Direccion, TipoDocumento
+from .cronograma import SALTOS_FRECUENCIA, generar_cronograma
+from .models import Préstamo, PlanPago, Pago, DetallePago, MetodoPago, TasaInteres
+from .numeracion import asignador
+from .saldos import totales_cronograma
+
+NOMBRES = [
+    'José', 'María', 'Juan', 'Rosa', 'Luis', 'Carmen', 'Carlos', 'Ana', 'Jorge', 'Lucía',
+    'Miguel', 'Elena', 'Pedro', 'Julia', 'Víctor', 'Patricia', 'César', 'Gloria', 'Raúl', 'Sofía',
+]
+APELLIDOS = [
+    'Quispe', 'Flores', 'Sánchez', 'Rodríguez', 'García', 'Huamán', 'Mamani', 'Rojas', 'Díaz', 'Torres',
+    'Vásquez', 'Ramírez', 'Chávez', 'Castillo', 'Mendoza', 'Gutiérrez', 'Espinoza', 'Núñez', 'Ríos', 'Pérez',
+]
+DISTRITOS = [
+    'Miraflores', 'San Isidro', 'Surco', 'San Juan de Lurigancho', 'Comas', 'Ate',
+    'Los Olivos', 'Villa El Salvador', 'Chorrillos', 'San Martín de Porres',
+]
+
+# (frecuencia, peso, plazos posibles en cuotas)
+FRECUENCIAS = [
+    ('Mensual', 60, [6, 12, 18, 24, 36]),
+    ('Quincenal', 25, [6, 12, 24]),
+    ('Semanal', 15, [12, 16, 24, 52]),
+]
+MONTOS = [Decimal(monto) for monto in (500, 1000, 1500, 2000, 3000, 5000, 8000, 10000, 15000, 20000)]
+PERFILES = [('puntual', 70), ('irregular', 20), ('moroso', 10)]
+
+CENTAVO = Decimal('0.01')
+
+
+@dataclass
+class ResultadoCartera:
+    clientes: int = 0
+    prestamos: int = 0
+    cuotas: int = 0
+    pagos: int = 0
+    segundos: float = 0.0
+
+
+@contextmanager
+def fechas_historicas(*modelos):
+    """
+    Desactiva auto_now_add de fecha_creacion mientras dura el bloque, para
+    que los registros generados conserven su fecha histórica.
+    """
+    campos = [modelo._meta.get_field('fecha_creacion') for modelo in modelos]
+    for campo in campos:
+        campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo in campos:
+            campo.auto_now_add = True
+
+
+def _elegir(aleatorio, opciones):
+    valores = [opcion[0] for opcion in opciones]
+    pesos = [opcion[1] for opcion in opciones]
+    return aleatorio.choices(valores, weights=pesos)[0]
+
+
+def _momento(fecha, aleatorio):
+    """Fecha y hora (en horario de atención) de un día dado."""
+    hora = datetime.combine(fecha, datetime.min.time()) + timedelta(minutes=aleatorio.randint(8 * 60, 19 * 60))
+    return timezone.make_aware(hora)
+
+
+def generar_cartera(clientes, prestamos, semilla=42, hasta=None, anios=3, tamano_lote=2000, progreso=None):
+    """
+    Genera `clientes` clientes y `prestamos` préstamos (repartidos entre
+    ellos) emitidos en los últimos `anios` años hasta la fecha `hasta`.
+    Cada lote de clientes va en su propia transacción. `progreso`, si se
+    pasa, se llama con el ResultadoCartera acumulado después de cada lote.
+    """
+    inicio = time.perf_counter()
+    aleatorio = random.Random(semilla)
+    hasta = hasta or timezone.localdate()
+    resultado = ResultadoCartera()
+
+    tipo_documento, _ = TipoDocumento.objects.get_or_create(nombre='DNI')
+    tasas = list(TasaInteres.objects.filter(tipo_tasa='Simple').order_by('pk'))
+    metodos = list(MetodoPago.objects.filter(activo=True).order_by('pk'))
+    if not tasas or not metodos:
+        raise ValueError('Faltan tasas de interés o métodos de pago (ejecutar poblar_datos_iniciales)')
+
+    # Los documentos continúan después de los clientes ya existentes
+    desplazamiento = Cliente.objects.count()
+    for desde in range(0, clientes, tamano_lote):
+        cantidad = min(tamano_lote, clientes - desde)
+        # Préstamos de este lote: reparto parejo de `prestamos` entre `clientes`
+        por_cliente = [
+            prestamos // clientes + (1 if indice < prestamos % clientes else 0)
+            for indice in range(desde, desde + cantidad)
+        ]
+        with transaction.atomic(), fechas_historicas(Cliente, Direccion, Préstamo, PlanPago, Pago, DetallePago):
+            _generar_lote(
+                aleatorio, desplazamiento + desde, por_cliente, hasta, anios,
+                tipo_documento, tasas, metodos, resultado,
+            )
+        if progreso:
+            resultado.segundos = time.perf_counter() - inicio
+            progreso(resultado)
+
+    resultado.segundos = time.perf_counter() - inicio
+    return resultado
+
+
+def _generar_lote(aleatorio, primer_indice, por_cliente, hasta, anios, tipo_documento, tasas, metodos, resultado):
+    numeros = iter(asignador.reservar(sum(por_cliente)) if sum(por_cliente) else [])
+    lote_clientes, lote_direcciones = [], []
+    lote_prestamos, lote_cuotas, lote_pagos, lote_detalles = [], [], [], []
+
+    for desplazamiento, cantidad_prestamos in enumerate(por_cliente):
+        indice = primer_indice + desplazamiento
+        nombres = aleatorio.choice(NOMBRES)
+        apellidos = f'{aleatorio.choice(APELLIDOS)} {aleatorio.choice(APELLIDOS)}'
+        emisiones = sorted(
+            hasta - timedelta(days=aleatorio.randint(0, anios * 365)) for _ in range(cantidad_prestamos)
+        )
+        alta = (emisiones[0] if emisiones else hasta) - timedelta(days=aleatorio.randint(0, 30))
+
+        cliente = Cliente(
+            tipo_documento=tipo_documento,
+            numero_documento=f'{10000000 + indice:08d}',
+            nombres=nombres,
+            apellidos=apellidos,
+            email=f'cliente{indice}@cartera.test' if aleatorio.random() < 0.6 else None,
+            telefono=f'9{aleatorio.randint(10000000, 99999999)}',
+            fecha_creacion=_momento(alta, aleatorio),
+        )
+        cliente.texto_busqueda = cliente.calcular_texto_busqueda()
+        lote_clientes.append(cliente)
+        lote_direcciones.append(Direccion(
+            cliente=cliente,
+            direccion_linea_1=f'Av. {aleatorio.choice(APELLIDOS)} {aleatorio.randint(100, 2999)}',
+            distrito=aleatorio.choice(DISTRITOS),
+            ciudad='Lima',
+            fecha_creacion=cliente.fecha_creacion,
+        ))
+
+        for emision in emisiones:
+            frecuencia, _, plazos = FRECUENCIAS[
+                aleatorio.choices(range(len(FRECUENCIAS)), weights=[f[1] for f in FRECUENCIAS])[0]
+            ]
+            tasa = aleatorio.choice(tasas)
+            prestamo = Préstamo(
+                numero_prestamo=next(numeros),
+                cliente=cliente,
+                tasa_interes=tasa,
+                monto_solicitado=aleatorio.choice(MONTOS),
+                numero_cuotas=aleatorio.choice(plazos),
+                frecuencia_pago=frecuencia,
+                fecha_emision=emision,
+                fecha_primer_pago=emision + SALTOS_FRECUENCIA[frecuencia],
+                fecha_creacion=_momento(emision, aleatorio),
+            )
+            cronograma = generar_cronograma(
+                monto_solicitado=prestamo.monto_solicitado,
+                numero_cuotas=prestamo.numero_cuotas,
+                frecuencia_pago=frecuencia,
+                fecha_primer_pago=prestamo.fecha_primer_pago,
+                valor_porcentaje=tasa.valor_porcentaje,
+                periodo=tasa.periodo,
+                tipo_tasa=tasa.tipo_tasa,
+            )
+            prestamo.monto_total_interes = cronograma['monto_total_interes']
+            prestamo.monto_total_pagar = cronograma['monto_total_pagar']
+
+            cuotas = [
+                PlanPago(prestamo=prestamo, fecha_creacion=prestamo.fecha_creacion, **datos)
+                for datos in cronograma['cuotas']
+            ]
+            pagos = _simular_pagos(aleatorio, prestamo, cuotas, hasta, metodos)
+
+            for campo, valor in totales_cronograma(cuotas).items():
+                setattr(prestamo, campo, valor)
+            prestamo.estado = _estado_prestamo(cuotas, hasta)
+
+            lote_prestamos.append(prestamo)
+            lote_cuotas.extend(cuotas)
+            for pago, detalle in pagos:
+                lote_pagos.append(pago)
+                lote_detalles.append(detalle)
+
+    Cliente.objects.bulk_create(lote_clientes)
+    Direccion.objects.bulk_create(lote_direcciones)
+    Préstamo.objects.bulk_create(lote_prestamos)
+    PlanPago.objects.bulk_create(lote_cuotas, batch_size=5000)
+    Pago.objects.bulk_create(lote_pagos, batch_size=5000)
+    DetallePago.objects.bulk_create(lote_detalles, batch_size=5000)
+
+    resultado.clientes += len(lote_clientes)
+    resultado.prestamos += len(lote_prestamos)
+    resultado.cuotas += len(lote_cuotas)
+    resultado.pagos += len(lote_pagos)
+
+
+def _simular_pagos(aleatorio, prestamo, cuotas, hasta, metodos):
+    """
+    Aplica a las cuotas (en memoria) el historial de pagos según el perfil
+    del cliente y devuelve [(Pago, DetallePago)]. Un pago por cuota pagada.
+    """
+    perfil = _elegir(aleatorio, PERFILES)
+    deja_de_pagar = aleatorio.randint(0, len(cuotas) // 2) if perfil == 'moroso' else None
+    pagos = []
+    for cuota in cuotas:
+        cuota.monto_pagado = Decimal('0.00')
+        if cuota.fecha_vencimiento > hasta + timedelta(days=3):
+            cuota.estado = 'Pendiente'
+        else:
+            if perfil == 'puntual':
+                atraso, fraccion = aleatorio.randint(-3, 2), Decimal('1')
+            elif perfil == 'irregular':
+                atraso = aleatorio.randint(0, 25)
+                fraccion = Decimal('0') if aleatorio.random() < 0.2 else (
+                    Decimal('0.5') if aleatorio.random() < 0.15 else Decimal('1')
+                )
+            else:
+                atraso = aleatorio.randint(0, 10)
+                fraccion = Decimal('1') if cuota.numero_cuota <= deja_de_pagar else Decimal('0')
+
+            fecha_pago = cuota.fecha_vencimiento + timedelta(days=atraso)
+            if fraccion and fecha_pago <= hasta:
+                monto = (cuota.monto_total_cuota * fraccion).quantize(CENTAVO, rounding=ROUND_HALF_UP)
+                cuota.monto_pagado = monto
+                momento = _momento(fecha_pago, aleatorio)
+                pago = Pago(
+                    prestamo=prestamo,
+                    monto_pagado=monto,
+                    fecha_pago=momento,
+                    metodo_pago=aleatorio.choice(metodos),
+                    distribuido=True,
+                    fecha_creacion=momento,
+                )
+                pagos.append((pago, DetallePago(pago=pago, cuota_plan=cuota, monto_aplicado=monto, fecha_creacion=momento)))
+            # Vencida o pendiente según la fecha; actualizar_saldo_y_estado
+            # la pasa a Pagada / Pagada Parcialmente según lo pagado
+            cuota.estado = 'Vencida' if cuota.fecha_vencimiento < hasta else 'Pendiente'
+        cuota.actualizar_saldo_y_estado()
+    return pagos
+
+
+def _estado_prestamo(cuotas, hasta):
+    if all(cuota.estado == 'Pagada' for cuota in cuotas):
+        return 'Pagado'
+    if any(cuota.saldo_pendiente > 0 and cuota.fecha_vencimiento < hasta for cuota in cuotas):
+        return 'En Atraso'
+    return 'Activo'
@@ -0,0 +1,238 @@
+"""
+Cola de tareas en la base de datos (sin broker externo).
+
+- Las funciones se registran con @tarea('nombre') (ver prestamos/tareas.py).
+  Reciben la Tarea y sus argumentos, informan su avance con
+  tarea.informar(porcentaje, mensaje) y lo que devuelven (JSON) queda en
+  Tarea.resultado.
+- encolar() crea la Tarea pendiente. Las vistas la siguen con
+  prestamos:tarea (página) o prestamos:estado_tarea (JSON).
+- El comando procesar_tareas lanza un proceso por núcleo. Cada uno toma la
+  siguiente tarea con SELECT ... FOR UPDATE SKIP LOCKED (en PostgreSQL) y una
+  actualización condicional, así dos procesos nunca ejecutan la misma.
+- Si una tarea falla se reintenta hasta max_intentos veces, esperando
+  REINTENTO_BASE * 2^(intento - 1) segundos (±20 %, hasta REINTENTO_MAXIMO).
+- La reserva dura RESERVA segundos y cada tarea.informar() la renueva
+  (latido). Si el proceso muere o deja de informar, al vencer la reserva
+  otro proceso la retoma (cuenta como un intento). El proceso anterior ya
+  no puede cerrarla: el resultado y los fallos solo se guardan si la tarea
+  sigue reservada a su nombre, y su próximo informar() lo detiene.
+
+Los modelos se importan dentro de las funciones: los procesos hijos de
+procesar_tareas importan este módulo antes de django.setup().
+"""
+import logging
+import os
+import random
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+logger = logging.getLogger('prestamos.cola')
+
+# Espera antes del primer reintento (se duplica en cada intento)
+REINTENTO_BASE = getattr(settings, 'PRESTAMOS_COLA_REINTENTO_BASE', 30)
+# Espera máxima entre reintentos
+REINTENTO_MAXIMO = getattr(settings, 'PRESTAMOS_COLA_REINTENTO_MAXIMO', 3600)
+# Segundos sin latido (tarea.informar) tras los que una tarea se considera abandonada
+RESERVA = getattr(settings, 'PRESTAMOS_COLA_RESERVA', 30 * 60)
+# Segundos entre consultas a la cola cuando está vacía
+ESPERA = getattr(settings, 'PRESTAMOS_COLA_ESPERA', 1.0)
+
+REGISTRO = {}
+
+
+class ReservaPerdida(Exception):
+    """La tarea venció su reserva y la retomó otro proceso."""
+
+
+def tarea(nombre):
+    """Decorador que registra una función como tarea de la cola."""
+    def registrar(funcion):
+        REGISTRO[nombre] = funcion
+        return funcion
+    return registrar
+
+
+def encolar(nombre, argumentos=None, creado_por=None, unica=False, max_intentos=3):
+    """
+    Agrega una tarea a la cola y la devuelve. `argumentos` (JSON) se pasan
+    como palabras clave a la función. Con unica=True, si ya hay una igual
+    (mismo nombre y argumentos) pendiente o en proceso, devuelve esa.
+    Dentro de una transacción, los procesos la ven recién al confirmarla.
+    """
+    from .models import Tarea
+
+    argumentos = argumentos or {}
+    if nombre not in REGISTRO:
+        raise ValueError(f'Tarea no registrada: {nombre}')
+    if unica:
+        existente = Tarea.objects.filter(
+            nombre=nombre, argumentos=argumentos, estado__in=('Pendiente', 'En Proceso')
+        ).first()
+        if existente is not None:
+            return existente
+    return Tarea.objects.create(
+        nombre=nombre,
+        argumentos=argumentos,
+        max_intentos=max_intentos,
+        creado_por=creado_por,
+    )
+
+
+def tomar_siguiente(trabajador):
+    """
+    Reserva para `trabajador` la siguiente tarea disponible (pendiente, o
+    abandonada por un proceso que murió) y la devuelve; None si no hay.
+    """
+    from .models import Tarea
+
+    for _ in range(5): # Otro proceso puede ganarla entre la lectura y la reserva
+        ahora = timezone.now()
+        disponibles = Tarea.objects.filter(
+            Q(estado='Pendiente', disponible_desde__lte=ahora)
+            | Q(estado='En Proceso', reservada_hasta__lt=ahora)
+        ).order_by('disponible_desde', 'id')
+        with transaction.atomic():
+            candidata = disponibles.select_for_update(skip_locked=True).first()
+            if candidata is None:
+                return None
+            reservada = Tarea.objects.filter(
+                pk=candidata.pk, estado=candidata.estado, intentos=candidata.intentos
+            ).update(
+                estado='En Proceso',
+                trabajador=trabajador,
+                reservada_hasta=ahora + timedelta(seconds=RESERVA),
+                intentos=F('intentos') + 1,
+                iniciada=ahora,
+                fecha_actualizacion=ahora,
+            )
+        if reservada:
+            candidata.refresh_from_db()
+            return candidata
+    return None
+
+
+def ejecutar(tarea):
+    """Ejecuta una tarea ya reservada y guarda su resultado o su error."""
+    from .models import Tarea
+
+    try:
+        if tarea.intentos > tarea.max_intentos:
+            # Retomada tras agotar sus intentos: no se vuelve a ejecutar
+            raise RuntimeError('El proceso que la ejecutaba se detuvo y no quedan intentos')
+        funcion = REGISTRO.get(tarea.nombre)
+        if funcion is None:
+            raise LookupError(f'Tarea no registrada: {tarea.nombre}')
+        resultado = funcion(tarea, **tarea.argumentos)
+    except ReservaPerdida:
+        logger.warning('Tarea %s #%s: la retomó otro proceso, se abandona', tarea.nombre, tarea.pk)
+        return False
+    except Exception as e:
+        _registrar_fallo(tarea, e)
+        return False
+
+    ahora = timezone.now()
+    cerrada = Tarea.reservadas_por(tarea.trabajador).filter(pk=tarea.pk).update(
+        estado='Completada',
+        progreso=100,
+        resultado=resultado,
+        error='',
+        reservada_hasta=None,
+        terminada=ahora,
+        fecha_actualizacion=ahora,
+    )
+    if not cerrada:
+        logger.warning(
+            'Tarea %s #%s terminó después de que otro proceso la retomara: se descarta el resultado',
+            tarea.nombre, tarea.pk,
+        )
+    return bool(cerrada)
+
+
+def espera_reintento(intento):
+    """Segundos antes del reintento número `intento` (1, 2, ...)."""
+    espera = min(REINTENTO_MAXIMO, REINTENTO_BASE * 2 ** (intento - 1))
+    return espera * random.uniform(0.8, 1.2)
+
+
+def _registrar_fallo(tarea, error):
+    from .models import Tarea
+
+    ahora = timezone.now()
+    detalle = ''.join(traceback.format_exception(error))
+    if tarea.intentos < tarea.max_intentos:
+        espera = espera_reintento(tarea.intentos)
+        logger.warning(
+            'Tarea %s #%s falló (intento %d de %d), se reintenta en %.0fs: %s',
+            tarea.nombre, tarea.pk, tarea.intentos, tarea.max_intentos, espera, error,
+        )
+        cambios = {'estado': 'Pendiente', 'disponible_desde': ahora + timedelta(seconds=espera)}
+    else:
+        logger.error('Tarea %s #%s falló definitivamente: %s', tarea.nombre, tarea.pk, error)
+        cambios = {'estado': 'Fallida', 'terminada': ahora}
+    # Si otro proceso ya la retomó, el fallo de este no cambia nada
+    Tarea.reservadas_por(tarea.trabajador).filter(pk=tarea.pk).update(
+        error=detalle,
+        mensaje=str(error)[:255],
+        reservada_hasta=None,
+        fecha_actualizacion=ahora,
+        **cambios,
+    )
+
+
+def nombre_trabajador(indice=0):
+    return f'{socket.gethostname()}:{os.getpid()}:{indice}'
+
+
+def trabajar(detener, una_vez=False, espera=None, indice=0):
+    """
+    Toma y ejecuta tareas hasta que se active `detener` (un Event). Con
+    una_vez=True termina cuando la cola queda vacía. Devuelve
+    (completadas, fallidas).
+    """
+    trabajador = nombre_trabajador(indice)
+    espera = ESPERA if espera is None else espera
+    completadas = fallidas = 0
+    while not detener.is_set():
+        # Como al empezar cada petición: descarta conexiones rotas o vencidas
+        close_old_connections()
+        try:
+            tarea_actual = tomar_siguiente(trabajador)
+            if tarea_actual is None:
+                if una_vez:
+                    break
+                detener.wait(espera)
+                continue
+            if ejecutar(tarea_actual):
+                completadas += 1
+            else:
+                fallidas += 1
+        except DatabaseError:
+            # La base no respondió al tomar o al cerrar la tarea: si quedó
+            # reservada, se retoma al vencer la reserva
+            logger.exception('Error de base de datos en el trabajador %s', trabajador)
+            connections.close_all()
+            detener.wait(espera)
+    return completadas, fallidas
+
+
+def proceso_trabajador(indice, detener, una_vez, espera):
+    """Punto de entrada de cada proceso hijo de procesar_tareas."""
+    import signal
+
+    import django
+
+    # Ctrl+C lo atiende el proceso principal, que activa `detener`: la
+    # tarea en curso termina antes de salir
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    django.setup()
+    try:
+        trabajar(detener, una_vez=una_vez, espera=espera, indice=indice)
+    finally:
+        connections.close_all()
@@ -0,0 +1,157 @@
+"""
+Registro de las consultas frecuentes (las que corren en cada pago, en cada
+carga del dashboard o de los listados, y en los procesos diarios).
+
+Cada consulta se registra con @consulta_frecuente y reproduce la forma de
+la consulta real (mismos filtros y orden) con valores de muestra. El
+comando explicar_consultas ejecuta EXPLAIN sobre todas y falla si alguna
+recorre una tabla completa, así un índice faltante o un cambio en la
+consulta se detecta antes de llegar a producción.
+
+Los índices que las sirven están en Meta.indexes de cada modelo.
+"""
+import uuid
+from datetime import timedelta
+
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from clientes.models import Cliente
+from .devengo_mora import cuotas_a_revisar
+from .models import Préstamo, PlanPago, Pago
+
+# nombre -> (función que arma el queryset, motores en los que aplica o None)
+CONSULTAS = {}
+
+
+def consulta_frecuente(nombre, motores=None):
+    """Registra una función que recibe la muestra (dict) y devuelve un queryset."""
+    def registrar(funcion):
+        CONSULTAS[nombre] = (funcion, motores)
+        return funcion
+    return registrar
+
+
+def muestra_por_defecto():
+    """Valores de muestra para los parámetros de las consultas."""
+    hoy = timezone.localdate()
+    ahora = timezone.now()
+    return {
+        'hoy': hoy,
+        'ahora': ahora,
+        'prestamo_id': Préstamo.objects.values_list('pk', flat=True).first() or uuid.uuid4(),
+        'numero_documento': '12345678',
+        'numero_prestamo': 1,
+    }
+
+
+# --- Procesos diarios ---
+
+@consulta_frecuente('verificar_vencimientos: cuotas pendientes vencidas')
+def _cuotas_pendientes_vencidas(muestra):
+    return (
+        PlanPago.objects.filter(fecha_vencimiento__lt=muestra['hoy'], estado='Pendiente')
+        .order_by('fecha_vencimiento', 'pk')
+        .values_list('pk', 'prestamo_id')[:2000]
+    )
+
+
+@consulta_frecuente('verificar_vencimientos: préstamos en atraso ya al día')
+def _prestamos_al_dia(muestra):
+    cuotas_atrasadas = PlanPago.objects.filter(
+        prestamo=OuterRef('pk'),
+        fecha_vencimiento__lt=muestra['hoy'],
+        saldo_pendiente__gt=0,
+    ).exclude(estado__in=['Pagada', 'Cancelada'])
+    return (
+        Préstamo.objects.filter(estado='En Atraso')
+        .exclude(Exists(cuotas_atrasadas))
+        .values_list('pk', flat=True)[:2000]
+    )
+
+
+@consulta_frecuente('devengo_mora: cuotas que cambiaron o vencieron desde la última ejecución')
+def _cuotas_con_mora(muestra):
+    return PlanPago.objects.filter(
+        cuotas_a_revisar(muestra['hoy'], muestra['ahora'] - timedelta(days=1), muestra['hoy'] - timedelta(days=1))
+    ).order_by().values_list('pk', 'saldo_pendiente', 'fecha_vencimiento', 'estado')
+
+
+# --- Registro de pagos ---
+
+@consulta_frecuente('PagoForm: cuotas sin pagar del préstamo')
+def _cuotas_sin_pagar(muestra):
+    return PlanPago.objects.filter(
+        prestamo_id=muestra['prestamo_id'],
+        estado__in=['Pendiente', 'Vencida', 'Pagada Parcialmente'],
+    ).order_by('numero_cuota')
+
+
+@consulta_frecuente('Pago.save: cronograma del préstamo')
+def _cronograma_prestamo(muestra):
+    return PlanPago.objects.filter(prestamo_id=muestra['prestamo_id']).order_by('numero_cuota')
+
+
+# --- Dashboard y reportes ---
+
+@consulta_frecuente('dashboard: préstamos recientes')
+def _prestamos_recientes(muestra):
+    return Préstamo.objects.order_by('-fecha_creacion')[:5]
+
+
+@consulta_frecuente('dashboard: pagos recientes')
+def _pagos_recientes(muestra):
+    return Pago.objects.order_by('-fecha_pago')[:5]
+
+
+@consulta_frecuente('KPIs: préstamos por estado creados en el mes')
+def _prestamos_por_estado(muestra):
+    inicio_mes = muestra['ahora'].replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return Préstamo.objects.filter(estado='En Atraso', fecha_creacion__gte=inicio_mes).values('pk')
+
+
+@consulta_frecuente('reportes: cobranza de la última semana')
+def _cobranza_semana(muestra):
+    return Pago.objects.filter(fecha_pago__gte=muestra['ahora'] - timedelta(days=7)).values('monto_pagado')
+
+
+# --- Listados y búsqueda ---
+
+@consulta_frecuente('lista_prestamos: página siguiente (keyset)')
+def _pagina_prestamos(muestra):
+    return Préstamo.objects.filter(
+        Q(fecha_emision__lt=muestra['hoy']) |
+        Q(fecha_emision=muestra['hoy'], id__lt=muestra['prestamo_id'])
+    ).order_by('-fecha_emision', '-id')[:16]
+
+
+@consulta_frecuente('reporte_cancelacion: página siguiente (keyset)')
+def _pagina_cancelacion(muestra):
+    from .cancelacion import prestamos_por_cancelar
+    return prestamos_por_cancelar().filter(
+        Q(numero_prestamo__gt=muestra['numero_prestamo']) |
+        Q(numero_prestamo=muestra['numero_prestamo'], id__gt=muestra['prestamo_id'])
+    ).order_by('numero_prestamo', 'id')[:51]
+
+
+@consulta_frecuente('lista_clientes: página siguiente (keyset)')
+def _pagina_clientes(muestra):
+    return Cliente.objects.filter(
+        Q(fecha_creacion__lt=muestra['ahora']) |
+        Q(fecha_creacion=muestra['ahora'], id__lt=1)
+    ).order_by('-fecha_creacion', '-id')[:26]
+
+
+@consulta_frecuente('búsqueda: cliente por documento exacto')
+def _cliente_por_documento(muestra):
+    return Cliente.objects.filter(numero_documento=muestra['numero_documento'])
+
+
+@consulta_frecuente('búsqueda: préstamo por número')
+def _prestamo_por_numero(muestra):
+    return Préstamo.objects.filter(numero_prestamo=muestra['numero_prestamo'])
+
+
+@consulta_frecuente('búsqueda: clientes por texto (trigramas)', motores=('postgresql',))
+def _clientes_por_texto(muestra):
+    return Cliente.objects.filter(texto_busqueda__contains='perez')[:25]
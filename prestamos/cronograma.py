@@ -0,0 +1,99 @@
+"""
+Motor de cálculo del cronograma de pagos.
+
+Funciones puras (sin acceso a la base de datos) que calculan los intereses
+y todas las cuotas de un préstamo en memoria. Las usan tanto Préstamo.save()
+para persistir el plan como la vista previa de crear_prestamo.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from dateutil.relativedelta import relativedelta
+
+
+# Cuántos períodos de cada frecuencia de pago caben en el período de la tasa
+DIVISORES_TASA = {
+    'Anual': {'Mensual': Decimal('12'), 'Quincenal': Decimal('24'), 'Semanal': Decimal('52')},
+    'Mensual': {'Quincenal': Decimal('2'), 'Semanal': Decimal('4')},
+}
+
+# Salto entre una fecha de vencimiento y la siguiente
+SALTOS_FRECUENCIA = {
+    'Mensual': relativedelta(months=1),
+    'Quincenal': relativedelta(weeks=2),
+    'Semanal': relativedelta(weeks=1),
+}
+
+
+def calcular_tasa_ajustada(valor_porcentaje, periodo, frecuencia_pago):
+    """
+    Convierte la tasa (en %) de su período de aplicación
+    a la tasa equivalente por cuota según la frecuencia de pago.
+    """
+    tasa_porcentaje = Decimal(valor_porcentaje) / Decimal('100')
+    divisor = DIVISORES_TASA.get(periodo, {}).get(frecuencia_pago)
+    if divisor is None:
+        # Para otros períodos (o misma frecuencia), usar la tasa directamente
+        return tasa_porcentaje
+    return tasa_porcentaje / divisor
+
+
+def generar_fechas_vencimiento(fecha_primer_pago, numero_cuotas, frecuencia_pago):
+    """
+    Devuelve la lista de fechas de vencimiento de las cuotas.
+    """
+    salto = SALTOS_FRECUENCIA.get(frecuencia_pago)
+    fechas = []
+    fecha_cuota = fecha_primer_pago
+    for _ in range(numero_cuotas):
+        fechas.append(fecha_cuota)
+        if salto is not None:
+            fecha_cuota += salto
+    return fechas
+
+
+def generar_cronograma(monto_solicitado, numero_cuotas, frecuencia_pago, fecha_primer_pago,
+                       valor_porcentaje, periodo, tipo_tasa='Simple'):
+    """
+    Calcula los totales y el plan de pagos completo de un préstamo.
+
+    Devuelve un diccionario con 'monto_total_interes', 'monto_total_pagar'
+    y 'cuotas' (lista de diccionarios con numero_cuota, fecha_vencimiento,
+    monto_capital, monto_interes y monto_total_cuota). La última cuota
+    absorbe las diferencias de redondeo.
+    """
+    if tipo_tasa != 'Simple':
+        raise ValueError("Cálculo solo implementado para Tasa Simple")
+
+    monto_solicitado = Decimal(monto_solicitado)
+    tasa_ajustada = calcular_tasa_ajustada(valor_porcentaje, periodo, frecuencia_pago)
+
+    interes_por_cuota = (monto_solicitado * tasa_ajustada).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    monto_total_interes = interes_por_cuota * numero_cuotas
+    monto_total_pagar = monto_solicitado + monto_total_interes
+
+    capital_por_cuota = (monto_solicitado / numero_cuotas).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    monto_total_cuota = capital_por_cuota + interes_por_cuota
+
+    fechas = generar_fechas_vencimiento(fecha_primer_pago, numero_cuotas, frecuencia_pago)
+    cuotas = [
+        {
+            'numero_cuota': i,
+            'fecha_vencimiento': fechas[i - 1],
+            'monto_capital': capital_por_cuota,
+            'monto_interes': interes_por_cuota,
+            'monto_total_cuota': monto_total_cuota,
+        }
+        for i in range(1, numero_cuotas + 1)
+    ]
+
+    # Ajuste de la última cuota para evitar errores de redondeo
+    ultima = cuotas[-1]
+    anteriores = numero_cuotas - 1
+    ultima['monto_capital'] = monto_solicitado - capital_por_cuota * anteriores
+    ultima['monto_interes'] = monto_total_interes - interes_por_cuota * anteriores
+    ultima['monto_total_cuota'] = ultima['monto_capital'] + ultima['monto_interes']
+
+    return {
+        'monto_total_interes': monto_total_interes,
+        'monto_total_pagar': monto_total_pagar,
+        'cuotas': cuotas,
+    }
@@ -0,0 +1,107 @@
+"""
+Datos de prueba para los tests de las apps.
+
+sembrar_cartera() crea una cartera chica pero completa (clientes con
+dirección, préstamos con su cronograma, pagos distribuidos) pasando por
+los save() reales, para que los tests ejerciten los mismos caminos que
+la aplicación.
+"""
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from accounts.models import Usuario
+from clientes.models import Cliente, Direccion, TipoDocumento
+from .models import Préstamo, Pago, MetodoPago, TasaInteres
+
+
+@dataclass
+class Cartera:
+    usuario: Usuario
+    tipo_documento: TipoDocumento
+    tasa: TasaInteres
+    metodo_pago: MetodoPago
+    clientes: list = field(default_factory=list)
+    prestamos: list = field(default_factory=list)
+    pagos: list = field(default_factory=list)
+
+
+def crear_usuario(email='cajero@prestamos.test', staff=False):
+    return Usuario.objects.create_user(
+        email=email,
+        username=email.split('@')[0],
+        nombre_completo='Usuario de Prueba',
+        password='clave-de-prueba',
+        is_staff=staff,
+    )
+
+
+def sembrar_cartera(clientes=5, prestamos_por_cliente=2, cuotas=6, pagos_por_prestamo=1, cartera=None):
+    """
+    Crea (o amplía, si se pasa `cartera`) una cartera de prueba y la devuelve.
+    Ver crear_prestamo para los préstamos de cada cliente.
+    """
+    if cartera is None:
+        cartera = Cartera(
+            usuario=crear_usuario(),
+            tipo_documento=TipoDocumento.objects.get_or_create(nombre='DNI')[0],
+            tasa=TasaInteres.objects.get_or_create(
+                nombre='Tasa de prueba',
+                defaults={'tipo_tasa': 'Simple', 'valor_porcentaje': Decimal('10.00'), 'periodo': 'Mensual'},
+            )[0],
+            metodo_pago=MetodoPago.objects.get_or_create(nombre='Efectivo')[0],
+        )
+
+    inicio = len(cartera.clientes)
+    for i in range(inicio, inicio + clientes):
+        cliente = Cliente.objects.create(
+            tipo_documento=cartera.tipo_documento,
+            numero_documento=f'{10000000 + i}',
+            nombres=f'Nombre{i}',
+            apellidos=f'Apellido{i}',
+            email=f'cliente{i}@prestamos.test',
+        )
+        Direccion.objects.create(cliente=cliente, direccion_linea_1=f'Calle {i}', distrito='Miraflores', ciudad='Lima')
+        cartera.clientes.append(cliente)
+
+        for _ in range(prestamos_por_cliente):
+            crear_prestamo(cartera, cliente, cuotas=cuotas, pagos=pagos_por_prestamo)
+    return cartera
+
+
+def crear_prestamo(cartera, cliente, cuotas=6, pagos=1):
+    """
+    Préstamo emitido hace `cuotas` meses (así parte del cronograma ya venció),
+    con `pagos` pagos de S/ 100 distribuidos por Pago.save().
+    """
+    emision = timezone.localdate() - timedelta(days=30 * cuotas)
+    prestamo = Préstamo.objects.create(
+        cliente=cliente,
+        tasa_interes=cartera.tasa,
+        monto_solicitado=Decimal('1200.00'),
+        numero_cuotas=cuotas,
+        frecuencia_pago='Mensual',
+        fecha_emision=emision,
+        fecha_primer_pago=emision + timedelta(days=30),
+        creado_por=cartera.usuario,
+    )
+    cartera.prestamos.append(prestamo)
+
+    for _ in range(pagos):
+        registrar_pago(cartera, prestamo)
+    return prestamo
+
+
+def registrar_pago(cartera, prestamo, monto=Decimal('100.00')):
+    """Pago distribuido en las cuotas por Pago.save()."""
+    pago = Pago(
+        prestamo=prestamo,
+        monto_pagado=monto,
+        metodo_pago=cartera.metodo_pago,
+        registrado_por=cartera.usuario,
+    )
+    pago.save()
+    cartera.pagos.append(pago)
+    return pago
@@ -0,0 +1,148 @@
+"""
+Devengo incremental de moras (cargos por atraso).
+
+La mora de una cuota vencida es el 5% mensual (30 días) de su saldo
+pendiente. Para un saldo que no cambia, la mora de cualquier día se deduce
+de la fila anterior (Mora.monto_a_la_fecha), así que cada ejecución solo
+procesa las cuotas cuyo saldo o estado cambió desde la ejecución previa (en
+cualquier estado) y las que vencieron desde entonces:
+
+- Si la cuota sigue vencida con saldo (también 'Pagada Parcialmente'), se
+  recalcula su mora y se escribe una fila de Mora por (cuota, fecha_generacion).
+- Si ya no (pagada, cancelada o con el vencimiento corrido), sus moras
+  'Pendiente' se cierran: 'Pagada' junto con la cuota pagada, 'Cancelada'
+  en los demás casos.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .distribucion import ESTADOS_CUOTA_PENDIENTE
+
+TASA_MORA_MENSUAL = Decimal('0.05')  # 5% mensual
+DIAS_POR_MES = 30
+NOMBRE_PROCESO = 'devengar_moras'
+
+
+def calcular_monto_mora(saldo_pendiente, dias_vencido):
+    """
+    Mora de un saldo con `dias_vencido` días de atraso (aritmética decimal
+    con días enteros, sin pasar por float).
+    """
+    if dias_vencido <= 0 or saldo_pendiente <= 0:
+        return Decimal('0.00')
+    mora = saldo_pendiente * TASA_MORA_MENSUAL * dias_vencido / DIAS_POR_MES
+    return mora.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def en_mora(fecha):
+    """Cuotas impagas vencidas antes de `fecha` con saldo."""
+    return Q(estado__in=ESTADOS_CUOTA_PENDIENTE, saldo_pendiente__gt=0, fecha_vencimiento__lt=fecha)
+
+
+def cuotas_a_revisar(fecha, ultima_ejecucion, ultima_fecha):
+    """
+    Las que cambiaron de saldo o de estado desde la ejecución anterior (en
+    cualquier estado: una cuota pagada sale de la mora) y las que vencieron
+    desde entonces sin que nadie las tocara.
+    """
+    return (
+        Q(fecha_actualizacion__gt=ultima_ejecucion)
+        | (Q(fecha_vencimiento__gte=ultima_fecha) & en_mora(fecha))
+    )
+
+
+def devengar_moras(fecha=None, tamano_lote=5000, completo=False):
+    """
+    Actualiza las moras a la fecha indicada de las cuotas que cambiaron
+    desde la última ejecución (con `completo`, de todas las cuotas vencidas
+    con saldo y de las que aún tienen moras pendientes).
+
+    Idempotente: volver a ejecutarlo el mismo día actualiza la misma fila.
+    Las moras 'Pendiente' anteriores de las cuotas recalculadas quedan
+    'Cancelada' (reemplazadas por la nueva fila), de modo que la suma de
+    moras pendientes de una cuota es siempre su mora vigente.
+
+    Devuelve un diccionario con estadísticas de la ejecución.
+    """
+    from .models import Mora, PlanPago, MarcaProceso
+
+    fecha = fecha or timezone.localdate()
+    inicio_ejecucion = timezone.now()
+    marca, _ = MarcaProceso.objects.get_or_create(nombre=NOMBRE_PROCESO)
+
+    if marca.ultima_ejecucion and not completo:
+        cuotas = PlanPago.objects.filter(cuotas_a_revisar(fecha, marca.ultima_ejecucion, marca.ultima_fecha))
+    else:
+        cuotas = PlanPago.objects.filter(
+            en_mora(fecha) | Q(pk__in=Mora.objects.filter(estado='Pendiente').values('cuota_plan_id'))
+        )
+
+    estadisticas = {
+        'cuotas_procesadas': 0,
+        'moras_generadas': 0,
+        'moras_reemplazadas': 0,
+        'moras_cerradas': 0,
+        'monto_total': Decimal('0.00'),
+    }
+
+    # Una sola pasada sobre tuplas (sin instanciar modelos), por lotes
+    filas = cuotas.order_by().values_list('pk', 'saldo_pendiente', 'fecha_vencimiento', 'estado')
+    lote = []
+    for fila in filas.iterator(chunk_size=tamano_lote):
+        lote.append(fila)
+        if len(lote) >= tamano_lote:
+            _guardar_lote(lote, fecha, estadisticas, Mora)
+            lote = []
+    if lote:
+        _guardar_lote(lote, fecha, estadisticas, Mora)
+
+    marca.ultima_fecha = fecha
+    # La marca es el inicio de esta ejecución: lo que cambie mientras corre
+    # se recoge en la siguiente
+    marca.ultima_ejecucion = inicio_ejecucion
+    marca.save(update_fields=['ultima_fecha', 'ultima_ejecucion', 'fecha_actualizacion'])
+    return estadisticas
+
+
+def _guardar_lote(lote, fecha, estadisticas, Mora):
+    moras = []
+    cerrar = {'Pagada': [], 'Cancelada': []}
+    for cuota_id, saldo, fecha_vencimiento, estado in lote:
+        if estado not in ESTADOS_CUOTA_PENDIENTE or saldo <= 0 or fecha_vencimiento >= fecha:
+            cerrar['Pagada' if estado == 'Pagada' else 'Cancelada'].append(cuota_id)
+            continue
+        dias = (fecha - fecha_vencimiento).days
+        monto = calcular_monto_mora(saldo, dias)
+        moras.append(Mora(
+            cuota_plan_id=cuota_id,
+            fecha_generacion=fecha,
+            monto_mora=monto,
+            saldo_base=saldo,
+            dias_vencido=dias,
+            estado='Pendiente',
+        ))
+        estadisticas['monto_total'] += monto
+
+    ahora = timezone.now()
+    with transaction.atomic():
+        estadisticas['moras_reemplazadas'] += Mora.objects.filter(
+            cuota_plan_id__in=[mora.cuota_plan_id for mora in moras],
+            estado='Pendiente',
+            fecha_generacion__lt=fecha,
+        ).update(estado='Cancelada', fecha_actualizacion=ahora)
+        for estado, ids_cuotas in cerrar.items():
+            if ids_cuotas:
+                estadisticas['moras_cerradas'] += Mora.objects.filter(
+                    cuota_plan_id__in=ids_cuotas, estado='Pendiente',
+                ).update(estado=estado, fecha_actualizacion=ahora)
+        Mora.objects.bulk_create(
+            moras,
+            update_conflicts=True,
+            unique_fields=['cuota_plan', 'fecha_generacion'],
+            update_fields=['monto_mora', 'saldo_base', 'dias_vencido', 'estado', 'fecha_actualizacion'],
+        )
+    estadisticas['cuotas_procesadas'] += len(lote)
+    estadisticas['moras_generadas'] += len(moras)
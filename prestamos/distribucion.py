@@ -0,0 +1,121 @@
+"""
+Distribución de un pago entre las cuotas de un préstamo, en memoria.
+
+Aplica la regla de pago anticipado (Ley N.º 29571 - Art. 85): si una cuota
+se paga antes de su vencimiento, solo se cobran los intereses generados
+hasta la fecha del pago, en proporción a los días transcurridos de su
+período. El período de una cuota empieza en el vencimiento de la cuota
+anterior (o en la fecha de emisión para la primera cuota).
+
+Estas funciones no consultan ni escriben en la base de datos: reciben el
+cronograma ya cargado y Pago.save() se encarga de persistir el resultado.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+ESTADOS_CUOTA_PENDIENTE = ['Pendiente', 'Vencida', 'Pagada Parcialmente']
+
+
+def interes_proporcional(monto_interes, fecha_base, fecha_vencimiento, fecha_pago):
+    """
+    Interés de la cuota reducido a los días transcurridos hasta fecha_pago.
+    Devuelve None si no corresponde reducirlo (pago en o después del
+    vencimiento, cuota sin interés o período inválido).
+    """
+    if fecha_pago >= fecha_vencimiento or monto_interes <= 0:
+        return None
+    dias_periodo_total = (fecha_vencimiento - fecha_base).days
+    if dias_periodo_total <= 0:
+        return None
+    dias_transcurridos = (fecha_pago - fecha_base).days
+    if dias_transcurridos <= 0:
+        # El período aún no ha comenzado: no hay intereses generados
+        return Decimal('0.00')
+    proporcion = Decimal(dias_transcurridos) / Decimal(dias_periodo_total)
+    return (monto_interes * proporcion).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def fechas_base_interes(cronograma, fecha_emision):
+    """
+    Mapa numero_cuota -> fecha de inicio de su período, a partir del
+    cronograma completo (todas las cuotas, sin filtrar por estado).
+    """
+    fechas = {}
+    fecha_anterior = fecha_emision
+    for cuota in sorted(cronograma, key=lambda c: c.numero_cuota):
+        fechas[cuota.numero_cuota] = fecha_anterior
+        fecha_anterior = cuota.fecha_vencimiento
+    return fechas
+
+
+def saldo_a_la_fecha(cuota, fecha_base, fecha_pago):
+    """
+    Lo que falta pagar de la cuota si se paga en fecha_pago. Devuelve
+    (saldo, interes): interes es el interés reducido, o None si se cobra
+    el de la cuota. `cuota` solo necesita los atributos del cronograma
+    (sirve una fila de values_list(named=True)).
+    """
+    interes = interes_proporcional(cuota.monto_interes, fecha_base, cuota.fecha_vencimiento, fecha_pago)
+    if interes is None:
+        return cuota.saldo_pendiente, None
+    return cuota.monto_capital + interes - (cuota.monto_pagado or Decimal('0.00')), interes
+
+
+def calcular_distribucion(cronograma, monto, fecha_pago, fecha_emision, ids_cuotas=None):
+    """
+    Reparte `monto` entre las cuotas pendientes del cronograma, en orden.
+
+    Modifica en memoria las cuotas afectadas (interés reducido, monto
+    pagado, saldo y estado) y devuelve (monto_ajustado, aplicaciones,
+    modificadas): aplicaciones es una lista de (cuota, monto_aplicado) y
+    modificadas las cuotas que hay que guardar. Si el pago excede lo
+    realmente adeudado (por ejemplo, por intereses reducidos), monto_ajustado
+    es lo necesario para cubrir las cuotas.
+    """
+    fechas_base = fechas_base_interes(cronograma, fecha_emision)
+    ids_cuotas = set(ids_cuotas) if ids_cuotas else None
+    candidatas = [
+        cuota for cuota in sorted(cronograma, key=lambda c: c.numero_cuota)
+        if cuota.estado in ESTADOS_CUOTA_PENDIENTE
+        and (ids_cuotas is None or cuota.pk in ids_cuotas)
+    ]
+
+    def saldo_efectivo(cuota):
+        return saldo_a_la_fecha(cuota, fechas_base[cuota.numero_cuota], fecha_pago)
+
+    # Primero, calcular el monto realmente necesario (con intereses reducidos)
+    monto_real_necesario = Decimal('0.00')
+    for cuota in candidatas:
+        if cuota.saldo_pendiente <= Decimal('0.00'):
+            continue
+        saldo, _ = saldo_efectivo(cuota)
+        if saldo > Decimal('0.00'):
+            monto_real_necesario += saldo
+        if monto_real_necesario >= monto:
+            break
+    if monto_real_necesario < monto:
+        monto = monto_real_necesario
+
+    # Luego, distribuir el monto (ya ajustado si fue necesario)
+    aplicaciones = []
+    modificadas = []
+    restante = monto
+    for cuota in candidatas:
+        if restante <= Decimal('0.00'):
+            break
+        if cuota.saldo_pendiente <= Decimal('0.00'):
+            continue
+
+        saldo, interes = saldo_efectivo(cuota)
+        if interes is not None:
+            cuota.monto_interes = interes
+            cuota.monto_total_cuota = cuota.monto_capital + interes
+
+        monto_aplicado = min(restante, saldo)
+        if monto_aplicado > Decimal('0.00'):
+            cuota.monto_pagado = (cuota.monto_pagado or Decimal('0.00')) + monto_aplicado
+            restante -= monto_aplicado
+            aplicaciones.append((cuota, monto_aplicado))
+        cuota.actualizar_saldo_y_estado()
+        modificadas.append(cuota)
+
+    return monto, aplicaciones, modificadas
@@ -0,0 +1,381 @@
+"""
+Exportación de préstamos, cuotas, pagos y detalles de pago en CSV y XLSX.
+
+Las filas se leen con values_list() e .iterator(chunk_size=...) (cursor del
+lado del servidor en PostgreSQL) y se escriben por bloques, así que la
+memoria del proceso no crece con la cantidad de filas. generar() devuelve
+un generador de bytes que usan tanto la vista exportar (con
+StreamingHttpResponse) como el comando exportar (a un archivo).
+
+El XLSX se escribe sin dependencias: un ZIP en modo streaming (sin
+posicionarse hacia atrás) con celdas en línea, en hojas de hasta
+FILAS_POR_HOJA filas (el límite de Excel); el libro que las enumera se
+escribe al final.
+
+Los textos que empiezan con =, +, -, @, tabulación o retorno de carro
+(nombres, referencias) se prefijan con ' para que Excel no los evalúe como
+fórmulas.
+"""
+import csv
+import io
+import zipfile
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+
+from .models import Préstamo, PlanPago, Pago, DetallePago
+
+# Filas leídas por cada viaje al cursor
+TAMANO_BLOQUE = 2000
+# Bytes que se acumulan antes de entregar un trozo de la respuesta
+TAMANO_TROZO = 64 * 1024
+# Filas de datos por hoja del XLSX: 1.048.576 de Excel menos el encabezado
+FILAS_POR_HOJA = 1048576 - 1
+# Primer carácter con el que Excel interpreta una celda como fórmula
+_INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+@dataclass
+class Exportacion:
+    modelo: type
+    columnas: list # [(campo para values_list, encabezado)]
+    campo_fecha: str # filtros desde/hasta
+    prefijo_prestamo: str = '' # ruta hasta el préstamo ('' si es el propio modelo)
+    campo_estado: str = None
+    orden: tuple = field(default=('pk',))
+
+    def queryset(self, filtros):
+        """Queryset ya filtrado (filtros = cleaned_data de ExportacionForm)."""
+        queryset = self.modelo.objects.all()
+        if filtros.get('desde'):
+            queryset = queryset.filter(**{f'{self.campo_fecha}__gte': filtros['desde']})
+        if filtros.get('hasta'):
+            queryset = queryset.filter(**{f'{self.campo_fecha}__lte': filtros['hasta']})
+        if filtros.get('estado') and self.campo_estado:
+            queryset = queryset.filter(**{self.campo_estado: filtros['estado']})
+        if filtros.get('numero_prestamo'):
+            queryset = queryset.filter(**{f'{self.prefijo_prestamo}numero_prestamo': filtros['numero_prestamo']})
+        if filtros.get('numero_documento'):
+            queryset = queryset.filter(
+                **{f'{self.prefijo_prestamo}cliente__numero_documento': filtros['numero_documento']}
+            )
+        return queryset.order_by(*self.orden)
+
+    @property
+    def encabezados(self):
+        return [encabezado for _, encabezado in self.columnas]
+
+    def filas(self, filtros):
+        campos = [campo for campo, _ in self.columnas]
+        return self.queryset(filtros).values_list(*campos).iterator(chunk_size=TAMANO_BLOQUE)
+
+
+EXPORTACIONES = {
+    'prestamos': Exportacion(
+        modelo=Préstamo,
+        columnas=[
+            ('numero_prestamo', 'Número'),
+            ('id', 'ID'),
+            ('cliente__tipo_documento__nombre', 'Tipo de documento'),
+            ('cliente__numero_documento', 'Documento'),
+            ('cliente__apellidos', 'Apellidos'),
+            ('cliente__nombres', 'Nombres'),
+            ('monto_solicitado', 'Monto solicitado'),
+            ('tasa_interes__nombre', 'Tasa'),
+            ('tasa_interes__valor_porcentaje', 'Tasa (%)'),
+            ('tasa_interes__periodo', 'Período de la tasa'),
+            ('numero_cuotas', 'Cuotas'),
+            ('frecuencia_pago', 'Frecuencia'),
+            ('fecha_emision', 'Fecha de emisión'),
+            ('fecha_primer_pago', 'Primer pago'),
+            ('monto_total_interes', 'Interés total'),
+            ('monto_total_pagar', 'Total a pagar'),
+            ('intereses_reales', 'Intereses reales'),
+            ('total_pagado', 'Total pagado'),
+            ('saldo_pendiente_total', 'Saldo pendiente'),
+            ('cuotas_pagadas', 'Cuotas pagadas'),
+            ('proxima_fecha_vencimiento', 'Próximo vencimiento'),
+            ('estado', 'Estado'),
+        ],
+        campo_fecha='fecha_emision',
+        campo_estado='estado',
+        orden=('fecha_emision', 'id'),
+    ),
+    'cuotas': Exportacion(
+        modelo=PlanPago,
+        columnas=[
+            ('prestamo__numero_prestamo', 'Préstamo'),
+            ('prestamo__cliente__numero_documento', 'Documento'),
+            ('numero_cuota', 'Cuota'),
+            ('fecha_vencimiento', 'Vencimiento'),
+            ('monto_capital', 'Capital'),
+            ('monto_interes', 'Interés'),
+            ('monto_total_cuota', 'Total cuota'),
+            ('monto_pagado', 'Pagado'),
+            ('saldo_pendiente', 'Saldo'),
+            ('estado', 'Estado'),
+        ],
+        campo_fecha='fecha_vencimiento',
+        prefijo_prestamo='prestamo__',
+        campo_estado='estado',
+        orden=('fecha_vencimiento', 'id'),
+    ),
+    'pagos': Exportacion(
+        modelo=Pago,
+        columnas=[
+            ('id', 'ID'),
+            ('prestamo__numero_prestamo', 'Préstamo'),
+            ('prestamo__cliente__numero_documento', 'Documento'),
+            ('fecha_pago', 'Fecha de pago'),
+            ('monto_pagado', 'Monto'),
+            ('metodo_pago__nombre', 'Método de pago'),
+            ('referencia', 'Referencia'),
+            ('registrado_por__email', 'Registrado por'),
+        ],
+        campo_fecha='fecha_pago__date',
+        prefijo_prestamo='prestamo__',
+        orden=('fecha_pago', 'id'),
+    ),
+    'detalles': Exportacion(
+        modelo=DetallePago,
+        columnas=[
+            ('pago_id', 'Pago'),
+            ('pago__fecha_pago', 'Fecha de pago'),
+            ('cuota_plan__prestamo__numero_prestamo', 'Préstamo'),
+            ('cuota_plan__prestamo__cliente__numero_documento', 'Documento'),
+            ('cuota_plan__numero_cuota', 'Cuota'),
+            ('monto_aplicado', 'Monto aplicado'),
+        ],
+        campo_fecha='pago__fecha_pago__date',
+        prefijo_prestamo='cuota_plan__prestamo__',
+        orden=('pago__fecha_pago', 'id'),
+    ),
+}
+
+
+def nombre_archivo(nombre, formato):
+    return f'{nombre}_{timezone.localdate():%Y%m%d}.{formato}'
+
+
+def generar(nombre, formato, filtros, avance=None):
+    """
+    Generador de bytes con la exportación `nombre` en `formato` ('csv' o
+    'xlsx'). Si se pasa `avance`, se llama con las filas leídas hasta el
+    momento cada TAMANO_BLOQUE filas.
+    """
+    exportacion = EXPORTACIONES[nombre]
+    filas = exportacion.filas(filtros)
+    if avance is not None:
+        filas = _contar_filas(filas, avance)
+    if formato == 'xlsx':
+        return _generar_xlsx(exportacion.encabezados, filas)
+    return _generar_csv(exportacion.encabezados, filas)
+
+
+def _contar_filas(filas, avance):
+    for leidas, fila in enumerate(filas, 1):
+        yield fila
+        if leidas % TAMANO_BLOQUE == 0:
+            avance(leidas)
+
+
+def _sin_formula(texto):
+    """Prefija con ' los textos que Excel evaluaría como fórmula."""
+    return f"'{texto}" if texto.startswith(_INICIO_FORMULA) else texto
+
+
+def _valor_texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        return timezone.localtime(valor).strftime('%Y-%m-%d %H:%M:%S') if timezone.is_aware(valor) else valor.isoformat(' ')
+    if isinstance(valor, str):
+        return _sin_formula(valor)
+    return valor
+
+
+def _generar_csv(encabezados, filas):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    # BOM: Excel abre el archivo como UTF-8 (tildes y eñes)
+    buffer.write('\ufeff')
+    escritor.writerow(encabezados)
+    for fila in filas:
+        escritor.writerow([_valor_texto(valor) for valor in fila])
+        if buffer.tell() >= TAMANO_TROZO:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+# --- XLSX ---
+
+class _Salida:
+    """Archivo de solo escritura (sin seek) del que se van retirando los bytes escritos."""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def retirar(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
+
+
+# Estilos: 0 normal, 1 fecha, 2 fecha y hora, 3 encabezado en negrita
+_ESTILO_FECHA = 1
+_ESTILO_FECHA_HORA = 2
+_ESTILO_ENCABEZADO = 3
+_EPOCA_EXCEL = datetime(1899, 12, 30)
+
+_ARCHIVOS_FIJOS = {
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/></numFmts>'
+        '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+        '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="4">'
+        '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+        '</cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    ),
+}
+
+
+def _archivos_libro(hojas):
+    """Tipos de contenido, libro y relaciones para `hojas` hojas (Datos, Datos 2, ...)."""
+    numeros = range(1, hojas + 1)
+    return {
+        '[Content_Types].xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            + ''.join(
+                f'<Override PartName="/xl/worksheets/sheet{numero}.xml" '
+                'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                for numero in numeros
+            )
+            + '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            '</Types>'
+        ),
+        'xl/workbook.xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+            + ''.join(
+                f'<sheet name="Datos{f" {numero}" if numero > 1 else ""}" sheetId="{numero}" r:id="rId{numero}"/>'
+                for numero in numeros
+            )
+            + '</sheets></workbook>'
+        ),
+        'xl/_rels/workbook.xml.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + ''.join(
+                f'<Relationship Id="rId{numero}" '
+                'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+                f'Target="worksheets/sheet{numero}.xml"/>'
+                for numero in numeros
+            )
+            + f'<Relationship Id="rId{hojas + 1}" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+            'Target="styles.xml"/>'
+            '</Relationships>'
+        ),
+    }
+
+
+def _celda(valor, estilo=None):
+    if valor is None:
+        return '<c/>'
+    if isinstance(valor, bool):
+        return f'<c t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float, Decimal)):
+        return f'<c><v>{valor}</v></c>'
+    if isinstance(valor, datetime):
+        if timezone.is_aware(valor):
+            valor = timezone.make_naive(valor)
+        valor = valor.replace(microsecond=0)
+        serial = (valor - _EPOCA_EXCEL).total_seconds() / 86400
+        return f'<c s="{_ESTILO_FECHA_HORA}"><v>{serial:.8f}</v></c>'
+    if isinstance(valor, date):
+        return f'<c s="{_ESTILO_FECHA}"><v>{(valor - _EPOCA_EXCEL.date()).days}</v></c>'
+    atributo_estilo = f' s="{estilo}"' if estilo else ''
+    return f'<c t="inlineStr"{atributo_estilo}><is><t>{escape(_sin_formula(str(valor)))}</t></is></c>'
+
+
+def _generar_xlsx(encabezados, filas):
+    salida = _Salida()
+    filas = iter(filas)
+    fila = next(filas, None)
+    hojas = 0
+    encabezado = '<row>' + ''.join(_celda(encabezado, _ESTILO_ENCABEZADO) for encabezado in encabezados) + '</row>'
+    with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED) as archivo_zip:
+        # Una hoja por cada FILAS_POR_HOJA filas (al menos una, aunque no haya filas)
+        while hojas == 0 or fila is not None:
+            hojas += 1
+            with archivo_zip.open(f'xl/worksheets/sheet{hojas}.xml', 'w', force_zip64=True) as hoja:
+                hoja.write((
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                    + encabezado
+                ).encode('utf-8'))
+
+                pendiente = []
+                tamano = 0
+                escritas = 0
+                while fila is not None and escritas < FILAS_POR_HOJA:
+                    xml = '<row>' + ''.join(_celda(valor) for valor in fila) + '</row>'
+                    pendiente.append(xml)
+                    tamano += len(xml)
+                    escritas += 1
+                    if tamano >= TAMANO_TROZO:
+                        hoja.write(''.join(pendiente).encode('utf-8'))
+                        pendiente, tamano = [], 0
+                        datos = salida.retirar()
+                        if datos:
+                            yield datos
+                    fila = next(filas, None)
+                hoja.write((''.join(pendiente) + '</sheetData></worksheet>').encode('utf-8'))
+
+        # El libro enumera las hojas: se escribe al final (el orden en el ZIP no importa)
+        for nombre, contenido in {**_ARCHIVOS_FIJOS, **_archivos_libro(hojas)}.items():
+            archivo_zip.writestr(nombre, contenido)
+    yield salida.retirar()
@@ -358,4 +358,69 @@ class TasaInteresForm(forms.ModelForm):
             if valor > 100:
                 raise ValidationError('El valor no puede exceder 100%.')
         
-        return valor
\ No newline at end of file
+        return valor
+
+class ImportarPagosForm(forms.Form):
+    """
+    Formulario para subir un extracto bancario (CSV) e importar sus pagos.
+    """
+    archivo = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={
+            'class': 'form-control',
+            'accept': '.csv,text/csv'
+        }),
+        label='Extracto Bancario (CSV)',
+        help_text='Columnas: fecha, monto y al menos una de numero_prestamo, numero_documento o referencia.'
+    )
+    metodo_pago = forms.ModelChoiceField(
+        queryset=MetodoPago.objects.filter(activo=True),
+        widget=forms.Select(attrs={
+            'class': 'form-select'
+        }),
+        label='Método de Pago',
+        empty_label='Seleccione un método de pago...'
+    )
+
+    def clean_archivo(self):
+        """
+        Validar que el archivo sea un CSV legible.
+        """
+        archivo = self.cleaned_data.get('archivo')
+        
+        if archivo:
+            if not archivo.name.lower().endswith('.csv'):
+                raise ValidationError('El archivo debe tener extensión .csv')
+            
+            try:
+                contenido = archivo.read().decode('utf-8-sig')
+            except UnicodeDecodeError:
+                raise ValidationError('El archivo debe estar codificado en UTF-8.')
+            
+            return contenido
+        
+        return archivo
+
+
+class ExportacionForm(forms.Form):
+    """
+    Filtros de las exportaciones (prestamos/exportacion.py). Se usa con los
+    parámetros GET de la vista exportar y con las opciones del comando exportar.
+    """
+    desde = forms.DateField(required=False, label='Desde')
+    hasta = forms.DateField(required=False, label='Hasta')
+    estado = forms.CharField(
+        required=False,
+        max_length=20,
+        label='Estado',
+        help_text='Estado del préstamo o de la cuota (no aplica a pagos).'
+    )
+    numero_prestamo = forms.IntegerField(required=False, min_value=1, label='Número de Préstamo')
+    numero_documento = forms.CharField(required=False, max_length=20, label='Documento del Cliente')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        desde = cleaned_data.get('desde')
+        hasta = cleaned_data.get('hasta')
+        if desde and hasta and desde > hasta:
+            raise ValidationError('"Desde" no puede ser posterior a "Hasta".')
+        return cleaned_data
@@ -0,0 +1,371 @@
+"""
+Importación masiva de pagos desde un extracto bancario (CSV).
+
+Flujo:
+1. leer_extracto(): normaliza las filas del CSV (fecha, monto, referencia,
+   numero_prestamo, numero_documento, descripcion) y calcula la clave de
+   importación de cada una: una huella de su contenido que no cambia al
+   volver a subir el mismo extracto.
+2. conciliar(): asocia cada fila a un préstamo con una consulta indexada
+   por lote (numero_prestamo, documento del cliente o referencia de un pago
+   anterior). Las filas sin préstamo y las ya importadas (misma clave, o
+   misma referencia, monto y día) van a la lista de excepciones.
+3. contabilizar(): registra los pagos con la lógica normal de Pago.save(),
+   repartiendo los préstamos entre procesos. Todas las filas de un mismo
+   préstamo van al mismo proceso (y en orden de fecha), así dos procesos
+   nunca tocan el mismo préstamo.
+"""
+import csv
+import hashlib
+import io
+import re
+import zlib
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time
+from decimal import Decimal, InvalidOperation
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+ESTADOS_PRESTAMO_COBRABLES = ['Activo', 'En Atraso']
+
+# Nombres de columna aceptados para cada campo
+ALIAS_COLUMNAS = {
+    'fecha': ['fecha', 'fecha_pago', 'fecha_operacion'],
+    'monto': ['monto', 'importe', 'monto_pagado', 'abono'],
+    'referencia': ['referencia', 'operacion', 'nro_operacion', 'numero_operacion'],
+    'numero_prestamo': ['numero_prestamo', 'prestamo', 'nro_prestamo'],
+    'numero_documento': ['numero_documento', 'documento', 'dni', 'ruc'],
+    'descripcion': ['descripcion', 'glosa', 'concepto', 'detalle'],
+}
+FORMATOS_FECHA = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d']
+
+
+def _normalizar_columna(nombre):
+    return (nombre or '').strip().lower().replace(' ', '_').replace('.', '')
+
+
+def _leer_fecha(texto):
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(texto.strip(), formato).date()
+        except ValueError:
+            continue
+    raise ValueError(f'Fecha no válida: {texto!r}')
+
+
+def _leer_monto(texto):
+    """
+    Lee montos con separador de miles y decimal en cualquiera de los dos
+    estilos (1,234.56 o 1.234,56). Un separador seguido de exactamente tres
+    dígitos es de miles (1,500 y S/ 2,000 son enteros); si hay dos
+    separadores distintos, el último es el decimal. Lo que no encaja en
+    ninguna lectura (1234,567, 0,500, 1,2345) es ambiguo y se rechaza: la
+    fila va a las excepciones en lugar de registrarse con un monto adivinado.
+    """
+    original = (texto or '').strip()
+    texto = original.replace('S/.', '').replace('S/', '').replace(' ', '')
+    signo = ''
+    if texto[:1] in ('-', '+'):
+        signo, texto = texto[0], texto[1:]
+    if not re.fullmatch(r'[\d.,]+', texto):
+        raise ValueError(f'Monto no válido: {original!r}')
+
+    separadores = [caracter for caracter in texto if caracter in ',.']
+    entero, decimales = texto, ''
+    if separadores:
+        ultimo = separadores[-1]
+        posicion = texto.rfind(ultimo)
+        cola = texto[posicion + 1:]
+        if len(set(separadores)) == 2 or (separadores.count(ultimo) == 1 and len(cola) in (1, 2)):
+            # El último separador es el decimal: debe ser único y con 1 o 2 decimales
+            if separadores.count(ultimo) > 1 or len(cola) not in (1, 2):
+                raise ValueError(f'Monto ambiguo: {original!r}')
+            entero, decimales = texto[:posicion], cola
+
+    # Lo que queda a la izquierda solo puede tener separadores de miles
+    grupos = re.split(r'[.,]', entero)
+    if len(grupos) > 1 and (
+        len(grupos[0]) not in (1, 2, 3)
+        or grupos[0].startswith('0')
+        or any(len(grupo) != 3 for grupo in grupos[1:])
+    ):
+        raise ValueError(f'Monto ambiguo: {original!r}')
+
+    try:
+        monto = Decimal(signo + ''.join(grupos) + ('.' + decimales if decimales else ''))
+    except InvalidOperation:
+        raise ValueError(f'Monto no válido: {original!r}')
+    if monto <= 0:
+        raise ValueError('El monto debe ser mayor a 0')
+    return monto.quantize(Decimal('0.01'))
+
+
+def _clave_importacion(fila, repeticion):
+    """
+    Huella de una fila del extracto: fecha, monto, referencia, préstamo,
+    documento y descripción, más cuántas filas idénticas la preceden en el
+    archivo (dos abonos iguales el mismo día son dos pagos distintos).
+    """
+    contenido = '|'.join(str(parte or '') for parte in (
+        fila['fecha'].isoformat(), fila['monto'], fila['referencia'], fila['numero_prestamo'],
+        fila['numero_documento'], fila['descripcion'], repeticion,
+    ))
+    return hashlib.sha1(contenido.encode('utf-8')).hexdigest()
+
+
+def _abrir_extracto(contenido):
+    """
+    Lector del CSV y {campo: columna del archivo}. ValueError si faltan las
+    columnas obligatorias.
+    """
+    try:
+        dialecto = csv.Sniffer().sniff(contenido[:4096], delimiters=',;\t|')
+    except csv.Error:
+        dialecto = csv.excel
+    lector = csv.DictReader(io.StringIO(contenido), dialect=dialecto)
+
+    columnas = {}
+    for columna in lector.fieldnames or []:
+        normalizada = _normalizar_columna(columna)
+        for campo, alias in ALIAS_COLUMNAS.items():
+            if normalizada in alias and campo not in columnas:
+                columnas[campo] = columna
+    if 'monto' not in columnas or 'fecha' not in columnas:
+        raise ValueError('El extracto debe tener al menos las columnas "fecha" y "monto".')
+    return lector, columnas
+
+
+def validar_extracto(contenido):
+    """Solo revisa las columnas (para rechazar el archivo antes de encolar su importación)."""
+    _abrir_extracto(contenido)
+
+
+def leer_extracto(archivo):
+    """
+    Lee un CSV (texto o archivo abierto en modo texto) y devuelve
+    (filas, excepciones). Cada fila es un diccionario con 'linea', 'fecha',
+    'monto', 'referencia', 'numero_prestamo', 'numero_documento',
+    'descripcion', 'clave' y 'original'.
+    """
+    contenido = archivo if isinstance(archivo, str) else archivo.read()
+    lector, columnas = _abrir_extracto(contenido)
+
+    filas, excepciones = [], []
+    repeticiones = defaultdict(int)
+    for linea, registro in enumerate(lector, start=2):
+        valor = lambda campo: (registro.get(columnas.get(campo, '')) or '').strip()
+        try:
+            numero_prestamo = valor('numero_prestamo').lstrip('#')
+            fila = {
+                'linea': linea,
+                'fecha': _leer_fecha(valor('fecha')),
+                'monto': _leer_monto(valor('monto')),
+                'referencia': valor('referencia') or None,
+                'numero_prestamo': int(numero_prestamo) if numero_prestamo.isdigit() else None,
+                'numero_documento': valor('numero_documento') or None,
+                'descripcion': valor('descripcion') or None,
+                'original': registro,
+            }
+        except ValueError as e:
+            excepciones.append({'linea': linea, 'original': registro, 'motivo': str(e)})
+            continue
+        clave = _clave_importacion(fila, 0)
+        fila['clave'] = _clave_importacion(fila, repeticiones[clave])
+        repeticiones[clave] += 1
+        filas.append(fila)
+    return filas, excepciones
+
+
+def conciliar(filas, tamano_lote=1000):
+    """
+    Asigna un préstamo a cada fila. Devuelve (asignaciones, excepciones),
+    donde asignaciones es {prestamo_id: [filas...]}.
+
+    Prioridad: numero_prestamo, luego el préstamo vigente más antiguo del
+    cliente con ese documento, luego el préstamo de un pago anterior con la
+    misma referencia. Se descartan las filas ya registradas: las que tienen
+    la clave de importación de un pago anterior (con o sin referencia) y las
+    que repiten préstamo, referencia, monto y día de un pago registrado a mano.
+    """
+    from .models import Préstamo, Pago
+
+    asignaciones = defaultdict(list)
+    excepciones = []
+    for inicio in range(0, len(filas), tamano_lote):
+        lote = filas[inicio:inicio + tamano_lote]
+
+        numeros = {f['numero_prestamo'] for f in lote if f['numero_prestamo']}
+        documentos = {f['numero_documento'] for f in lote if f['numero_documento']}
+        referencias = {f['referencia'] for f in lote if f['referencia']}
+        importadas = set(
+            Pago.objects.filter(clave_importacion__in=[f['clave'] for f in lote])
+            .values_list('clave_importacion', flat=True)
+        )
+
+        # Una consulta indexada por cada tipo de clave en el lote
+        por_numero, estados_por_id = {}, {}
+        if numeros:
+            for numero, prestamo_id, estado in Préstamo.objects.filter(
+                numero_prestamo__in=numeros
+            ).values_list('numero_prestamo', 'id', 'estado'):
+                por_numero[numero] = prestamo_id
+                estados_por_id[prestamo_id] = estado
+
+        por_documento = {}
+        if documentos:
+            vigentes = (
+                Préstamo.objects.filter(
+                    cliente__numero_documento__in=documentos,
+                    estado__in=ESTADOS_PRESTAMO_COBRABLES,
+                )
+                .order_by('fecha_emision', 'numero_prestamo')
+                .values_list('cliente__numero_documento', 'id')
+            )
+            for documento, prestamo_id in vigentes:
+                por_documento.setdefault(documento, prestamo_id)
+
+        por_referencia = {}
+        ya_registrados = set()
+        if referencias:
+            anteriores = (
+                Pago.objects.filter(referencia__in=referencias)
+                .order_by('fecha_pago')
+                .values_list('referencia', 'prestamo_id', 'monto_pagado', 'fecha_pago')
+            )
+            for referencia, prestamo_id, monto, fecha_pago in anteriores:
+                por_referencia.setdefault(referencia, prestamo_id)
+                ya_registrados.add((prestamo_id, referencia, monto, timezone.localdate(fecha_pago)))
+
+        for fila in lote:
+            prestamo_id = (
+                por_numero.get(fila['numero_prestamo'])
+                or por_documento.get(fila['numero_documento'])
+                or por_referencia.get(fila['referencia'])
+            )
+            if prestamo_id is None:
+                motivo = 'No se encontró un préstamo para la fila'
+            elif estados_por_id.get(prestamo_id, 'Activo') not in ESTADOS_PRESTAMO_COBRABLES:
+                motivo = f'El préstamo está en estado {estados_por_id[prestamo_id]}'
+            elif fila['clave'] in importadas:
+                motivo = 'El pago ya fue registrado (la misma fila en una importación anterior)'
+            elif (prestamo_id, fila['referencia'], fila['monto'], fila['fecha']) in ya_registrados:
+                motivo = 'El pago ya fue registrado (misma referencia, monto y fecha)'
+            else:
+                asignaciones[prestamo_id].append(fila)
+                continue
+            excepciones.append({'linea': fila['linea'], 'original': fila['original'], 'motivo': motivo})
+
+    return dict(asignaciones), excepciones
+
+
+def _fragmento(prestamo_id, procesos):
+    """Fragmento (proceso) estable para un préstamo."""
+    return zlib.crc32(str(prestamo_id).encode()) % procesos
+
+
+def _contabilizar_fragmento(trabajo):
+    """
+    Registra los pagos de un fragmento de préstamos. Se ejecuta dentro de
+    un proceso del pool (o en el mismo proceso si hay un solo worker).
+    """
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    from .models import Préstamo, Pago
+
+    asignaciones, metodo_pago_id, usuario_id = trabajo
+    resultado = {'pagos': 0, 'monto': Decimal('0.00'), 'ajustes': [], 'excepciones': []}
+    prestamos = Préstamo.objects.in_bulk(list(asignaciones))
+    for prestamo_id, filas in asignaciones.items():
+        prestamo = prestamos.get(prestamo_id)
+        for fila in sorted(filas, key=lambda f: (f['fecha'], f['linea'])):
+            if prestamo is None or prestamo.estado not in ESTADOS_PRESTAMO_COBRABLES:
+                estado = prestamo.estado if prestamo else 'inexistente'
+                resultado['excepciones'].append({
+                    'linea': fila['linea'], 'original': fila['original'],
+                    'motivo': f'El préstamo está en estado {estado}',
+                })
+                continue
+            try:
+                with transaction.atomic():
+                    pago = Pago(
+                        prestamo=prestamo,
+                        monto_pagado=fila['monto'],
+                        metodo_pago_id=metodo_pago_id,
+                        referencia=fila['referencia'],
+                        clave_importacion=fila['clave'],
+                        registrado_por_id=usuario_id,
+                        fecha_pago=timezone.make_aware(datetime.combine(fila['fecha'], time(12, 0))),
+                    )
+                    pago.save()
+            except Exception as e:
+                resultado['excepciones'].append({
+                    'linea': fila['linea'], 'original': fila['original'],
+                    'motivo': f'Error al registrar el pago: {e}',
+                })
+                continue
+            resultado['pagos'] += 1
+            resultado['monto'] += pago.monto_pagado
+            if pago.monto_pagado != fila['monto']:
+                # Pago.save ajusta el monto a lo realmente adeudado
+                resultado['ajustes'].append({
+                    'linea': fila['linea'], 'original': fila['original'],
+                    'motivo': f'Monto ajustado de {fila["monto"]} a {pago.monto_pagado} (excedente sin aplicar)',
+                })
+    connections.close_all()
+    return resultado
+
+
+def contabilizar(asignaciones, metodo_pago_id, usuario_id=None, procesos=1):
+    """
+    Registra los pagos conciliados. Con procesos > 1 reparte los préstamos
+    en fragmentos por hash del id y los contabiliza en paralelo.
+    Devuelve un resumen con el total de pagos, monto, ajustes y excepciones.
+    """
+    procesos = max(1, min(procesos, len(asignaciones) or 1))
+    if connections['default'].vendor == 'sqlite':
+        # SQLite no admite escrituras concurrentes desde varios procesos
+        procesos = 1
+    fragmentos = [{} for _ in range(procesos)]
+    for prestamo_id, filas in asignaciones.items():
+        fragmentos[_fragmento(prestamo_id, procesos)][prestamo_id] = filas
+    trabajos = [(fragmento, metodo_pago_id, usuario_id) for fragmento in fragmentos if fragmento]
+
+    if procesos == 1:
+        resultados = [_contabilizar_fragmento(trabajo) for trabajo in trabajos]
+    else:
+        # Cada proceso hijo debe abrir sus propias conexiones
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            resultados = list(pool.map(_contabilizar_fragmento, trabajos))
+
+    resumen = {'pagos': 0, 'monto': Decimal('0.00'), 'ajustes': [], 'excepciones': []}
+    for resultado in resultados:
+        resumen['pagos'] += resultado['pagos']
+        resumen['monto'] += resultado['monto']
+        resumen['ajustes'].extend(resultado['ajustes'])
+        resumen['excepciones'].extend(resultado['excepciones'])
+    return resumen
+
+
+def escribir_excepciones(excepciones, destino):
+    """
+    Escribe las excepciones (filas originales + motivo) como CSV en `destino`
+    (archivo abierto en modo texto).
+    """
+    columnas = []
+    for excepcion in excepciones:
+        for columna in excepcion['original']:
+            if columna not in columnas:
+                columnas.append(columna)
+    escritor = csv.writer(destino)
+    escritor.writerow(['linea'] + columnas + ['motivo'])
+    for excepcion in sorted(excepciones, key=lambda e: e['linea']):
+        escritor.writerow(
+            [excepcion['linea']]
+            + [excepcion['original'].get(columna, '') for columna in columnas]
+            + [excepcion['motivo']]
+        )
@@ -0,0 +1,177 @@
+"""
+Contadores de indicadores (KPI) del dashboard.
+
+Cada indicador se guarda por mes en ContadorKPI y se actualiza en la misma
+transacción que el evento que lo cambia:
+- Préstamo.save() al crear un préstamo o cambiar su estado.
+- Pago.save() al registrar un pago (y si el préstamo queda pagado).
+- verificar_vencimientos al pasar préstamos entre 'Activo' y 'En Atraso'.
+- Señales post_save/post_delete de Cliente, y post_delete de Préstamo y Pago.
+
+Los indicadores de préstamos (cantidad, monto, saldo y estado) se agrupan
+por el mes de creación del préstamo; los de pagos por el mes del pago. El
+dashboard lee esta tabla con una sola consulta. El comando reconciliar_kpis
+los recalcula desde cero e informa las diferencias.
+"""
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateField, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+METRICA_PRESTAMOS = 'prestamos'
+METRICA_MONTO_PRESTADO = 'monto_prestado'
+METRICA_SALDO_PENDIENTE = 'saldo_pendiente'
+METRICA_PAGOS = 'pagos'
+METRICA_MONTO_PAGADO = 'monto_pagado'
+METRICA_CLIENTES = 'clientes'
+PREFIJO_ESTADO = 'estado:'
+
+
+def metrica_estado(estado):
+    """Nombre del contador de préstamos en un estado (ej. 'estado:Activo')."""
+    return f'{PREFIJO_ESTADO}{estado}'
+
+
+def mes_de(fecha):
+    """Primer día del mes (en la zona horaria local) de una fecha o datetime."""
+    if isinstance(fecha, datetime):
+        fecha = timezone.localdate(fecha) if timezone.is_aware(fecha) else fecha.date()
+    return fecha.replace(day=1)
+
+
+def incrementar(deltas, using='default'):
+    """
+    Suma cada delta a su contador. `deltas` es {(metrica, mes): valor}.
+
+    Debe llamarse dentro de la transacción del evento. Las claves se
+    actualizan siempre en el mismo orden para que dos transacciones
+    concurrentes no se bloqueen mutuamente.
+    """
+    from .models import ContadorKPI
+
+    ahora = timezone.now()
+    for (metrica, mes), delta in sorted(deltas.items()):
+        if not delta:
+            continue
+        contador = ContadorKPI.objects.using(using).filter(metrica=metrica, mes=mes)
+        if contador.update(valor=F('valor') + delta, fecha_actualizacion=ahora):
+            continue
+        try:
+            # Primer evento del mes: crear el contador (en un savepoint por
+            # si otra transacción lo creó al mismo tiempo)
+            with transaction.atomic(using=using):
+                ContadorKPI.objects.using(using).create(metrica=metrica, mes=mes, valor=delta)
+        except IntegrityError:
+            contador.update(valor=F('valor') + delta, fecha_actualizacion=ahora)
+
+
+def deltas_cambio_estado(fechas_creacion, estado_anterior, estado_nuevo):
+    """
+    Deltas para préstamos que pasan de un estado a otro, a partir de las
+    fechas de creación de esos préstamos.
+    """
+    deltas = defaultdict(int)
+    for fecha_creacion in fechas_creacion:
+        mes = mes_de(fecha_creacion)
+        deltas[(metrica_estado(estado_anterior), mes)] -= 1
+        deltas[(metrica_estado(estado_nuevo), mes)] += 1
+    return deltas
+
+
+def calcular_desde_cero(using='default'):
+    """
+    Recalcula todos los contadores desde las tablas de origen con
+    consultas agrupadas por mes. Devuelve {(metrica, mes): valor}.
+    """
+    from .models import Préstamo, Pago
+    from clientes.models import Cliente
+
+    def por_mes(campo):
+        return TruncMonth(campo, output_field=DateField())
+
+    valores = {}
+    prestamos = (
+        Préstamo.objects.using(using)
+        .annotate(mes=por_mes('fecha_creacion'))
+        .values('mes')
+        .annotate(cantidad=Count('pk'), monto=Sum('monto_solicitado'), saldo=Sum('saldo_pendiente_total'))
+        .order_by()
+    )
+    for fila in prestamos:
+        valores[(METRICA_PRESTAMOS, fila['mes'])] = fila['cantidad']
+        valores[(METRICA_MONTO_PRESTADO, fila['mes'])] = fila['monto']
+        valores[(METRICA_SALDO_PENDIENTE, fila['mes'])] = fila['saldo']
+
+    estados = (
+        Préstamo.objects.using(using)
+        .annotate(mes=por_mes('fecha_creacion'))
+        .values('mes', 'estado')
+        .annotate(cantidad=Count('pk'))
+        .order_by()
+    )
+    for fila in estados:
+        valores[(metrica_estado(fila['estado']), fila['mes'])] = fila['cantidad']
+
+    pagos = (
+        Pago.objects.using(using)
+        .annotate(mes=por_mes('fecha_pago'))
+        .values('mes')
+        .annotate(cantidad=Count('pk'), monto=Sum('monto_pagado'))
+        .order_by()
+    )
+    for fila in pagos:
+        valores[(METRICA_PAGOS, fila['mes'])] = fila['cantidad']
+        valores[(METRICA_MONTO_PAGADO, fila['mes'])] = fila['monto']
+
+    clientes = (
+        Cliente.objects.using(using)
+        .annotate(mes=por_mes('fecha_creacion'))
+        .values('mes')
+        .annotate(cantidad=Count('pk'))
+        .order_by()
+    )
+    for fila in clientes:
+        valores[(METRICA_CLIENTES, fila['mes'])] = fila['cantidad']
+
+    return {clave: Decimal(valor or 0) for clave, valor in valores.items()}
+
+
+def resumen_dashboard(hoy=None, meses=6):
+    """
+    Totales y serie mensual del dashboard con una sola consulta a
+    ContadorKPI.
+    """
+    from .models import ContadorKPI
+
+    hoy = hoy or timezone.localdate()
+    totales = defaultdict(Decimal)
+    por_mes = defaultdict(Decimal)
+    for metrica, mes, valor in ContadorKPI.objects.values_list('metrica', 'mes', 'valor'):
+        totales[metrica] += valor
+        por_mes[(metrica, mes)] += valor
+
+    mes_actual = mes_de(hoy)
+    meses_stats = []
+    for i in range(meses - 1, -1, -1): # Del más antiguo al más reciente
+        mes = mes_actual - relativedelta(months=i)
+        meses_stats.append({
+            'mes': mes.strftime('%b %Y'),
+            'prestamos': int(por_mes[(METRICA_PRESTAMOS, mes)]),
+            'pagos': int(por_mes[(METRICA_PAGOS, mes)]),
+        })
+
+    return {
+        'total_prestamos': int(totales[METRICA_PRESTAMOS]),
+        'prestamos_activos': int(totales[metrica_estado('Activo')]),
+        'prestamos_pagados': int(totales[metrica_estado('Pagado')]),
+        'total_clientes': int(totales[METRICA_CLIENTES]),
+        'monto_total_prestado': totales[METRICA_MONTO_PRESTADO],
+        'monto_total_pagado': totales[METRICA_MONTO_PAGADO],
+        'saldo_pendiente_total': totales[METRICA_SALDO_PENDIENTE],
+        'meses_stats': meses_stats,
+    }
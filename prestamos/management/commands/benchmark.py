@@ -0,0 +1,250 @@
+import io
+import json
+import platform
+import random
+import statistics
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+from decimal import Decimal
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.db.models import Max, Min
+from asgiref.sync import async_to_sync
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from clientes.models import Cliente
+from core.middleware import MedicionConsultas, medicion_actual
+from prestamos import views
+from prestamos.datos_prueba import crear_usuario
+from prestamos.models import Préstamo, PlanPago, Pago, MetodoPago, TasaInteres
+
+
+class _Rollback(Exception):
+    """Se lanza al final para deshacer todo lo que escribió el benchmark."""
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide originación, registro de pagos, verificar_vencimientos, las vistas principales y '
+        'los agregados de dashboard y reportes (en secuencia y en paralelo) sobre la cartera '
+        'actual (ver generar_cartera) y guarda los resultados en JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=20, help='Mediciones por operación')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla para elegir préstamos y clientes de muestra')
+        parser.add_argument(
+            '--salida',
+            help='Archivo JSON de resultados (por defecto benchmark-AAAAMMDD-HHMMSS.json)',
+        )
+        parser.add_argument(
+            '--comparar',
+            metavar='ANTERIOR',
+            help='JSON de una ejecución anterior para mostrar la variación de cada medida',
+        )
+
+    def handle(self, *args, **options):
+        repeticiones = max(1, options['repeticiones'])
+        if not Préstamo.objects.exists():
+            raise CommandError('No hay préstamos: generar una cartera antes con generar_cartera')
+
+        ahora = timezone.localtime()
+        resultado = {
+            'fecha': ahora.isoformat(),
+            'motor': connection.vendor,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'repeticiones': repeticiones,
+            'semilla': options['semilla'],
+            'volumen': {
+                'clientes': Cliente.objects.count(),
+                'prestamos': Préstamo.objects.count(),
+                'cuotas': PlanPago.objects.count(),
+                'pagos': Pago.objects.count(),
+            },
+            'medidas': {},
+        }
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'⏱️  Benchmark sobre {resultado["volumen"]["prestamos"]} préstamos '
+                f'(los datos se revierten al final)'
+            )
+        )
+        self.stdout.write(f'{"Operación":<30} {"mediana ms":>11} {"p95 ms":>9} {"consultas":>10}')
+
+        # Solo lecturas y fuera de la transacción: en paralelo, cada consulta
+        # va por otra conexión (ver core/concurrencia.py)
+        self._medir_agregados(repeticiones, resultado['medidas'])
+
+        aleatorio = random.Random(options['semilla'])
+        try:
+            with transaction.atomic(), override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                self._medir_todo(aleatorio, repeticiones, resultado['medidas'])
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        salida = options['salida'] or f'benchmark-{ahora:%Y%m%d-%H%M%S}.json'
+        with open(salida, 'w', encoding='utf-8') as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+
+        if options['comparar']:
+            self._comparar(options['comparar'], resultado['medidas'])
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Benchmark completado: resultados en {salida}'))
+
+    def _medir_todo(self, aleatorio, repeticiones, medidas):
+        usuario = crear_usuario(email='benchmark@prestamos.test', staff=True)
+        tasa = TasaInteres.objects.filter(tipo_tasa='Simple').first()
+        metodo_pago = MetodoPago.objects.filter(activo=True).first()
+        prestamos = self._muestra_prestamos(aleatorio, repeticiones)
+        clientes = self._muestra_clientes(aleatorio, repeticiones)
+        hoy = timezone.localdate()
+
+        # --- Escrituras ---
+        def originar(indice):
+            Préstamo.objects.create(
+                cliente=clientes[indice % len(clientes)],
+                tasa_interes=tasa,
+                monto_solicitado=Decimal('5000.00'),
+                numero_cuotas=12,
+                frecuencia_pago='Mensual',
+                fecha_emision=hoy,
+                fecha_primer_pago=hoy + timedelta(days=30),
+                creado_por=usuario,
+            )
+        self._medir(medidas, 'originacion', originar, repeticiones)
+
+        activos = [prestamo for prestamo in prestamos if prestamo.estado in ('Activo', 'En Atraso')] or prestamos
+
+        def registrar_pago(indice):
+            Pago(
+                prestamo=activos[indice % len(activos)],
+                monto_pagado=Decimal('50.00'),
+                metodo_pago=metodo_pago,
+                registrado_por=usuario,
+            ).save()
+        self._medir(medidas, 'registro_pago', registrar_pago, repeticiones)
+
+        # Una sola vez: en ejecuciones repetidas no quedaría nada por hacer
+        self._medir(
+            medidas, 'verificar_vencimientos',
+            lambda indice: call_command('verificar_vencimientos', stdout=io.StringIO()),
+            1,
+        )
+
+        # --- Vistas (pila completa: middleware, vista y plantilla) ---
+        navegador = Client()
+        navegador.force_login(usuario)
+        apellido = clientes[0].apellidos.split()[0]
+        vistas = {
+            'vista_dashboard': lambda indice: reverse('prestamos:dashboard'),
+            'vista_reportes': lambda indice: reverse('prestamos:reportes'),
+            'vista_lista_prestamos': lambda indice: reverse('prestamos:lista_prestamos'),
+            'vista_buscar_prestamos': lambda indice: f'{reverse("prestamos:lista_prestamos")}?q={apellido}',
+            'vista_detalle_prestamo': lambda indice: reverse(
+                'prestamos:detalle_prestamo', args=[prestamos[indice % len(prestamos)].pk]
+            ),
+            'vista_lista_clientes': lambda indice: reverse('clientes:lista_clientes'),
+            'vista_buscar_clientes': lambda indice: f'{reverse("clientes:lista_clientes")}?q={apellido}',
+            'vista_detalle_cliente': lambda indice: reverse(
+                'clientes:detalle_cliente', args=[clientes[indice % len(clientes)].pk]
+            ),
+        }
+        for nombre, url in vistas.items():
+            def pedir(indice, url=url, nombre=nombre):
+                respuesta = navegador.get(url(indice))
+                if respuesta.status_code != 200:
+                    raise CommandError(f'{nombre} respondió {respuesta.status_code}')
+            self._medir(medidas, nombre, pedir, repeticiones)
+
+    def _medir_agregados(self, repeticiones, medidas):
+        """Bloques agregados (sin caché) consulta por consulta y en paralelo."""
+        bloques = {
+            'dashboard': (views._contexto_dashboard, views._acontexto_dashboard),
+            'reportes': (views._contexto_reportes, views._acontexto_reportes),
+        }
+        for nombre, (secuencial, concurrente) in bloques.items():
+            concurrente = async_to_sync(concurrente)
+            self._medir(medidas, f'agregados_{nombre}_secuencial', lambda indice: secuencial(), repeticiones)
+            self._medir(medidas, f'agregados_{nombre}_paralelo', lambda indice: concurrente(), repeticiones)
+
+    def _medir(self, medidas, nombre, funcion, repeticiones):
+        tiempos, consultas = [], []
+        for indice in range(repeticiones):
+            # Como el middleware de presupuesto: todas las conexiones, y también
+            # las consultas hechas en otros hilos (core/concurrencia.py)
+            medicion = MedicionConsultas()
+            token = medicion_actual.set(medicion)
+            try:
+                with ExitStack() as pila:
+                    for conexion in connections.all():
+                        pila.enter_context(conexion.execute_wrapper(medicion))
+                    inicio = time.perf_counter()
+                    funcion(indice)
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+            finally:
+                medicion_actual.reset(token)
+            consultas.append(medicion.consultas)
+
+        medida = {
+            'repeticiones': repeticiones,
+            'mediana_ms': round(statistics.median(tiempos), 3),
+            'p95_ms': round(_percentil(tiempos, 95), 3),
+            'min_ms': round(min(tiempos), 3),
+            'max_ms': round(max(tiempos), 3),
+            'consultas': statistics.median_high(consultas),
+        }
+        medidas[nombre] = medida
+        self.stdout.write(
+            f'{nombre:<30} {medida["mediana_ms"]:>11.2f} {medida["p95_ms"]:>9.2f} {medida["consultas"]:>10}'
+        )
+
+    def _muestra_prestamos(self, aleatorio, cantidad):
+        """Préstamos al azar, elegidos por número (índice único) y no con ORDER BY RANDOM()."""
+        rango = Préstamo.objects.aggregate(minimo=Min('numero_prestamo'), maximo=Max('numero_prestamo'))
+        numeros = [aleatorio.randint(rango['minimo'], rango['maximo']) for _ in range(cantidad * 2)]
+        muestra = list(Préstamo.objects.filter(numero_prestamo__in=numeros))
+        return muestra or list(Préstamo.objects.all()[:cantidad])
+
+    def _muestra_clientes(self, aleatorio, cantidad):
+        rango = Cliente.objects.aggregate(minimo=Min('pk'), maximo=Max('pk'))
+        ids = [aleatorio.randint(rango['minimo'], rango['maximo']) for _ in range(cantidad * 2)]
+        muestra = list(Cliente.objects.filter(pk__in=ids))
+        return muestra or list(Cliente.objects.all()[:cantidad])
+
+    def _comparar(self, ruta, medidas):
+        try:
+            with open(ruta, encoding='utf-8') as archivo:
+                anteriores = json.load(archivo)['medidas']
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'No se pudo leer {ruta}: {e}')
+
+        self.stdout.write(f'\n📊 Comparación con {ruta} (mediana)')
+        for nombre, medida in medidas.items():
+            anterior = anteriores.get(nombre)
+            if not anterior or not anterior['mediana_ms']:
+                continue
+            variacion = (medida['mediana_ms'] - anterior['mediana_ms']) / anterior['mediana_ms'] * 100
+            linea = (
+                f'{nombre:<30} {anterior["mediana_ms"]:>9.2f} → {medida["mediana_ms"]:>9.2f} ms '
+                f'({variacion:+.1f}%), consultas {anterior["consultas"]} → {medida["consultas"]}'
+            )
+            if variacion > 20 or medida['consultas'] > anterior['consultas']:
+                self.stdout.write(self.style.WARNING(f'⚠️  {linea}'))
+            else:
+                self.stdout.write(f'   {linea}')
+
+
+def _percentil(valores, percentil):
+    """Percentil por rango más cercano (con pocas muestras, el máximo)."""
+    ordenados = sorted(valores)
+    posicion = max(0, -(-len(ordenados) * percentil // 100) - 1)
+    return ordenados[posicion]
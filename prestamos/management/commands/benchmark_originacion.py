@@ -0,0 +1,79 @@
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from prestamos.models import Préstamo, TasaInteres
+from clientes.models import Cliente, TipoDocumento
+
+
+class _Rollback(Exception):
+    """Se lanza al final para deshacer todos los préstamos de prueba."""
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de originación de préstamos según el número de cuotas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cuotas',
+            type=int,
+            nargs='+',
+            default=[12, 52, 104, 520],
+            help='Tamaños de cronograma a medir (número de cuotas)',
+        )
+        parser.add_argument(
+            '--repeticiones',
+            type=int,
+            default=5,
+            help='Préstamos creados por cada tamaño',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            self.style.SUCCESS('⏱️  Benchmark de originación (los datos se revierten al final)')
+        )
+        self.stdout.write(f'{"Cuotas":>8} {"ms/préstamo":>12} {"ms/cuota":>10} {"consultas":>10}')
+
+        try:
+            with transaction.atomic():
+                tipo_documento = TipoDocumento.objects.create(nombre='BENCH')
+                cliente = Cliente.objects.create(
+                    tipo_documento=tipo_documento,
+                    numero_documento='BENCH-0001',
+                    nombres='Benchmark',
+                    apellidos='Originación',
+                )
+                tasa = TasaInteres.objects.create(
+                    nombre='Tasa Benchmark', valor_porcentaje=Decimal('15.00'), periodo='Anual'
+                )
+
+                for numero_cuotas in options['cuotas']:
+                    repeticiones = options['repeticiones']
+                    with CaptureQueriesContext(connection) as consultas:
+                        inicio = time.perf_counter()
+                        for _ in range(repeticiones):
+                            Préstamo.objects.create(
+                                cliente=cliente,
+                                tasa_interes=tasa,
+                                monto_solicitado=Decimal('10000.00'),
+                                numero_cuotas=numero_cuotas,
+                                frecuencia_pago='Semanal',
+                                fecha_emision=date(2025, 1, 1),
+                                fecha_primer_pago=date(2025, 1, 8),
+                            )
+                        transcurrido = time.perf_counter() - inicio
+
+                    ms_prestamo = transcurrido * 1000 / repeticiones
+                    self.stdout.write(
+                        f'{numero_cuotas:>8} {ms_prestamo:>12.2f} '
+                        f'{ms_prestamo / numero_cuotas:>10.4f} '
+                        f'{len(consultas) // repeticiones:>10}'
+                    )
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark completado'))
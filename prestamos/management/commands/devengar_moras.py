@@ -0,0 +1,53 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from prestamos.devengo_mora import devengar_moras
+
+
+class Command(BaseCommand):
+    help = 'Devenga las moras de las cuotas que cambiaron o vencieron desde la última ejecución'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fecha',
+            help='Fecha de devengo en formato AAAA-MM-DD (por defecto hoy)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Cuotas procesadas por lote',
+        )
+        parser.add_argument(
+            '--completo',
+            action='store_true',
+            help='Procesar todas las cuotas vencidas y las que tienen moras pendientes, no solo las que cambiaron',
+        )
+
+    def handle(self, *args, **options):
+        fecha = None
+        if options['fecha']:
+            try:
+                fecha = date.fromisoformat(options['fecha'])
+            except ValueError:
+                raise CommandError('La fecha debe tener el formato AAAA-MM-DD')
+
+        inicio = time.perf_counter()
+        estadisticas = devengar_moras(
+            fecha=fecha,
+            tamano_lote=max(1, options['batch_size']),
+            completo=options['completo'],
+        )
+        transcurrido = time.perf_counter() - inicio
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ Devengo de moras completado en {transcurrido:.2f}s:\n'
+                f'   - Cuotas procesadas: {estadisticas["cuotas_procesadas"]}\n'
+                f'   - Moras generadas/actualizadas: {estadisticas["moras_generadas"]}\n'
+                f'   - Moras anteriores reemplazadas: {estadisticas["moras_reemplazadas"]}\n'
+                f'   - Moras cerradas (cuotas pagadas o canceladas): {estadisticas["moras_cerradas"]}\n'
+                f'   - Monto total devengado: S/ {estadisticas["monto_total"]:.2f}'
+            )
+        )
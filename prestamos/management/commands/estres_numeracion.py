@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection
+from prestamos.models import Préstamo, TasaInteres
+from prestamos.numeracion import asignador
+from clientes.models import Cliente, TipoDocumento
+
+
+class Command(BaseCommand):
+    help = 'Prueba de estrés: crea préstamos desde varios hilos y verifica que no se repita numero_prestamo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=8, help='Hilos concurrentes')
+        parser.add_argument('--prestamos', type=int, default=2000, help='Total de préstamos a crear')
+        parser.add_argument(
+            '--bloque',
+            type=int,
+            default=None,
+            help='Tamaño de bloque de reserva por proceso (por defecto PRESTAMOS_NUMERACION_BLOQUE)',
+        )
+        parser.add_argument(
+            '--conservar',
+            action='store_true',
+            help='No eliminar los préstamos creados al terminar',
+        )
+
+    def handle(self, *args, **options):
+        if options['bloque'] is not None:
+            from django.conf import settings
+            settings.PRESTAMOS_NUMERACION_BLOQUE = options['bloque']
+            asignador.reiniciar()
+
+        tipo_documento, _ = TipoDocumento.objects.get_or_create(nombre='ESTRES')
+        cliente, _ = Cliente.objects.get_or_create(
+            numero_documento='ESTRES-0001',
+            defaults={'tipo_documento': tipo_documento, 'nombres': 'Estrés', 'apellidos': 'Numeración'},
+        )
+        tasa, _ = TasaInteres.objects.get_or_create(
+            nombre='Tasa Estrés', defaults={'valor_porcentaje': Decimal('10.00'), 'periodo': 'Mensual'}
+        )
+
+        creados = []
+        colisiones = []
+        otros_errores = []
+        lock = threading.Lock()
+
+        def crear(_):
+            try:
+                prestamo = Préstamo.objects.create(
+                    cliente=cliente,
+                    tasa_interes=tasa,
+                    monto_solicitado=Decimal('1000.00'),
+                    numero_cuotas=1,
+                    frecuencia_pago='Mensual',
+                    fecha_emision=date(2025, 1, 1),
+                    fecha_primer_pago=date(2025, 2, 1),
+                )
+                with lock:
+                    creados.append((prestamo.pk, prestamo.numero_prestamo))
+            except IntegrityError as e:
+                with lock:
+                    colisiones.append(str(e))
+            except Exception as e:
+                with lock:
+                    otros_errores.append(str(e))
+            finally:
+                # Cada hilo usa su propia conexión; la cerramos al terminar la tarea
+                connection.close()
+
+        self.stdout.write(
+            f'🔥 Creando {options["prestamos"]} préstamos con {options["hilos"]} hilos '
+            f'(bloque={asignador.tamano_bloque})...'
+        )
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['hilos']) as pool:
+            list(pool.map(crear, range(options['prestamos'])))
+        transcurrido = time.perf_counter() - inicio
+
+        numeros = Counter(numero for _, numero in creados)
+        duplicados = [numero for numero, veces in numeros.items() if veces > 1]
+
+        self.stdout.write(
+            f'   - Préstamos creados: {len(creados)} en {transcurrido:.2f}s '
+            f'({len(creados) / transcurrido if transcurrido else 0:.0f}/s)\n'
+            f'   - Colisiones (IntegrityError): {len(colisiones)}\n'
+            f'   - Números duplicados: {len(duplicados)}\n'
+            f'   - Otros errores: {len(otros_errores)}'
+        )
+        for error in otros_errores[:5]:
+            self.stdout.write(self.style.WARNING(f'     {error}'))
+
+        if not options['conservar']:
+            Préstamo.objects.filter(pk__in=[pk for pk, _ in creados]).delete()
+
+        if colisiones or duplicados:
+            raise CommandError('❌ Se detectaron colisiones en numero_prestamo')
+        self.stdout.write(self.style.SUCCESS('✅ Sin colisiones en numero_prestamo'))
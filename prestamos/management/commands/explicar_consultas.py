@@ -0,0 +1,101 @@
+import io
+import json
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from prestamos.cartera_sintetica import generar_cartera
+from prestamos.consultas_frecuentes import CONSULTAS, muestra_por_defecto
+from prestamos.models import MetodoPago, TasaInteres
+
+
+class Command(BaseCommand):
+    help = (
+        'Ejecuta EXPLAIN sobre las consultas frecuentes (prestamos/consultas_frecuentes.py) '
+        'y falla si alguna recorre una tabla completa'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sembrar',
+            type=int,
+            default=0,
+            metavar='PRESTAMOS',
+            help=(
+                'Cargar antes esta cantidad de préstamos sintéticos (con clientes, cuotas y pagos). '
+                'Se cargan en una transacción que se revierte al terminar'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            raise CommandError(f'Motor no soportado: {connection.vendor}')
+
+        inicio = time.perf_counter()
+        fallas = []
+        with transaction.atomic():
+            if options['sembrar'] > 0:
+                self._sembrar(options['sembrar'])
+
+            muestra = muestra_por_defecto()
+            for nombre, (armar_consulta, motores) in CONSULTAS.items():
+                if motores and connection.vendor not in motores:
+                    self.stdout.write(f'   ⏭️  {nombre} (solo {", ".join(motores)})')
+                    continue
+                tablas = self._tablas_recorridas(armar_consulta(muestra))
+                if tablas:
+                    fallas.append((nombre, tablas))
+                    self.stdout.write(self.style.ERROR(f'   ❌ {nombre}: recorre {", ".join(tablas)}'))
+                else:
+                    self.stdout.write(f'   ✅ {nombre}')
+
+            # Los datos sembrados no se conservan
+            transaction.set_rollback(True)
+
+        transcurrido = time.perf_counter() - inicio
+        if fallas:
+            raise CommandError(
+                f'{len(fallas)} de {len(CONSULTAS)} consultas frecuentes recorren tablas completas. '
+                'Revisar los índices en Meta.indexes (en tablas chicas el planificador puede '
+                'preferir el recorrido: usar --sembrar)'
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Consultas frecuentes verificadas en {transcurrido:.2f}s: todas usan índices')
+        )
+
+    def _tablas_recorridas(self, queryset):
+        """Tablas que el plan recorre completas (Seq Scan / SCAN sin índice)."""
+        if connection.vendor == 'postgresql':
+            plan = json.loads(queryset.explain(format='json'))
+            tablas = []
+            pendientes = [plan[0]['Plan']]
+            while pendientes:
+                nodo = pendientes.pop()
+                if nodo['Node Type'] == 'Seq Scan':
+                    tablas.append(nodo['Relation Name'])
+                pendientes.extend(nodo.get('Plans', []))
+            return tablas
+
+        # SQLite: líneas "SCAN tabla" (completo) o "SCAN tabla USING INDEX ..." / "SEARCH ..."
+        tablas = []
+        for linea in queryset.explain().splitlines():
+            detalle = linea.split(' ', 3)[-1]
+            if detalle.startswith('SCAN ') and ' USING ' not in detalle:
+                tablas.append(detalle.split()[1])
+        return tablas
+
+    def _sembrar(self, cantidad):
+        """Cartera sintética de `cantidad` préstamos (ver prestamos/cartera_sintetica.py)."""
+        if not TasaInteres.objects.exists() or not MetodoPago.objects.exists():
+            call_command('poblar_datos_iniciales', stdout=io.StringIO())
+        resultado = generar_cartera(clientes=max(1, cantidad // 2), prestamos=cantidad)
+
+        # Estadísticas al día para que el planificador vea el volumen real
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        self.stdout.write(
+            f'🌱 Sembrados {resultado.prestamos} préstamos, {resultado.cuotas} cuotas y {resultado.pagos} pagos '
+            f'en {resultado.segundos:.2f}s'
+        )
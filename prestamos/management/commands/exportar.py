@@ -0,0 +1,54 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from prestamos.exportacion import EXPORTACIONES, FORMATOS, generar, nombre_archivo
+from prestamos.forms import ExportacionForm
+
+
+class Command(BaseCommand):
+    help = 'Exporta préstamos, cuotas, pagos o detalles de pago a CSV o XLSX (con memoria constante)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('nombre', choices=sorted(EXPORTACIONES), help='Qué exportar')
+        parser.add_argument('--formato', choices=sorted(FORMATOS), default='csv')
+        parser.add_argument(
+            '--salida',
+            help='Archivo de salida (por defecto <nombre>_AAAAMMDD.<formato>; "-" para la salida estándar)',
+        )
+        parser.add_argument('--desde', help='Fecha inicial (AAAA-MM-DD)')
+        parser.add_argument('--hasta', help='Fecha final (AAAA-MM-DD)')
+        parser.add_argument('--estado', help='Estado del préstamo o de la cuota')
+        parser.add_argument('--numero-prestamo', type=int)
+        parser.add_argument('--numero-documento', help='Documento del cliente')
+
+    def handle(self, *args, **options):
+        form = ExportacionForm({
+            campo: options[campo]
+            for campo in ('desde', 'hasta', 'estado', 'numero_prestamo', 'numero_documento')
+            if options[campo] is not None
+        })
+        if not form.is_valid():
+            errores = '; '.join(f'{campo}: {" ".join(mensajes)}' for campo, mensajes in form.errors.items())
+            raise CommandError(f'Filtros no válidos: {errores}')
+
+        nombre, formato = options['nombre'], options['formato']
+        ruta = options['salida'] or nombre_archivo(nombre, formato)
+        inicio = time.perf_counter()
+        escritos = 0
+        archivo = sys.stdout.buffer if ruta == '-' else open(ruta, 'wb')
+        try:
+            for trozo in generar(nombre, formato, form.cleaned_data):
+                archivo.write(trozo)
+                escritos += len(trozo)
+        finally:
+            if archivo is not sys.stdout.buffer:
+                archivo.close()
+
+        if ruta != '-':
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'✅ Exportación de {nombre} completada en {time.perf_counter() - inicio:.2f}s: '
+                    f'{ruta} ({escritos / 1024:,.0f} KB)'
+                )
+            )
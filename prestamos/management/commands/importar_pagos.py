@@ -0,0 +1,100 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from prestamos.importacion import leer_extracto, conciliar, contabilizar, escribir_excepciones
+from prestamos.models import MetodoPago
+from accounts.models import Usuario
+
+
+class Command(BaseCommand):
+    help = 'Importa pagos desde un extracto bancario en CSV y los registra en los préstamos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del extracto bancario (CSV)')
+        parser.add_argument(
+            '--metodo-pago',
+            default='Transferencia Bancaria',
+            help='Nombre del método de pago con el que se registran los pagos',
+        )
+        parser.add_argument(
+            '--usuario',
+            help='Email del usuario que figura como "registrado por"',
+        )
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Procesos en paralelo (los préstamos se reparten entre ellos)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Filas conciliadas por consulta',
+        )
+        parser.add_argument(
+            '--excepciones',
+            help='Archivo CSV donde se escriben las filas no registradas '
+                 '(por defecto <archivo>.excepciones.csv)',
+        )
+        parser.add_argument(
+            '--encoding',
+            default='utf-8-sig',
+            help='Codificación del archivo',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            metodo_pago = MetodoPago.objects.get(nombre=options['metodo_pago'])
+        except MetodoPago.DoesNotExist:
+            raise CommandError(f'No existe el método de pago "{options["metodo_pago"]}"')
+
+        usuario_id = None
+        if options['usuario']:
+            try:
+                usuario_id = Usuario.objects.get(email=options['usuario']).pk
+            except Usuario.DoesNotExist:
+                raise CommandError(f'No existe el usuario "{options["usuario"]}"')
+
+        inicio = time.perf_counter()
+        try:
+            with open(options['archivo'], encoding=options['encoding'], newline='') as archivo:
+                filas, excepciones = leer_extracto(archivo)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'No se pudo leer el extracto: {e}')
+
+        self.stdout.write(f'📄 {len(filas)} filas leídas ({len(excepciones)} con formato inválido)')
+
+        asignaciones, no_conciliadas = conciliar(filas, tamano_lote=max(1, options['batch_size']))
+        excepciones.extend(no_conciliadas)
+        self.stdout.write(
+            f'🔎 {sum(len(f) for f in asignaciones.values())} filas conciliadas '
+            f'en {len(asignaciones)} préstamos ({len(no_conciliadas)} sin conciliar)'
+        )
+
+        resumen = contabilizar(
+            asignaciones,
+            metodo_pago_id=metodo_pago.pk,
+            usuario_id=usuario_id,
+            procesos=options['procesos'],
+        )
+        excepciones.extend(resumen['excepciones'])
+        excepciones.extend(resumen['ajustes'])
+
+        ruta_excepciones = options['excepciones'] or f'{options["archivo"]}.excepciones.csv'
+        if excepciones:
+            with open(ruta_excepciones, 'w', encoding='utf-8', newline='') as destino:
+                escribir_excepciones(excepciones, destino)
+
+        transcurrido = time.perf_counter() - inicio
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ Importación completada en {transcurrido:.2f}s:\n'
+                f'   - Pagos registrados: {resumen["pagos"]}\n'
+                f'   - Monto registrado: S/ {resumen["monto"]:.2f}\n'
+                f'   - Pagos con monto ajustado: {len(resumen["ajustes"])}\n'
+                f'   - Filas no registradas: {len(excepciones) - len(resumen["ajustes"])}'
+                + (f'\n   - Excepciones en: {ruta_excepciones}' if excepciones else '')
+            )
+        )
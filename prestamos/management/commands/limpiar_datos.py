@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 from django.db import transaction
-from prestamos.models import Préstamo, Pago, PlanPago, DetallePago, MetodoPago, TasaInteres
+from prestamos.models import Préstamo, Pago, PlanPago, DetallePago, MetodoPago, TasaInteres, ContadorKPI
 from clientes.models import Cliente, Direccion, TipoDocumento
 from accounts.models import Usuario, Perfil
 
@@ -89,6 +89,11 @@ class Command(BaseCommand):
                 Perfil.objects.all().delete()
                 self.stdout.write(f'✅ Eliminados {perfil_count} perfiles')
 
+                # 12. Reiniciar los contadores del dashboard
+                contador_count = ContadorKPI.objects.count()
+                ContadorKPI.objects.all().delete()
+                self.stdout.write(f'✅ Eliminados {contador_count} contadores del dashboard')
+
             self.stdout.write(
                 self.style.SUCCESS(
                     '\n🎉 ¡Limpieza completada exitosamente!\n'
@@ -0,0 +1,107 @@
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from prestamos import cola
+
+
+class Command(BaseCommand):
+    help = (
+        'Ejecuta las tareas de la cola (préstamos largos, exportaciones, refresco de reportes) '
+        'con un proceso por núcleo. Ctrl+C espera a que terminen las tareas en curso'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Procesos trabajadores (por defecto, uno por núcleo; 1 = en este mismo proceso)',
+        )
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Procesar lo que haya en la cola y terminar (para cron o pruebas)',
+        )
+        parser.add_argument(
+            '--espera',
+            type=float,
+            default=cola.ESPERA,
+            help='Segundos entre consultas cuando la cola está vacía',
+        )
+
+    def handle(self, *args, **options):
+        procesos = options['procesos']
+        if procesos <= 0:
+            raise CommandError('--procesos debe ser positivo')
+        if procesos > 1 and connections['default'].vendor == 'sqlite':
+            # Una exportación mantiene abierta su lectura mientras informa el
+            # avance, y SQLite no deja escribir a otros procesos mientras tanto
+            self.stderr.write(self.style.WARNING('⚠️  Con SQLite la cola se procesa con un solo proceso'))
+            procesos = 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'⚙️  Procesando la cola con {procesos} proceso(s)'
+                f'{" hasta vaciarla" if options["una_vez"] else " (Ctrl+C para detener)"}...'
+            )
+        )
+        inicio = time.perf_counter()
+        if procesos == 1:
+            # Ctrl+C o SIGTERM: se termina la tarea en curso antes de salir
+            detener = threading.Event()
+            anteriores = {senal: signal.signal(senal, lambda *_: detener.set()) for senal in (signal.SIGINT, signal.SIGTERM)}
+            try:
+                completadas, fallidas = cola.trabajar(detener, una_vez=options['una_vez'], espera=options['espera'])
+            finally:
+                for senal, manejador in anteriores.items():
+                    signal.signal(senal, manejador)
+            resumen = f'{completadas} completadas, {fallidas} con error'
+        else:
+            self._supervisar(procesos, options['una_vez'], options['espera'])
+            resumen = f'{procesos} procesos detenidos'
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Cola procesada en {time.perf_counter() - inicio:.1f}s: {resumen}')
+        )
+
+    def _supervisar(self, cantidad, una_vez, espera):
+        """Lanza los procesos, reemplaza los que mueren y los detiene con Ctrl+C o SIGTERM."""
+        contexto = multiprocessing.get_context()
+        detener = contexto.Event()
+        signal.signal(signal.SIGTERM, lambda *_: detener.set())
+        # Los hijos abren sus propias conexiones (no se comparten sockets tras fork)
+        connections.close_all()
+
+        def lanzar(indice):
+            proceso = contexto.Process(
+                target=cola.proceso_trabajador,
+                args=(indice, detener, una_vez, espera),
+                name=f'procesar_tareas-{indice}',
+            )
+            proceso.start()
+            return proceso
+
+        procesos = [lanzar(indice) for indice in range(cantidad)]
+        try:
+            while any(proceso.is_alive() for proceso in procesos):
+                if not una_vez and not detener.is_set():
+                    for indice, proceso in enumerate(procesos):
+                        if not proceso.is_alive():
+                            self.stderr.write(
+                                self.style.WARNING(
+                                    f'⚠️  El proceso {indice} terminó (código {proceso.exitcode}); se reinicia'
+                                )
+                            )
+                            procesos[indice] = lanzar(indice)
+                detener.wait(1)
+        except KeyboardInterrupt:
+            self.stdout.write('Deteniendo: se espera a que terminen las tareas en curso...')
+            detener.set()
+        finally:
+            for proceso in procesos:
+                proceso.join()
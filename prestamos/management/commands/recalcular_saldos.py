@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from prestamos.models import Préstamo
+from prestamos.saldos import recalcular_saldos
+from prestamos import cache_agregados
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los saldos desnormalizados de los préstamos a partir de sus cuotas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Préstamos recalculados por lote (cada lote va en su propia transacción)',
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        tamano_lote = max(1, options['batch_size'])
+
+        prestamo_ids = Préstamo.objects.order_by('pk').values_list('pk', flat=True)
+        revisados = 0
+        corregidos = 0
+        lote = []
+        for prestamo_id in prestamo_ids.iterator(chunk_size=tamano_lote):
+            lote.append(prestamo_id)
+            if len(lote) >= tamano_lote:
+                with transaction.atomic():
+                    corregidos += recalcular_saldos(lote)
+                revisados += len(lote)
+                lote = []
+        if lote:
+            with transaction.atomic():
+                corregidos += recalcular_saldos(lote)
+            revisados += len(lote)
+
+        if corregidos:
+            # bulk_update no dispara señales: invalidar la caché a mano
+            cache_agregados.invalidar()
+
+        transcurrido = time.perf_counter() - inicio
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ Saldos recalculados en {transcurrido:.2f}s:\n'
+                f'   - Préstamos revisados: {revisados}\n'
+                f'   - Préstamos corregidos: {corregidos}'
+            )
+        )
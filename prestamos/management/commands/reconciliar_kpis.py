@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from prestamos.kpis import calcular_desde_cero
+from prestamos.models import ContadorKPI
+from prestamos import cache_agregados
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero los contadores del dashboard e informa las diferencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Solo informar las diferencias, sin corregir los contadores',
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+
+        with transaction.atomic():
+            # Bloquear la tabla de contadores mientras se compara y corrige,
+            # para no pisar incrementos concurrentes
+            actuales = {
+                (contador.metrica, contador.mes): contador
+                for contador in ContadorKPI.objects.select_for_update()
+            }
+            esperados = calcular_desde_cero()
+
+            diferencias = []
+            for clave in sorted(set(actuales) | set(esperados)):
+                contador = actuales.get(clave)
+                valor_actual = contador.valor if contador else 0
+                valor_esperado = esperados.get(clave, 0)
+                if valor_actual != valor_esperado:
+                    diferencias.append((clave, valor_actual, valor_esperado))
+
+            for (metrica, mes), valor_actual, valor_esperado in diferencias:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f'⚠️  {metrica} {mes:%Y-%m}: contador {valor_actual}, '
+                        f'recalculado {valor_esperado} (diferencia {valor_esperado - valor_actual})'
+                    )
+                )
+
+            if diferencias and not options['simular']:
+                nuevos = []
+                for (metrica, mes), _, valor_esperado in diferencias:
+                    contador = actuales.get((metrica, mes))
+                    if contador:
+                        contador.valor = valor_esperado
+                        contador.save(update_fields=['valor', 'fecha_actualizacion'])
+                    else:
+                        nuevos.append(ContadorKPI(metrica=metrica, mes=mes, valor=valor_esperado))
+                ContadorKPI.objects.bulk_create(nuevos)
+                cache_agregados.invalidar()
+
+        transcurrido = time.perf_counter() - inicio
+        if not diferencias:
+            resultado = 'sin diferencias'
+        elif options['simular']:
+            resultado = f'{len(diferencias)} diferencias (sin corregir, --simular)'
+        else:
+            resultado = f'{len(diferencias)} diferencias corregidas'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ Reconciliación completada en {transcurrido:.2f}s:\n'
+                f'   - Contadores revisados: {len(set(actuales) | set(esperados))}\n'
+                f'   - Resultado: {resultado}'
+            )
+        )
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+from prestamos.reportes import refrescar_reportes
+
+
+class Command(BaseCommand):
+    help = 'Refresca las vistas materializadas de reportes (originaciones, cobranzas, intereses, estados y clientes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--no-concurrente',
+            action='store_true',
+            help='Refrescar bloqueando las lecturas (más rápido, solo PostgreSQL)',
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        resultado = refrescar_reportes(concurrente=not options['no_concurrente'])
+        transcurrido = time.perf_counter() - inicio
+
+        detalle = '\n'.join(f'   - {tabla}: {filas} filas' for tabla, filas in resultado.items())
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Reportes refrescados en {transcurrido:.2f}s:\n{detalle}')
+        )
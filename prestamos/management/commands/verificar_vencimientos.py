@@ -1,47 +1,129 @@
+import time
+
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
 from django.utils import timezone
-from datetime import timedelta
 from prestamos.models import PlanPago, Préstamo
-from django.db.models import Q
+from prestamos import cache_agregados, kpis
+
 
 class Command(BaseCommand):
     help = 'Verifica préstamos vencidos y actualiza estados'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Filas actualizadas por cada UPDATE (cada lote va en su propia transacción)',
+        )
+
     def handle(self, *args, **options):
         """
         Comando para verificar préstamos vencidos y generar alertas.
+
+        Trabaja por conjuntos: en lugar de cargar y guardar cada cuota, emite
+        UPDATEs por lotes de --batch-size filas.
+
+        Revisa siempre todas las cuotas 'Pendiente' ya vencidas, también las
+        insertadas después de la ejecución anterior con un vencimiento pasado
+        (préstamos con fecha de emisión atrasada, generar_cartera,
+        importaciones). El índice parcial plan_pendiente_venc_idx solo
+        contiene cuotas 'Pendiente' y cada ejecución saca de él las vencidas,
+        así que la consulta recorre únicamente las que hay que actualizar (no
+        hace falta una marca de la ejecución anterior).
+
+        "Hoy" es la fecha local del proyecto (America/Lima), no la de UTC.
         """
-        hoy = timezone.now().date()
-        
-        # Buscar cuotas vencidas
+        inicio = time.perf_counter()
+        hoy = timezone.localdate()
+        tamano_lote = max(1, options['batch_size'])
+
+        # --- 1. Cuotas pendientes ya vencidas (por plan_pendiente_venc_idx) ---
         cuotas_vencidas = PlanPago.objects.filter(
             fecha_vencimiento__lt=hoy,
             estado='Pendiente'
-        )
-        
-        # Actualizar estado de cuotas vencidas
+        ).order_by('fecha_vencimiento', 'pk')
+
         cuotas_actualizadas = 0
-        for cuota in cuotas_vencidas:
-            cuota.estado = 'Vencida'
-            cuota.save()
-            cuotas_actualizadas += 1
-        
-        # Buscar préstamos que deben cambiar a "En Atraso"
-        prestamos_en_atraso = Préstamo.objects.filter(
-            estado='Activo',
-            plan_pagos__estado='Vencida'
-        ).distinct()
-        
-        prestamos_actualizados = 0
-        for prestamo in prestamos_en_atraso:
-            prestamo.estado = 'En Atraso'
-            prestamo.save()
-            prestamos_actualizados += 1
-        
+        prestamos_en_atraso = 0
+        lotes = 0
+        while True:
+            lote = list(cuotas_vencidas.values_list('pk', 'prestamo_id')[:tamano_lote])
+            if not lote:
+                break
+            lotes += 1
+            ids_cuotas = [pk for pk, _ in lote]
+            ids_prestamos = {prestamo_id for _, prestamo_id in lote}
+            ahora = timezone.now()
+            with transaction.atomic():
+                # update() no pasa por save(): fijamos fecha_actualizacion a mano
+                cuotas_actualizadas += PlanPago.objects.filter(
+                    pk__in=ids_cuotas, estado='Pendiente'
+                ).update(estado='Vencida', fecha_actualizacion=ahora)
+                # Cuotas nuevas en rojo: invalidar el detalle cacheado de sus préstamos
+                Préstamo.objects.filter(pk__in=ids_prestamos).update(version=F('version') + 1)
+
+                # --- 2. Préstamos de este lote que pasan a "En Atraso" ---
+                prestamos_en_atraso += self._cambiar_estado(ids_prestamos, 'Activo', 'En Atraso', ahora)
+
+        # --- 3. Préstamos "En Atraso" que ya se pusieron al día vuelven a "Activo" ---
+        # Al día = ninguna cuota vencida con saldo (las pagadas parcialmente también cuentan)
+        cuotas_atrasadas = PlanPago.objects.filter(
+            prestamo=OuterRef('pk'),
+            fecha_vencimiento__lt=hoy,
+            saldo_pendiente__gt=0,
+        ).exclude(estado__in=['Pagada', 'Cancelada'])
+        prestamos_al_dia = Préstamo.objects.filter(estado='En Atraso').exclude(
+            Exists(cuotas_atrasadas)
+        )
+
+        prestamos_regularizados = 0
+        while True:
+            ids_prestamos = list(prestamos_al_dia.values_list('pk', flat=True)[:tamano_lote])
+            if not ids_prestamos:
+                break
+            lotes += 1
+            with transaction.atomic():
+                prestamos_regularizados += self._cambiar_estado(
+                    ids_prestamos, 'En Atraso', 'Activo', timezone.now()
+                )
+
+        # Los UPDATE masivos no disparan señales: invalidar la caché a mano
+        if cuotas_actualizadas or prestamos_en_atraso or prestamos_regularizados:
+            cache_agregados.invalidar()
+
+        transcurrido = time.perf_counter() - inicio
         self.stdout.write(
             self.style.SUCCESS(
-                f'✅ Verificación completada:\n'
+                f'✅ Verificación completada en {transcurrido:.2f}s:\n'
+                f'   - Vencidas antes del: {hoy}\n'
                 f'   - Cuotas vencidas actualizadas: {cuotas_actualizadas}\n'
-                f'   - Préstamos en atraso actualizados: {prestamos_actualizados}'
+                f'   - Préstamos en atraso actualizados: {prestamos_en_atraso}\n'
+                f'   - Préstamos regularizados (En Atraso -> Activo): {prestamos_regularizados}\n'
+                f'   - Lotes ejecutados: {lotes} (batch-size={tamano_lote})'
             )
         )
+
+    def _cambiar_estado(self, ids_prestamos, estado_anterior, estado_nuevo, ahora):
+        """
+        Pasa de estado_anterior a estado_nuevo los préstamos indicados que
+        sigan en estado_anterior, y ajusta los contadores del dashboard en la
+        misma transacción. Devuelve cuántos préstamos cambiaron.
+        """
+        # Bloqueamos las filas para que el conteo coincida con el UPDATE
+        cambian = list(
+            Préstamo.objects.select_for_update()
+            .filter(pk__in=ids_prestamos, estado=estado_anterior)
+            .values_list('pk', 'fecha_creacion')
+        )
+        if not cambian:
+            return 0
+        actualizados = Préstamo.objects.filter(
+            pk__in=[pk for pk, _ in cambian]
+        ).update(estado=estado_nuevo, fecha_actualizacion=ahora, version=F('version') + 1)
+        kpis.incrementar(kpis.deltas_cambio_estado(
+            [fecha_creacion for _, fecha_creacion in cambian], estado_anterior, estado_nuevo
+        ))
+        return actualizados
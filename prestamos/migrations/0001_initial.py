@@ -0,0 +1,297 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:48
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('clientes', '0002_cliente_texto_busqueda'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReporteCliente',
+            fields=[
+                ('cliente', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='clientes.cliente', verbose_name='Cliente')),
+                ('prestamos', models.IntegerField(verbose_name='Préstamos')),
+                ('monto_prestado', models.DecimalField(decimal_places=2, max_digits=16, verbose_name='Monto Prestado')),
+            ],
+            options={
+                'verbose_name': 'Reporte por Cliente',
+                'db_table': 'prestamos_reporte_cliente',
+                'ordering': ['-prestamos'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ReporteCobranza',
+            fields=[
+                ('fecha', models.DateField(primary_key=True, serialize=False, verbose_name='Fecha')),
+                ('pagos', models.IntegerField(verbose_name='Pagos')),
+                ('monto_cobrado', models.DecimalField(decimal_places=2, max_digits=16, verbose_name='Monto Cobrado')),
+            ],
+            options={
+                'verbose_name': 'Reporte de Cobranza',
+                'db_table': 'prestamos_reporte_cobranza',
+                'ordering': ['fecha'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ReporteEstado',
+            fields=[
+                ('estado', models.CharField(max_length=20, primary_key=True, serialize=False, verbose_name='Estado')),
+                ('prestamos', models.IntegerField(verbose_name='Préstamos')),
+                ('monto_prestado', models.DecimalField(decimal_places=2, max_digits=16, verbose_name='Monto Prestado')),
+                ('saldo_pendiente', models.DecimalField(decimal_places=2, max_digits=16, verbose_name='Saldo Pendiente')),
+                ('intereses_reales', models.DecimalField(decimal_places=2, max_digits=16, verbose_name='Intereses Reales')),
+            ],
+            options={
+                'verbose_name': 'Reporte por Estado',
+                'db_table': 'prestamos_reporte_estado',
+                'ordering': ['estado'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ReporteInteres',
+            fields=[
+                ('fecha', models.DateField(primary_key=True, serialize=False, verbose_name='Fecha')),
+                ('capital_cobrado', models.DecimalField(decimal_places=2, max_digits=16, verbose_name='Capital Cobrado')),
+                ('interes_cobrado', models.DecimalField(decimal_places=2, max_digits=16, verbose_name='Interés Cobrado')),
+            ],
+            options={
+                'verbose_name': 'Reporte de Intereses',
+                'db_table': 'prestamos_reporte_interes',
+                'ordering': ['fecha'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ReporteOriginacion',
+            fields=[
+                ('fecha', models.DateField(primary_key=True, serialize=False, verbose_name='Fecha')),
+                ('prestamos', models.IntegerField(verbose_name='Préstamos')),
+                ('monto_prestado', models.DecimalField(decimal_places=2, max_digits=16, verbose_name='Monto Prestado')),
+                ('intereses_pactados', models.DecimalField(decimal_places=2, max_digits=16, verbose_name='Intereses Pactados')),
+            ],
+            options={
+                'verbose_name': 'Reporte de Originación',
+                'db_table': 'prestamos_reporte_originacion',
+                'ordering': ['fecha'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ContadorSecuencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+                ('nombre', models.CharField(max_length=100, unique=True, verbose_name='Nombre de la Secuencia')),
+                ('ultimo_valor', models.PositiveBigIntegerField(default=0, verbose_name='Último Valor Asignado')),
+            ],
+            options={
+                'verbose_name': 'Contador de Secuencia',
+                'verbose_name_plural': 'Contadores de Secuencia',
+            },
+        ),
+        migrations.CreateModel(
+            name='MarcaProceso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+                ('nombre', models.CharField(max_length=100, unique=True, verbose_name='Nombre del Proceso')),
+                ('ultima_fecha', models.DateField(blank=True, null=True, verbose_name='Última Fecha Procesada')),
+                ('ultima_ejecucion', models.DateTimeField(blank=True, null=True, verbose_name='Última Ejecución')),
+            ],
+            options={
+                'verbose_name': 'Marca de Proceso',
+                'verbose_name_plural': 'Marcas de Proceso',
+            },
+        ),
+        migrations.CreateModel(
+            name='MetodoPago',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+                ('nombre', models.CharField(max_length=100, unique=True, verbose_name='Nombre del Método')),
+                ('activo', models.BooleanField(default=True, verbose_name='¿Está activo?')),
+            ],
+            options={
+                'verbose_name': 'Método de Pago',
+                'verbose_name_plural': 'Métodos de Pago',
+            },
+        ),
+        migrations.CreateModel(
+            name='TasaInteres',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+                ('nombre', models.CharField(max_length=100, unique=True, verbose_name='Nombre de la Tasa')),
+                ('tipo_tasa', models.CharField(choices=[('Simple', 'Simple')], default='Simple', max_length=10, verbose_name='Tipo de Tasa')),
+                ('valor_porcentaje', models.DecimalField(decimal_places=2, max_digits=5, verbose_name='Valor en Porcentaje (%)')),
+                ('periodo', models.CharField(choices=[('Diario', 'Diario'), ('Semanal', 'Semanal'), ('Quincenal', 'Quincenal'), ('Mensual', 'Mensual'), ('Anual', 'Anual')], default='Mensual', max_length=10, verbose_name='Periodo de Aplicación')),
+            ],
+            options={
+                'verbose_name': 'Tasa de Interés',
+                'verbose_name_plural': 'Tasas de Interés',
+            },
+        ),
+        migrations.CreateModel(
+            name='ContadorKPI',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+                ('metrica', models.CharField(max_length=50, verbose_name='Métrica')),
+                ('mes', models.DateField(verbose_name='Mes')),
+                ('valor', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Valor')),
+            ],
+            options={
+                'verbose_name': 'Contador KPI',
+                'verbose_name_plural': 'Contadores KPI',
+                'ordering': ['metrica', 'mes'],
+                'unique_together': {('metrica', 'mes')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CuentaBancaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+                ('banco', models.CharField(max_length=100, verbose_name='Nombre del Banco')),
+                ('numero_cuenta', models.CharField(max_length=50, unique=True, verbose_name='Número de Cuenta')),
+                ('tipo_cuenta', models.CharField(choices=[('Ahorros', 'Ahorros'), ('Corriente', 'Corriente')], default='Ahorros', max_length=20, verbose_name='Tipo de Cuenta')),
+                ('cci', models.CharField(blank=True, max_length=50, null=True, unique=True, verbose_name='CCI (Código de Cuenta Interbancario)')),
+                ('es_principal', models.BooleanField(default=True, verbose_name='¿Es cuenta principal?')),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cuentas_bancarias', to='clientes.cliente', verbose_name='Cliente')),
+            ],
+            options={
+                'verbose_name': 'Cuenta Bancaria',
+                'verbose_name_plural': 'Cuentas Bancarias',
+            },
+        ),
+        migrations.CreateModel(
+            name='Préstamo',
+            fields=[
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('numero_prestamo', models.PositiveIntegerField(blank=True, help_text='Número secuencial del préstamo', null=True, unique=True, verbose_name='Número de Préstamo')),
+                ('monto_solicitado', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Monto Solicitado')),
+                ('numero_cuotas', models.PositiveIntegerField(verbose_name='Número de Cuotas')),
+                ('frecuencia_pago', models.CharField(choices=[('Semanal', 'Semanal'), ('Quincenal', 'Quincenal'), ('Mensual', 'Mensual')], default='Mensual', max_length=10, verbose_name='Frecuencia de Pago')),
+                ('fecha_emision', models.DateField(default=django.utils.timezone.now, verbose_name='Fecha de Emisión (Desembolso)')),
+                ('fecha_primer_pago', models.DateField(verbose_name='Fecha del Primer Pago')),
+                ('monto_total_interes', models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10, verbose_name='Monto Total de Intereses')),
+                ('monto_total_pagar', models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10, verbose_name='Monto Total a Pagar')),
+                ('saldo_pendiente_total', models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12, verbose_name='Saldo Pendiente Total')),
+                ('total_pagado', models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12, verbose_name='Total Pagado')),
+                ('cuotas_pagadas', models.PositiveIntegerField(default=0, editable=False, verbose_name='Cuotas Pagadas')),
+                ('intereses_reales', models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12, verbose_name='Intereses Reales')),
+                ('proxima_fecha_vencimiento', models.DateField(blank=True, editable=False, null=True, verbose_name='Próximo Vencimiento')),
+                ('garantia_descripcion', models.TextField(blank=True, null=True, verbose_name='Descripción de la Garantía')),
+                ('estado', models.CharField(choices=[('Pendiente', 'Pendiente de Desembolso'), ('Activo', 'Activo'), ('En Atraso', 'En Atraso'), ('Pagado', 'Pagado Completamente'), ('Cancelado', 'Cancelado')], default='Activo', max_length=20, verbose_name='Estado del Préstamo')),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='prestamos', to='clientes.cliente', verbose_name='Cliente')),
+                ('creado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='prestamos_creados', to=settings.AUTH_USER_MODEL, verbose_name='Creado por')),
+                ('tasa_interes', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='prestamos.tasainteres', verbose_name='Tasa de Interés Aplicada')),
+            ],
+            options={
+                'verbose_name': 'Préstamo',
+                'verbose_name_plural': 'Préstamos',
+                'ordering': ['-fecha_emision'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PlanPago',
+            fields=[
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('numero_cuota', models.PositiveIntegerField(verbose_name='Número de Cuota')),
+                ('fecha_vencimiento', models.DateField(verbose_name='Fecha de Vencimiento')),
+                ('monto_capital', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Monto Capital')),
+                ('monto_interes', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Monto Interés')),
+                ('monto_total_cuota', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Monto Total Cuota')),
+                ('estado', models.CharField(choices=[('Pendiente', 'Pendiente'), ('Pagada', 'Pagada'), ('Vencida', 'Vencida'), ('Pagada Parcialmente', 'Pagada Parcialmente'), ('Cancelada', 'Cancelada')], default='Pendiente', max_length=20, verbose_name='Estado de la Cuota')),
+                ('monto_pagado', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Monto Pagado de esta Cuota')),
+                ('saldo_pendiente', models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10, verbose_name='Saldo Pendiente de esta Cuota')),
+                ('prestamo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='plan_pagos', to='prestamos.préstamo', verbose_name='Préstamo')),
+            ],
+            options={
+                'verbose_name': 'Cuota del Plan de Pago',
+                'verbose_name_plural': 'Plan de Pagos',
+                'ordering': ['prestamo', 'numero_cuota'],
+                'unique_together': {('prestamo', 'numero_cuota')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Pago',
+            fields=[
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('monto_pagado', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Monto Pagado')),
+                ('fecha_pago', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha y Hora del Pago')),
+                ('referencia', models.CharField(blank=True, max_length=100, null=True, verbose_name='Referencia (Nro. Operación)')),
+                ('distribuido', models.BooleanField(default=False, editable=False)),
+                ('metodo_pago', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='prestamos.metodopago', verbose_name='Método de Pago')),
+                ('registrado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pagos_registrados', to=settings.AUTH_USER_MODEL, verbose_name='Registrado por')),
+                ('prestamo', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='pagos', to='prestamos.préstamo', verbose_name='Préstamo Asociado')),
+            ],
+            options={
+                'verbose_name': 'Pago',
+                'verbose_name_plural': 'Pagos',
+                'ordering': ['-fecha_pago'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Mora',
+            fields=[
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('monto_mora', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Monto de la Mora')),
+                ('fecha_generacion', models.DateField(default=django.utils.timezone.now, verbose_name='Fecha de Generación')),
+                ('estado', models.CharField(choices=[('Pendiente', 'Pendiente'), ('Pagada', 'Pagada'), ('Cancelada', 'Cancelada')], default='Pendiente', max_length=10, verbose_name='Estado de la Mora')),
+                ('saldo_base', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Saldo Vencido Base')),
+                ('dias_vencido', models.PositiveIntegerField(default=0, verbose_name='Días Vencidos a la Fecha de Generación')),
+                ('cuota_plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='moras', to='prestamos.planpago', verbose_name='Cuota Vencida')),
+            ],
+            options={
+                'verbose_name': 'Cargo por Mora',
+                'verbose_name_plural': 'Cargos por Mora',
+                'ordering': ['cuota_plan', '-fecha_generacion'],
+                'unique_together': {('cuota_plan', 'fecha_generacion')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DetallePago',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+                ('monto_aplicado', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Monto Aplicado a esta Cuota')),
+                ('pago', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='detalles', to='prestamos.pago', verbose_name='Pago')),
+                ('cuota_plan', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='pagos_aplicados', to='prestamos.planpago', verbose_name='Cuota Afectada')),
+            ],
+            options={
+                'verbose_name': 'Detalle de Aplicación de Pago',
+                'verbose_name_plural': 'Detalles de Aplicación de Pagos',
+                'unique_together': {('pago', 'cuota_plan')},
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+from core.migraciones import AgregarIndiceConcurrente
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY (PostgreSQL) no puede ir dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('clientes', '0003_indices_consultas_frecuentes'),
+        ('prestamos', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AgregarIndiceConcurrente(
+            model_name='pago',
+            index=models.Index(fields=['fecha_pago'], name='pago_fecha_idx'),
+        ),
+        AgregarIndiceConcurrente(
+            model_name='planpago',
+            index=models.Index(condition=models.Q(('estado', 'Pendiente')), fields=['fecha_vencimiento', 'id'], name='plan_pendiente_venc_idx'),
+        ),
+        AgregarIndiceConcurrente(
+            model_name='planpago',
+            index=models.Index(condition=models.Q(('estado', 'Vencida'), ('saldo_pendiente__gt', 0)), fields=['fecha_vencimiento'], name='plan_vencida_saldo_idx'),
+        ),
+        AgregarIndiceConcurrente(
+            model_name='planpago',
+            index=models.Index(condition=models.Q(('estado__in', ['Pagada', 'Cancelada']), _negated=True), fields=['prestamo', 'numero_cuota'], name='plan_sin_pagar_idx'),
+        ),
+        AgregarIndiceConcurrente(
+            model_name='préstamo',
+            index=models.Index(fields=['estado', 'fecha_creacion'], name='prestamo_estado_creacion_idx'),
+        ),
+        AgregarIndiceConcurrente(
+            model_name='préstamo',
+            index=models.Index(fields=['fecha_creacion'], name='prestamo_creacion_idx'),
+        ),
+        AgregarIndiceConcurrente(
+            model_name='préstamo',
+            index=models.Index(fields=['fecha_emision', 'id'], name='prestamo_emision_id_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prestamos', '0002_indices_consultas_frecuentes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='préstamo',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Versión'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:19
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prestamos', '0003_prestamo_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+                ('nombre', models.CharField(max_length=100, verbose_name='Tarea')),
+                ('argumentos', models.JSONField(blank=True, default=dict, verbose_name='Argumentos')),
+                ('estado', models.CharField(choices=[('Pendiente', 'Pendiente'), ('En Proceso', 'En Proceso'), ('Completada', 'Completada'), ('Fallida', 'Fallida')], default='Pendiente', max_length=20, verbose_name='Estado')),
+                ('disponible_desde', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Disponible Desde')),
+                ('intentos', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')),
+                ('max_intentos', models.PositiveSmallIntegerField(default=3, verbose_name='Máximo de Intentos')),
+                ('progreso', models.PositiveSmallIntegerField(default=0, verbose_name='Progreso (%)')),
+                ('mensaje', models.CharField(blank=True, max_length=255, verbose_name='Mensaje')),
+                ('resultado', models.JSONField(blank=True, null=True, verbose_name='Resultado')),
+                ('error', models.TextField(blank=True, verbose_name='Último Error')),
+                ('trabajador', models.CharField(blank=True, max_length=100, verbose_name='Trabajador')),
+                ('reservada_hasta', models.DateTimeField(blank=True, null=True, verbose_name='Reservada Hasta')),
+                ('iniciada', models.DateTimeField(blank=True, null=True, verbose_name='Iniciada')),
+                ('terminada', models.DateTimeField(blank=True, null=True, verbose_name='Terminada')),
+                ('creado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tareas', to=settings.AUTH_USER_MODEL, verbose_name='Creado por')),
+            ],
+            options={
+                'verbose_name': 'Tarea',
+                'verbose_name_plural': 'Tareas',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', 'disponible_desde'], name='tarea_cola_idx')],
+            },
+        ),
+    ]
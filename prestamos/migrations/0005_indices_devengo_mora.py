@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:47
+
+from django.db import migrations, models
+
+from core.migraciones import AgregarIndiceConcurrente
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY (PostgreSQL) no puede ir dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('prestamos', '0004_tarea'),
+    ]
+
+    operations = [
+        AgregarIndiceConcurrente(
+            model_name='planpago',
+            index=models.Index(fields=['fecha_actualizacion'], name='plan_actualizacion_idx'),
+        ),
+        AgregarIndiceConcurrente(
+            model_name='planpago',
+            index=models.Index(fields=['fecha_vencimiento'], name='plan_vencimiento_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:58
+
+from django.db import migrations, models
+
+from core.migraciones import AgregarIndiceConcurrente
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY (PostgreSQL) no puede ir dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('prestamos', '0005_indices_devengo_mora'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pago',
+            name='clave_importacion',
+            field=models.CharField(blank=True, editable=False, max_length=40, null=True, verbose_name='Clave de Importación'),
+        ),
+        AgregarIndiceConcurrente(
+            model_name='pago',
+            index=models.Index(condition=models.Q(('clave_importacion__isnull', False)), fields=['clave_importacion'], name='pago_clave_importacion_idx'),
+        ),
+    ]
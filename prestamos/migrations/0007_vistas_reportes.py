@@ -0,0 +1,142 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:20
+
+from django.db import migrations
+
+from core.migraciones import SQLSegunMotor
+
+# SQL fijo de las vistas de reportes (prestamos/models/reporte.py). Es el de
+# las consultas de prestamos/reportes.py al crear esta migración, con las
+# fechas de pago en la zona horaria del proyecto (America/Lima): si una
+# consulta cambia, otra migración recrea su vista.
+
+VISTAS_POSTGRESQL = [
+    '''
+    CREATE MATERIALIZED VIEW prestamos_reporte_originacion AS
+    SELECT p.fecha_emision AS fecha,
+           COUNT(p.id)::integer AS prestamos,
+           COALESCE(SUM(p.monto_solicitado), 0)::numeric(16, 2) AS monto_prestado,
+           COALESCE(SUM(p.monto_total_interes), 0)::numeric(16, 2) AS intereses_pactados
+    FROM "prestamos_préstamo" p
+    GROUP BY p.fecha_emision
+    WITH NO DATA
+    ''',
+    '''
+    CREATE MATERIALIZED VIEW prestamos_reporte_cobranza AS
+    SELECT (g.fecha_pago AT TIME ZONE 'America/Lima')::date AS fecha,
+           COUNT(g.id)::integer AS pagos,
+           COALESCE(SUM(g.monto_pagado), 0)::numeric(16, 2) AS monto_cobrado
+    FROM prestamos_pago g
+    GROUP BY 1
+    WITH NO DATA
+    ''',
+    # Parte de interés de cada monto aplicado, en la proporción de la cuota
+    '''
+    CREATE MATERIALIZED VIEW prestamos_reporte_interes AS
+    SELECT (g.fecha_pago AT TIME ZONE 'America/Lima')::date AS fecha,
+           COALESCE(SUM(d.monto_aplicado - d.monto_aplicado * c.monto_interes / c.monto_total_cuota), 0)::numeric(16, 2) AS capital_cobrado,
+           COALESCE(SUM(d.monto_aplicado * c.monto_interes / c.monto_total_cuota), 0)::numeric(16, 2) AS interes_cobrado
+    FROM prestamos_detallepago d
+    INNER JOIN prestamos_planpago c ON d.cuota_plan_id = c.id
+    INNER JOIN prestamos_pago g ON d.pago_id = g.id
+    WHERE c.monto_total_cuota > 0
+    GROUP BY 1
+    WITH NO DATA
+    ''',
+    '''
+    CREATE MATERIALIZED VIEW prestamos_reporte_estado AS
+    SELECT p.estado,
+           COUNT(p.id)::integer AS prestamos,
+           COALESCE(SUM(p.monto_solicitado), 0)::numeric(16, 2) AS monto_prestado,
+           COALESCE(SUM(p.saldo_pendiente_total), 0)::numeric(16, 2) AS saldo_pendiente,
+           COALESCE(SUM(p.intereses_reales), 0)::numeric(16, 2) AS intereses_reales
+    FROM "prestamos_préstamo" p
+    GROUP BY p.estado
+    WITH NO DATA
+    ''',
+    '''
+    CREATE MATERIALIZED VIEW prestamos_reporte_cliente AS
+    SELECT p.cliente_id,
+           COUNT(p.id)::integer AS prestamos,
+           COALESCE(SUM(p.monto_solicitado), 0)::numeric(16, 2) AS monto_prestado
+    FROM "prestamos_préstamo" p
+    GROUP BY p.cliente_id
+    WITH NO DATA
+    ''',
+    # El índice único es requisito de REFRESH ... CONCURRENTLY
+    'CREATE UNIQUE INDEX prestamos_reporte_originacion_uniq ON prestamos_reporte_originacion (fecha)',
+    'CREATE UNIQUE INDEX prestamos_reporte_cobranza_uniq ON prestamos_reporte_cobranza (fecha)',
+    'CREATE UNIQUE INDEX prestamos_reporte_interes_uniq ON prestamos_reporte_interes (fecha)',
+    'CREATE UNIQUE INDEX prestamos_reporte_estado_uniq ON prestamos_reporte_estado (estado)',
+    'CREATE UNIQUE INDEX prestamos_reporte_cliente_uniq ON prestamos_reporte_cliente (cliente_id)',
+]
+
+# En otros motores (SQLite en desarrollo) son tablas que refrescar_reportes
+# vacía y vuelve a llenar
+TABLAS = [
+    '''
+    CREATE TABLE prestamos_reporte_originacion (
+        fecha date NOT NULL PRIMARY KEY,
+        prestamos integer NOT NULL,
+        monto_prestado numeric(16, 2) NOT NULL,
+        intereses_pactados numeric(16, 2) NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE prestamos_reporte_cobranza (
+        fecha date NOT NULL PRIMARY KEY,
+        pagos integer NOT NULL,
+        monto_cobrado numeric(16, 2) NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE prestamos_reporte_interes (
+        fecha date NOT NULL PRIMARY KEY,
+        capital_cobrado numeric(16, 2) NOT NULL,
+        interes_cobrado numeric(16, 2) NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE prestamos_reporte_estado (
+        estado varchar(20) NOT NULL PRIMARY KEY,
+        prestamos integer NOT NULL,
+        monto_prestado numeric(16, 2) NOT NULL,
+        saldo_pendiente numeric(16, 2) NOT NULL,
+        intereses_reales numeric(16, 2) NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE prestamos_reporte_cliente (
+        cliente_id bigint NOT NULL PRIMARY KEY,
+        prestamos integer NOT NULL,
+        monto_prestado numeric(16, 2) NOT NULL
+    )
+    ''',
+]
+
+NOMBRES = [
+    'prestamos_reporte_cliente',
+    'prestamos_reporte_estado',
+    'prestamos_reporte_interes',
+    'prestamos_reporte_cobranza',
+    'prestamos_reporte_originacion',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0001_initial'),
+        ('prestamos', '0006_pago_clave_importacion'),
+    ]
+
+    operations = [
+        SQLSegunMotor(
+            sql=VISTAS_POSTGRESQL,
+            reverse_sql=[f'DROP MATERIALIZED VIEW IF EXISTS {nombre}' for nombre in NOMBRES],
+        ),
+        SQLSegunMotor(
+            sql=TABLAS,
+            reverse_sql=[f'DROP TABLE IF EXISTS {nombre}' for nombre in NOMBRES],
+            excluir=True,
+        ),
+    ]
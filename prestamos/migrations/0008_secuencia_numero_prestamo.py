@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:12
+
+from django.db import migrations
+
+from core.migraciones import SQLSegunMotor
+
+# En otros motores la numeración usa ContadorSecuencia (prestamos/numeracion.py)
+CREAR_SECUENCIA = [
+    'CREATE SEQUENCE IF NOT EXISTS prestamos_numero_prestamo_seq',
+    # Continúa después del mayor número emitido (o del último nextval, si la
+    # secuencia ya existía)
+    '''
+    SELECT setval(
+        'prestamos_numero_prestamo_seq',
+        GREATEST(
+            COALESCE((SELECT MAX(numero_prestamo) FROM "prestamos_préstamo"), 0),
+            (SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM prestamos_numero_prestamo_seq)
+        ) + 1,
+        false
+    )
+    ''',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prestamos', '0007_vistas_reportes'),
+    ]
+
+    operations = [
+        SQLSegunMotor(
+            sql=CREAR_SECUENCIA,
+            reverse_sql='DROP SEQUENCE IF EXISTS prestamos_numero_prestamo_seq',
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:40
+
+from django.db import migrations, models
+
+from core.migraciones import AgregarIndiceConcurrente
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY (PostgreSQL) no puede ir dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('prestamos', '0008_secuencia_numero_prestamo'),
+    ]
+
+    operations = [
+        AgregarIndiceConcurrente(
+            model_name='préstamo',
+            index=models.Index(condition=models.Q(('estado__in', ['Activo', 'En Atraso']), ('numero_prestamo__isnull', False), ('saldo_pendiente_total__gt', 0)), fields=['numero_prestamo', 'id'], name='prestamo_cobrable_numero_idx'),
+        ),
+    ]
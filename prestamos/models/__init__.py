@@ -6,6 +6,13 @@ from .plan_pago import PlanPago
 from .pago import Pago
 from .detalle_pago import DetallePago
 from .mora import Mora
+from .contador_secuencia import ContadorSecuencia
+from .marca_proceso import MarcaProceso
+from .contador_kpi import ContadorKPI
+from .tarea import Tarea
+from .reporte import (
+    ReporteOriginacion, ReporteCobranza, ReporteInteres, ReporteEstado, ReporteCliente
+)
 
 __all__ = [
     'TasaInteres',
@@ -16,4 +23,13 @@ __all__ = [
     'Pago',
     'DetallePago',
     'Mora',
+    'ContadorSecuencia',
+    'MarcaProceso',
+    'ContadorKPI',
+    'Tarea',
+    'ReporteOriginacion',
+    'ReporteCobranza',
+    'ReporteInteres',
+    'ReporteEstado',
+    'ReporteCliente',
 ]
\ No newline at end of file
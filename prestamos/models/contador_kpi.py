@@ -0,0 +1,31 @@
+from django.db import models
+from core.models import TimestampModel
+
+class ContadorKPI(TimestampModel):
+    """
+    Acumulado de un indicador del dashboard para un mes. Se actualiza en la
+    misma transacción que el evento que lo modifica (ver prestamos/kpis.py);
+    el total de un indicador es la suma de sus meses.
+    """
+    metrica = models.CharField(
+        max_length=50,
+        verbose_name="Métrica"
+    )
+    mes = models.DateField(
+        verbose_name="Mes", # Siempre el día 1 del mes
+    )
+    valor = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        default=0,
+        verbose_name="Valor"
+    )
+
+    def __str__(self):
+        return f"{self.metrica} {self.mes:%Y-%m}: {self.valor}"
+
+    class Meta:
+        verbose_name = "Contador KPI"
+        verbose_name_plural = "Contadores KPI"
+        unique_together = ('metrica', 'mes')
+        ordering = ['metrica', 'mes']
@@ -0,0 +1,25 @@
+from django.db import models
+from core.models import TimestampModel
+
+class ContadorSecuencia(TimestampModel):
+    """
+    Contador con nombre usado como secuencia en bases de datos que no
+    tienen secuencias nativas (ej. SQLite). En PostgreSQL la numeración
+    usa una SEQUENCE real y esta tabla no se utiliza.
+    """
+    nombre = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name="Nombre de la Secuencia"
+    )
+    ultimo_valor = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name="Último Valor Asignado"
+    )
+
+    def __str__(self):
+        return f"{self.nombre} = {self.ultimo_valor}"
+
+    class Meta:
+        verbose_name = "Contador de Secuencia"
+        verbose_name_plural = "Contadores de Secuencia"
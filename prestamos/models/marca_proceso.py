@@ -0,0 +1,31 @@
+from django.db import models
+from core.models import TimestampModel
+
+class MarcaProceso(TimestampModel):
+    """
+    Guarda hasta dónde llegó la última ejecución de un proceso periódico
+    (ej. verificar_vencimientos), para que la siguiente ejecución solo
+    procese lo nuevo.
+    """
+    nombre = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name="Nombre del Proceso"
+    )
+    ultima_fecha = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name="Última Fecha Procesada"
+    )
+    ultima_ejecucion = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Última Ejecución"
+    )
+
+    def __str__(self):
+        return f"{self.nombre} (hasta {self.ultima_fecha or '-'})"
+
+    class Meta:
+        verbose_name = "Marca de Proceso"
+        verbose_name_plural = "Marcas de Proceso"
@@ -38,6 +38,18 @@ class Mora(TimestampModel):
         default='Pendiente',
         verbose_name="Estado de la Mora"
     )
+    # Base del cálculo: con estos dos datos la mora de cualquier día posterior
+    # se obtiene sin volver a procesar la cuota (ver monto_a_la_fecha)
+    saldo_base = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        verbose_name="Saldo Vencido Base"
+    )
+    dias_vencido = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Días Vencidos a la Fecha de Generación"
+    )
     # Podríamos añadir un ForeignKey a Pago si una mora se paga específicamente
     # pago_asociado = models.ForeignKey(Pago, ...)
 
@@ -45,7 +57,18 @@ class Mora(TimestampModel):
         cuota_num = self.cuota_plan.numero_cuota if self.cuota_plan else 'N/A'
         return f"Mora de {self.monto_mora} para Cuota {cuota_num}"
 
+    def monto_a_la_fecha(self, fecha):
+        """
+        Mora acumulada a una fecha posterior, suponiendo que el saldo vencido
+        no cambió desde fecha_generacion (si cambia, el devengo genera otra fila).
+        """
+        from ..devengo_mora import calcular_monto_mora
+        dias = self.dias_vencido + max(0, (fecha - self.fecha_generacion).days)
+        return calcular_monto_mora(self.saldo_base, dias)
+
     class Meta:
         verbose_name = "Cargo por Mora"
         verbose_name_plural = "Cargos por Mora"
-        ordering = ['cuota_plan', '-fecha_generacion'] # Ordenar por cuota y fecha
\ No newline at end of file
+        ordering = ['cuota_plan', '-fecha_generacion'] # Ordenar por cuota y fecha
+        # Una sola fila por cuota y día: el devengo es idempotente
+        unique_together = ('cuota_plan', 'fecha_generacion')
\ No newline at end of file
@@ -1,6 +1,6 @@
 import uuid
 from decimal import Decimal
-from django.db import models
+from django.db import models, transaction
 from core.models import TimestampModel
 
 class PlanPago(TimestampModel):
@@ -64,7 +64,29 @@ class PlanPago(TimestampModel):
         editable=False # Campo calculado
     )
 
+    @transaction.atomic
     def save(self, *args, **kwargs):
+        self.actualizar_saldo_y_estado()
+        super().save(*args, **kwargs)
+        # Edición suelta de una cuota: recalcular los saldos del préstamo
+        from ..saldos import recalcular_saldos
+        recalcular_saldos([self.prestamo_id], using=kwargs.get('using') or self._state.db)
+
+    @transaction.atomic
+    def delete(self, *args, **kwargs):
+        prestamo_id = self.prestamo_id
+        using = kwargs.get('using') or self._state.db
+        resultado = super().delete(*args, **kwargs)
+        from ..saldos import recalcular_saldos
+        recalcular_saldos([prestamo_id], using=using)
+        return resultado
+
+    def actualizar_saldo_y_estado(self):
+        """
+        Recalcula saldo_pendiente y estado en memoria a partir de lo pagado.
+        Lo usa save() y también la distribución de pagos, que guarda las
+        cuotas con bulk_update (sin pasar por save()).
+        """
         # Asegurarse de que monto_pagado no sea None
         monto_pagado = self.monto_pagado or Decimal('0.00')
         self.saldo_pendiente = self.monto_total_cuota - monto_pagado
@@ -82,23 +104,17 @@ class PlanPago(TimestampModel):
                 if self.estado not in ['Pendiente', 'Vencida']: # Si estaba pagada/parcial y se revierte pago
                     self.estado = 'Pendiente' # Volver a pendiente
 
-        super().save(*args, **kwargs)
-
     def calcular_mora(self):
         """
         Calcula la mora si la cuota está vencida.
         """
         from django.utils import timezone
-        from decimal import Decimal
+        from ..devengo_mora import calcular_monto_mora
         
         if self.estado == 'Vencida' and self.saldo_pendiente > 0:
             dias_vencido = (timezone.now().date() - self.fecha_vencimiento).days
-            if dias_vencido > 0:
-                # Calcular mora: 5% del saldo pendiente por cada mes vencido
-                meses_vencido = dias_vencido / 30
-                tasa_mora = Decimal('0.05')  # 5% mensual
-                mora = self.saldo_pendiente * tasa_mora * Decimal(str(meses_vencido))
-                return mora.quantize(Decimal('0.01'))
+            # 5% del saldo pendiente por cada mes (30 días) vencido
+            return calcular_monto_mora(self.saldo_pendiente, dias_vencido)
         return Decimal('0.00')
 
     def __str__(self):
@@ -112,4 +128,30 @@ class PlanPago(TimestampModel):
         verbose_name_plural = "Plan de Pagos"
         # Asegura que no haya dos cuotas con el mismo número para el mismo préstamo
         unique_together = ('prestamo', 'numero_cuota')
-        ordering = ['prestamo', 'numero_cuota']
\ No newline at end of file
+        ordering = ['prestamo', 'numero_cuota']
+        # Índices de las consultas frecuentes (ver prestamos/consultas_frecuentes.py).
+        # Los parciales solo indexan las cuotas que esas consultas buscan
+        indexes = [
+            # verificar_vencimientos: cuotas pendientes ya vencidas, por vencimiento
+            models.Index(
+                fields=['fecha_vencimiento', 'id'],
+                condition=models.Q(estado='Pendiente'),
+                name='plan_pendiente_venc_idx',
+            ),
+            # devengo_mora: cuotas vencidas con saldo
+            models.Index(
+                fields=['fecha_vencimiento'],
+                condition=models.Q(estado='Vencida', saldo_pendiente__gt=0),
+                name='plan_vencida_saldo_idx',
+            ),
+            # devengo_mora incremental: cuotas que cambiaron desde la última ejecución...
+            models.Index(fields=['fecha_actualizacion'], name='plan_actualizacion_idx'),
+            # ...y las que vencieron desde entonces (un día de cuotas, en cualquier estado)
+            models.Index(fields=['fecha_vencimiento'], name='plan_vencimiento_idx'),
+            # PagoForm y regularización de atrasos: cuotas sin pagar de un préstamo
+            models.Index(
+                fields=['prestamo', 'numero_cuota'],
+                condition=~models.Q(estado__in=['Pagada', 'Cancelada']),
+                name='plan_sin_pagar_idx',
+            ),
+        ]
\ No newline at end of file
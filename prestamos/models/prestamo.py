@@ -1,15 +1,16 @@
 import uuid
-from decimal import Decimal, ROUND_HALF_UP # Para cálculos precisos
+from decimal import Decimal # Para cálculos precisos
 from django.db import models
 from django.conf import settings # Para importar nuestro Usuario personalizado
 from django.utils import timezone
-from dateutil.relativedelta import relativedelta # Para sumar meses/semanas etc.
 from django.db import transaction # Para asegurar que todo se guarde junto
 
 # Importamos modelos de otras apps y de este mismo paquete
 from core.models import TimestampModel
 from clientes.models import Cliente
 from .tasa_interes import TasaInteres
+from ..cronograma import generar_cronograma # Cálculo puro del plan de pagos
+from ..numeracion import siguiente_numero_prestamo
 
 
 class Préstamo(TimestampModel):
@@ -83,6 +84,40 @@ class Préstamo(TimestampModel):
         verbose_name="Monto Total a Pagar",
         editable=False # Campo calculado
     )
+    # --- Saldos desnormalizados (ver prestamos/saldos.py) ---
+    # Se mantienen en la misma transacción que modifica las cuotas
+    saldo_pendiente_total = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name="Saldo Pendiente Total",
+        editable=False
+    )
+    total_pagado = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name="Total Pagado",
+        editable=False
+    )
+    cuotas_pagadas = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Cuotas Pagadas",
+        editable=False
+    )
+    intereses_reales = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name="Intereses Reales", # Menores al total si hubo pagos anticipados
+        editable=False
+    )
+    proxima_fecha_vencimiento = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name="Próximo Vencimiento",
+        editable=False
+    )
     garantia_descripcion = models.TextField(
         null=True,
         blank=True,
@@ -94,6 +129,13 @@ class Préstamo(TimestampModel):
         default='Activo',
         verbose_name="Estado del Préstamo"
     )
+    # Sube con cada pago, cambio de estado o edición del cronograma: forma
+    # parte de la clave de los fragmentos cacheados de detalle_prestamo
+    version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Versión"
+    )
     # Quién registró el préstamo
     creado_por = models.ForeignKey(
         settings.AUTH_USER_MODEL, # Referencia a nuestro Usuario (Empleado)
@@ -112,6 +154,13 @@ class Préstamo(TimestampModel):
         else:
             return f"Préstamo ...{str(self.id)[:8]} - {cliente_nombre} (S/ {self.monto_solicitado})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Estado guardado en la base, para detectar cambios de estado en save()
+        instancia._estado_guardado = instancia.__dict__.get('estado')
+        return instancia
+
     # --- LÓGICA DE NEGOCIO ---
     @transaction.atomic # Asegura que o se crea el préstamo y todas las cuotas, o nada
     def save(self, *args, **kwargs):
@@ -124,116 +173,117 @@ class Préstamo(TimestampModel):
 
         # --- 0. Asignar número de préstamo si es nuevo y no tiene uno ---
         if es_nuevo and not self.numero_prestamo:
-            # Obtener el último número de préstamo
-            from django.db.models import Max
-            ultimo_prestamo = Préstamo.objects.aggregate(Max('numero_prestamo'))
-            ultimo_numero = ultimo_prestamo['numero_prestamo__max']
-            self.numero_prestamo = (ultimo_numero or 0) + 1
+            # Tomado de la secuencia (sin MAX + 1, que colisiona con usuarios concurrentes)
+            self.numero_prestamo = siguiente_numero_prestamo(using=kwargs.get('using'))
 
-        # --- 1. Calcular Totales (Solo si es nuevo) ---
+        # --- 1. Calcular Totales y Cronograma en memoria (Solo si es nuevo) ---
+        cronograma = None
         if es_nuevo:
-            # Calcular intereses basado en la frecuencia de pago del préstamo
-            if self.tasa_interes.tipo_tasa == 'Simple':
-                
-                # Convertir la tasa de interés según el período de la tasa
-                tasa_porcentaje = self.tasa_interes.valor_porcentaje / Decimal('100')
-                
-                # Ajustar la tasa según el período de la tasa de interés
-                if self.tasa_interes.periodo == 'Anual':
-                    # Si la tasa es anual, la convertimos según la frecuencia de pago
-                    if self.frecuencia_pago == 'Mensual':
-                        tasa_ajustada = tasa_porcentaje / Decimal('12')
-                    elif self.frecuencia_pago == 'Quincenal':
-                        tasa_ajustada = tasa_porcentaje / Decimal('24')
-                    elif self.frecuencia_pago == 'Semanal':
-                        tasa_ajustada = tasa_porcentaje / Decimal('52')
-                    else:
-                        tasa_ajustada = tasa_porcentaje
-                elif self.tasa_interes.periodo == 'Mensual':
-                    # Si la tasa es mensual, la ajustamos según la frecuencia de pago
-                    if self.frecuencia_pago == 'Quincenal':
-                        tasa_ajustada = tasa_porcentaje / Decimal('2')
-                    elif self.frecuencia_pago == 'Semanal':
-                        tasa_ajustada = tasa_porcentaje / Decimal('4')
-                    else:
-                        tasa_ajustada = tasa_porcentaje
-                else:
-                    # Para otros períodos, usar la tasa directamente
-                    tasa_ajustada = tasa_porcentaje
-                
-                # Calcular interés por cuota
-                interes_por_cuota = (self.monto_solicitado * tasa_ajustada).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-                
-                # Calcular totales
-                self.monto_total_interes = interes_por_cuota * self.numero_cuotas
-                self.monto_total_pagar = self.monto_solicitado + self.monto_total_interes
-                
-                # Marcar estado como Activo al crear el plan
-                self.estado = 'Activo'
-            else:
-                # Por ahora, lanzamos un error si no es simple
-                raise ValueError("Cálculo solo implementado para Tasa Simple")
+            # Lanza ValueError si la tasa no es Simple (único tipo implementado)
+            cronograma = generar_cronograma(
+                monto_solicitado=self.monto_solicitado,
+                numero_cuotas=self.numero_cuotas,
+                frecuencia_pago=self.frecuencia_pago,
+                fecha_primer_pago=self.fecha_primer_pago,
+                valor_porcentaje=self.tasa_interes.valor_porcentaje,
+                periodo=self.tasa_interes.periodo,
+                tipo_tasa=self.tasa_interes.tipo_tasa,
+            )
+            self.monto_total_interes = cronograma['monto_total_interes']
+            self.monto_total_pagar = cronograma['monto_total_pagar']
+
+            # Saldos iniciales: nada pagado, todo el cronograma pendiente
+            self.saldo_pendiente_total = cronograma['monto_total_pagar']
+            self.total_pagado = Decimal('0.00')
+            self.cuotas_pagadas = 0
+            self.intereses_reales = cronograma['monto_total_interes']
+            self.proxima_fecha_vencimiento = (
+                cronograma['cuotas'][0]['fecha_vencimiento'] if cronograma['cuotas'] else None
+            )
+
+            # Marcar estado como Activo al crear el plan
+            self.estado = 'Activo'
+        else:
+            # Edición: invalida los fragmentos cacheados del detalle
+            self.version += 1
 
         # --- 2. Guardar el Préstamo (para tener un ID) ---
         # Guardamos el préstamo (sea nuevo o actualización)
         super().save(*args, **kwargs)
 
-        # --- 3. Generar Plan de Pagos (Solo si es nuevo y se calcularon intereses) ---
+        # --- 3. Persistir el Plan de Pagos (Solo si es nuevo y se calcularon intereses) ---
         if es_nuevo and self.monto_total_pagar > 0:
-            
-            # Calculamos capital por cuota
-            capital_por_cuota = (self.monto_solicitado / self.numero_cuotas).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            
-            # Recalculamos interés por cuota basado en el total (más preciso)
-            interes_por_cuota = (self.monto_total_interes / self.numero_cuotas).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            
-            monto_total_cuota = capital_por_cuota + interes_por_cuota
-
-            fecha_cuota = self.fecha_primer_pago
-
-            # Para el ajuste de redondeo
-            total_capital_asignado = Decimal('0.00')
-            total_interes_asignado = Decimal('0.00')
-
-            for i in range(1, self.numero_cuotas + 1):
-                
-                # Valores por defecto
-                capital_cuota_actual = capital_por_cuota
-                interes_cuota_actual = interes_por_cuota
-                monto_total_cuota_actual = monto_total_cuota
-
-                # Ajuste para la última cuota para evitar errores de redondeo
-                if i == self.numero_cuotas:
-                    capital_cuota_actual = self.monto_solicitado - total_capital_asignado
-                    interes_cuota_actual = self.monto_total_interes - total_interes_asignado
-                    monto_total_cuota_actual = capital_cuota_actual + interes_cuota_actual
-                else:
-                    total_capital_asignado += capital_cuota_actual
-                    total_interes_asignado += interes_cuota_actual
-
-                from .plan_pago import PlanPago
-                PlanPago.objects.create(
-                    prestamo=self,
-                    numero_cuota=i,
-                    fecha_vencimiento=fecha_cuota,
-                    monto_capital=capital_cuota_actual,
-                    monto_interes=interes_cuota_actual,
-                    monto_total_cuota=monto_total_cuota_actual,
-                    estado='Pendiente',
-                    monto_pagado=0,
-                    saldo_pendiente=monto_total_cuota_actual # Inicialmente, el saldo es el total
-                )
-
-                # Calcular la fecha de la siguiente cuota
-                if self.frecuencia_pago == 'Mensual':
-                    fecha_cuota += relativedelta(months=1)
-                elif self.frecuencia_pago == 'Quincenal':
-                    fecha_cuota += relativedelta(weeks=2)
-                elif self.frecuencia_pago == 'Semanal':
-                    fecha_cuota += relativedelta(weeks=1)
+            self._crear_plan_pagos(cronograma['cuotas'])
+
+        # --- 4. Contadores del dashboard (misma transacción) ---
+        self._actualizar_kpis(es_nuevo, using=kwargs.get('using') or self._state.db)
+        self._estado_guardado = self.estado
+
+    def _actualizar_kpis(self, es_nuevo, using):
+        from .. import kpis
+        mes = kpis.mes_de(self.fecha_creacion)
+        if es_nuevo:
+            kpis.incrementar({
+                (kpis.METRICA_PRESTAMOS, mes): 1,
+                (kpis.METRICA_MONTO_PRESTADO, mes): self.monto_solicitado,
+                (kpis.METRICA_SALDO_PENDIENTE, mes): self.saldo_pendiente_total,
+                (kpis.metrica_estado(self.estado), mes): 1,
+            }, using=using)
+            return
+        estado_anterior = getattr(self, '_estado_guardado', None)
+        if estado_anterior is not None and estado_anterior != self.estado:
+            kpis.incrementar(
+                kpis.deltas_cambio_estado([self.fecha_creacion], estado_anterior, self.estado),
+                using=using,
+            )
+
+    def _crear_plan_pagos(self, cuotas):
+        """
+        Inserta todas las cuotas del cronograma con un único bulk_create.
+        bulk_create no llama a PlanPago.save(), por eso el saldo y el estado
+        se fijan aquí directamente (cuota nueva: saldo = total, 'Pendiente').
+        """
+        from .plan_pago import PlanPago
+        PlanPago.objects.bulk_create([
+            PlanPago(
+                prestamo=self,
+                estado='Pendiente',
+                monto_pagado=Decimal('0.00'),
+                saldo_pendiente=cuota['monto_total_cuota'], # Inicialmente, el saldo es el total
+                **cuota
+            )
+            for cuota in cuotas
+        ])
+
+    @property
+    def monto_total_real(self):
+        """
+        Total a pagar según el cronograma vigente: capital más los intereses
+        reales (que bajan con los pagos anticipados).
+        """
+        return self.monto_solicitado + self.intereses_reales
 
 
     class Meta:
         verbose_name = "Préstamo"
         verbose_name_plural = "Préstamos"
-        ordering = ['-fecha_emision'] # Mostrar los más recientes primero
\ No newline at end of file
+        ordering = ['-fecha_emision'] # Mostrar los más recientes primero
+        # Índices de las consultas frecuentes (ver prestamos/consultas_frecuentes.py)
+        indexes = [
+            # Conteos por estado y mes (KPIs, verificar_vencimientos)
+            models.Index(fields=['estado', 'fecha_creacion'], name='prestamo_estado_creacion_idx'),
+            # Préstamos recientes del dashboard
+            models.Index(fields=['fecha_creacion'], name='prestamo_creacion_idx'),
+            # Paginación por llave de lista_prestamos
+            models.Index(fields=['fecha_emision', 'id'], name='prestamo_emision_id_idx'),
+            # Paginación por llave del reporte de cancelación (préstamos cobrables con saldo)
+            models.Index(
+                fields=['numero_prestamo', 'id'],
+                name='prestamo_cobrable_numero_idx',
+                condition=models.Q(
+                    estado__in=['Activo', 'En Atraso'],
+                    saldo_pendiente_total__gt=0,
+                    numero_prestamo__isnull=False,
+                ),
+            ),
+        ]
\ No newline at end of file
@@ -0,0 +1,91 @@
+from django.db import models
+
+# Modelos de solo lectura sobre las vistas materializadas de reportes
+# (PostgreSQL) o sus tablas equivalentes (otros motores). Django no los
+# gestiona: la migración 0007_vistas_reportes los crea con el SQL de las
+# consultas de prestamos/reportes.py, y el comando refrescar_reportes los llena.
+
+class ReporteOriginacion(models.Model):
+    """
+    Préstamos otorgados por día de emisión.
+    """
+    fecha = models.DateField(primary_key=True, verbose_name="Fecha")
+    prestamos = models.IntegerField(verbose_name="Préstamos")
+    monto_prestado = models.DecimalField(max_digits=16, decimal_places=2, verbose_name="Monto Prestado")
+    intereses_pactados = models.DecimalField(max_digits=16, decimal_places=2, verbose_name="Intereses Pactados")
+
+    class Meta:
+        managed = False
+        db_table = 'prestamos_reporte_originacion'
+        verbose_name = "Reporte de Originación"
+        ordering = ['fecha']
+
+
+class ReporteCobranza(models.Model):
+    """
+    Pagos recibidos por día.
+    """
+    fecha = models.DateField(primary_key=True, verbose_name="Fecha")
+    pagos = models.IntegerField(verbose_name="Pagos")
+    monto_cobrado = models.DecimalField(max_digits=16, decimal_places=2, verbose_name="Monto Cobrado")
+
+    class Meta:
+        managed = False
+        db_table = 'prestamos_reporte_cobranza'
+        verbose_name = "Reporte de Cobranza"
+        ordering = ['fecha']
+
+
+class ReporteInteres(models.Model):
+    """
+    Capital e interés cobrados por día. Cada monto aplicado a una cuota se
+    reparte entre capital e interés en la proporción de esa cuota.
+    """
+    fecha = models.DateField(primary_key=True, verbose_name="Fecha")
+    capital_cobrado = models.DecimalField(max_digits=16, decimal_places=2, verbose_name="Capital Cobrado")
+    interes_cobrado = models.DecimalField(max_digits=16, decimal_places=2, verbose_name="Interés Cobrado")
+
+    class Meta:
+        managed = False
+        db_table = 'prestamos_reporte_interes'
+        verbose_name = "Reporte de Intereses"
+        ordering = ['fecha']
+
+
+class ReporteEstado(models.Model):
+    """
+    Totales de la cartera por estado del préstamo.
+    """
+    estado = models.CharField(max_length=20, primary_key=True, verbose_name="Estado")
+    prestamos = models.IntegerField(verbose_name="Préstamos")
+    monto_prestado = models.DecimalField(max_digits=16, decimal_places=2, verbose_name="Monto Prestado")
+    saldo_pendiente = models.DecimalField(max_digits=16, decimal_places=2, verbose_name="Saldo Pendiente")
+    intereses_reales = models.DecimalField(max_digits=16, decimal_places=2, verbose_name="Intereses Reales")
+
+    class Meta:
+        managed = False
+        db_table = 'prestamos_reporte_estado'
+        verbose_name = "Reporte por Estado"
+        ordering = ['estado']
+
+
+class ReporteCliente(models.Model):
+    """
+    Préstamos y monto prestado por cliente.
+    """
+    cliente = models.OneToOneField(
+        'clientes.Cliente',
+        primary_key=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name="Cliente"
+    )
+    prestamos = models.IntegerField(verbose_name="Préstamos")
+    monto_prestado = models.DecimalField(max_digits=16, decimal_places=2, verbose_name="Monto Prestado")
+
+    class Meta:
+        managed = False
+        db_table = 'prestamos_reporte_cliente'
+        verbose_name = "Reporte por Cliente"
+        ordering = ['-prestamos']
@@ -0,0 +1,144 @@
+from datetime import timedelta
+
+from django.db import models
+from django.conf import settings
+from django.utils import timezone
+from core.models import TimestampModel
+
+class Tarea(TimestampModel):
+    """
+    Trabajo pesado (crear préstamos largos, exportar, refrescar reportes)
+    que se ejecuta fuera de la petición web, en la cola de la base de datos
+    (ver prestamos/cola.py y el comando procesar_tareas).
+    """
+    ESTADO_CHOICES = [
+        ('Pendiente', 'Pendiente'), # En la cola (o esperando un reintento)
+        ('En Proceso', 'En Proceso'),
+        ('Completada', 'Completada'),
+        ('Fallida', 'Fallida'), # Agotó sus intentos
+    ]
+
+    nombre = models.CharField(
+        max_length=100,
+        verbose_name="Tarea", # Nombre registrado en prestamos/cola.py
+    )
+    argumentos = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="Argumentos"
+    )
+    estado = models.CharField(
+        max_length=20,
+        choices=ESTADO_CHOICES,
+        default='Pendiente',
+        verbose_name="Estado"
+    )
+    # No se toma antes de esta fecha (espera entre reintentos)
+    disponible_desde = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Disponible Desde"
+    )
+    intentos = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Intentos"
+    )
+    max_intentos = models.PositiveSmallIntegerField(
+        default=3,
+        verbose_name="Máximo de Intentos"
+    )
+    progreso = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Progreso (%)"
+    )
+    mensaje = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name="Mensaje"
+    )
+    resultado = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name="Resultado"
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name="Último Error"
+    )
+    # Proceso que la ejecuta (equipo:pid) y hasta cuándo: pasado ese
+    # momento se considera abandonada y otro proceso la puede retomar
+    trabajador = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name="Trabajador"
+    )
+    reservada_hasta = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Reservada Hasta"
+    )
+    iniciada = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Iniciada"
+    )
+    terminada = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Terminada"
+    )
+    creado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='tareas',
+        verbose_name="Creado por"
+    )
+
+    @classmethod
+    def reservadas_por(cls, trabajador):
+        """Tareas en proceso reservadas a nombre de `trabajador`."""
+        return cls.objects.filter(estado='En Proceso', trabajador=trabajador)
+
+    def informar(self, progreso, mensaje=''):
+        """
+        Guarda el avance (0 a 100) sin tocar el resto de la fila y renueva
+        la reserva (latido, ver prestamos/cola.py). Como mucho una escritura
+        por segundo, salvo al llegar a 100. Si otro proceso ya retomó la
+        tarea lanza cola.ReservaPerdida, para que este deje de trabajar en ella.
+        """
+        from ..cola import RESERVA, ReservaPerdida
+
+        progreso = max(0, min(100, int(progreso)))
+        ahora = timezone.now()
+        ultimo = getattr(self, '_ultimo_informe', None)
+        if progreso < 100 and ultimo is not None and (ahora - ultimo).total_seconds() < 1:
+            return
+        self._ultimo_informe = ahora
+        self.progreso, self.mensaje = progreso, mensaje[:255]
+        self.reservada_hasta = ahora + timedelta(seconds=RESERVA)
+        informada = Tarea.reservadas_por(self.trabajador).filter(pk=self.pk).update(
+            progreso=self.progreso,
+            mensaje=self.mensaje,
+            reservada_hasta=self.reservada_hasta,
+            fecha_actualizacion=ahora,
+        )
+        if not informada:
+            raise ReservaPerdida(f'La tarea #{self.pk} ya no está reservada por {self.trabajador}')
+
+    @property
+    def terminal(self):
+        """True si ya no va a cambiar (completada o fallida)."""
+        return self.estado in ('Completada', 'Fallida')
+
+    def __str__(self):
+        return f"{self.nombre} #{self.pk} ({self.estado})"
+
+    class Meta:
+        verbose_name = "Tarea"
+        verbose_name_plural = "Tareas"
+        ordering = ['-fecha_creacion']
+        indexes = [
+            # La consulta con la que los trabajadores toman la siguiente tarea
+            models.Index(fields=['estado', 'disponible_desde'], name='tarea_cola_idx'),
+        ]
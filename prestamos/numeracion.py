@@ -0,0 +1,135 @@
+"""
+Asignación de números de préstamo (numero_prestamo).
+
+Los números salen de una secuencia de base de datos en lugar de calcular
+MAX(numero_prestamo) + 1, que recorre el índice en cada originación y
+produce colisiones cuando dos usuarios crean préstamos al mismo tiempo.
+
+- PostgreSQL: SEQUENCE nativa, creada por la migración
+  0008_secuencia_numero_prestamo (nextval no bloquea ni participa de la
+  transacción del préstamo; solo los bloques toman un advisory lock
+  breve para salir contiguos).
+- Otros motores: fila de ContadorSecuencia incrementada con UPDATE.
+
+Con settings.PRESTAMOS_NUMERACION_BLOQUE > 1 cada proceso reserva un bloque
+de números de una sola vez y los reparte en memoria, de modo que la mayoría
+de originaciones no tocan la base de datos para numerarse. Los números que
+queden sin usar al terminar el proceso se pierden (habrá huecos), igual que
+con los nextval de transacciones revertidas.
+"""
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import F, Max
+
+NOMBRE_SECUENCIA = 'prestamos_numero_prestamo_seq'
+
+
+def _modelo_prestamo():
+    from .models import Préstamo
+    return Préstamo
+
+
+def _reservar_postgresql(conexion, cantidad):
+    with conexion.cursor() as cursor:
+        if cantidad == 1:
+            cursor.execute('SELECT nextval(%s)', [NOMBRE_SECUENCIA])
+            return [cursor.fetchone()[0]]
+        # Los nextval de otras sesiones se intercalarían con los del bloque:
+        # un advisory lock de sesión (no de transacción, para no retenerlo
+        # hasta que termine la transacción del préstamo) lo mantiene contiguo
+        cursor.execute('SELECT pg_advisory_lock(hashtext(%s))', [NOMBRE_SECUENCIA])
+        try:
+            cursor.execute(
+                'SELECT nextval(%s) FROM generate_series(1, %s)', [NOMBRE_SECUENCIA, cantidad]
+            )
+            return [fila[0] for fila in cursor.fetchall()]
+        finally:
+            cursor.execute('SELECT pg_advisory_unlock(hashtext(%s))', [NOMBRE_SECUENCIA])
+
+
+# SQLite serializa las escrituras de todos modos; entre hilos del mismo
+# proceso este lock evita el "database table is locked" de las bases en
+# memoria compartida, que no respetan el timeout de espera
+_lock_contador = threading.Lock()
+
+
+def _reservar_contador(conexion, cantidad):
+    from .models import ContadorSecuencia
+    Préstamo = _modelo_prestamo()
+    contadores = ContadorSecuencia.objects.using(conexion.alias)
+    with _lock_contador, transaction.atomic(using=conexion.alias):
+        actualizados = contadores.filter(nombre=NOMBRE_SECUENCIA).update(
+            ultimo_valor=F('ultimo_valor') + cantidad
+        )
+        if not actualizados:
+            # Primera vez: arrancamos después del mayor número ya emitido
+            ultimo_numero = Préstamo.objects.using(conexion.alias).aggregate(
+                Max('numero_prestamo')
+            )['numero_prestamo__max'] or 0
+            contadores.get_or_create(
+                nombre=NOMBRE_SECUENCIA, defaults={'ultimo_valor': ultimo_numero}
+            )
+            contadores.filter(nombre=NOMBRE_SECUENCIA).update(
+                ultimo_valor=F('ultimo_valor') + cantidad
+            )
+        ultimo_valor = contadores.values_list('ultimo_valor', flat=True).get(nombre=NOMBRE_SECUENCIA)
+    return list(range(ultimo_valor - cantidad + 1, ultimo_valor + 1))
+
+
+class AsignadorNumeroPrestamo:
+    """
+    Reparte números de préstamo; seguro para usarse desde varios hilos.
+    Mantiene un bloque reservado por alias de base de datos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reservados = {}
+
+    @property
+    def tamano_bloque(self):
+        return max(1, int(getattr(settings, 'PRESTAMOS_NUMERACION_BLOQUE', 1)))
+
+    def reservar(self, cantidad, using=None):
+        """
+        Reserva `cantidad` números nuevos directamente en la base de datos.
+        """
+        using = using or router.db_for_write(_modelo_prestamo())
+        conexion = connections[using]
+        if conexion.vendor == 'postgresql':
+            return _reservar_postgresql(conexion, cantidad)
+        return _reservar_contador(conexion, cantidad)
+
+    def siguiente(self, using=None):
+        """
+        Devuelve el siguiente número de préstamo disponible.
+        """
+        using = using or router.db_for_write(_modelo_prestamo())
+        bloque = self.tamano_bloque
+        if bloque == 1:
+            return self.reservar(1, using=using)[0]
+        with self._lock:
+            reservados = self._reservados.setdefault(using, deque())
+            if not reservados:
+                reservados.extend(self.reservar(bloque, using=using))
+            return reservados.popleft()
+
+    def reiniciar(self):
+        """
+        Descarta los bloques reservados en memoria (ej. tras limpiar datos).
+        """
+        with self._lock:
+            self._reservados.clear()
+
+
+asignador = AsignadorNumeroPrestamo()
+
+
+def siguiente_numero_prestamo(using=None):
+    """
+    Atajo para obtener el siguiente numero_prestamo.
+    """
+    return asignador.siguiente(using=using)
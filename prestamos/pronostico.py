@@ -0,0 +1,153 @@
+"""
+Pronóstico de cobranza de la cartera por semana o por mes (tesorería).
+
+Cada cuota pendiente se espera cobrar según la curva del tramo de atraso de
+su préstamo: la fracción de su saldo que entra en la semana de su
+vencimiento (o en la actual, si ya venció) y en las siguientes. El tramo se
+toma de Préstamo.proxima_fecha_vencimiento (la cuota impaga más antigua):
+las cuotas futuras de un préstamo atrasado también se esperan con menos
+probabilidad.
+
+La base hace el trabajo pesado: una sola consulta agrupa los saldos por
+(tramo, fecha esperada de cobro), así que se devuelven a lo sumo unas
+pocas filas por día del horizonte, sin importar cuántas cuotas haya. Las
+curvas se aplican después sobre esos totales.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db.models import Case, DateField, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .distribucion import ESTADOS_CUOTA_PENDIENTE
+from .importacion import ESTADOS_PRESTAMO_COBRABLES
+
+CERO = Decimal('0.00')
+
+# (nombre, días máximos de atraso del préstamo o None, curva semanal): la
+# curva es la fracción del saldo que se cobra en la semana esperada y en
+# cada una de las siguientes; lo que no suma 1 no se espera cobrar
+TRAMOS = getattr(settings, 'PRESTAMOS_PRONOSTICO_TRAMOS', [
+    ('Al día', 0, ['0.85', '0.07', '0.03']),
+    ('1-30 días', 30, ['0.55', '0.15', '0.08', '0.04']),
+    ('31-60 días', 60, ['0.30', '0.12', '0.08', '0.05']),
+    ('61-90 días', 90, ['0.15', '0.08', '0.05', '0.03']),
+    ('Más de 90 días', None, ['0.05', '0.03', '0.02']),
+])
+
+GRANULARIDADES = {
+    'week': 13, # Períodos por defecto en cada granularidad
+    'month': 12,
+}
+
+
+def _redondear(monto):
+    return monto.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def curvas():
+    return [[Decimal(str(fraccion)) for fraccion in curva] for _, _, curva in TRAMOS]
+
+
+def _tramo(fecha):
+    """Expresión con el índice en TRAMOS del préstamo de cada cuota."""
+    casos = [When(prestamo__proxima_fecha_vencimiento__isnull=True, then=Value(0))]
+    for indice, (_, dias, _) in enumerate(TRAMOS):
+        if dias is not None:
+            casos.append(When(
+                prestamo__proxima_fecha_vencimiento__gte=fecha - timedelta(days=dias), then=Value(indice)
+            ))
+    return Case(*casos, default=Value(len(TRAMOS) - 1), output_field=IntegerField())
+
+
+def inicio_periodo(fecha, granularidad):
+    if granularidad == 'week':
+        return fecha - timedelta(days=fecha.weekday())
+    return fecha.replace(day=1)
+
+
+def _sumar_periodos(inicio, cantidad, granularidad):
+    if granularidad == 'week':
+        return inicio + timedelta(weeks=cantidad)
+    return inicio + relativedelta(months=cantidad)
+
+
+def _indice_periodo(fecha, inicio, granularidad):
+    if granularidad == 'week':
+        return (fecha - inicio).days // 7
+    return (fecha.year - inicio.year) * 12 + fecha.month - inicio.month
+
+
+def saldos_por_dia(fecha, hasta, using=None):
+    """
+    {(tramo, fecha esperada): saldo} de las cuotas pendientes que vencen
+    antes de `hasta`. Las vencidas se esperan desde `fecha`.
+    """
+    from .models import PlanPago
+
+    filas = (
+        PlanPago.objects.db_manager(using)
+        .filter(
+            estado__in=ESTADOS_CUOTA_PENDIENTE,
+            saldo_pendiente__gt=0,
+            fecha_vencimiento__lt=hasta,
+            prestamo__estado__in=ESTADOS_PRESTAMO_COBRABLES,
+        )
+        .annotate(
+            tramo=_tramo(fecha),
+            dia=Greatest('fecha_vencimiento', Value(fecha, output_field=DateField()), output_field=DateField()),
+        )
+        .values_list('tramo', 'dia')
+        .annotate(saldo=Sum('saldo_pendiente'))
+        .order_by()
+    )
+    return {(tramo, dia): saldo for tramo, dia, saldo in filas}
+
+
+def pronosticar(fecha=None, granularidad='month', periodos=None, using=None):
+    """
+    Cobranza esperada por período desde el que contiene `fecha` (hoy por
+    defecto). Devuelve un diccionario listo para la plantilla o el CSV:
+    períodos con lo que vence (programado), lo esperado en total y por tramo.
+    """
+    if granularidad not in GRANULARIDADES:
+        raise ValueError(f'Granularidad no válida: {granularidad}')
+    fecha = fecha or timezone.localdate()
+    periodos = periodos or GRANULARIDADES[granularidad]
+    inicio = inicio_periodo(fecha, granularidad)
+    fin = _sumar_periodos(inicio, periodos, granularidad)
+
+    programado = [CERO] * periodos
+    esperado = [[CERO] * len(TRAMOS) for _ in range(periodos)]
+    saldo_por_tramo = defaultdict(lambda: CERO)
+    curvas_tramo = curvas()
+    for (tramo, dia), saldo in saldos_por_dia(fecha, fin, using).items():
+        saldo_por_tramo[tramo] += saldo
+        programado[_indice_periodo(dia, inicio, granularidad)] += saldo
+        for semana, fraccion in enumerate(curvas_tramo[tramo]):
+            cobro = dia + timedelta(weeks=semana)
+            if cobro < fin:
+                esperado[_indice_periodo(cobro, inicio, granularidad)][tramo] += saldo * fraccion
+
+    filas = []
+    for indice in range(periodos):
+        filas.append({
+            'inicio': _sumar_periodos(inicio, indice, granularidad),
+            'fin': _sumar_periodos(inicio, indice + 1, granularidad) - timedelta(days=1),
+            'programado': _redondear(programado[indice]),
+            'esperado': _redondear(sum(esperado[indice], CERO)),
+            'por_tramo': [_redondear(monto) for monto in esperado[indice]],
+        })
+    return {
+        'fecha': fecha,
+        'granularidad': granularidad,
+        'tramos': [nombre for nombre, _, _ in TRAMOS],
+        'periodos': filas,
+        'saldo_por_tramo': [_redondear(saldo_por_tramo[indice]) for indice in range(len(TRAMOS))],
+        'programado': sum((fila['programado'] for fila in filas), CERO),
+        'esperado': sum((fila['esperado'] for fila in filas), CERO),
+    }
@@ -0,0 +1,239 @@
+"""
+Reportes de cartera sobre vistas materializadas.
+
+En PostgreSQL cada reporte es una MATERIALIZED VIEW con un índice único,
+refrescada con REFRESH MATERIALIZED VIEW CONCURRENTLY (las lecturas no se
+bloquean mientras se refresca). En otros motores (SQLite en desarrollo) es
+una tabla normal que se vacía y se vuelve a llenar en una transacción.
+Las vistas y tablas las crea la migración 0007_vistas_reportes con SQL fijo;
+las peticiones solo las leen.
+
+Las consultas de origen se escriben con el ORM (TruncDate en la zona
+horaria del proyecto): llenan las tablas de los otros motores y son las
+que la migración fijó para PostgreSQL. Si una cambia, su vista se recrea
+en una migración nueva. Los reportes por día se agrupan luego por semana o mes con
+TruncWeek/TruncMonth sobre la vista, que tiene una fila por día.
+"""
+from collections import OrderedDict
+from datetime import timedelta
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.db import connections, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import Coalesce, TruncDate, TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+NOMBRE_PROCESO = 'refrescar_reportes'
+CERO = Decimal('0.00')
+
+GRANULARIDADES = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+    # Alias en español
+    'dia': TruncDay,
+    'semana': TruncWeek,
+    'mes': TruncMonth,
+}
+
+
+def _monto(expresion):
+    return Coalesce(Sum(expresion), CERO, output_field=DecimalField(max_digits=16, decimal_places=2))
+
+
+def _consulta_originacion():
+    from .models import Préstamo
+    return (
+        Préstamo.objects.values(fecha=F('fecha_emision'))
+        .annotate(
+            prestamos=Count('pk'),
+            monto_prestado=_monto('monto_solicitado'),
+            intereses_pactados=_monto('monto_total_interes'),
+        )
+        .order_by()
+    )
+
+
+def _consulta_cobranza():
+    from .models import Pago
+    return (
+        Pago.objects.annotate(fecha=TruncDate('fecha_pago'))
+        .values('fecha')
+        .annotate(pagos=Count('pk'), monto_cobrado=_monto('monto_pagado'))
+        .order_by()
+    )
+
+
+def _consulta_interes():
+    from .models import DetallePago
+    # Parte de interés de cada monto aplicado, en la proporción de la cuota
+    interes = ExpressionWrapper(
+        F('monto_aplicado') * F('cuota_plan__monto_interes') / F('cuota_plan__monto_total_cuota'),
+        output_field=DecimalField(max_digits=16, decimal_places=2),
+    )
+    return (
+        DetallePago.objects.filter(cuota_plan__monto_total_cuota__gt=0)
+        .annotate(fecha=TruncDate('pago__fecha_pago'))
+        .values('fecha')
+        .annotate(
+            capital_cobrado=_monto(F('monto_aplicado') - interes),
+            interes_cobrado=_monto(interes),
+        )
+        .order_by()
+    )
+
+
+def _consulta_estado():
+    from .models import Préstamo
+    return (
+        Préstamo.objects.values('estado')
+        .annotate(
+            prestamos=Count('pk'),
+            monto_prestado=_monto('monto_solicitado'),
+            saldo_pendiente=_monto('saldo_pendiente_total'),
+            intereses_reales=_monto('intereses_reales'),
+        )
+        .order_by()
+    )
+
+
+def _consulta_cliente():
+    from .models import Préstamo
+    return (
+        Préstamo.objects.values('cliente_id')
+        .annotate(prestamos=Count('pk'), monto_prestado=_monto('monto_solicitado'))
+        .order_by()
+    )
+
+
+def _vistas():
+    """
+    Modelo -> (consulta de origen, columnas).
+    """
+    from .models import (
+        ReporteOriginacion, ReporteCobranza, ReporteInteres, ReporteEstado, ReporteCliente
+    )
+    return OrderedDict([
+        (ReporteOriginacion, (_consulta_originacion, ['fecha', 'prestamos', 'monto_prestado', 'intereses_pactados'])),
+        (ReporteCobranza, (_consulta_cobranza, ['fecha', 'pagos', 'monto_cobrado'])),
+        (ReporteInteres, (_consulta_interes, ['fecha', 'capital_cobrado', 'interes_cobrado'])),
+        (ReporteEstado, (_consulta_estado, ['estado', 'prestamos', 'monto_prestado', 'saldo_pendiente', 'intereses_reales'])),
+        (ReporteCliente, (_consulta_cliente, ['cliente_id', 'prestamos', 'monto_prestado'])),
+    ])
+
+
+def _select(consulta, columnas, conexion):
+    """SELECT de las columnas indicadas sobre la consulta del ORM."""
+    sql, parametros = consulta.query.get_compiler(connection=conexion).as_sql()
+    lista = ', '.join(conexion.ops.quote_name(columna) for columna in columnas)
+    return f'SELECT {lista} FROM ({sql}) origen', parametros
+
+
+def _vista_llena_postgresql(cursor, nombre):
+    cursor.execute('SELECT ispopulated FROM pg_matviews WHERE matviewname = %s', [nombre])
+    fila = cursor.fetchone()
+    return bool(fila and fila[0])
+
+
+def refrescar_reportes(concurrente=True, using='default'):
+    """
+    Refresca todas las vistas de reportes (creadas por la migración) y
+    devuelve {tabla: filas} con el número de filas de cada una.
+    """
+    from .models import MarcaProceso
+
+    conexion = connections[using]
+    resultado = {}
+    for modelo, (consulta, columnas) in _vistas().items():
+        tabla = modelo._meta.db_table
+        nombre = conexion.ops.quote_name(tabla)
+
+        if conexion.vendor == 'postgresql':
+            with conexion.cursor() as cursor:
+                # CONCURRENTLY no se puede usar en el primer refresco (vista sin datos)
+                concurrentemente = concurrente and _vista_llena_postgresql(cursor, tabla)
+                cursor.execute(
+                    f'REFRESH MATERIALIZED VIEW {"CONCURRENTLY " if concurrentemente else ""}{nombre}'
+                )
+        else:
+            select, parametros = _select(consulta().using(using), columnas, conexion)
+            with transaction.atomic(using=using):
+                lista = ', '.join(conexion.ops.quote_name(columna) for columna in columnas)
+                with conexion.cursor() as cursor:
+                    cursor.execute(f'DELETE FROM {nombre}')
+                    cursor.execute(f'INSERT INTO {nombre} ({lista}) {select}', parametros)
+        resultado[tabla] = modelo.objects.using(using).count()
+
+    marca, _ = MarcaProceso.objects.using(using).get_or_create(nombre=NOMBRE_PROCESO)
+    marca.ultima_fecha = timezone.localdate()
+    marca.ultima_ejecucion = timezone.now()
+    marca.save(update_fields=['ultima_fecha', 'ultima_ejecucion', 'fecha_actualizacion'])
+
+    from .cache_agregados import invalidar
+    invalidar()
+    return resultado
+
+
+def ultima_actualizacion():
+    """
+    Fecha y hora del último refresco de las vistas, o None si todavía no se
+    refrescaron (en PostgreSQL una vista sin refrescar no se puede leer).
+    Solo lee: el refresco lo hacen el comando refrescar_reportes y la tarea
+    prestamos.refrescar_reportes.
+    """
+    from .models import MarcaProceso
+
+    return (
+        MarcaProceso.objects.filter(nombre=NOMBRE_PROCESO, ultima_ejecucion__isnull=False)
+        .values_list('ultima_ejecucion', flat=True)
+        .first()
+    )
+
+
+def _periodos(desde, hasta, granularidad):
+    """Inicio de cada período entre desde y hasta (inclusive)."""
+    if GRANULARIDADES[granularidad] is TruncMonth:
+        actual, paso = desde.replace(day=1), relativedelta(months=1)
+    elif GRANULARIDADES[granularidad] is TruncWeek:
+        actual, paso = desde - timedelta(days=desde.weekday()), timedelta(weeks=1)
+    else:
+        actual, paso = desde, timedelta(days=1)
+    while actual <= hasta:
+        yield actual
+        actual += paso
+
+
+def serie_temporal(desde, hasta, granularidad='month'):
+    """
+    Serie de originaciones, cobranzas e intereses entre dos fechas
+    (inclusive), agrupada por día, semana o mes. Los períodos sin
+    movimiento aparecen con ceros.
+    """
+    from .models import ReporteOriginacion, ReporteCobranza, ReporteInteres
+
+    truncar = GRANULARIDADES[granularidad]
+    campos = {
+        ReporteOriginacion: ['prestamos', 'monto_prestado', 'intereses_pactados'],
+        ReporteCobranza: ['pagos', 'monto_cobrado'],
+        ReporteInteres: ['capital_cobrado', 'interes_cobrado'],
+    }
+    vacio = {campo: 0 if campo in ('prestamos', 'pagos') else CERO for lista in campos.values() for campo in lista}
+    serie = OrderedDict((periodo, dict(vacio)) for periodo in _periodos(desde, hasta, granularidad))
+
+    for modelo, lista in campos.items():
+        filas = (
+            modelo.objects.filter(fecha__range=(desde, hasta))
+            .annotate(periodo=truncar('fecha'))
+            .values('periodo')
+            .annotate(**{campo: Sum(campo) for campo in lista})
+            .order_by()
+        )
+        for fila in filas:
+            periodo = fila.pop('periodo')
+            serie.setdefault(periodo, dict(vacio)).update({
+                campo: valor.quantize(CERO) if isinstance(valor, Decimal) else (valor or vacio[campo])
+                for campo, valor in fila.items()
+            })
+
+    return [{'periodo': periodo, **valores} for periodo, valores in sorted(serie.items())]
@@ -0,0 +1,117 @@
+"""
+Saldos desnormalizados del préstamo.
+
+Préstamo guarda los totales de su cronograma (saldo pendiente, total
+pagado, cuotas pagadas, intereses reales y próximo vencimiento) para que
+el detalle de un préstamo y los totales de la cartera no tengan que sumar
+las cuotas en cada consulta.
+
+Se mantienen dentro de la misma transacción que modifica las cuotas:
+- Préstamo.save() al crear el plan de pagos (desde el cronograma en memoria).
+- Pago.save() al distribuir un pago (desde el cronograma ya bloqueado).
+- PlanPago.save()/delete() para ediciones sueltas de una cuota.
+El comando recalcular_saldos los reconstruye en bloque (y ajusta el
+contador de saldo del dashboard, ver prestamos/kpis.py).
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Count, F, Min, Q, Sum
+from django.utils import timezone
+
+from .distribucion import ESTADOS_CUOTA_PENDIENTE
+
+CAMPOS_SALDO = [
+    'saldo_pendiente_total',
+    'total_pagado',
+    'cuotas_pagadas',
+    'intereses_reales',
+    'proxima_fecha_vencimiento',
+]
+
+
+def totales_cronograma(cuotas):
+    """
+    Totales del préstamo a partir de sus cuotas ya cargadas en memoria
+    (instancias de PlanPago con los valores que se van a guardar).
+    """
+    pendientes = [
+        cuota.fecha_vencimiento for cuota in cuotas
+        if cuota.estado in ESTADOS_CUOTA_PENDIENTE and cuota.saldo_pendiente > 0
+    ]
+    return {
+        'saldo_pendiente_total': sum((cuota.saldo_pendiente for cuota in cuotas), Decimal('0.00')),
+        'total_pagado': sum((cuota.monto_pagado or Decimal('0.00') for cuota in cuotas), Decimal('0.00')),
+        'cuotas_pagadas': sum(1 for cuota in cuotas if cuota.estado == 'Pagada'),
+        'intereses_reales': sum((cuota.monto_interes for cuota in cuotas), Decimal('0.00')),
+        'proxima_fecha_vencimiento': min(pendientes) if pendientes else None,
+    }
+
+
+def _totales_agregados(prestamo_ids, using):
+    """
+    Totales de varios préstamos con una sola consulta agrupada sobre PlanPago.
+    Los préstamos sin cuotas no aparecen en el resultado.
+    """
+    from .models import PlanPago
+
+    filas = (
+        PlanPago.objects.using(using)
+        .filter(prestamo_id__in=prestamo_ids)
+        .values('prestamo_id')
+        .annotate(
+            saldo_pendiente_total=Sum('saldo_pendiente'),
+            total_pagado=Sum('monto_pagado'),
+            cuotas_pagadas=Count('id', filter=Q(estado='Pagada')),
+            intereses_reales=Sum('monto_interes'),
+            proxima_fecha_vencimiento=Min(
+                'fecha_vencimiento',
+                filter=Q(estado__in=ESTADOS_CUOTA_PENDIENTE, saldo_pendiente__gt=0),
+            ),
+        )
+        .order_by()
+    )
+    return {fila.pop('prestamo_id'): fila for fila in filas}
+
+
+def recalcular_saldos(prestamo_ids, using='default'):
+    """
+    Recalcula desde las cuotas los saldos de los préstamos indicados: una
+    consulta agregada y un bulk_update. Devuelve cuántos préstamos cambiaron.
+    """
+    from .models import Préstamo
+    from . import kpis
+
+    prestamo_ids = list(prestamo_ids)
+    if not prestamo_ids:
+        return 0
+    totales = _totales_agregados(prestamo_ids, using)
+    vacio = {
+        'saldo_pendiente_total': Decimal('0.00'),
+        'total_pagado': Decimal('0.00'),
+        'cuotas_pagadas': 0,
+        'intereses_reales': Decimal('0.00'),
+        'proxima_fecha_vencimiento': None,
+    }
+
+    ahora = timezone.now()
+    modificados = []
+    deltas_saldo = defaultdict(Decimal)
+    prestamos = Préstamo.objects.using(using).filter(pk__in=prestamo_ids).only('pk', 'fecha_creacion', *CAMPOS_SALDO)
+    for prestamo in prestamos:
+        nuevos = totales.get(prestamo.pk, vacio)
+        if any(getattr(prestamo, campo) != valor for campo, valor in nuevos.items()):
+            mes = kpis.mes_de(prestamo.fecha_creacion)
+            deltas_saldo[(kpis.METRICA_SALDO_PENDIENTE, mes)] += nuevos['saldo_pendiente_total'] - prestamo.saldo_pendiente_total
+            for campo, valor in nuevos.items():
+                setattr(prestamo, campo, valor)
+            # bulk_update no aplica auto_now: lo fijamos a mano
+            prestamo.fecha_actualizacion = ahora
+            # Invalida los fragmentos cacheados del detalle
+            prestamo.version = F('version') + 1
+            modificados.append(prestamo)
+    if modificados:
+        Préstamo.objects.using(using).bulk_update(modificados, CAMPOS_SALDO + ['fecha_actualizacion', 'version'])
+        # El saldo de la cartera del dashboard sigue al de los préstamos
+        kpis.incrementar(deltas_saldo, using=using)
+    return len(modificados)
@@ -0,0 +1,74 @@
+"""
+Señales de la app:
+- Mantienen los contadores del dashboard (prestamos/kpis.py) para los
+  eventos que no pasan por Préstamo.save() ni Pago.save(): altas y bajas
+  de clientes, y bajas de préstamos y pagos.
+- Invalidan la caché de los bloques agregados (prestamos/cache_agregados.py)
+  cuando cambian préstamos, pagos, cuotas o clientes.
+- Invalidan los fragmentos cacheados de detalle_prestamo cuando se edita
+  una cuota suelta (versión del préstamo) o una dirección del cliente
+  (fecha de actualización del cliente).
+"""
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from clientes.models import Cliente, Direccion
+from . import cache_agregados, kpis
+from .models import Préstamo, Pago, PlanPago
+
+
+@receiver(post_save, sender=Cliente)
+def contar_cliente_creado(sender, instance, created, using, **kwargs):
+    if created:
+        kpis.incrementar({(kpis.METRICA_CLIENTES, kpis.mes_de(instance.fecha_creacion)): 1}, using=using)
+
+
+@receiver(post_delete, sender=Cliente)
+def descontar_cliente_eliminado(sender, instance, using, **kwargs):
+    kpis.incrementar({(kpis.METRICA_CLIENTES, kpis.mes_de(instance.fecha_creacion)): -1}, using=using)
+
+
+@receiver(post_delete, sender=Préstamo)
+def descontar_prestamo_eliminado(sender, instance, using, **kwargs):
+    mes = kpis.mes_de(instance.fecha_creacion)
+    kpis.incrementar({
+        (kpis.METRICA_PRESTAMOS, mes): -1,
+        (kpis.METRICA_MONTO_PRESTADO, mes): -instance.monto_solicitado,
+        (kpis.METRICA_SALDO_PENDIENTE, mes): -instance.saldo_pendiente_total,
+        (kpis.metrica_estado(instance.estado), mes): -1,
+    }, using=using)
+
+
+@receiver(post_delete, sender=Pago)
+def descontar_pago_eliminado(sender, instance, using, **kwargs):
+    mes = kpis.mes_de(instance.fecha_pago)
+    kpis.incrementar({
+        (kpis.METRICA_PAGOS, mes): -1,
+        (kpis.METRICA_MONTO_PAGADO, mes): -instance.monto_pagado,
+    }, using=using)
+
+
+@receiver(post_save, sender=Préstamo)
+@receiver(post_save, sender=Pago)
+@receiver(post_save, sender=PlanPago)
+@receiver(post_delete, sender=Préstamo)
+@receiver(post_delete, sender=Pago)
+@receiver(post_delete, sender=PlanPago)
+@receiver(post_save, sender=Cliente)
+@receiver(post_delete, sender=Cliente)
+def invalidar_cache_agregados(sender, **kwargs):
+    cache_agregados.invalidar()
+
+
+@receiver(post_save, sender=PlanPago)
+@receiver(post_delete, sender=PlanPago)
+def invalidar_detalle_prestamo(sender, instance, using, **kwargs):
+    Préstamo.objects.using(using).filter(pk=instance.prestamo_id).update(version=F('version') + 1)
+
+
+@receiver(post_save, sender=Direccion)
+@receiver(post_delete, sender=Direccion)
+def invalidar_detalle_cliente(sender, instance, using, **kwargs):
+    Cliente.objects.using(using).filter(pk=instance.cliente_id).update(fecha_actualizacion=timezone.now())
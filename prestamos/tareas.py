@@ -0,0 +1,175 @@
+"""
+Tareas de la cola (prestamos/cola.py): lo que puede tardar demasiado para
+hacerlo dentro de la petición web. Se registran al cargar la app
+(PrestamosConfig.ready) y las ejecuta el comando procesar_tareas.
+
+Lo que devuelven queda en Tarea.resultado; 'url' es a dónde lleva la página
+de seguimiento al terminar.
+"""
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
+
+from core.replicas import en_replica
+from .cola import tarea
+
+
+def directorio_exportaciones():
+    """Dónde quedan los archivos de las exportaciones en segundo plano (fuera de MEDIA: no son públicos)."""
+    return Path(getattr(settings, 'PRESTAMOS_DIRECTORIO_EXPORTACIONES', Path(settings.BASE_DIR) / 'exportaciones'))
+
+
+# Excepciones de una importación que se muestran en la página (todas van al CSV)
+EXCEPCIONES_EN_PAGINA = 200
+
+
+def crear_prestamo_confirmado(datos, creado_por_id):
+    """Crea el préstamo con los términos firmados de la vista previa (ver views.crear_prestamo)."""
+    from .models import Préstamo
+
+    with transaction.atomic():
+        return Préstamo.objects.create(
+            cliente_id=datos['cliente_id'],
+            tasa_interes_id=datos['tasa_interes_id'],
+            monto_solicitado=Decimal(datos['monto_solicitado']),
+            numero_cuotas=datos['numero_cuotas'],
+            frecuencia_pago=datos['frecuencia_pago'],
+            fecha_emision=date.fromisoformat(datos['fecha_emision']),
+            fecha_primer_pago=date.fromisoformat(datos['fecha_primer_pago']),
+            garantia_descripcion=datos.get('garantia_descripcion', ''),
+            creado_por_id=creado_por_id,
+        )
+
+
+@tarea('prestamos.crear_prestamo')
+def crear_prestamo(tarea, datos):
+    # Se encola con max_intentos=1: un reintento podría duplicar el préstamo
+    tarea.informar(0, 'Generando el plan de pagos')
+    prestamo = crear_prestamo_confirmado(datos, tarea.creado_por_id)
+    return {
+        'prestamo': str(prestamo.pk),
+        'numero_prestamo': prestamo.numero_prestamo,
+        'url': reverse('prestamos:detalle_prestamo', args=[prestamo.pk]),
+    }
+
+
+@tarea('prestamos.exportar')
+def exportar(tarea, nombre, formato, filtros):
+    """`filtros` son los valores sin validar (como en la URL de exportar)."""
+    from .forms import ExportacionForm
+
+    form = ExportacionForm(filtros)
+    if not form.is_valid():
+        raise ValueError(f'Filtros no válidos: {form.errors.as_text()}')
+
+    # Como la descarga directa, lee de la réplica (el avance se escribe en
+    # Tarea, que siempre va a la principal)
+    with en_replica():
+        return _exportar(tarea, nombre, formato, form.cleaned_data)
+
+
+def _exportar(tarea, nombre, formato, filtros):
+    from .exportacion import EXPORTACIONES, generar, nombre_archivo
+
+    total = EXPORTACIONES[nombre].queryset(filtros).count()
+
+    def avance(leidas):
+        tarea.informar(min(99, leidas * 100 // max(total, 1)), f'{leidas} de {total} filas')
+
+    directorio = directorio_exportaciones()
+    directorio.mkdir(parents=True, exist_ok=True)
+    archivo = nombre_archivo(nombre, formato)
+    ruta = directorio / f'tarea_{tarea.pk}_{archivo}'
+    # Se escribe aparte y se renombra al final: nunca se descarga un archivo a medias
+    parcial = ruta.with_name(ruta.name + '.parcial')
+    with open(parcial, 'wb') as salida:
+        for trozo in generar(nombre, formato, filtros, avance=avance):
+            salida.write(trozo)
+    parcial.replace(ruta)
+
+    return {
+        'archivo': ruta.name,
+        'nombre': archivo,
+        'filas': total,
+        'bytes': ruta.stat().st_size,
+        'url': reverse('prestamos:descargar_tarea', args=[tarea.pk]),
+    }
+
+
+@tarea('prestamos.refrescar_reportes')
+def refrescar_reportes(tarea):
+    from .reportes import refrescar_reportes as refrescar
+
+    tarea.informar(0, 'Refrescando las vistas de reportes')
+    return {'filas': refrescar(), 'url': reverse('prestamos:reportes')}
+
+
+@tarea('prestamos.totales_cancelacion')
+def totales_cancelacion(tarea, fecha):
+    """
+    Cotiza la cartera completa a `fecha` (AAAA-MM-DD) y deja los totales en
+    la caché que lee el reporte de cancelación (lo encola la vista).
+    """
+    from . import cache_agregados
+    from .cancelacion import totales_cartera
+
+    version = cache_agregados.version_actual()
+    tarea.informar(0, 'Cotizando la cancelación de la cartera')
+    totales = totales_cartera(date.fromisoformat(fecha))
+    cache_agregados.guardar(f'cancelacion:{fecha}', totales, version)
+    return {
+        'prestamos': totales['prestamos'],
+        'total': str(totales['total']),
+        'url': f"{reverse('prestamos:reporte_cancelacion')}?fecha={fecha}",
+    }
+
+
+@tarea('prestamos.importar_pagos')
+def importar_pagos(tarea, archivo, metodo_pago_id):
+    """
+    Importa el extracto que subió la vista importar_pagos (`archivo`, en el
+    directorio de exportaciones). Reintentarla es seguro: las filas ya
+    registradas se descartan por su clave de importación.
+    """
+    from .importacion import conciliar, contabilizar, escribir_excepciones, leer_extracto
+
+    directorio = directorio_exportaciones()
+    extracto = directorio / archivo
+    tarea.informar(0, 'Leyendo el extracto')
+    filas, excepciones = leer_extracto(extracto.read_text(encoding='utf-8'))
+
+    tarea.informar(10, f'Conciliando {len(filas)} filas')
+    asignaciones, no_conciliadas = conciliar(filas)
+    excepciones.extend(no_conciliadas)
+
+    tarea.informar(30, f'Registrando los pagos de {len(asignaciones)} préstamos')
+    resumen = contabilizar(asignaciones, metodo_pago_id=metodo_pago_id, usuario_id=tarea.creado_por_id)
+    excepciones.extend(resumen['excepciones'])
+    excepciones.extend(resumen['ajustes'])
+    excepciones.sort(key=lambda excepcion: excepcion['linea'])
+
+    nombre_excepciones = None
+    if excepciones:
+        nombre_excepciones = f'tarea_{tarea.pk}_excepciones_importacion.csv'
+        with open(directorio / nombre_excepciones, 'w', encoding='utf-8', newline='') as destino:
+            escribir_excepciones(excepciones, destino)
+    extracto.unlink(missing_ok=True)
+
+    return {
+        'filas': len(filas),
+        'pagos': resumen['pagos'],
+        'monto': str(resumen['monto']),
+        'excepciones': [
+            {'linea': excepcion['linea'], 'motivo': excepcion['motivo']}
+            for excepcion in excepciones[:EXCEPCIONES_EN_PAGINA]
+        ],
+        'total_excepciones': len(excepciones),
+        # Descarga de las excepciones con descargar_tarea
+        'archivo': nombre_excepciones,
+        'nombre': 'excepciones_importacion.csv',
+        'url': f'{reverse("prestamos:importar_pagos")}?tarea={tarea.pk}',
+    }
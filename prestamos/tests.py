@@ -1,3 +1,1477 @@
-from django.test import TestCase
+import csv
+import io
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
 
-# Create your tests here.
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.db.models import Sum
+from django.template.defaultfilters import floatformat
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from clientes.models import Cliente, Direccion
+from core.paginacion import SALT_CURSOR
+from core.pruebas import PresupuestoConsultasMixin
+from . import cache_agregados, cola, consultas_frecuentes, kpis, pronostico, views
+from .atraso import antiguedad_cartera
+from .busqueda import buscar_prestamos
+from .cancelacion import cotizar_cancelacion, cotizar_cartera, fechas_de_reporte, totales_cartera
+from .cartera_sintetica import generar_cartera
+from .datos_prueba import crear_prestamo, crear_usuario, registrar_pago, sembrar_cartera
+from .devengo_mora import calcular_monto_mora, devengar_moras
+from .importacion import _leer_monto, conciliar, contabilizar, leer_extracto
+from .models import (
+    ContadorKPI, Préstamo, Pago, MetodoPago, Mora, PlanPago, ReporteCliente, ReporteCobranza, ReporteEstado,
+    TasaInteres, Tarea,
+)
+from .numeracion import AsignadorNumeroPrestamo
+from .reportes import refrescar_reportes, ultima_actualizacion
+from .saldos import CAMPOS_SALDO, recalcular_saldos, totales_cronograma
+
+# Consultas máximas por vista (con la caché vacía). Incluyen sesión y usuario.
+PRESUPUESTO_DASHBOARD = 5
+PRESUPUESTO_LISTA_PRESTAMOS = 4
+PRESUPUESTO_DETALLE_PRESTAMO = 7
+# Detalle ya renderizado (fragmentos en caché): sesión, usuario y el préstamo
+PRESUPUESTO_DETALLE_PRESTAMO_EN_CACHE = 3
+PRESUPUESTO_REGISTRAR_PAGO_GET = 6
+PRESUPUESTO_REGISTRAR_PAGO_POST = 18
+
+
+class CronogramaTests(TestCase):
+    """El cronograma se calcula en memoria y se inserta de una sola vez."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cartera = sembrar_cartera(clientes=1, prestamos_por_cliente=0)
+
+    def crear(self, cuotas, monto='1000.00'):
+        return Préstamo.objects.create(
+            cliente=self.cartera.clientes[0],
+            tasa_interes=self.cartera.tasa,
+            monto_solicitado=Decimal(monto),
+            numero_cuotas=cuotas,
+            frecuencia_pago='Quincenal',
+            fecha_emision=date(2026, 1, 1),
+            fecha_primer_pago=date(2026, 1, 15),
+        )
+
+    def test_la_ultima_cuota_absorbe_el_redondeo(self):
+        prestamo = self.crear(7)
+        cuotas = list(prestamo.plan_pagos.order_by('numero_cuota'))
+
+        self.assertEqual([cuota.numero_cuota for cuota in cuotas], list(range(1, 8)))
+        self.assertEqual(cuotas[1].fecha_vencimiento, date(2026, 1, 29))
+        self.assertEqual(sum(cuota.monto_capital for cuota in cuotas), prestamo.monto_solicitado)
+        self.assertEqual(sum(cuota.monto_interes for cuota in cuotas), prestamo.monto_total_interes)
+        self.assertEqual(cuotas[0].monto_capital, Decimal('142.86'))
+        self.assertEqual(cuotas[-1].monto_capital, Decimal('142.84'))
+        for cuota in cuotas:
+            self.assertEqual((cuota.estado, cuota.saldo_pendiente), ('Pendiente', cuota.monto_total_cuota))
+        self.assertEqual(prestamo.saldo_pendiente_total, prestamo.monto_total_pagar)
+        self.assertEqual(prestamo.proxima_fecha_vencimiento, date(2026, 1, 15))
+
+    def test_consultas_no_dependen_de_las_cuotas(self):
+        self.crear(1) # Inicializa la numeración y los contadores del mes
+        with CaptureQueriesContext(connection) as corto:
+            self.crear(12)
+        with CaptureQueriesContext(connection) as largo:
+            self.crear(60)
+        self.assertEqual(len(corto), len(largo))
+        self.assertEqual(PlanPago.objects.count(), 1 + 12 + 60)
+
+
+class VistaPreviaPrestamoTests(TestCase):
+    """La vista previa no escribe en la sesión y memoriza el cronograma."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cartera = sembrar_cartera(clientes=1, prestamos_por_cliente=0)
+
+    def setUp(self):
+        self.client.force_login(self.cartera.usuario)
+        cache.clear()
+        self.url = reverse('prestamos:crear_prestamo')
+        self.datos = {
+            'preview': '1',
+            'cliente': self.cartera.clientes[0].pk,
+            'tasa_interes': self.cartera.tasa.pk,
+            'monto_solicitado': '1500.00',
+            'numero_cuotas': 6,
+            'frecuencia_pago': 'Mensual',
+            'fecha_emision': '2026-03-01',
+            'fecha_primer_pago': '2026-04-01',
+        }
+
+    def test_vista_previa_sin_sesion_y_memorizada(self):
+        with mock.patch.object(views, 'generar_cronograma', wraps=views.generar_cronograma) as generar, \
+                CaptureQueriesContext(connection) as consultas:
+            primera = self.client.post(self.url, self.datos)
+            segunda = self.client.post(self.url, self.datos)
+
+        self.assertEqual(generar.call_count, 1)
+        self.assertEqual(len(primera.context['plan_pagos']), 6)
+        self.assertEqual(primera.context['plan_pagos'], segunda.context['plan_pagos'])
+        escrituras = [
+            consulta['sql'] for consulta in consultas.captured_queries
+            if 'django_session' in consulta['sql'] and not consulta['sql'].startswith('SELECT')
+        ]
+        self.assertEqual(escrituras, [])
+
+    def test_confirmar_con_el_token_firmado(self):
+        token = self.client.post(self.url, self.datos).context['token']
+
+        adulterado = signing.loads(token, salt=views.SALT_TOKEN_PRESTAMO)
+        adulterado['monto_solicitado'] = '1.00'
+        falso = signing.dumps(adulterado, salt='otro', compress=True)
+        self.assertRedirects(self.client.post(self.url, {'confirmar': '1', 'token': falso}), self.url)
+        self.assertFalse(Préstamo.objects.exists())
+
+        respuesta = self.client.post(self.url, {'confirmar': '1', 'token': token})
+        prestamo = Préstamo.objects.get()
+        self.assertRedirects(respuesta, reverse('prestamos:detalle_prestamo', args=[prestamo.pk]))
+        self.assertEqual(prestamo.monto_solicitado, Decimal('1500.00'))
+        self.assertEqual(prestamo.creado_por, self.cartera.usuario)
+
+
+class NumeracionConcurrenteTests(TransactionTestCase):
+    """Varios hilos (cada uno con su conexión) nunca reciben el mismo número."""
+
+    HILOS = 6
+    BLOQUE = 5
+
+    def en_hilos(self, funcion, veces):
+        def trabajar(_):
+            try:
+                return [funcion() for _ in range(veces)]
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.HILOS) as pool:
+            return [resultado for resultados in pool.map(trabajar, range(self.HILOS)) for resultado in resultados]
+
+    def test_bloques_reservados_unicos_y_sin_huecos(self):
+        asignador = AsignadorNumeroPrestamo()
+        bloques = self.en_hilos(lambda: asignador.reservar(self.BLOQUE), 10)
+
+        numeros = [numero for bloque in bloques for numero in bloque]
+        self.assertEqual(len(numeros), self.HILOS * 10 * self.BLOQUE)
+        self.assertEqual(len(set(numeros)), len(numeros))
+        for bloque in bloques:
+            self.assertEqual(bloque, list(range(bloque[0], bloque[0] + self.BLOQUE)))
+
+    def test_reparto_en_memoria_entre_hilos(self):
+        asignador = AsignadorNumeroPrestamo()
+        with self.settings(PRESTAMOS_NUMERACION_BLOQUE=self.BLOQUE):
+            numeros = self.en_hilos(asignador.siguiente, 12)
+
+        # Los bloques se reparten completos: ningún número se repite ni queda sin usar
+        self.assertEqual(sorted(numeros), list(range(min(numeros), min(numeros) + self.HILOS * 12)))
+
+
+class VerificarVencimientosTests(TestCase):
+    """Las cuotas vencidas pasan a 'Vencida' y sus préstamos a 'En Atraso'."""
+
+    def setUp(self):
+        self.cartera = sembrar_cartera(clientes=2, prestamos_por_cliente=1)
+
+    def verificar(self, **opciones):
+        call_command('verificar_vencimientos', stdout=io.StringIO(), **opciones)
+
+    def test_prestamo_con_fecha_atrasada_creado_despues_de_una_ejecucion(self):
+        self.verificar()
+        self.assertFalse(PlanPago.objects.filter(estado='Pendiente', fecha_vencimiento__lt=timezone.localdate()).exists())
+
+        # Emitido hace seis meses, después de la ejecución anterior
+        atrasado = crear_prestamo(self.cartera, self.cartera.clientes[0], pagos=0)
+        self.verificar(batch_size=2)
+
+        atrasado.refresh_from_db()
+        self.assertEqual(atrasado.estado, 'En Atraso')
+        self.assertEqual(
+            set(atrasado.plan_pagos.filter(fecha_vencimiento__lt=timezone.localdate()).values_list('estado', flat=True)),
+            {'Vencida'},
+        )
+
+    def test_prestamo_al_dia_vuelve_a_activo(self):
+        self.verificar()
+        prestamo = self.cartera.prestamos[0]
+        prestamo.refresh_from_db()
+        self.assertEqual(prestamo.estado, 'En Atraso')
+
+        vencido = prestamo.plan_pagos.filter(fecha_vencimiento__lt=timezone.localdate()).aggregate(
+            total=Sum('saldo_pendiente')
+        )['total']
+        registrar_pago(self.cartera, prestamo, vencido)
+        self.verificar()
+        prestamo.refresh_from_db()
+        self.assertEqual(prestamo.estado, 'Activo')
+
+    def test_hoy_es_la_fecha_local(self):
+        # 20:00 en Lima ya es el día siguiente en UTC
+        ahora = timezone.make_aware(datetime.combine(timezone.localdate(), time(20)))
+        cuota = PlanPago.objects.filter(estado='Pendiente', fecha_vencimiento__gt=ahora.date()).first()
+        PlanPago.objects.filter(pk=cuota.pk).update(fecha_vencimiento=ahora.date())
+        with mock.patch('django.utils.timezone.now', return_value=ahora.astimezone(dt_timezone.utc)):
+            self.verificar()
+        cuota.refresh_from_db()
+        # Vence hoy: todavía no está vencida
+        self.assertEqual(cuota.estado, 'Pendiente')
+
+
+class DevengoMoraTests(TestCase):
+    """El devengo es idempotente y solo procesa las cuotas que cambiaron."""
+
+    def setUp(self):
+        # Cinco cuotas vencidas; la primera pagada parcialmente
+        self.cartera = sembrar_cartera(clientes=1, prestamos_por_cliente=1)
+        self.prestamo = self.cartera.prestamos[0]
+        self.hoy = timezone.localdate()
+
+    def moras(self):
+        return list(Mora.objects.order_by('cuota_plan__numero_cuota', 'fecha_generacion').values_list(
+            'cuota_plan__numero_cuota', 'fecha_generacion', 'monto_mora', 'estado'
+        ))
+
+    def test_idempotente(self):
+        primera = devengar_moras(self.hoy)
+        moras = self.moras()
+
+        vencidas = self.prestamo.plan_pagos.filter(fecha_vencimiento__lt=self.hoy)
+        self.assertEqual(primera['cuotas_procesadas'], vencidas.count())
+        self.assertEqual(
+            {(numero, monto) for numero, _, monto, _ in moras},
+            {(cuota.numero_cuota, calcular_monto_mora(cuota.saldo_pendiente, (self.hoy - cuota.fecha_vencimiento).days))
+             for cuota in vencidas},
+        )
+        # La cuota pagada parcialmente también devenga, sobre su saldo
+        self.assertEqual(vencidas.get(numero_cuota=1).estado, 'Pagada Parcialmente')
+
+        self.assertEqual(devengar_moras(self.hoy)['cuotas_procesadas'], 0)
+        devengar_moras(self.hoy, completo=True)
+        self.assertEqual(self.moras(), moras)
+
+    def test_solo_las_cuotas_que_cambiaron(self):
+        devengar_moras(self.hoy - timedelta(days=1))
+        cuotas = {cuota.numero_cuota: cuota for cuota in self.prestamo.plan_pagos.all()}
+        # Salda la cuota 1 y paga parte de la 2
+        registrar_pago(self.cartera, self.prestamo, cuotas[1].saldo_pendiente + Decimal('50.00'))
+
+        estadisticas = devengar_moras(self.hoy)
+        self.assertEqual(estadisticas['cuotas_procesadas'], 2)
+        self.assertEqual(estadisticas['moras_cerradas'], 1)
+        moras = self.moras()
+        self.assertEqual([estado for numero, _, _, estado in moras if numero == 1], ['Pagada'])
+        cuota_2 = PlanPago.objects.get(prestamo=self.prestamo, numero_cuota=2)
+        self.assertEqual(
+            [(fecha, monto, estado) for numero, fecha, monto, estado in moras if numero == 2],
+            [
+                (self.hoy - timedelta(days=1), mock.ANY, 'Cancelada'),
+                (self.hoy, calcular_monto_mora(cuota_2.saldo_pendiente, (self.hoy - cuota_2.fecha_vencimiento).days), 'Pendiente'),
+            ],
+        )
+        # Las demás conservan la mora de ayer (se deduce con monto_a_la_fecha)
+        self.assertEqual({fecha for numero, fecha, _, _ in moras if numero > 2}, {self.hoy - timedelta(days=1)})
+
+
+class DistribucionPagoTests(TestCase):
+    """Pago.save() hace las mismas consultas cubra una cuota o diez."""
+
+    def setUp(self):
+        self.cartera = sembrar_cartera(clientes=1, prestamos_por_cliente=0)
+        # Emitidos hace un año: once de las doce cuotas ya vencieron
+        self.prestamos = [
+            crear_prestamo(self.cartera, self.cartera.clientes[0], cuotas=12, pagos=0) for _ in range(3)
+        ]
+        registrar_pago(self.cartera, self.prestamos[2]) # Inicializa los contadores del mes
+
+    def pagar_cuotas(self, prestamo, cuotas):
+        monto = prestamo.plan_pagos.filter(numero_cuota__lte=cuotas).aggregate(total=Sum('saldo_pendiente'))['total']
+        with CaptureQueriesContext(connection) as consultas:
+            pago = registrar_pago(self.cartera, prestamo, monto)
+        return pago, len(consultas)
+
+    def test_consultas_constantes(self):
+        _, una = self.pagar_cuotas(self.prestamos[0], 1)
+        pago, diez = self.pagar_cuotas(self.prestamos[1], 10)
+
+        self.assertEqual(una, diez)
+        self.assertEqual(pago.detalles.count(), 10)
+        self.assertEqual(pago.detalles.aggregate(total=Sum('monto_aplicado'))['total'], pago.monto_pagado)
+        self.assertEqual(
+            list(self.prestamos[1].plan_pagos.order_by('numero_cuota').values_list('estado', flat=True)),
+            ['Pagada'] * 10 + ['Pendiente'] * 2,
+        )
+        self.prestamos[1].refresh_from_db()
+        self.assertEqual(self.prestamos[1].cuotas_pagadas, 10)
+        self.assertEqual(self.prestamos[1].total_pagado, pago.monto_pagado)
+
+
+class ImportacionPagosTests(TestCase):
+    """Lectura de montos del extracto y reimportación del mismo archivo."""
+
+    def setUp(self):
+        self.cartera = sembrar_cartera(clientes=2, prestamos_por_cliente=1, pagos_por_prestamo=0)
+        self.cliente = self.cartera.clientes[0]
+        self.prestamo = self.cartera.prestamos[1]
+
+    def importar(self, contenido):
+        filas, excepciones = leer_extracto(contenido)
+        asignaciones, rechazadas = conciliar(filas)
+        resumen = contabilizar(asignaciones, self.cartera.metodo_pago.pk, self.cartera.usuario.pk)
+        return resumen, excepciones + rechazadas
+
+    def test_leer_monto(self):
+        casos = {
+            '1,500': Decimal('1500.00'),
+            'S/ 2,000': Decimal('2000.00'),
+            'S/. 2.000': Decimal('2000.00'),
+            '1.234,56': Decimal('1234.56'),
+            '1,234.56': Decimal('1234.56'),
+            '1,234,567.8': Decimal('1234567.80'),
+            '1234,56': Decimal('1234.56'),
+            '150.5': Decimal('150.50'),
+            '300': Decimal('300.00'),
+        }
+        for texto, esperado in casos.items():
+            with self.subTest(texto=texto):
+                self.assertEqual(_leer_monto(texto), esperado)
+
+        for texto in ['1,2345', '1234,567', '0,500', '1.234,567', '1,23,456', '1.234.56', '12a', '-50', '']:
+            with self.subTest(texto=texto):
+                with self.assertRaises(ValueError):
+                    _leer_monto(texto)
+
+    def test_monto_ambiguo_va_a_excepciones(self):
+        resumen, excepciones = self.importar(
+            'fecha;monto;documento\n'
+            f'2026-01-05;1.234,567;{self.cliente.numero_documento}\n'
+            f'2026-01-05;1,100;{self.cliente.numero_documento}\n'
+        )
+
+        self.assertEqual(resumen['pagos'], 1)
+        self.assertEqual(resumen['monto'], Decimal('1100.00'))
+        self.assertEqual([excepcion['linea'] for excepcion in excepciones], [2])
+        self.assertIn('ambiguo', excepciones[0]['motivo'])
+
+    def test_reimportar_el_mismo_archivo(self):
+        # Sin referencia: dos abonos idénticos el mismo día son dos pagos
+        contenido = (
+            'fecha,monto,prestamo,dni,glosa\n'
+            f'2026-01-05,100.00,,{self.cliente.numero_documento},DEPOSITO VENTANILLA\n'
+            f'2026-01-05,100.00,,{self.cliente.numero_documento},DEPOSITO VENTANILLA\n'
+            f'2026-01-06,"1,000",{self.prestamo.numero_prestamo},,TRANSFERENCIA\n'
+        )
+        resumen, excepciones = self.importar(contenido)
+        self.assertEqual(resumen['pagos'], 3)
+        self.assertEqual(excepciones, [])
+        self.assertEqual(Pago.objects.filter(clave_importacion__isnull=False).count(), 3)
+
+        resumen, excepciones = self.importar(contenido)
+        self.assertEqual(resumen['pagos'], 0)
+        self.assertEqual([excepcion['linea'] for excepcion in excepciones], [2, 3, 4])
+        self.assertTrue(all('importación anterior' in excepcion['motivo'] for excepcion in excepciones))
+        self.assertEqual(Pago.objects.count(), 3)
+
+        # Una fila nueva en el extracto ampliado sí se registra
+        resumen, excepciones = self.importar(
+            contenido + f'2026-01-07,100.00,,{self.cliente.numero_documento},DEPOSITO VENTANILLA\n'
+        )
+        self.assertEqual(resumen['pagos'], 1)
+        self.assertEqual(len(excepciones), 3)
+
+
+class SaldosDesnormalizadosTests(TestCase):
+    """Los saldos guardados en Préstamo siguen a los de sus cuotas."""
+
+    def setUp(self):
+        self.cartera = sembrar_cartera(clientes=1, prestamos_por_cliente=2, pagos_por_prestamo=1)
+        self.prestamo = self.cartera.prestamos[0]
+
+    def assertSaldosAlDia(self, prestamo):
+        prestamo.refresh_from_db()
+        esperados = totales_cronograma(list(prestamo.plan_pagos.all()))
+        self.assertEqual({campo: getattr(prestamo, campo) for campo in CAMPOS_SALDO}, esperados)
+
+    def test_creacion_y_pagos(self):
+        self.assertSaldosAlDia(self.prestamo)
+        self.assertEqual(self.prestamo.cuotas_pagadas, 0)
+
+        registrar_pago(self.cartera, self.prestamo, self.prestamo.plan_pagos.get(numero_cuota=1).saldo_pendiente)
+        self.assertSaldosAlDia(self.prestamo)
+        self.assertEqual(self.prestamo.cuotas_pagadas, 1)
+        self.assertEqual(
+            self.prestamo.proxima_fecha_vencimiento,
+            self.prestamo.plan_pagos.get(numero_cuota=2).fecha_vencimiento,
+        )
+
+    def test_edicion_y_baja_de_cuota(self):
+        version = self.prestamo.version
+        cuota = self.prestamo.plan_pagos.get(numero_cuota=6)
+        cuota.monto_pagado = cuota.monto_total_cuota
+        cuota.save()
+        self.assertSaldosAlDia(self.prestamo)
+        self.assertGreater(self.prestamo.version, version)
+
+        self.prestamo.plan_pagos.get(numero_cuota=5).delete()
+        self.assertSaldosAlDia(self.prestamo)
+
+    def test_recalcular_corrige_desvios(self):
+        otro = self.cartera.prestamos[1]
+        saldo = self.prestamo.saldo_pendiente_total
+        Préstamo.objects.filter(pk=self.prestamo.pk).update(saldo_pendiente_total=0, cuotas_pagadas=9)
+        contador = ContadorKPI.objects.get(metrica=kpis.METRICA_SALDO_PENDIENTE)
+
+        salida = io.StringIO()
+        call_command('recalcular_saldos', batch_size=1, stdout=salida)
+
+        self.assertIn('Préstamos corregidos: 1', salida.getvalue())
+        self.assertSaldosAlDia(self.prestamo)
+        self.assertSaldosAlDia(otro)
+        # El contador del dashboard se ajusta con la diferencia corregida
+        self.assertEqual(ContadorKPI.objects.get(pk=contador.pk).valor, contador.valor + saldo)
+        self.assertEqual(recalcular_saldos([self.prestamo.pk, otro.pk]), 0)
+
+
+class ContadoresKPITests(TestCase):
+    """Los contadores del dashboard coinciden con recalcularlos desde cero."""
+
+    def setUp(self):
+        self.cartera = sembrar_cartera(clientes=2, prestamos_por_cliente=2, pagos_por_prestamo=1)
+
+    def contadores(self):
+        return {
+            (metrica, mes): valor
+            for metrica, mes, valor in ContadorKPI.objects.values_list('metrica', 'mes', 'valor')
+            if valor
+        }
+
+    def assertContadoresAlDia(self):
+        esperados = {clave: valor for clave, valor in kpis.calcular_desde_cero().items() if valor}
+        self.assertEqual(self.contadores(), esperados)
+
+    def test_eventos_mantienen_los_contadores(self):
+        self.assertContadoresAlDia()
+
+        prestamo = self.cartera.prestamos[0]
+        registrar_pago(self.cartera, prestamo, prestamo.saldo_pendiente_total)
+        self.assertContadoresAlDia()
+        call_command('verificar_vencimientos', stdout=io.StringIO())
+        self.assertContadoresAlDia()
+        self.cartera.pagos[-1].delete()
+        self.assertContadoresAlDia()
+        sembrar_cartera(clientes=1, prestamos_por_cliente=0, cartera=self.cartera).clientes[-1].delete()
+        self.assertContadoresAlDia()
+
+        resumen = kpis.resumen_dashboard()
+        self.assertEqual(resumen['total_prestamos'], Préstamo.objects.count())
+        self.assertEqual(resumen['prestamos_pagados'], Préstamo.objects.filter(estado='Pagado').count())
+        self.assertEqual(resumen['total_clientes'], 2)
+        self.assertEqual(resumen['monto_total_pagado'], Pago.objects.aggregate(total=Sum('monto_pagado'))['total'])
+        self.assertEqual(
+            resumen['saldo_pendiente_total'],
+            Préstamo.objects.aggregate(total=Sum('saldo_pendiente_total'))['total'],
+        )
+
+    def test_resumen_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            kpis.resumen_dashboard()
+
+    def test_reconciliar_corrige_diferencias(self):
+        ContadorKPI.objects.filter(metrica=kpis.METRICA_PAGOS).update(valor=0)
+        esperados = self.contadores()
+
+        salida = io.StringIO()
+        call_command('reconciliar_kpis', simular=True, stdout=salida)
+        self.assertIn('sin corregir', salida.getvalue())
+        self.assertEqual(self.contadores(), esperados)
+
+        call_command('reconciliar_kpis', stdout=io.StringIO())
+        self.assertContadoresAlDia()
+
+
+class ReportesMaterializadosTests(TestCase):
+    """Vistas de reportes: se leen en las peticiones y se llenan al refrescarlas."""
+
+    def setUp(self):
+        self.cartera = sembrar_cartera(clientes=2, prestamos_por_cliente=2, pagos_por_prestamo=2)
+        self.client.force_login(self.cartera.usuario)
+        cache.clear()
+
+    def totales_por_estado(self):
+        return {
+            fila.estado: (fila.prestamos, fila.saldo_pendiente)
+            for fila in ReporteEstado.objects.all()
+        }
+
+    def test_sin_refrescar_no_crea_ni_refresca(self):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(reverse('prestamos:reportes'))
+
+        self.assertContains(respuesta, 'aún no se han refrescado')
+        self.assertIsNone(respuesta.context['actualizado'])
+        self.assertEqual(respuesta.context['total_prestamos'], 0)
+        self.assertTrue(all(
+            consulta['sql'].lstrip().upper().startswith(('SELECT', 'SAVEPOINT', 'RELEASE'))
+            or 'django_session' in consulta['sql']
+            for consulta in consultas
+        ))
+        self.assertIsNone(ultima_actualizacion())
+
+        datos = self.client.get(reverse('prestamos:serie_reportes')).json()
+        self.assertIsNone(datos['actualizado'])
+        self.assertEqual(datos['serie'], [])
+
+    def test_refresco(self):
+        call_command('refrescar_reportes', stdout=io.StringIO())
+
+        self.assertIsNotNone(ultima_actualizacion())
+        self.assertEqual(self.totales_por_estado(), {'Activo': (4, Préstamo.objects.aggregate(
+            total=Sum('saldo_pendiente_total'))['total'])})
+        self.assertEqual(
+            ReporteCobranza.objects.aggregate(total=Sum('monto_cobrado'))['total'],
+            Pago.objects.aggregate(total=Sum('monto_pagado'))['total'],
+        )
+        self.assertEqual(ReporteCliente.objects.count(), 2)
+
+        # Un pago nuevo no se ve hasta el siguiente refresco
+        antes = self.totales_por_estado()
+        registrar_pago(self.cartera, self.cartera.prestamos[0])
+        self.assertEqual(self.totales_por_estado(), antes)
+        refrescar_reportes()
+        self.assertEqual(self.totales_por_estado()['Activo'][1], antes['Activo'][1] - Decimal('100.00'))
+
+        respuesta = self.client.get(reverse('prestamos:reportes'))
+        self.assertEqual(respuesta.context['total_prestamos'], 4)
+        self.assertEqual(
+            respuesta.context['monto_total_pagado'], Pago.objects.aggregate(total=Sum('monto_pagado'))['total']
+        )
+
+    def test_serie_reportes(self):
+        refrescar_reportes()
+        url = reverse('prestamos:serie_reportes')
+        hoy = timezone.localdate()
+        desde = hoy - timedelta(days=400)
+
+        datos = self.client.get(url, {'desde': desde.isoformat(), 'hasta': hoy.isoformat()}).json()
+        self.assertIsNotNone(datos['actualizado'])
+        self.assertEqual(datos['granularidad'], 'month')
+        self.assertEqual(len(datos['serie']), (hoy.year - desde.year) * 12 + hoy.month - desde.month + 1)
+        self.assertEqual(sum(fila['prestamos'] for fila in datos['serie']), 4)
+        self.assertEqual(sum(fila['pagos'] for fila in datos['serie']), 8)
+        self.assertEqual(
+            sum(Decimal(fila['monto_cobrado']) for fila in datos['serie']),
+            Pago.objects.aggregate(total=Sum('monto_pagado'))['total'],
+        )
+
+        # Granularidad diaria: los días sin movimiento vienen en cero
+        datos = self.client.get(url, {'desde': desde.isoformat(), 'hasta': hoy.isoformat(), 'granularidad': 'dia'}).json()
+        self.assertEqual(len(datos['serie']), 401)
+        self.assertEqual(sum(fila['prestamos'] for fila in datos['serie']), 4)
+
+        for parametros in (
+            {'granularidad': 'anio'},
+            {'desde': '2026-13-01'},
+            {'desde': hoy.isoformat(), 'hasta': desde.isoformat()},
+        ):
+            with self.subTest(parametros=parametros):
+                self.assertEqual(self.client.get(url, parametros).status_code, 400)
+
+
+class CacheAgregadosTests(TestCase):
+    """Claves versionadas y stale-while-revalidate de los bloques agregados."""
+
+    def setUp(self):
+        cache.clear()
+        self.calculos = 0
+
+    def calcular(self):
+        self.calculos += 1
+        return self.calculos
+
+    def test_valor_fresco_no_se_recalcula(self):
+        self.assertEqual(cache_agregados.obtener('bloque', self.calcular), 1)
+        self.assertEqual(cache_agregados.obtener('bloque', self.calcular), 1)
+        self.assertEqual(self.calculos, 1)
+
+    def test_invalidar_al_confirmar(self):
+        cache_agregados.obtener('bloque', self.calcular)
+        version = cache_agregados.version_actual()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            cache_agregados.invalidar()
+            # Hasta confirmar la transacción se sigue usando la versión anterior
+            self.assertEqual(cache_agregados.version_actual(), version)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(cache_agregados.version_actual(), version + 1)
+        self.assertEqual(cache_agregados.obtener('bloque', self.calcular), 2)
+
+    def test_cambios_en_la_cartera_invalidan(self):
+        cartera = sembrar_cartera(clientes=1, prestamos_por_cliente=1, pagos_por_prestamo=0)
+        version = cache_agregados.version_actual()
+        with self.captureOnCommitCallbacks(execute=True):
+            registrar_pago(cartera, cartera.prestamos[0])
+        self.assertGreater(cache_agregados.version_actual(), version)
+
+    def test_vencido_se_sirve_mientras_otro_recalcula(self):
+        cache_agregados.obtener('bloque', self.calcular)
+        with self.captureOnCommitCallbacks(execute=True):
+            cache_agregados.invalidar()
+
+        # Otra petición tiene el candado: se sirve el último valor conocido
+        candado = f'{cache_agregados.PREFIJO}:bloque:candado'
+        cache.add(candado, 1)
+        self.assertEqual(cache_agregados.obtener('bloque', self.calcular), 1)
+        self.assertEqual(self.calculos, 1)
+
+        # Liberado el candado, una sola petición recalcula
+        cache.delete(candado)
+        self.assertEqual(cache_agregados.obtener('bloque', self.calcular), 2)
+        self.assertIsNone(cache.get(candado))
+
+    def test_valor_vencido_de_la_misma_version(self):
+        with mock.patch.object(cache_agregados, 'FRESCURA', -1):
+            cache_agregados.obtener('bloque', self.calcular)
+            self.assertEqual(cache_agregados.obtener('bloque', self.calcular), 2)
+
+    def test_primera_carga_espera_a_quien_calcula(self):
+        candado = f'{cache_agregados.PREFIJO}:bloque:candado'
+        cache.add(candado, 1)
+        with mock.patch.object(cache_agregados, 'ESPERA_MAXIMA', 0.1):
+            # Nadie termina de calcular a tiempo: se calcula sin guardar
+            self.assertEqual(cache_agregados.obtener('bloque', self.calcular), 1)
+
+        cache.delete(candado)
+        self.assertEqual(cache_agregados.obtener('bloque', self.calcular), 2)
+        self.assertEqual(cache_agregados.obtener('bloque', self.calcular), 2)
+
+
+class BusquedaPrestamosTests(TestCase):
+    """Búsqueda de préstamos por número, id, documento o nombre del cliente."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cartera = sembrar_cartera(clientes=3, prestamos_por_cliente=2, pagos_por_prestamo=0)
+        cls.cliente = cls.cartera.clientes[1]
+        cls.cliente.nombres, cls.cliente.apellidos = 'Raúl', 'Gómez Ñaupari'
+        cls.cliente.save()
+        cls.prestamo = cls.cartera.prestamos[2]
+
+    def buscar(self, consulta):
+        return list(buscar_prestamos(Préstamo.objects.all(), consulta))
+
+    def test_numero_de_prestamo(self):
+        numero = self.prestamo.numero_prestamo
+        for consulta in (str(numero), f'#{numero}', f'# {numero}'):
+            with self.subTest(consulta=consulta):
+                resultado = buscar_prestamos(Préstamo.objects.all(), consulta)
+                self.assertEqual(list(resultado), [self.prestamo])
+                self.assertEqual(resultado[0].rango, 1.0)
+
+    def test_id_completo(self):
+        self.assertEqual(self.buscar(str(self.prestamo.pk)), [self.prestamo])
+
+    def test_documento_del_cliente(self):
+        esperados = set(self.cliente.prestamos.all())
+        self.assertEqual(set(self.buscar(self.cliente.numero_documento)), esperados)
+        documento = self.cliente.numero_documento
+        self.assertEqual(set(self.buscar(f'{documento[:2]}.{documento[2:5]}.{documento[5:]}')), esperados)
+
+    def test_nombre_sin_tildes(self):
+        esperados = set(self.cliente.prestamos.all())
+        for consulta in ('raul gomez', 'ÑAUPARI', 'Gómez'):
+            with self.subTest(consulta=consulta):
+                self.assertEqual(set(self.buscar(consulta)), esperados)
+        self.assertEqual(self.buscar('inexistente'), [])
+
+    def test_desde_la_vista(self):
+        self.client.force_login(self.cartera.usuario)
+        respuesta = self.client.get(reverse('prestamos:lista_prestamos'), {'q': f'#{self.prestamo.numero_prestamo}'})
+        self.assertEqual([prestamo.pk for prestamo in respuesta.context['prestamos']], [self.prestamo.pk])
+
+
+class PaginacionPrestamosTests(TestCase):
+    """lista_prestamos pagina por llave con cursores firmados y total estimado."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cartera = sembrar_cartera(clientes=1, prestamos_por_cliente=0)
+        # Varios préstamos con la misma fecha de emisión: desempata el id
+        cls.prestamos = [
+            crear_prestamo(cls.cartera, cls.cartera.clientes[0], cuotas=2, pagos=0)
+            for _ in range(views.PRESTAMOS_POR_PAGINA * 2 + 4)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.cartera.usuario)
+        self.url = reverse('prestamos:lista_prestamos')
+
+    def pagina(self, **datos):
+        return self.client.get(self.url, datos).context['prestamos']
+
+    def test_recorre_todas_las_paginas_sin_repetir(self):
+        pagina = self.pagina()
+        paginas = [pagina]
+        while pagina.hay_siguiente:
+            pagina = self.pagina(cursor=pagina.cursor_siguiente)
+            paginas.append(pagina)
+
+        tamano = views.PRESTAMOS_POR_PAGINA
+        self.assertEqual([len(pagina) for pagina in paginas], [tamano, tamano, 4])
+        self.assertEqual(paginas[0].total_legible, str(len(self.prestamos)))
+        ids = [prestamo.pk for pagina in paginas for prestamo in pagina]
+        self.assertEqual(ids, list(Préstamo.objects.order_by('-fecha_emision', '-id').values_list('pk', flat=True)))
+
+        anterior = self.pagina(cursor=paginas[2].cursor_anterior)
+        self.assertEqual([p.pk for p in anterior], [p.pk for p in paginas[1]])
+        self.assertTrue(anterior.hay_anterior)
+
+    def test_pagina_profunda_mismas_consultas(self):
+        tercera = self.pagina(cursor=self.pagina().cursor_siguiente).cursor_siguiente
+        with CaptureQueriesContext(connection) as al_principio:
+            self.pagina()
+        with CaptureQueriesContext(connection) as al_final:
+            self.pagina(cursor=tercera)
+        self.assertEqual(len(al_principio), len(al_final))
+        self.assertNotIn('OFFSET', al_final.captured_queries[-1]['sql'].upper())
+
+    def test_cursor_manipulado_vuelve_al_principio(self):
+        primera = [prestamo.pk for prestamo in self.pagina()]
+        cursor = self.pagina().cursor_siguiente
+
+        for manipulado in (
+            cursor[:-2] + ('A' if cursor[-2] != 'A' else 'B') + cursor[-1],
+            'no-es-un-cursor',
+            signing.dumps({'v': ['mañana', 'x'], 'd': 'anterior'}, salt=SALT_CURSOR),
+            signing.dumps({'v': ['2026-01-01', str(self.prestamos[0].pk)], 'd': 'siguiente'}),
+        ):
+            with self.subTest(cursor=manipulado):
+                respuesta = self.client.get(self.url, {'cursor': manipulado})
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertEqual([prestamo.pk for prestamo in respuesta.context['prestamos']], primera)
+
+    def test_cursor_de_una_busqueda(self):
+        # Con búsqueda el orden incluye el rango: el cursor del listado sin
+        # búsqueda no encaja y se vuelve al principio
+        cursor = self.pagina().cursor_siguiente
+        respuesta = self.client.get(self.url, {'q': 'nombre0', 'cursor': cursor})
+        self.assertEqual(len(respuesta.context['prestamos']), views.PRESTAMOS_POR_PAGINA)
+        self.assertEqual(respuesta.context['prestamos'].total_legible, str(len(self.prestamos)))
+
+
+class ExplicarConsultasTests(TestCase):
+    """El chequeo de EXPLAIN pasa con los índices actuales y detecta recorridos completos."""
+
+    def explicar(self, **opciones):
+        salida = io.StringIO()
+        call_command('explicar_consultas', stdout=salida, **opciones)
+        return salida.getvalue()
+
+    def test_consultas_frecuentes_usan_indices(self):
+        salida = self.explicar(sembrar=150)
+
+        self.assertIn('todas usan índices', salida)
+        self.assertNotIn('❌', salida)
+        # Los datos sembrados se revierten al terminar
+        self.assertFalse(Préstamo.objects.exists())
+
+    def test_detecta_recorrido_completo(self):
+        def sin_indice(muestra):
+            return Préstamo.objects.filter(monto_solicitado__gt=0).order_by()
+
+        with mock.patch.dict(consultas_frecuentes.CONSULTAS, {'prueba: monto sin índice': (sin_indice, None)}):
+            with self.assertRaisesMessage(CommandError, 'recorren tablas completas'):
+                self.explicar(sembrar=20)
+
+
+class PresupuestoVistasPrestamosTests(PresupuestoConsultasMixin, TestCase):
+    """Las vistas principales no superan su presupuesto ni hacen N+1."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cartera = sembrar_cartera()
+        cls.prestamo = cls.cartera.prestamos[0]
+
+    def setUp(self):
+        self.client.force_login(self.cartera.usuario)
+
+    def ampliar_cartera(self):
+        sembrar_cartera(clientes=5, cartera=self.cartera)
+
+    def test_dashboard(self):
+        url = reverse('prestamos:dashboard')
+        self.assertPresupuesto(url, PRESUPUESTO_DASHBOARD)
+        self.assertConsultasNoCrecen(url, self.ampliar_cartera)
+
+    def test_lista_prestamos(self):
+        url = reverse('prestamos:lista_prestamos')
+        self.assertPresupuesto(url, PRESUPUESTO_LISTA_PRESTAMOS)
+        self.assertConsultasNoCrecen(url, self.ampliar_cartera)
+
+    def test_lista_prestamos_con_busqueda(self):
+        url = reverse('prestamos:lista_prestamos')
+        self.assertPresupuesto(url, PRESUPUESTO_LISTA_PRESTAMOS, datos={'q': 'apellido'})
+        self.assertConsultasNoCrecen(url, self.ampliar_cartera, datos={'q': 'apellido'})
+
+    def test_detalle_prestamo(self):
+        url = reverse('prestamos:detalle_prestamo', args=[self.prestamo.pk])
+        self.assertPresupuesto(url, PRESUPUESTO_DETALLE_PRESTAMO)
+
+    def test_detalle_prestamo_no_depende_de_los_pagos(self):
+        url = reverse('prestamos:detalle_prestamo', args=[self.prestamo.pk])
+        self.assertConsultasNoCrecen(
+            url, lambda: [registrar_pago(self.cartera, self.prestamo) for _ in range(3)]
+        )
+
+    def test_detalle_prestamo_repetido(self):
+        url = reverse('prestamos:detalle_prestamo', args=[self.prestamo.pk])
+        self.consultas_de(url)
+        with self.assertNumQueries(PRESUPUESTO_DETALLE_PRESTAMO_EN_CACHE):
+            self.client.get(url)
+
+    def test_detalle_prestamo_se_actualiza_con_un_pago(self):
+        url = reverse('prestamos:detalle_prestamo', args=[self.prestamo.pk])
+        self.consultas_de(url)
+        registrar_pago(self.cartera, self.prestamo, Decimal('37.00'))
+
+        self.prestamo.refresh_from_db()
+        self.assertContains(self.client.get(url), f'S/ {floatformat(self.prestamo.total_pagado, 2)}')
+
+    def test_detalle_prestamo_se_actualiza_con_una_direccion(self):
+        url = reverse('prestamos:detalle_prestamo', args=[self.prestamo.pk])
+        self.consultas_de(url)
+        Direccion.objects.create(
+            cliente=self.prestamo.cliente, direccion_linea_1='Jr. Nuevo 123', distrito='Barranco', ciudad='Lima'
+        )
+
+        self.assertContains(self.client.get(url), 'Barranco')
+
+    def test_registrar_pago_formulario(self):
+        url = reverse('prestamos:registrar_pago', args=[self.prestamo.pk])
+        self.assertPresupuesto(url, PRESUPUESTO_REGISTRAR_PAGO_GET)
+
+    def test_registrar_pago(self):
+        url = reverse('prestamos:registrar_pago', args=[self.prestamo.pk])
+        datos = {'numero_cuotas_pagar': 1, 'metodo_pago': self.cartera.metodo_pago.pk}
+        _, respuesta = self.assertPresupuesto(url, PRESUPUESTO_REGISTRAR_PAGO_POST, metodo='post', datos=datos)
+        self.assertRedirects(respuesta, reverse('prestamos:detalle_prestamo', args=[self.prestamo.pk]))
+        self.assertEqual(self.prestamo.pagos.count(), 2)
+
+
+class CarteraSinteticaTests(TestCase):
+    """La cartera de generar_cartera es coherente y reproducible."""
+
+    HASTA = date(2026, 6, 30)
+
+    @classmethod
+    def setUpTestData(cls):
+        TasaInteres.objects.create(nombre='Tasa Personal', valor_porcentaje=Decimal('15.00'), periodo='Anual')
+        MetodoPago.objects.create(nombre='Efectivo')
+
+    def generar(self):
+        return generar_cartera(clientes=8, prestamos=20, semilla=7, hasta=self.HASTA, tamano_lote=3)
+
+    def resumen(self):
+        return list(
+            Préstamo.objects.order_by('cliente__numero_documento', 'fecha_emision', 'monto_solicitado')
+            .values_list('cliente__numero_documento', 'monto_solicitado', 'numero_cuotas',
+                         'frecuencia_pago', 'estado', 'saldo_pendiente_total', 'total_pagado')
+        )
+
+    def test_saldos_y_pagos_coherentes(self):
+        resultado = self.generar()
+
+        self.assertEqual((resultado.clientes, resultado.prestamos), (8, 20))
+        # Los saldos calculados en memoria coinciden con los de las cuotas
+        self.assertEqual(recalcular_saldos(Préstamo.objects.values_list('pk', flat=True)), 0)
+        # Cada pago está aplicado completo a sus cuotas
+        for pago in Pago.objects.annotate(aplicado=Sum('detalles__monto_aplicado')):
+            self.assertEqual(pago.aplicado, pago.monto_pagado)
+
+    def test_misma_semilla_misma_cartera(self):
+        with transaction.atomic():
+            self.generar()
+            primera = self.resumen()
+            transaction.set_rollback(True)
+
+        self.generar()
+        self.assertEqual(self.resumen(), primera)
+
+
+class ExportacionTests(TestCase):
+    """Las exportaciones se envían en streaming y respetan los filtros."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cartera = sembrar_cartera(clientes=2, prestamos_por_cliente=1)
+
+    def setUp(self):
+        self.client.force_login(self.cartera.usuario)
+
+    def descargar(self, nombre, formato, **filtros):
+        respuesta = self.client.get(reverse('prestamos:exportar', args=[nombre, formato]), filtros)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.streaming)
+        return b''.join(respuesta.streaming_content)
+
+    def test_cuotas_csv_filtradas_por_prestamo(self):
+        prestamo = self.cartera.prestamos[0]
+        filas = list(csv.reader(io.StringIO(
+            self.descargar('cuotas', 'csv', numero_prestamo=prestamo.numero_prestamo).decode('utf-8-sig')
+        )))
+
+        self.assertEqual(filas[0][:3], ['Préstamo', 'Documento', 'Cuota'])
+        self.assertEqual(len(filas) - 1, prestamo.numero_cuotas)
+        self.assertEqual({fila[0] for fila in filas[1:]}, {str(prestamo.numero_prestamo)})
+
+    def test_pagos_xlsx(self):
+        with zipfile.ZipFile(io.BytesIO(self.descargar('pagos', 'xlsx'))) as archivo:
+            hoja = archivo.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        # Encabezado más un pago por préstamo
+        self.assertEqual(hoja.count('<row>'), 1 + len(self.cartera.pagos))
+
+    def test_textos_no_se_evaluan_como_formulas(self):
+        cliente = self.cartera.clientes[0]
+        Cliente.objects.filter(pk=cliente.pk).update(apellidos='=HYPERLINK("http://x.test")', nombres='-Ana')
+        filas = list(csv.reader(io.StringIO(
+            self.descargar('prestamos', 'csv', numero_documento=cliente.numero_documento).decode('utf-8-sig')
+        )))
+        self.assertEqual(filas[1][4:6], ["'=HYPERLINK(\"http://x.test\")", "'-Ana"])
+
+        with zipfile.ZipFile(io.BytesIO(
+            self.descargar('prestamos', 'xlsx', numero_documento=cliente.numero_documento)
+        )) as archivo:
+            hoja = archivo.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertIn("<t>'=HYPERLINK", hoja)
+        self.assertIn("<t>'-Ana</t>", hoja)
+
+    def test_xlsx_en_varias_hojas_sobre_el_limite(self):
+        with mock.patch('prestamos.exportacion.FILAS_POR_HOJA', 5):
+            contenido = self.descargar('cuotas', 'xlsx')
+        cuotas = sum(prestamo.numero_cuotas for prestamo in self.cartera.prestamos)
+        with zipfile.ZipFile(io.BytesIO(contenido)) as archivo:
+            libro = archivo.read('xl/workbook.xml').decode('utf-8')
+            hojas = [
+                archivo.read(f'xl/worksheets/sheet{numero}.xml').decode('utf-8')
+                for numero in range(1, libro.count('<sheet ') + 1)
+            ]
+        self.assertEqual(len(hojas), -(-cuotas // 5))
+        self.assertIn('name="Datos 2"', libro)
+        # Cada hoja repite el encabezado
+        self.assertEqual(sum(hoja.count('<row>') - 1 for hoja in hojas), cuotas)
+        self.assertTrue(all('Vencimiento' in hoja for hoja in hojas))
+
+    def test_filtros_no_validos(self):
+        url = reverse('prestamos:exportar', args=['prestamos', 'csv'])
+        respuesta = self.client.get(url, {'desde': '2026-05-01', 'hasta': '2026-01-01'})
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_exportacion_desconocida(self):
+        respuesta = self.client.get(reverse('prestamos:exportar', args=['usuarios', 'csv']))
+        self.assertEqual(respuesta.status_code, 404)
+
+
+class VistasAsyncTests(TransactionTestCase):
+    """Fuera de una transacción, dashboard y reportes hacen sus consultas en paralelo."""
+
+    databases = '__all__' # Con réplica configurada, el dashboard lee de ella
+
+    def setUp(self):
+        self.cartera = sembrar_cartera(clientes=2)
+        self.cartera.usuario.is_staff = True
+        self.cartera.usuario.save()
+        refrescar_reportes()
+        cache.clear()
+
+    def test_mismo_contexto_en_paralelo_y_en_secuencia(self):
+        for secuencial, concurrente in (
+            (views._contexto_dashboard, views._acontexto_dashboard),
+            (views._contexto_reportes, views._acontexto_reportes),
+        ):
+            with self.subTest(secuencial.__name__):
+                self.assertEqual(async_to_sync(concurrente)(), secuencial())
+
+    async def test_dashboard_por_asgi(self):
+        await self.async_client.aforce_login(self.cartera.usuario)
+        respuesta = await self.async_client.get(reverse('prestamos:dashboard'))
+        self.assertEqual(respuesta.status_code, 200)
+        # El presupuesto también cuenta las consultas hechas en el pool
+        self.assertIn(f'"{PRESUPUESTO_DASHBOARD} consultas"', respuesta['Server-Timing'])
+
+
+@skipUnless('replica' in settings.DATABASES, 'Sin réplica en DATABASES (ver core/replicas.py)')
+class ReplicaTests(TransactionTestCase):
+    """Con la réplica como espejo de la principal en los tests."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        self.cartera = sembrar_cartera(clientes=1)
+        self.prestamo = self.cartera.prestamos[0]
+        self.client.force_login(self.cartera.usuario)
+
+    def test_listados_y_exportaciones_leen_de_la_replica(self):
+        for url in (
+            reverse('prestamos:lista_prestamos'),
+            reverse('clientes:lista_clientes'),
+            reverse('prestamos:exportar', args=['prestamos', 'csv']),
+        ):
+            with self.subTest(url), CaptureQueriesContext(connections['replica']) as replica:
+                respuesta = self.client.get(url)
+                respuesta.getvalue()
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertTrue(replica.captured_queries)
+
+    def test_registrar_pago_usa_la_principal(self):
+        url = reverse('prestamos:registrar_pago', args=[self.prestamo.pk])
+        datos = {'numero_cuotas_pagar': 1, 'metodo_pago': self.cartera.metodo_pago.pk}
+        with CaptureQueriesContext(connections['replica']) as replica:
+            self.client.get(url)
+            self.client.post(url, datos)
+        self.assertEqual(replica.captured_queries, [])
+        self.assertEqual(self.prestamo.pagos.count(), 2)
+
+
+class ColaTareasTests(TestCase):
+    """Tareas en la cola: ejecución, reintentos con espera y seguimiento."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cartera = sembrar_cartera(clientes=1, prestamos_por_cliente=1)
+
+    def setUp(self):
+        self.client.force_login(self.cartera.usuario)
+
+    def procesar(self):
+        call_command('procesar_tareas', procesos=1, una_vez=True, stdout=io.StringIO())
+
+    def registrar(self, nombre, funcion):
+        cola.REGISTRO[nombre] = funcion
+        self.addCleanup(cola.REGISTRO.pop, nombre)
+
+    def test_reintento_con_espera_y_fallo_definitivo(self):
+        intentos = []
+
+        def fallar(tarea):
+            intentos.append(tarea.intentos)
+            raise RuntimeError('sin conexión con el banco')
+
+        self.registrar('pruebas.fallar', fallar)
+        tarea = cola.encolar('pruebas.fallar', max_intentos=2)
+
+        with self.assertLogs('prestamos.cola', 'WARNING'):
+            self.procesar()
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.intentos), ('Pendiente', 1))
+        self.assertGreater(tarea.disponible_desde, timezone.now())
+        self.assertIn('sin conexión con el banco', tarea.error)
+
+        # Vencida la espera se reintenta, y sin intentos restantes queda fallida
+        Tarea.objects.filter(pk=tarea.pk).update(disponible_desde=timezone.now())
+        with self.assertLogs('prestamos.cola', 'ERROR'):
+            self.procesar()
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, intentos), ('Fallida', [1, 2]))
+
+    def test_tarea_abandonada_se_retoma(self):
+        self.registrar('pruebas.sumar', lambda tarea, a, b: a + b)
+        tarea = cola.encolar('pruebas.sumar', {'a': 2, 'b': 3})
+        tomada = cola.tomar_siguiente('otro-equipo:1:0')
+        self.assertEqual(tomada.pk, tarea.pk)
+        self.assertIsNone(cola.tomar_siguiente('otro-equipo:1:1'))
+
+        # El proceso murió: vencida la reserva, otro la termina
+        Tarea.objects.filter(pk=tarea.pk).update(reservada_hasta=timezone.now() - timedelta(seconds=1))
+        self.procesar()
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.intentos, tarea.resultado), ('Completada', 2, 5))
+
+    def test_informar_renueva_la_reserva(self):
+        self.registrar('pruebas.sumar', lambda tarea, a, b: a + b)
+        cola.encolar('pruebas.sumar', {'a': 1, 'b': 1})
+        tomada = cola.tomar_siguiente('equipo:1:0')
+        Tarea.objects.filter(pk=tomada.pk).update(reservada_hasta=timezone.now() + timedelta(seconds=5))
+
+        tomada.informar(40, 'A mitad de camino')
+        tomada.refresh_from_db()
+        self.assertEqual((tomada.progreso, tomada.mensaje), (40, 'A mitad de camino'))
+        self.assertGreater(tomada.reservada_hasta, timezone.now() + timedelta(seconds=cola.RESERVA - 60))
+        self.assertIsNone(cola.tomar_siguiente('equipo:2:0'))
+
+    def retomar(self, nombre):
+        """La reserva del primer proceso vence y un segundo proceso retoma la tarea."""
+        tarea = cola.encolar(nombre)
+        anterior = cola.tomar_siguiente('equipo:1:0')
+        Tarea.objects.filter(pk=tarea.pk).update(reservada_hasta=timezone.now() - timedelta(seconds=1))
+        return anterior, cola.tomar_siguiente('equipo:2:0')
+
+    def test_el_proceso_anterior_se_detiene_al_informar(self):
+        def trabajar(tarea):
+            tarea.informar(50, f'avance de {tarea.trabajador}')
+            return tarea.trabajador
+
+        self.registrar('pruebas.trabajar', trabajar)
+        anterior, actual = self.retomar('pruebas.trabajar')
+
+        with self.assertLogs('prestamos.cola', 'WARNING'):
+            self.assertFalse(cola.ejecutar(anterior))
+        tarea = Tarea.objects.get(pk=actual.pk)
+        self.assertEqual((tarea.estado, tarea.trabajador, tarea.progreso), ('En Proceso', 'equipo:2:0', 0))
+
+        self.assertTrue(cola.ejecutar(actual))
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.resultado, tarea.intentos), ('Completada', 'equipo:2:0', 2))
+
+    def test_el_proceso_anterior_no_cierra_la_tarea(self):
+        def trabajar(tarea):
+            if tarea.trabajador == 'equipo:1:0':
+                raise RuntimeError('falla tardía del proceso anterior')
+            return 'ok'
+
+        self.registrar('pruebas.trabajar', trabajar)
+        anterior, actual = self.retomar('pruebas.trabajar')
+
+        # Ni su fallo ni su resultado cambian la tarea del proceso actual
+        with self.assertLogs('prestamos.cola', 'WARNING'):
+            self.assertFalse(cola.ejecutar(anterior))
+        tarea = Tarea.objects.get(pk=actual.pk)
+        self.assertEqual((tarea.estado, tarea.trabajador, tarea.error), ('En Proceso', 'equipo:2:0', ''))
+
+        cola.REGISTRO['pruebas.trabajar'] = lambda tarea: 'tarde'
+        with self.assertLogs('prestamos.cola', 'WARNING'):
+            self.assertFalse(cola.ejecutar(anterior))
+        self.assertTrue(cola.ejecutar(actual))
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.resultado), ('Completada', 'tarde'))
+
+    def test_importacion_en_la_cola(self):
+        prestamo = self.cartera.prestamos[0]
+        contenido = (
+            'fecha,monto,prestamo,glosa\n'
+            f'2026-01-05,50.00,{prestamo.numero_prestamo},DEPOSITO\n'
+            '2026-01-06,20.00,999999,DEPOSITO\n'
+        )
+        url = reverse('prestamos:importar_pagos')
+
+        def subir():
+            return self.client.post(url, {
+                'archivo': SimpleUploadedFile('extracto.csv', contenido.encode('utf-8')),
+                'metodo_pago': self.cartera.metodo_pago.pk,
+            })
+
+        with tempfile.TemporaryDirectory() as directorio, self.settings(PRESTAMOS_DIRECTORIO_EXPORTACIONES=directorio):
+            respuesta = subir()
+            tarea = Tarea.objects.get(nombre='prestamos.importar_pagos')
+            self.assertRedirects(respuesta, reverse('prestamos:tarea', args=[tarea.pk]))
+            # Nada se registra dentro de la petición
+            self.assertEqual(Pago.objects.filter(prestamo=prestamo, monto_pagado=Decimal('50.00')).count(), 0)
+
+            self.procesar()
+            estado = self.client.get(reverse('prestamos:estado_tarea', args=[tarea.pk])).json()
+            self.assertEqual(estado['url'], f'{url}?tarea={tarea.pk}')
+            resultado = self.client.get(estado['url'])
+            self.assertEqual(resultado.context['resumen']['pagos'], 1)
+            self.assertEqual(resultado.context['resumen']['total_excepciones'], 1)
+            self.assertContains(resultado, 'No se encontró')
+
+            descarga = self.client.get(reverse('prestamos:descargar_tarea', args=[tarea.pk]))
+            excepciones = b''.join(descarga.streaming_content).decode('utf-8')
+            descarga.close()
+            self.assertIn('999999', excepciones)
+            # El extracto subido se borra al terminar
+            self.assertEqual([ruta.name for ruta in Path(directorio).glob('importacion_*')], [])
+
+            # Subir el mismo extracto otra vez no duplica el pago
+            subir()
+            self.procesar()
+            segunda = Tarea.objects.filter(nombre='prestamos.importar_pagos').latest('id')
+            self.assertEqual((segunda.estado, segunda.resultado['pagos']), ('Completada', 0))
+        self.assertEqual(Pago.objects.filter(prestamo=prestamo, monto_pagado=Decimal('50.00')).count(), 1)
+
+    def test_extracto_sin_columnas_no_se_encola(self):
+        respuesta = self.client.post(reverse('prestamos:importar_pagos'), {
+            'archivo': SimpleUploadedFile('extracto.csv', b'dia,importe_total\n2026-01-05,50\n'),
+            'metodo_pago': self.cartera.metodo_pago.pk,
+        })
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('fecha', respuesta.context['form'].errors['archivo'][0])
+        self.assertFalse(Tarea.objects.exists())
+
+    def test_prestamo_largo_se_crea_en_la_cola(self):
+        prestamo = self.cartera.prestamos[0]
+        datos = {
+            'cliente_id': prestamo.cliente_id,
+            'tasa_interes_id': prestamo.tasa_interes_id,
+            'monto_solicitado': '1200.00',
+            'numero_cuotas': views.CUOTAS_EN_COLA,
+            'frecuencia_pago': 'Semanal',
+            'fecha_emision': date(2026, 1, 5).isoformat(),
+            'fecha_primer_pago': date(2026, 1, 12).isoformat(),
+        }
+        token = signing.dumps(datos, salt=views.SALT_TOKEN_PRESTAMO, compress=True)
+        respuesta = self.client.post(reverse('prestamos:crear_prestamo'), {'confirmar': '1', 'token': token})
+        tarea = Tarea.objects.get(nombre='prestamos.crear_prestamo')
+        self.assertRedirects(respuesta, reverse('prestamos:tarea', args=[tarea.pk]))
+        self.assertEqual(tarea.max_intentos, 1)
+
+        self.procesar()
+        estado = self.client.get(reverse('prestamos:estado_tarea', args=[tarea.pk])).json()
+        self.assertEqual(estado['estado'], 'Completada')
+        nuevo = Préstamo.objects.get(pk=Tarea.objects.get(pk=tarea.pk).resultado['prestamo'])
+        self.assertEqual(estado['url'], reverse('prestamos:detalle_prestamo', args=[nuevo.pk]))
+        self.assertEqual(nuevo.plan_pagos.count(), views.CUOTAS_EN_COLA)
+        self.assertEqual(nuevo.creado_por, self.cartera.usuario)
+
+    def test_exportacion_en_la_cola(self):
+        with tempfile.TemporaryDirectory() as directorio, self.settings(PRESTAMOS_DIRECTORIO_EXPORTACIONES=directorio):
+            url = reverse('prestamos:exportar', args=['cuotas', 'csv'])
+            respuesta = self.client.post(f'{url}?numero_prestamo={self.cartera.prestamos[0].numero_prestamo}')
+            tarea = Tarea.objects.get(nombre='prestamos.exportar')
+            self.assertRedirects(respuesta, reverse('prestamos:tarea', args=[tarea.pk]))
+
+            self.procesar()
+            descarga = self.client.get(reverse('prestamos:descargar_tarea', args=[tarea.pk]))
+            contenido = b''.join(descarga.streaming_content).decode('utf-8-sig')
+            descarga.close()
+        self.assertEqual(len(contenido.strip().splitlines()), 1 + self.cartera.prestamos[0].numero_cuotas)
+
+    def test_solo_el_creador_sigue_la_tarea(self):
+        tarea = cola.encolar('prestamos.refrescar_reportes', creado_por=self.cartera.usuario)
+        self.assertEqual(self.client.get(reverse('prestamos:tarea', args=[tarea.pk])).status_code, 200)
+
+        self.client.force_login(crear_usuario(email='otro@prestamos.test'))
+        self.assertEqual(self.client.get(reverse('prestamos:estado_tarea', args=[tarea.pk])).status_code, 404)
+
+    def test_refresco_de_reportes_no_se_duplica(self):
+        url = reverse('prestamos:refrescar_reportes')
+        self.client.post(url)
+        self.client.post(url)
+        self.assertEqual(Tarea.objects.filter(nombre='prestamos.refrescar_reportes').count(), 1)
+
+
+class CancelacionTests(TestCase):
+    """La cotización no escribe nada y coincide con lo que cobra Pago.save()."""
+
+    def setUp(self):
+        self.cartera = sembrar_cartera(clientes=3, prestamos_por_cliente=1)
+        self.prestamo = self.cartera.prestamos[0]
+        # A mitad del segundo período: la primera cuota tiene un pago parcial y
+        # las siguientes aún no vencen
+        self.fecha = self.prestamo.fecha_emision + timedelta(days=45)
+
+    def test_pagar_lo_cotizado_cancela_el_prestamo(self):
+        with self.assertNumQueries(1):
+            cotizacion = cotizar_cancelacion(self.prestamo, self.fecha)
+        self.assertEqual(Pago.objects.filter(prestamo=self.prestamo).count(), 1)
+        self.assertGreater(cotizacion.interes_condonado, 0)
+        self.assertEqual(cotizacion.total, cotizacion.capital + cotizacion.interes - cotizacion.pagado)
+        self.assertEqual(cotizacion.total, sum(cuota.saldo for cuota in cotizacion.cuotas))
+
+        pago = Pago(
+            prestamo=self.prestamo,
+            monto_pagado=cotizacion.total + Decimal('500.00'), # El exceso se descarta al distribuir
+            metodo_pago=self.cartera.metodo_pago,
+            fecha_pago=timezone.make_aware(datetime.combine(self.fecha, time(12))),
+        )
+        pago.save()
+        self.prestamo.refresh_from_db()
+        self.assertEqual(pago.monto_pagado, cotizacion.total)
+        self.assertEqual(self.prestamo.estado, 'Pagado')
+
+    def test_cartera_por_lotes_coincide_con_cada_prestamo(self):
+        # Tres préstamos en lotes de dos: dos lotes con dos consultas y uno vacío
+        with self.assertNumQueries(5):
+            cotizaciones = list(cotizar_cartera(self.fecha, tamano_lote=2))
+        self.assertEqual(len(cotizaciones), 3)
+        for cotizacion in cotizaciones:
+            individual = cotizar_cancelacion(Préstamo.objects.get(pk=cotizacion.prestamo_id), self.fecha)
+            self.assertEqual(cotizacion.total, individual.total)
+            self.assertEqual(cotizacion.interes_condonado, individual.interes_condonado)
+            self.assertEqual(cotizacion.cuotas, [])
+
+    def test_endpoint_y_reporte(self):
+        self.client.force_login(self.cartera.usuario)
+        url = reverse('prestamos:cancelacion_prestamo', args=[self.prestamo.pk])
+        datos = self.client.get(url, {'fecha': self.fecha.isoformat()}).json()
+        self.assertEqual(Decimal(datos['total']), cotizar_cancelacion(self.prestamo, self.fecha).total)
+        self.assertEqual(len(datos['cuotas']), datos['cuotas_pendientes'])
+        self.assertEqual(self.client.get(url, {'fecha': '31/12/2024'}).status_code, 400)
+
+    def reporte(self, **parametros):
+        return self.client.get(reverse('prestamos:reporte_cancelacion'), parametros)
+
+    def procesar_cola(self):
+        call_command('procesar_tareas', procesos=1, una_vez=True, stdout=io.StringIO())
+
+    def test_reporte_con_totales_de_la_cola(self):
+        cache.clear()
+        self.client.force_login(self.cartera.usuario)
+        fin_de_mes = fechas_de_reporte()[1]
+        respuesta = self.reporte(fecha=fin_de_mes.isoformat())
+        self.assertContains(respuesta, self.prestamo.numero_prestamo)
+        # La petición no cotiza la cartera: encola la tarea (una sola vez)
+        self.assertIsNone(respuesta.context['totales'])
+        self.assertContains(respuesta, 'se están calculando')
+        self.reporte(fecha=fin_de_mes.isoformat())
+        self.assertEqual(Tarea.objects.filter(nombre='prestamos.totales_cancelacion').count(), 1)
+
+        self.procesar_cola()
+        respuesta = self.reporte(fecha=fin_de_mes.isoformat())
+        self.assertTrue(respuesta.context['totales_al_dia'])
+        self.assertEqual(respuesta.context['totales'], totales_cartera(fin_de_mes))
+        self.assertEqual(respuesta.context['totales']['prestamos'], 3)
+
+    def test_solo_fechas_permitidas(self):
+        self.client.force_login(self.cartera.usuario)
+        for fecha in (self.fecha.isoformat(), '31/12/2024'):
+            respuesta = self.reporte(fecha=fecha)
+            self.assertEqual(respuesta.context['fecha'], timezone.localdate())
+            self.assertContains(respuesta, 'La fecha debe ser hoy o el fin de este mes')
+        # Las fechas no permitidas no encolan otra cotización de la cartera
+        self.assertEqual(
+            list(Tarea.objects.filter(nombre='prestamos.totales_cancelacion').values_list('argumentos', flat=True)),
+            [{'fecha': timezone.localdate().isoformat()}],
+        )
+
+    def test_reporte_cotiza_solo_la_pagina(self):
+        self.client.force_login(self.cartera.usuario)
+        with mock.patch('prestamos.views.COTIZACIONES_POR_PAGINA', 2):
+            primera = self.reporte()
+            # Ordenada en la base por número de préstamo
+            numeros = [cotizacion.numero_prestamo for cotizacion in primera.context['cotizaciones']]
+            self.assertEqual(numeros, sorted(p.numero_prestamo for p in self.cartera.prestamos)[:2])
+            pagina = primera.context['pagina']
+            self.assertTrue(pagina.hay_siguiente)
+
+            with mock.patch('prestamos.cancelacion.cotizar_cartera', wraps=cotizar_cartera) as cotizar:
+                segunda = self.reporte(cursor=pagina.cursor_siguiente)
+            # Solo el préstamo de la página
+            self.assertEqual(cotizar.call_args.kwargs['prestamos'].count(), 1)
+        self.assertEqual(
+            [cotizacion.numero_prestamo for cotizacion in segunda.context['cotizaciones']],
+            [max(p.numero_prestamo for p in self.cartera.prestamos)],
+        )
+        self.assertTrue(segunda.context['pagina'].hay_anterior)
+
+    def test_prestamo_sin_numero_queda_fuera(self):
+        Préstamo.objects.filter(pk=self.prestamo.pk).update(numero_prestamo=None)
+        self.client.force_login(self.cartera.usuario)
+        respuesta = self.reporte()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotIn(self.prestamo.pk, [c.prestamo_id for c in respuesta.context['cotizaciones']])
+        self.assertEqual(len(respuesta.context['cotizaciones']), 2)
+
+    def test_tras_un_pago_se_muestran_los_totales_anteriores_y_se_recalculan(self):
+        cache.clear()
+        self.client.force_login(self.cartera.usuario)
+        self.reporte()
+        self.procesar_cola()
+        antes = self.reporte().context['totales']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            registrar_pago(self.cartera, self.cartera.prestamos[1])
+        respuesta = self.reporte()
+        self.assertFalse(respuesta.context['totales_al_dia'])
+        self.assertEqual(respuesta.context['totales'], antes)
+
+        self.procesar_cola()
+        despues = self.reporte().context['totales']
+        self.assertEqual(despues['total'], antes['total'] - Decimal('100.00'))
+
+
+class PronosticoTests(TestCase):
+    """Pronóstico de cobranza a partir de los saldos agregados en la base."""
+
+    def setUp(self):
+        self.cartera = sembrar_cartera(clientes=3, prestamos_por_cliente=1, cuotas=12)
+        cache.clear()
+
+    def test_con_curvas_de_cobro_total_se_espera_lo_que_vence(self):
+        tramos = [(nombre, dias, ['1']) for nombre, dias, _ in pronostico.TRAMOS]
+        with mock.patch.object(pronostico, 'TRAMOS', tramos), self.assertNumQueries(1):
+            resultado = pronostico.pronosticar(granularidad='week', periodos=30)
+
+        hoy = timezone.localdate()
+        fin = resultado['periodos'][-1]['fin']
+        pendiente = PlanPago.objects.filter(
+            estado__in=['Pendiente', 'Vencida', 'Pagada Parcialmente'], saldo_pendiente__gt=0, fecha_vencimiento__lte=fin
+        ).aggregate(total=Sum('saldo_pendiente'))['total']
+        vencido = sum(
+            (cuota.saldo_pendiente for prestamo in self.cartera.prestamos
+             for cuota in prestamo.plan_pagos.filter(fecha_vencimiento__lt=hoy, saldo_pendiente__gt=0)),
+            Decimal('0.00'),
+        )
+        self.assertEqual(resultado['programado'], pendiente)
+        self.assertEqual(resultado['esperado'], pendiente)
+        # Lo vencido se espera en la semana actual
+        self.assertGreaterEqual(resultado['periodos'][0]['programado'], vencido)
+        self.assertEqual(
+            [fila['esperado'] for fila in resultado['periodos']],
+            [fila['programado'] for fila in resultado['periodos']],
+        )
+
+    def test_reporte_y_csv(self):
+        self.client.force_login(self.cartera.usuario)
+        url = reverse('prestamos:pronostico_cobranza')
+        respuesta = self.client.get(url, {'granularidad': 'week'})
+        self.assertEqual(len(respuesta.context['pronostico']['periodos']), 13)
+        self.assertLessEqual(respuesta.context['pronostico']['esperado'], respuesta.context['pronostico']['programado'])
+
+        filas = list(csv.reader(io.StringIO(self.client.get(url, {'periodos': 6, 'formato': 'csv'}).content.decode())))
+        self.assertEqual(len(filas), 7)
+        self.assertEqual(filas[0][:4], ['Desde', 'Hasta', 'Vence', 'Esperado'])
+
+
+class AtrasoTests(TestCase):
+    """Antigüedad de la morosidad y PAR con una sola consulta agrupada."""
+
+    def setUp(self):
+        self.cartera = sembrar_cartera(clientes=4, prestamos_por_cliente=1)
+        self.hoy = timezone.localdate()
+        # Un préstamo por tramo: al día, 10, 45 y 100 días de atraso
+        for prestamo, dias, saldo in zip(self.cartera.prestamos, (-5, 10, 45, 100), (100, 200, 300, 400)):
+            Préstamo.objects.filter(pk=prestamo.pk).update(
+                proxima_fecha_vencimiento=self.hoy - timedelta(days=dias),
+                saldo_pendiente_total=Decimal(saldo),
+                frecuencia_pago='Semanal' if dias > 30 else 'Mensual',
+            )
+        cache.clear()
+
+    def test_tramos_y_par(self):
+        with self.assertNumQueries(1):
+            total = antiguedad_cartera(self.hoy)['total']
+        self.assertEqual([tramo['prestamos'] for tramo in total['tramos']], [1, 1, 1, 0, 1])
+        self.assertEqual(total['saldo'], Decimal('1000.00'))
+        self.assertEqual(total['saldo_en_atraso'], Decimal('900.00'))
+        self.assertEqual(total['par30'], Decimal('70.00'))
+        self.assertEqual(total['par90'], Decimal('40.00'))
+
+    def test_agrupado_suma_la_cartera(self):
+        with self.assertNumQueries(1):
+            reporte = antiguedad_cartera(self.hoy, por='frecuencia')
+        self.assertEqual([grupo['grupo'] for grupo in reporte['grupos']], ['Mensual', 'Semanal'])
+        self.assertEqual(reporte['grupos'][1]['par30'], Decimal('100.00'))
+        self.assertEqual(sum(grupo['saldo'] for grupo in reporte['grupos']), reporte['total']['saldo'])
+
+    def test_vista(self):
+        self.client.force_login(self.cartera.usuario)
+        url = reverse('prestamos:reporte_atraso')
+        for por in ('', 'tasa', 'frecuencia', 'creado_por'):
+            with self.subTest(por=por):
+                self.assertContains(self.client.get(url, {'por': por}), 'PAR30')
+        respuesta = self.client.get(url, {'por': 'sucursal'})
+        self.assertIsNone(respuesta.context['por'])
@@ -18,12 +18,31 @@ urlpatterns = [
 
     # URL para registrar un pago
     path('<uuid:pk>/registrar-pago/', views.registrar_pago, name='registrar_pago'),
+
+    # URL para cotizar la cancelación anticipada (JSON, ?fecha=AAAA-MM-DD)
+    path('<uuid:pk>/cancelacion/', views.cancelacion_prestamo, name='cancelacion_prestamo'),
     
     # URL para crear un préstamo
     path('crear/', views.crear_prestamo, name='crear_prestamo'),
     
+    # URL para importar pagos desde un extracto bancario
+    path('importar-pagos/', views.importar_pagos, name='importar_pagos'),
+
+    # URL para exportar (nombre: prestamos, cuotas, pagos o detalles; formato: csv o xlsx)
+    path('exportar/<slug:nombre>.<slug:formato>', views.exportar, name='exportar'),
+
+    # URLs para seguir las tareas de la cola (estado en JSON y archivo de exportación)
+    path('tareas/<int:pk>/', views.tarea, name='tarea'),
+    path('tareas/<int:pk>/estado/', views.estado_tarea, name='estado_tarea'),
+    path('tareas/<int:pk>/descargar/', views.descargar_tarea, name='descargar_tarea'),
+
     # URLs para métodos de pago
     path('reportes/', views.reportes, name='reportes'),
+    path('reportes/serie/', views.serie_reportes, name='serie_reportes'),
+    path('reportes/refrescar/', views.refrescar_reportes, name='refrescar_reportes'),
+    path('reportes/cancelacion/', views.reporte_cancelacion, name='reporte_cancelacion'),
+    path('reportes/pronostico/', views.pronostico_cobranza, name='pronostico_cobranza'),
+    path('reportes/atraso/', views.reporte_atraso, name='reporte_atraso'),
     path('metodos-pago/', views.lista_metodos_pago, name='lista_metodos_pago'),
     path('metodos-pago/crear/', views.crear_metodo_pago, name='crear_metodo_pago'),
     path('metodos-pago/<int:pk>/editar/', views.editar_metodo_pago, name='editar_metodo_pago'),
@@ -1,119 +1,120 @@
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
+from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db import transaction, models
+from django.db.models import Sum
 from django.utils import timezone
-from decimal import Decimal, ROUND_HALF_UP
+from django.core import signing
+from django.core.cache import cache
+from decimal import Decimal
 from .models import Préstamo, Pago, MetodoPago, PlanPago, TasaInteres
-from .forms import PagoForm, PrestamoForm, MetodoPagoForm, TasaInteresForm
+from .forms import PagoForm, PrestamoForm, MetodoPagoForm, TasaInteresForm, ImportarPagosForm, ExportacionForm
+from .cronograma import generar_cronograma
+from .kpis import resumen_dashboard
+from .busqueda import buscar_prestamos
+from . import cache_agregados
+from .cola import encolar
+from .tareas import crear_prestamo_confirmado
 from clientes.models import Cliente
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from core.concurrencia import reunir
+from core.replicas import lectura_en_replica, solo_principal
+from core.paginacion import contar, paginar_keyset
 
 @login_required
-def dashboard(request):
+@lectura_en_replica
+async def dashboard(request):
     """
     Dashboard principal del sistema con estadísticas y resumen.
+    Es async: las consultas del bloque agregado se ejecutan en paralelo
+    (ver core/concurrencia.py).
     """
-    from django.db.models import Sum, Count
-    from django.utils import timezone
-    from datetime import datetime, timedelta
-    
-    # Estadísticas generales
-    total_prestamos = Préstamo.objects.count()
-    prestamos_activos = Préstamo.objects.filter(estado='Activo').count()
-    prestamos_pagados = Préstamo.objects.filter(estado='Pagado').count()
-    total_clientes = Cliente.objects.count()
-    
-    # Montos
-    monto_total_prestado = Préstamo.objects.aggregate(
-        total=Sum('monto_solicitado')
-    )['total'] or 0
-    
-    monto_total_pagado = Pago.objects.aggregate(
-        total=Sum('monto_pagado')
-    )['total'] or 0
-    
-    # Préstamos recientes
-    prestamos_recientes = Préstamo.objects.select_related('cliente', 'tasa_interes').order_by('-fecha_creacion')[:5]
-    
-    # Pagos recientes
-    pagos_recientes = Pago.objects.select_related('prestamo', 'metodo_pago').order_by('-fecha_pago')[:5]
-    
-    # Estadísticas por mes (últimos 6 meses)
-    meses_stats = []
-    for i in range(6):
-        fecha = timezone.now() - timedelta(days=30*i)
-        mes_prestamos = Préstamo.objects.filter(
-            fecha_creacion__year=fecha.year,
-            fecha_creacion__month=fecha.month
-        ).count()
-        mes_pagos = Pago.objects.filter(
-            fecha_pago__year=fecha.year,
-            fecha_pago__month=fecha.month
-        ).count()
-        
-        meses_stats.append({
-            'mes': fecha.strftime('%b %Y'),
-            'prestamos': mes_prestamos,
-            'pagos': mes_pagos
-        })
-    
-    meses_stats.reverse()  # Mostrar del más antiguo al más reciente
-    
-    # Calcular saldo pendiente total sumando los saldos pendientes de todas las cuotas
-    from .models import PlanPago
-    saldo_pendiente_total = PlanPago.objects.aggregate(
-        total=Sum('saldo_pendiente')
-    )['total'] or 0
-    
+    # Bloque agregado en caché (se invalida al cambiar préstamos, pagos o cuotas)
     context = {
         'titulo_pagina': 'Dashboard',
-        'total_prestamos': total_prestamos,
-        'prestamos_activos': prestamos_activos,
-        'prestamos_pagados': prestamos_pagados,
-        'total_clientes': total_clientes,
-        'monto_total_prestado': monto_total_prestado,
-        'monto_total_pagado': monto_total_pagado,
-        'saldo_pendiente_total': saldo_pendiente_total,
-        'prestamos_recientes': prestamos_recientes,
-        'pagos_recientes': pagos_recientes,
-        'meses_stats': meses_stats,
+        **await _obtener_agregado('dashboard', _acontexto_dashboard),
     }
     
-    return render(request, 'prestamos/dashboard.html', context)
+    return await _arender(request, 'prestamos/dashboard.html', context)
+
+async def _arender(request, plantilla, context):
+    """render() para vistas async (la plantilla se renderiza en un hilo)."""
+    # request.user y request.auser() cachean el usuario por separado: se
+    # reutiliza el que ya cargó login_required en vez de consultarlo otra vez
+    request.user = await request.auser()
+    return await sync_to_async(render)(request, plantilla, context)
+
+async def _obtener_agregado(nombre, acalcular):
+    """
+    Bloque agregado desde cache_agregados; si hay que recalcularlo, lo
+    calcula `acalcular` (async) en el event loop de la petición.
+    """
+    return await sync_to_async(cache_agregados.obtener)(nombre, async_to_sync(acalcular))
+
+def _prestamos_recientes():
+    # Evaluados con list() para poder guardarlos en caché
+    return list(Préstamo.objects.select_related('cliente', 'tasa_interes').order_by('-fecha_creacion')[:5])
+
+def _pagos_recientes():
+    return list(Pago.objects.select_related('prestamo__cliente', 'metodo_pago').order_by('-fecha_pago')[:5])
+
+# Consultas independientes del bloque agregado del dashboard
+CONSULTAS_DASHBOARD = {
+    # Indicadores: una sola consulta a la tabla de contadores (ver prestamos/kpis.py)
+    'resumen': resumen_dashboard,
+    'prestamos_recientes': _prestamos_recientes,
+    'pagos_recientes': _pagos_recientes,
+}
+
+def _contexto_dashboard():
+    """Bloque agregado del dashboard (lo que se guarda en caché), consulta por consulta."""
+    return _armar_dashboard({nombre: consulta() for nombre, consulta in CONSULTAS_DASHBOARD.items()})
+
+async def _acontexto_dashboard():
+    """Igual que _contexto_dashboard, con las consultas en paralelo."""
+    return _armar_dashboard(await reunir(CONSULTAS_DASHBOARD))
+
+def _armar_dashboard(resultados):
+    return {
+        'prestamos_recientes': resultados['prestamos_recientes'],
+        'pagos_recientes': resultados['pagos_recientes'],
+        **resultados['resumen'], # total_prestamos, prestamos_activos, ..., meses_stats
+    }
+
+# Préstamos por página en lista_prestamos
+PRESTAMOS_POR_PAGINA = 15
 
 @login_required # Protege la vista, requiere que el usuario esté logueado
+@lectura_en_replica
 def lista_prestamos(request):
     """
     Muestra una lista paginada de todos los préstamos con filtro de búsqueda.
+    La paginación es por llave (fecha_emision, id) con cursores opacos, y el
+    total es estimado o acotado (ver core/paginacion.py), así las páginas
+    profundas cuestan lo mismo que la primera.
     """
     # Obtener parámetros de búsqueda
     query = request.GET.get('q')
     
     # Optimizamos cargando el cliente relacionado en la misma consulta
-    prestamos_list = Préstamo.objects.select_related('cliente', 'tasa_interes').order_by('-fecha_emision')
+    prestamos_list = Préstamo.objects.select_related('cliente', 'tasa_interes')
+    orden = ('-fecha_emision', '-id')
     
-    # Aplicar filtro de búsqueda si existe
+    # Aplicar filtro de búsqueda si existe (número, id o texto normalizado
+    # del cliente; ver prestamos/busqueda.py). Los más relevantes primero
     if query:
-        prestamos_list = prestamos_list.filter(
-            models.Q(cliente__nombres__icontains=query) |
-            models.Q(cliente__apellidos__icontains=query) |
-            models.Q(cliente__numero_documento__icontains=query) |
-            models.Q(id__icontains=query)
-        )
-    
-    # Configurar paginación
-    paginator = Paginator(prestamos_list, 15)  # Mostrar 15 préstamos por página
-    page = request.GET.get('page')
+        prestamos_list = buscar_prestamos(prestamos_list, query)
+        orden = ('-rango', *orden)
     
-    try:
-        prestamos = paginator.page(page)
-    except PageNotAnInteger:
-        # Si la página no es un entero, entregar la primera página
-        prestamos = paginator.page(1)
-    except EmptyPage:
-        # Si la página está fuera de rango, entregar la última página
-        prestamos = paginator.page(paginator.num_pages)
+    prestamos = paginar_keyset(
+        prestamos_list,
+        cursor=request.GET.get('cursor'),
+        orden=orden,
+        tamano=PRESTAMOS_POR_PAGINA,
+    )
+    contar(prestamos, prestamos_list, 'prestamos:lista')
     
     context = {
         'prestamos': prestamos,
@@ -122,46 +123,51 @@ def lista_prestamos(request):
     }
     return render(request, 'prestamos/lista_prestamos.html', context)
 
+# Segundos que se conservan los fragmentos del detalle (las versiones
+# anteriores dejan de usarse solas, esto solo libera memoria)
+CACHE_DETALLE_SEGUNDOS = getattr(settings, 'PRESTAMOS_CACHE_DETALLE', 24 * 3600)
+
 @login_required # Protege también la vista de detalle
 def detalle_prestamo(request, pk):
     """
     Muestra los detalles de un préstamo específico, incluyendo su plan de pagos.
     'pk' es la llave primaria (el UUID del préstamo) que viene de la URL.
+
+    El plan de pagos, el resumen y el bloque del cliente son fragmentos
+    cacheados por préstamo y versión (prestamo.version sube con cada pago
+    o cambio de estado). Las cuotas y direcciones se pasan como querysets
+    perezosos: solo se consultan si hay que volver a renderizar, así que
+    ver de nuevo un préstamo sin cambios cuesta una sola consulta.
     """
     # Usamos get_object_or_404 para manejar el caso de que el ID no exista
-    # select_related('cliente', 'tasa_interes', 'creado_por') optimiza la carga de objetos relacionados (uno a uno o muchos a uno)
-    # prefetch_related('plan_pagos') optimiza la carga de todas las cuotas asociadas (uno a muchos o muchos a muchos)
+    # select_related(...) optimiza la carga de objetos relacionados (uno a uno o muchos a uno)
     prestamo = get_object_or_404(
-        Préstamo.objects.select_related('cliente', 'tasa_interes', 'creado_por')
-                         .prefetch_related('plan_pagos'), # Carga el plan de pagos eficientemente
+        Préstamo.objects.select_related('cliente__tipo_documento', 'tasa_interes', 'creado_por'),
         pk=pk
     )
 
-    # Calcular estadísticas del préstamo
-    cuotas = prestamo.plan_pagos.all()
-    cuotas_pagadas = cuotas.filter(estado='Pagada').count()
-    total_pagado = sum(cuota.monto_pagado for cuota in cuotas)
-    # El saldo pendiente debe calcularse sumando los saldos pendientes de cada cuota
-    # (ya que los montos pueden haber cambiado por pagos anticipados con intereses reducidos)
-    saldo_pendiente = sum(cuota.saldo_pendiente for cuota in cuotas)
-    # Calcular intereses reales pagados (pueden ser menores si hubo pagos anticipados)
-    total_intereses_real = sum(cuota.monto_interes for cuota in cuotas)
-    # Calcular monto total real a pagar (sumando el monto_total_cuota de cada cuota)
-    monto_total_real = sum(cuota.monto_total_cuota for cuota in cuotas)
-    
+    # Los totales del préstamo están desnormalizados en el propio préstamo
+    # (se mantienen al registrar pagos; ver prestamos/saldos.py), así que
+    # no hace falta sumar las cuotas
     # Pasamos el objeto 'prestamo' (que ahora incluye el plan de pagos) a la plantilla
     context = {
         'prestamo': prestamo,
-        'cuotas_pagadas': cuotas_pagadas,
-        'total_pagado': total_pagado,
-        'saldo_pendiente': saldo_pendiente,
-        'total_intereses_real': total_intereses_real,
-        'monto_total_real': monto_total_real,
+        'cuotas_pagadas': prestamo.cuotas_pagadas,
+        'total_pagado': prestamo.total_pagado,
+        'saldo_pendiente': prestamo.saldo_pendiente_total,
+        # Intereses reales (pueden ser menores si hubo pagos anticipados)
+        'total_intereses_real': prestamo.intereses_reales,
+        'monto_total_real': prestamo.monto_total_real,
+        # Solo se evalúan si el fragmento no está en caché
+        'cuotas': prestamo.plan_pagos.order_by('numero_cuota'),
+        'direcciones': prestamo.cliente.direcciones.all(),
+        'cache_detalle_segundos': CACHE_DETALLE_SEGUNDOS,
         'titulo_pagina': f"Detalle Préstamo #{prestamo.numero_prestamo}" # Título para base.html
         }
     return render(request, 'prestamos/detalle_prestamo.html', context)
 
 @login_required
+@solo_principal # Lee el saldo que va a modificar: nunca de la réplica
 def registrar_pago(request, pk):
     """
     Permite registrar un pago para un préstamo específico.
@@ -171,8 +177,8 @@ def registrar_pago(request, pk):
         pk=pk
     )
     
-    # Verificar que el préstamo esté activo
-    if prestamo.estado != 'Activo':
+    # Verificar que el préstamo esté activo (o en atraso, para que pueda ponerse al día)
+    if prestamo.estado not in ('Activo', 'En Atraso'):
         messages.error(request, f'No se pueden registrar pagos para préstamos en estado: {prestamo.get_estado_display()}')
         return redirect('prestamos:detalle_prestamo', pk=prestamo.id)
     
@@ -203,17 +209,9 @@ def registrar_pago(request, pk):
                     # Establecer los IDs de cuotas como atributo temporal para que save() los use
                     pago._cuotas_ids = cuotas_seleccionadas
                     # Guardar el pago - save() leerá _cuotas_ids y distribuirá solo entre esas cuotas
+                    # (y marcará el préstamo como 'Pagado' si ya no quedan cuotas pendientes)
                     pago.save()
                     
-                    # Verificar si el préstamo está completamente pagado
-                    cuotas_pendientes = PlanPago.objects.filter(
-                        prestamo=prestamo
-                    ).exclude(estado='Pagada').exists()
-                    
-                    if not cuotas_pendientes:
-                        # Actualizar el estado del préstamo a 'Pagado'
-                        Préstamo.objects.filter(pk=prestamo.pk).update(estado='Pagado')
-                    
                     messages.success(request, f'Pago de S/ {monto_total:.2f} registrado exitosamente.')
                     return redirect('prestamos:detalle_prestamo', pk=prestamo.id)
                     
@@ -242,6 +240,65 @@ def registrar_pago(request, pk):
     return render(request, 'prestamos/registrar_pago.html', context)
 
 
+@login_required
+def cancelacion_prestamo(request, pk):
+    """
+    Cotización de la cancelación anticipada en JSON, para caja: lo que hay
+    que pagar a ?fecha= (AAAA-MM-DD, hoy por defecto) para cancelar el
+    préstamo, con el detalle por cuota. No registra nada (ver
+    prestamos/cancelacion.py). Se lee de la principal: refleja el último pago.
+    """
+    from datetime import date
+    from .cancelacion import cotizar_cancelacion
+
+    prestamo = get_object_or_404(Préstamo.objects.only('numero_prestamo', 'fecha_emision', 'estado'), pk=pk)
+    try:
+        fecha = date.fromisoformat(request.GET['fecha']) if request.GET.get('fecha') else timezone.localdate()
+    except ValueError:
+        return JsonResponse({'error': 'La fecha debe tener el formato AAAA-MM-DD'}, status=400)
+    if fecha < prestamo.fecha_emision:
+        return JsonResponse({'error': 'La fecha no puede ser anterior a la emisión del préstamo'}, status=400)
+
+    cotizacion = cotizar_cancelacion(prestamo, fecha)
+    return JsonResponse({'estado': prestamo.estado, **cotizacion.como_dict()})
+
+
+# Los términos de la vista previa viajan firmados hasta la confirmación
+SALT_TOKEN_PRESTAMO = 'prestamos.crear_prestamo'
+VIGENCIA_TOKEN_PRESTAMO = 60 * 60  # 1 hora para confirmar
+# Cuánto tiempo se memoriza un cronograma de vista previa en la caché
+VIGENCIA_CACHE_VISTA_PREVIA = 60 * 15
+# Desde cuántas cuotas el préstamo se crea en la cola de tareas
+CUOTAS_EN_COLA = getattr(settings, 'PRESTAMOS_CUOTAS_EN_COLA', 120)
+
+
+def _cronograma_vista_previa(monto_solicitado, numero_cuotas, frecuencia_pago, tasa_interes, fecha_primer_pago):
+    """
+    Devuelve el cronograma de la vista previa, memorizado en la caché por
+    (monto, cuotas, frecuencia, tasa, fecha del primer pago). La clave incluye
+    el valor y período de la tasa para no servir un plan desactualizado si la
+    tasa se edita.
+    """
+    clave = 'prestamos:vista_previa:' + ':'.join(str(parte) for parte in (
+        monto_solicitado, numero_cuotas, frecuencia_pago,
+        tasa_interes.pk, tasa_interes.tipo_tasa, tasa_interes.valor_porcentaje, tasa_interes.periodo,
+        fecha_primer_pago.isoformat(),
+    ))
+    cronograma = cache.get(clave)
+    if cronograma is None:
+        cronograma = generar_cronograma(
+            monto_solicitado=monto_solicitado,
+            numero_cuotas=numero_cuotas,
+            frecuencia_pago=frecuencia_pago,
+            fecha_primer_pago=fecha_primer_pago,
+            valor_porcentaje=tasa_interes.valor_porcentaje,
+            periodo=tasa_interes.periodo,
+            tipo_tasa=tasa_interes.tipo_tasa,
+        )
+        cache.set(clave, cronograma, VIGENCIA_CACHE_VISTA_PREVIA)
+    return cronograma
+
+
 @login_required
 def crear_prestamo(request):
     """
@@ -250,145 +307,87 @@ def crear_prestamo(request):
     # Verificar si estamos en el paso de confirmación
     if request.method == 'POST' and 'confirmar' in request.POST:
         # Si viene del formulario de confirmación, crear el préstamo
-        # Recuperamos los datos del formulario original desde la sesión
-        if 'prestamo_data' in request.session:
-            try:
-                from datetime import date
-                prestamo_data = request.session['prestamo_data']
-                with transaction.atomic():
-                    # Convertir strings ISO de vuelta a objetos date
-                    fecha_emision = date.fromisoformat(prestamo_data['fecha_emision']) if isinstance(prestamo_data['fecha_emision'], str) else prestamo_data['fecha_emision']
-                    fecha_primer_pago = date.fromisoformat(prestamo_data['fecha_primer_pago']) if isinstance(prestamo_data['fecha_primer_pago'], str) else prestamo_data['fecha_primer_pago']
-                    
-                    # Crear el préstamo con los datos guardados
-                    from .models import Préstamo
-                    prestamo = Préstamo.objects.create(
-                        cliente_id=prestamo_data['cliente_id'],
-                        tasa_interes_id=prestamo_data['tasa_interes_id'],
-                        monto_solicitado=Decimal(str(prestamo_data['monto_solicitado'])),
-                        numero_cuotas=prestamo_data['numero_cuotas'],
-                        frecuencia_pago=prestamo_data['frecuencia_pago'],
-                        fecha_emision=fecha_emision,
-                        fecha_primer_pago=fecha_primer_pago,
-                        garantia_descripcion=prestamo_data.get('garantia_descripcion', ''),
-                        creado_por=request.user
-                    )
-                    
-                    # Limpiar la sesión
-                    del request.session['prestamo_data']
-                    
-                    messages.success(request, f'Préstamo de S/ {prestamo.monto_solicitado:.2f} creado exitosamente para {prestamo.cliente.nombre_completo}.')
-                    return redirect('prestamos:detalle_prestamo', pk=prestamo.id)
-                    
-            except Exception as e:
-                messages.error(request, f'Error al crear el préstamo: {str(e)}')
-        else:
+        # Recuperamos los términos del préstamo desde el token firmado de la vista previa
+        token = request.POST.get('token')
+        if not token:
             messages.error(request, 'Error: No se encontraron los datos del préstamo.')
             return redirect('prestamos:crear_prestamo')
+
+        try:
+            prestamo_data = signing.loads(
+                token, salt=SALT_TOKEN_PRESTAMO, max_age=VIGENCIA_TOKEN_PRESTAMO
+            )
+        except signing.SignatureExpired:
+            messages.error(request, 'La vista previa expiró. Vuelva a generar el plan de pagos.')
+            return redirect('prestamos:crear_prestamo')
+        except signing.BadSignature:
+            messages.error(request, 'Error: Los datos del préstamo no son válidos.')
+            return redirect('prestamos:crear_prestamo')
+
+        # Préstamos largos: el plan de pagos se genera en la cola y la
+        # página de seguimiento lleva al detalle cuando termina
+        if prestamo_data['numero_cuotas'] >= CUOTAS_EN_COLA:
+            tarea = encolar(
+                'prestamos.crear_prestamo', {'datos': prestamo_data}, creado_por=request.user, max_intentos=1
+            )
+            messages.info(request, f'El préstamo de {prestamo_data["numero_cuotas"]} cuotas se está generando.')
+            return redirect('prestamos:tarea', pk=tarea.pk)
+
+        try:
+            # Crear el préstamo con los datos firmados
+            prestamo = crear_prestamo_confirmado(prestamo_data, request.user.pk)
+            messages.success(request, f'Préstamo de S/ {prestamo.monto_solicitado:.2f} creado exitosamente para {prestamo.cliente.nombre_completo}.')
+            return redirect('prestamos:detalle_prestamo', pk=prestamo.id)
+
+        except Exception as e:
+            messages.error(request, f'Error al crear el préstamo: {str(e)}')
+            return redirect('prestamos:crear_prestamo')
     
     # Verificar si estamos en el paso de vista previa
     elif request.method == 'POST' and 'preview' in request.POST:
         form = PrestamoForm(request.POST)
         if form.is_valid():
-            # Guardamos los datos en la sesión para confirmar después
-            # Convertir fechas a strings ISO para evitar problemas de serialización JSON
-            from datetime import date
-            fecha_emision = form.cleaned_data['fecha_emision']
-            fecha_primer_pago = form.cleaned_data['fecha_primer_pago']
-            
-            prestamo_data = {
-                'cliente_id': form.cleaned_data['cliente'].id,
-                'tasa_interes_id': form.cleaned_data['tasa_interes'].id,
-                'monto_solicitado': float(form.cleaned_data['monto_solicitado']),
-                'numero_cuotas': form.cleaned_data['numero_cuotas'],
-                'frecuencia_pago': form.cleaned_data['frecuencia_pago'],
-                'fecha_emision': fecha_emision.isoformat() if isinstance(fecha_emision, date) else str(fecha_emision),
-                'fecha_primer_pago': fecha_primer_pago.isoformat() if isinstance(fecha_primer_pago, date) else str(fecha_primer_pago),
-                'garantia_descripcion': form.cleaned_data.get('garantia_descripcion', ''),
-            }
-            request.session['prestamo_data'] = prestamo_data
-            
-            # Calcular el plan de pagos para mostrar en vista previa
-            from .models import TasaInteres
-            from dateutil.relativedelta import relativedelta
-            
             tasa_interes = form.cleaned_data['tasa_interes']
             monto_solicitado = form.cleaned_data['monto_solicitado']
             numero_cuotas = form.cleaned_data['numero_cuotas']
             frecuencia_pago = form.cleaned_data['frecuencia_pago']
             fecha_primer_pago = form.cleaned_data['fecha_primer_pago']
-            
-            # Calcular intereses y totales
-            if tasa_interes.tipo_tasa == 'Simple':
-                tasa_porcentaje = tasa_interes.valor_porcentaje / Decimal('100')
-                
-                # Ajustar la tasa según el período
-                if tasa_interes.periodo == 'Anual':
-                    if frecuencia_pago == 'Mensual':
-                        tasa_ajustada = tasa_porcentaje / Decimal('12')
-                    elif frecuencia_pago == 'Quincenal':
-                        tasa_ajustada = tasa_porcentaje / Decimal('24')
-                    elif frecuencia_pago == 'Semanal':
-                        tasa_ajustada = tasa_porcentaje / Decimal('52')
-                    else:
-                        tasa_ajustada = tasa_porcentaje
-                elif tasa_interes.periodo == 'Mensual':
-                    if frecuencia_pago == 'Quincenal':
-                        tasa_ajustada = tasa_porcentaje / Decimal('2')
-                    elif frecuencia_pago == 'Semanal':
-                        tasa_ajustada = tasa_porcentaje / Decimal('4')
-                    else:
-                        tasa_ajustada = tasa_porcentaje
-                else:
-                    tasa_ajustada = tasa_porcentaje
-                
-                # Calcular interés por cuota
-                interes_por_cuota = (monto_solicitado * tasa_ajustada).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-                monto_total_interes = interes_por_cuota * numero_cuotas
-                monto_total_pagar = monto_solicitado + monto_total_interes
-                
-                # Generar plan de pagos
-                from .models import PlanPago
-                capital_por_cuota = (monto_solicitado / numero_cuotas).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-                plan_pagos = []
-                
-                fecha_cuota = fecha_primer_pago
-                total_capital_asignado = Decimal('0.00')
-                total_interes_asignado = Decimal('0.00')
-                
-                for i in range(1, numero_cuotas + 1):
-                    if i == numero_cuotas:
-                        capital_cuota = monto_solicitado - total_capital_asignado
-                        interes_cuota = monto_total_interes - total_interes_asignado
-                    else:
-                        capital_cuota = capital_por_cuota
-                        interes_cuota = interes_por_cuota
-                        total_capital_asignado += capital_cuota
-                        total_interes_asignado += interes_cuota
-                    
-                    total_cuota = capital_cuota + interes_cuota
-                    plan_pagos.append({
-                        'numero_cuota': i,
-                        'fecha_vencimiento': fecha_cuota,
-                        'capital': capital_cuota,
-                        'interes': interes_cuota,
-                        'total': total_cuota
-                    })
-                    
-                    # Calcular siguiente fecha
-                    if frecuencia_pago == 'Mensual':
-                        fecha_cuota += relativedelta(months=1)
-                    elif frecuencia_pago == 'Quincenal':
-                        fecha_cuota += relativedelta(weeks=2)
-                    elif frecuencia_pago == 'Semanal':
-                        fecha_cuota += relativedelta(weeks=1)
-            
+
+            # Los términos viajan firmados en el formulario de confirmación
+            # (sin escribir en la sesión de la base de datos)
+            prestamo_data = {
+                'cliente_id': form.cleaned_data['cliente'].id,
+                'tasa_interes_id': tasa_interes.id,
+                'monto_solicitado': str(monto_solicitado),
+                'numero_cuotas': numero_cuotas,
+                'frecuencia_pago': frecuencia_pago,
+                'fecha_emision': form.cleaned_data['fecha_emision'].isoformat(),
+                'fecha_primer_pago': fecha_primer_pago.isoformat(),
+                'garantia_descripcion': form.cleaned_data.get('garantia_descripcion', ''),
+            }
+            token = signing.dumps(prestamo_data, salt=SALT_TOKEN_PRESTAMO, compress=True)
+
+            try:
+                cronograma = _cronograma_vista_previa(
+                    monto_solicitado, numero_cuotas, frecuencia_pago, tasa_interes, fecha_primer_pago
+                )
+            except ValueError as e:
+                form.add_error('tasa_interes', str(e))
+                context = {
+                    'form': form,
+                    'titulo_pagina': 'Crear Nuevo Préstamo'
+                }
+                return render(request, 'prestamos/crear_prestamo.html', context)
+
             context = {
                 'form': form,
-                'plan_pagos': plan_pagos,
+                'token': token,
+                'cliente': form.cleaned_data['cliente'],
+                'tasa_interes': tasa_interes,
+                'plan_pagos': cronograma['cuotas'],
                 'monto_solicitado': monto_solicitado,
-                'monto_total_interes': monto_total_interes,
-                'monto_total_pagar': monto_total_pagar,
+                'monto_total_interes': cronograma['monto_total_interes'],
+                'monto_total_pagar': cronograma['monto_total_pagar'],
                 'numero_cuotas': numero_cuotas,
                 'titulo_pagina': 'Vista Previa - Plan de Pagos'
             }
@@ -416,86 +415,454 @@ def crear_prestamo(request):
 
 
 @login_required
-def reportes(request):
+@lectura_en_replica
+async def reportes(request):
     """
     Vista para mostrar reportes básicos del sistema.
+    Lee las vistas materializadas de prestamos/reportes.py (refrescadas con
+    el comando refrescar_reportes), no las tablas de préstamos y pagos.
+    Como el dashboard, es async y hace sus consultas en paralelo.
     """
-    from django.db.models import Sum, Count, Avg
-    from datetime import datetime, timedelta
-    
-    # Estadísticas generales
-    total_prestamos = Préstamo.objects.count()
-    prestamos_activos = Préstamo.objects.filter(estado='Activo').count()
-    prestamos_vencidos = Préstamo.objects.filter(estado='En Atraso').count()
-    
-    # Montos
-    monto_total_prestado = Préstamo.objects.aggregate(
-        total=Sum('monto_solicitado')
-    )['total'] or 0
-    
-    monto_total_pagado = Pago.objects.aggregate(
-        total=Sum('monto_pagado')
-    )['total'] or 0
-    
-    # Calcular saldo pendiente total sumando los saldos pendientes de todas las cuotas
-    from .models import PlanPago
-    saldo_pendiente_total = PlanPago.objects.aggregate(
-        total=Sum('saldo_pendiente')
-    )['total'] or 0
-    
-    # Calcular intereses reales pagados sumando los intereses de todas las cuotas
-    total_intereses_real = PlanPago.objects.aggregate(
-        total=Sum('monto_interes')
-    )['total'] or 0
-    
-    # Préstamos por estado
-    prestamos_por_estado = Préstamo.objects.values('estado').annotate(
-        cantidad=Count('id'),
-        monto_total=Sum('monto_solicitado')
-    ).order_by('estado')
-    
-    # Top 5 clientes con más préstamos
-    top_clientes = Cliente.objects.annotate(
-        total_prestamos=Count('prestamos'),
-        monto_total=Sum('prestamos__monto_solicitado')
-    ).order_by('-total_prestamos')[:5]
-    
-    # Préstamos por mes (últimos 6 meses)
-    meses_stats = []
-    for i in range(6):
-        fecha = timezone.now() - timedelta(days=30*i)
-        mes_prestamos = Préstamo.objects.filter(
-            fecha_creacion__year=fecha.year,
-            fecha_creacion__month=fecha.month
-        ).count()
-        mes_monto = Préstamo.objects.filter(
-            fecha_creacion__year=fecha.year,
-            fecha_creacion__month=fecha.month
-        ).aggregate(total=Sum('monto_solicitado'))['total'] or 0
-        
-        meses_stats.append({
-            'mes': fecha.strftime('%b %Y'),
-            'prestamos': mes_prestamos,
-            'monto': mes_monto
-        })
-    
-    meses_stats.reverse()
-    
     context = {
         'titulo_pagina': 'Reportes del Sistema',
-        'total_prestamos': total_prestamos,
-        'prestamos_activos': prestamos_activos,
-        'prestamos_vencidos': prestamos_vencidos,
-        'monto_total_prestado': monto_total_prestado,
-        'monto_total_pagado': monto_total_pagado,
-        'saldo_pendiente_total': saldo_pendiente_total,
-        'total_intereses_real': total_intereses_real,
-        'prestamos_por_estado': prestamos_por_estado,
-        'top_clientes': top_clientes,
-        'meses_stats': meses_stats,
+        **await _obtener_agregado('reportes', _acontexto_reportes),
     }
     
-    return render(request, 'prestamos/reportes.html', context)
+    return await _arender(request, 'prestamos/reportes.html', context)
+
+def _reporte_por_estado():
+    from .models import ReporteEstado
+    return list(ReporteEstado.objects.values(
+        'estado', 'prestamos', 'monto_prestado', 'saldo_pendiente', 'intereses_reales'
+    ))
+
+def _reporte_monto_pagado():
+    from .models import ReporteCobranza
+    return ReporteCobranza.objects.aggregate(total=Sum('monto_cobrado'))['total'] or 0
+
+def _reporte_top_clientes():
+    from .models import ReporteCliente
+    # Top 5 clientes con más préstamos
+    top_clientes = []
+    for fila in ReporteCliente.objects.select_related('cliente').order_by('-prestamos', '-monto_prestado')[:5]:
+        cliente = fila.cliente
+        cliente.total_prestamos = fila.prestamos
+        cliente.monto_total = fila.monto_prestado
+        top_clientes.append(cliente)
+    return top_clientes
+
+def _reporte_meses():
+    from dateutil.relativedelta import relativedelta
+    from .reportes import serie_temporal
+    # Préstamos por mes (últimos 6 meses calendario, por fecha de emisión)
+    hoy = timezone.localdate()
+    desde = hoy.replace(day=1) - relativedelta(months=5)
+    return [
+        {
+            'mes': fila['periodo'].strftime('%b %Y'),
+            'prestamos': fila['prestamos'],
+            'monto': fila['monto_prestado'],
+        }
+        for fila in serie_temporal(desde, hoy, 'month')
+    ]
+
+# Consultas independientes del bloque agregado de reportes (todas leen las
+# vistas materializadas, así que solo se hacen si ya se refrescaron alguna vez)
+CONSULTAS_REPORTES = {
+    'por_estado': _reporte_por_estado,
+    'monto_pagado': _reporte_monto_pagado,
+    'top_clientes': _reporte_top_clientes,
+    'meses': _reporte_meses,
+}
+
+# Bloque de reportes mientras las vistas no se han refrescado
+REPORTES_SIN_REFRESCAR = {
+    'por_estado': [],
+    'monto_pagado': 0,
+    'top_clientes': [],
+    'meses': [],
+}
+
+def _contexto_reportes():
+    """Bloque agregado de reportes (lo que se guarda en caché), consulta por consulta."""
+    from .reportes import ultima_actualizacion
+
+    actualizado = ultima_actualizacion()
+    if actualizado is None:
+        return _armar_reportes(None, dict(REPORTES_SIN_REFRESCAR))
+    return _armar_reportes(actualizado, {nombre: consulta() for nombre, consulta in CONSULTAS_REPORTES.items()})
+
+async def _acontexto_reportes():
+    """Igual que _contexto_reportes, con las consultas en paralelo."""
+    from .reportes import ultima_actualizacion
+
+    actualizado = await sync_to_async(ultima_actualizacion)()
+    if actualizado is None:
+        return _armar_reportes(None, dict(REPORTES_SIN_REFRESCAR))
+    return _armar_reportes(actualizado, await reunir(CONSULTAS_REPORTES))
+
+def _armar_reportes(actualizado, resultados):
+    # Préstamos por estado (y totales de la cartera a partir de ellos)
+    prestamos_por_estado = resultados['por_estado']
+    for fila in prestamos_por_estado:
+        # Nombres que usa la plantilla
+        fila['cantidad'] = fila['prestamos']
+        fila['monto_total'] = fila['monto_prestado']
+    por_estado = {fila['estado']: fila for fila in prestamos_por_estado}
+
+    return {
+        # Estadísticas generales
+        'total_prestamos': sum(fila['prestamos'] for fila in prestamos_por_estado),
+        'prestamos_activos': por_estado.get('Activo', {}).get('prestamos', 0),
+        'prestamos_vencidos': por_estado.get('En Atraso', {}).get('prestamos', 0),
+        # Montos
+        'monto_total_prestado': sum(fila['monto_prestado'] for fila in prestamos_por_estado),
+        'monto_total_pagado': resultados['monto_pagado'],
+        'saldo_pendiente_total': sum(fila['saldo_pendiente'] for fila in prestamos_por_estado),
+        'total_intereses_real': sum(fila['intereses_reales'] for fila in prestamos_por_estado),
+        'prestamos_por_estado': prestamos_por_estado,
+        'top_clientes': resultados['top_clientes'],
+        'meses_stats': resultados['meses'],
+        'actualizado': actualizado,
+    }
+
+@login_required
+def refrescar_reportes(request):
+    """Encola el refresco de las vistas de reportes (una sola vez aunque se pida varias)."""
+    if request.method != 'POST':
+        return redirect('prestamos:reportes')
+    tarea = encolar('prestamos.refrescar_reportes', creado_por=request.user, unica=True)
+    return redirect('prestamos:tarea', pk=tarea.pk)
+
+@login_required
+@lectura_en_replica
+def serie_reportes(request):
+    """
+    Serie temporal de la cartera en JSON: originaciones, cobranzas e
+    intereses entre ?desde= y ?hasta= (AAAA-MM-DD), agrupados por
+    ?granularidad= day, week o month. Si las vistas todavía no se
+    refrescaron, "actualizado" es null y la serie viene vacía.
+    """
+    from datetime import date
+    from .reportes import GRANULARIDADES, serie_temporal, ultima_actualizacion
+
+    hoy = timezone.localdate()
+    granularidad = request.GET.get('granularidad', 'month')
+    if granularidad not in GRANULARIDADES:
+        return JsonResponse(
+            {'error': f'Granularidad no válida. Use una de: {", ".join(GRANULARIDADES)}'}, status=400
+        )
+    try:
+        hasta = date.fromisoformat(request.GET['hasta']) if request.GET.get('hasta') else hoy
+        desde = date.fromisoformat(request.GET['desde']) if request.GET.get('desde') else hasta.replace(month=1, day=1)
+    except ValueError:
+        return JsonResponse({'error': 'Las fechas deben tener el formato AAAA-MM-DD'}, status=400)
+    if desde > hasta:
+        return JsonResponse({'error': '"desde" no puede ser posterior a "hasta"'}, status=400)
+    if granularidad in ('day', 'dia') and (hasta - desde).days > 366 * 5:
+        return JsonResponse({'error': 'Rango demasiado amplio para granularidad diaria (máximo 5 años)'}, status=400)
+
+    actualizado = ultima_actualizacion()
+    return JsonResponse({
+        'desde': desde,
+        'hasta': hasta,
+        'granularidad': granularidad,
+        'actualizado': actualizado,
+        'serie': serie_temporal(desde, hasta, granularidad) if actualizado else [],
+    })
+
+
+# Préstamos por página en el reporte de cancelación
+COTIZACIONES_POR_PAGINA = 50
+
+@login_required
+@lectura_en_replica
+def reporte_cancelacion(request):
+    """
+    Cuánto cancelaría cada préstamo cobrable a ?fecha= (AAAA-MM-DD: hoy o
+    fin de mes, ver cancelacion.fechas_de_reporte) y los totales de la
+    cartera. Solo se cotizan los préstamos de la página (por llave
+    (numero_prestamo, id), ver core/paginacion.py). Los totales recorren
+    toda la cartera: los calcula la tarea prestamos.totales_cancelacion y
+    la vista muestra el último valor en caché mientras tanto.
+    """
+    from datetime import date
+    from .cancelacion import cotizar_cartera, fechas_de_reporte, prestamos_por_cancelar
+
+    fechas = fechas_de_reporte()
+    fecha = fechas[0]
+    if request.GET.get('fecha'):
+        try:
+            fecha = date.fromisoformat(request.GET['fecha'])
+        except ValueError:
+            fecha = None
+        if fecha not in fechas:
+            messages.error(request, 'La fecha debe ser hoy o el fin de este mes o del siguiente')
+            fecha = fechas[0]
+
+    pagina = paginar_keyset(
+        prestamos_por_cancelar().only('pk', 'numero_prestamo'),
+        cursor=request.GET.get('cursor'),
+        orden=('numero_prestamo', 'id'),
+        tamano=COTIZACIONES_POR_PAGINA,
+    )
+    cotizaciones = []
+    if pagina:
+        # cotizar_cartera devuelve en orden de id: se reordena como la página
+        por_prestamo = {
+            cotizacion.prestamo_id: cotizacion
+            for cotizacion in cotizar_cartera(
+                fecha, prestamos=Préstamo.objects.filter(pk__in=[prestamo.pk for prestamo in pagina])
+            )
+        }
+        cotizaciones = [
+            por_prestamo[prestamo.pk] for prestamo in pagina
+            if prestamo.pk in por_prestamo and por_prestamo[prestamo.pk].total > 0
+        ]
+
+    totales, al_dia = cache_agregados.consultar(f'cancelacion:{fecha.isoformat()}')
+    if not al_dia:
+        encolar('prestamos.totales_cancelacion', {'fecha': fecha.isoformat()}, unica=True)
+    context = {
+        'titulo_pagina': 'Cancelación Anticipada de la Cartera',
+        'fecha': fecha,
+        'fechas': fechas,
+        'totales': totales,
+        'totales_al_dia': al_dia,
+        'pagina': pagina,
+        'cotizaciones': cotizaciones,
+    }
+    return render(request, 'prestamos/reporte_cancelacion.html', context)
+
+
+@login_required
+@lectura_en_replica
+def reporte_atraso(request):
+    """
+    Antigüedad de la morosidad: préstamos y saldo por tramo de días de
+    atraso, con PAR30 y PAR90, de toda la cartera y por ?por= tasa,
+    frecuencia o creado_por (ver prestamos/atraso.py).
+    """
+    from .atraso import DIMENSIONES, antiguedad_cartera
+
+    por = request.GET.get('por') or None
+    if por is not None and por not in DIMENSIONES:
+        messages.error(request, f'Agrupación no válida. Use una de: {", ".join(DIMENSIONES)}')
+        por = None
+
+    hoy = timezone.localdate()
+    context = {
+        'titulo_pagina': 'Antigüedad de la Morosidad',
+        'reporte': cache_agregados.obtener(
+            f'atraso:{por or "cartera"}:{hoy.isoformat()}', lambda: antiguedad_cartera(hoy, por)
+        ),
+        'por': por,
+        'dimensiones': [('tasa', 'Tasa de interés'), ('frecuencia', 'Frecuencia de pago'), ('creado_por', 'Creado por')],
+    }
+    return render(request, 'prestamos/reporte_atraso.html', context)
+
+
+# Máximo de períodos del pronóstico de cobranza
+MAX_PERIODOS_PRONOSTICO = 104
+
+@login_required
+@lectura_en_replica
+def pronostico_cobranza(request):
+    """
+    Cobranza esperada por semana o mes (?granularidad=week o month,
+    ?periodos=N) según las curvas por tramo de atraso de
+    prestamos/pronostico.py. Con ?formato=csv descarga la tabla.
+    """
+    import csv
+    from django.http import HttpResponse
+    from .pronostico import GRANULARIDADES, pronosticar
+
+    granularidad = request.GET.get('granularidad', 'month')
+    if granularidad not in GRANULARIDADES:
+        messages.error(request, f'Granularidad no válida. Use una de: {", ".join(GRANULARIDADES)}')
+        granularidad = 'month'
+    try:
+        periodos = int(request.GET.get('periodos') or GRANULARIDADES[granularidad])
+    except ValueError:
+        periodos = 0
+    if not 1 <= periodos <= MAX_PERIODOS_PRONOSTICO:
+        messages.error(request, f'Los períodos deben estar entre 1 y {MAX_PERIODOS_PRONOSTICO}')
+        periodos = GRANULARIDADES[granularidad]
+
+    # Se invalida con cada pago, como el dashboard (ver cache_agregados)
+    hoy = timezone.localdate()
+    pronostico = cache_agregados.obtener(
+        f'pronostico:{granularidad}:{periodos}:{hoy.isoformat()}',
+        lambda: pronosticar(hoy, granularidad, periodos),
+    )
+
+    if request.GET.get('formato') == 'csv':
+        response = HttpResponse(content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="pronostico_cobranza_{granularidad}_{hoy:%Y%m%d}.csv"'
+        escritor = csv.writer(response)
+        escritor.writerow(['Desde', 'Hasta', 'Vence', 'Esperado', *pronostico['tramos']])
+        for fila in pronostico['periodos']:
+            escritor.writerow([fila['inicio'], fila['fin'], fila['programado'], fila['esperado'], *fila['por_tramo']])
+        return response
+
+    context = {
+        'titulo_pagina': 'Pronóstico de Cobranza',
+        'pronostico': pronostico,
+        'tramos': list(zip(pronostico['tramos'], pronostico['saldo_por_tramo'])),
+        'granularidad': granularidad,
+        'periodos': periodos,
+    }
+    return render(request, 'prestamos/pronostico_cobranza.html', context)
+
+
+@login_required
+@lectura_en_replica
+def exportar(request, nombre, formato):
+    """
+    Descarga préstamos, cuotas, pagos o detalles de pago en CSV o XLSX,
+    filtrados por ?desde=&hasta= (AAAA-MM-DD), ?estado=, ?numero_prestamo=
+    y ?numero_documento=. La respuesta se genera mientras se envía (ver
+    prestamos/exportacion.py): la memoria no depende de la cantidad de filas.
+    Por POST, el archivo se prepara en la cola de tareas y se descarga desde
+    la página de seguimiento.
+    """
+    from django.http import Http404, StreamingHttpResponse
+    from .exportacion import EXPORTACIONES, FORMATOS, generar, nombre_archivo
+
+    if nombre not in EXPORTACIONES or formato not in FORMATOS:
+        raise Http404('Exportación no disponible')
+    form = ExportacionForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errores': form.errors}, status=400)
+
+    if request.method == 'POST':
+        # La tarea vuelve a validar los filtros: se guardan tal como llegaron
+        filtros = {campo: request.GET[campo] for campo in form.fields if request.GET.get(campo)}
+        tarea = encolar(
+            'prestamos.exportar',
+            {'nombre': nombre, 'formato': formato, 'filtros': filtros},
+            creado_por=request.user,
+        )
+        return redirect('prestamos:tarea', pk=tarea.pk)
+
+    response = StreamingHttpResponse(
+        generar(nombre, formato, form.cleaned_data),
+        content_type=FORMATOS[formato],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{nombre_archivo(nombre, formato)}"'
+    return response
+
+
+def _tareas_de(usuario):
+    """Las tareas que puede seguir el usuario: las suyas (todas si es staff)."""
+    from .models import Tarea
+
+    tareas = Tarea.objects.all()
+    return tareas if usuario.is_staff else tareas.filter(creado_por=usuario)
+
+
+@login_required
+def tarea(request, pk):
+    """Página de seguimiento de una tarea de la cola (consulta estado_tarea hasta que termina)."""
+    tarea = get_object_or_404(_tareas_de(request.user), pk=pk)
+    context = {
+        'tarea': tarea,
+        'titulo_pagina': 'Tarea en Segundo Plano'
+    }
+    return render(request, 'prestamos/tarea.html', context)
+
+
+@login_required
+def estado_tarea(request, pk):
+    """Estado de una tarea de la cola en JSON (para la página de seguimiento)."""
+    tarea = get_object_or_404(_tareas_de(request.user), pk=pk)
+    resultado = tarea.resultado or {}
+    return JsonResponse({
+        'id': tarea.pk,
+        'nombre': tarea.nombre,
+        'estado': tarea.estado,
+        'progreso': tarea.progreso,
+        'mensaje': tarea.mensaje,
+        'intentos': tarea.intentos,
+        'terminal': tarea.terminal,
+        'url': resultado.get('url') if tarea.estado == 'Completada' else None,
+    })
+
+
+@login_required
+def descargar_tarea(request, pk):
+    """Descarga el archivo de una exportación (o las excepciones de una importación) hecha en la cola."""
+    from django.http import FileResponse, Http404
+    from .tareas import directorio_exportaciones
+
+    tarea = get_object_or_404(
+        _tareas_de(request.user),
+        pk=pk,
+        nombre__in=('prestamos.exportar', 'prestamos.importar_pagos'),
+        estado='Completada',
+    )
+    if not tarea.resultado.get('archivo'):
+        raise Http404('La tarea no generó un archivo')
+    ruta = directorio_exportaciones() / tarea.resultado['archivo']
+    if not ruta.is_file():
+        raise Http404('El archivo ya no está disponible')
+    return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=tarea.resultado['nombre'])
+
+
+@login_required
+@solo_principal # Lee el resultado de la tarea recién terminada: nunca de la réplica
+def importar_pagos(request):
+    """
+    Importa los pagos de un extracto bancario (CSV): guarda el archivo y
+    encola su importación (prestamos.importar_pagos), que concilia cada fila
+    con su préstamo y registra los pagos. Al terminar, la página de la
+    tarea vuelve aquí con ?tarea= para mostrar el resumen y las excepciones.
+    """
+    import uuid
+    from .importacion import validar_extracto
+    from .tareas import directorio_exportaciones
+
+    resumen = None
+    tarea = None
+    if request.method == 'POST':
+        form = ImportarPagosForm(request.POST, request.FILES)
+        if form.is_valid():
+            contenido = form.cleaned_data['archivo']
+            try:
+                validar_extracto(contenido)
+            except ValueError as e:
+                form.add_error('archivo', str(e))
+            else:
+                directorio = directorio_exportaciones()
+                directorio.mkdir(parents=True, exist_ok=True)
+                archivo = f'importacion_{uuid.uuid4().hex}.csv'
+                (directorio / archivo).write_text(contenido, encoding='utf-8')
+                tarea = encolar(
+                    'prestamos.importar_pagos',
+                    {'archivo': archivo, 'metodo_pago_id': form.cleaned_data['metodo_pago'].pk},
+                    creado_por=request.user,
+                )
+                return redirect('prestamos:tarea', pk=tarea.pk)
+    else:
+        form = ImportarPagosForm()
+        if request.GET.get('tarea'):
+            tarea = get_object_or_404(
+                _tareas_de(request.user),
+                pk=request.GET['tarea'],
+                nombre='prestamos.importar_pagos',
+                estado='Completada',
+            )
+            resumen = tarea.resultado
+
+    context = {
+        'form': form,
+        'resumen': resumen,
+        'tarea': tarea,
+        'excepciones': resumen['excepciones'] if resumen else [],
+        'titulo_pagina': 'Importar Pagos desde Extracto Bancario'
+    }
+
+    return render(request, 'prestamos/importar_pagos.html', context)
 
 
 @login_required
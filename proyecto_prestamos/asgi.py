@@ -3,6 +3,11 @@ ASGI config for proyecto_prestamos project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Las vistas async (dashboard y reportes) solo aprovechan el event loop si se
+sirven por aquí, con un servidor ASGI, por ejemplo:
+
+    uvicorn proyecto_prestamos.asgi:application --workers 4
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -47,6 +47,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.PresupuestoConsultasMiddleware', # Mide consultas y tiempos por vista
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -91,6 +92,15 @@ DATABASES = {
     }
 }
 
+# Réplica de solo lectura (core/replicas.py): las vistas con @lectura_en_replica
+# (dashboard, reportes, listados, exportaciones) leen de este alias si existe.
+# Para probar en local, otra base con los mismos datos, por ejemplo:
+# DATABASES['replica'] = {**DATABASES['default'], 'NAME': 'db_prestamos_replica', 'TEST': {'MIRROR': 'default'}}
+DATABASE_ROUTERS = ['core.replicas.RouterReplicas']
+CORE_REPLICA = 'replica' # Alias de la réplica en DATABASES
+CORE_REPLICA_APPS = ['prestamos', 'clientes'] # Apps cuyos modelos se pueden leer de la réplica
+CORE_REPLICA_EXCLUIDOS = ['prestamos.tarea'] # Siempre de la principal (la cola debe verse al instante)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -136,4 +146,47 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'accounts.Usuario'
 LOGIN_URL = 'accounts:login' # A dónde redirigir si se necesita login (@login_required)
 LOGIN_REDIRECT_URL = 'prestamos:dashboard' # A dónde ir DESPUÉS de un login exitoso
-LOGOUT_REDIRECT_URL = 'home' # A dónde ir DESPUÉS de un logout exitoso
\ No newline at end of file
+LOGOUT_REDIRECT_URL = 'home' # A dónde ir DESPUÉS de un logout exitoso
+
+# Numeración de préstamos (prestamos/numeracion.py)
+# Cuántos números reserva cada proceso de una sola vez. 1 = sin reserva por bloques.
+PRESTAMOS_NUMERACION_BLOQUE = 1
+
+# Caché del dashboard y reportes (prestamos/cache_agregados.py)
+# Usa el backend CACHES configurado (locmem por defecto, Redis en producción).
+PRESTAMOS_CACHE_FRESCURA = 300 # Segundos que un bloque se sirve sin recalcular
+PRESTAMOS_CACHE_VIGENCIA_MAXIMA = 24 * 3600 # Segundos que se puede servir un valor vencido mientras se recalcula
+PRESTAMOS_CACHE_DETALLE = 24 * 3600 # Segundos que se conservan los fragmentos de detalle_prestamo (clave: préstamo + versión)
+
+# Cotización de cancelación anticipada (prestamos/cancelacion.py)
+PRESTAMOS_CANCELACION_LOTE = 1000 # Préstamos por lote (una consulta de cronogramas por lote) en el reporte de la cartera
+
+# Pronóstico de cobranza (prestamos/pronostico.py)
+# Por tramo de atraso del préstamo: (nombre, días máximos de atraso o None, curva semanal).
+# La curva es la fracción del saldo que se cobra en la semana esperada y en las siguientes.
+PRESTAMOS_PRONOSTICO_TRAMOS = [
+    ('Al día', 0, ['0.85', '0.07', '0.03']),
+    ('1-30 días', 30, ['0.55', '0.15', '0.08', '0.04']),
+    ('31-60 días', 60, ['0.30', '0.12', '0.08', '0.05']),
+    ('61-90 días', 90, ['0.15', '0.08', '0.05', '0.03']),
+    ('Más de 90 días', None, ['0.05', '0.03', '0.02']),
+]
+
+# Consultas en paralelo de las vistas async dashboard y reportes (core/concurrencia.py)
+CORE_CONSULTAS_CONCURRENTES = 4 # Hilos (y conexiones a la base) por proceso para consultas en paralelo. 1 = en secuencia
+
+# Cola de tareas en la base de datos (prestamos/cola.py, comando procesar_tareas)
+PRESTAMOS_COLA_REINTENTO_BASE = 30 # Segundos antes del primer reintento (se duplica en cada intento)
+PRESTAMOS_COLA_REINTENTO_MAXIMO = 3600 # Espera máxima entre reintentos
+PRESTAMOS_COLA_RESERVA = 30 * 60 # Segundos sin latido (tarea.informar); después otro proceso la retoma
+PRESTAMOS_CUOTAS_EN_COLA = 120 # Préstamos con al menos estas cuotas se crean en la cola
+PRESTAMOS_DIRECTORIO_EXPORTACIONES = BASE_DIR / 'exportaciones' # Archivos de las exportaciones en segundo plano
+
+# Presupuesto por vista (core/middleware.py)
+# Máximo de consultas SQL y de milisegundos (sql, render, total) por nombre de URL.
+# Las vistas que lo superen se registran en el logger 'core.presupuesto'.
+PRESUPUESTO_VISTAS = {
+    'default': {'consultas': 30, 'sql_ms': 250, 'total_ms': 1000},
+    'prestamos:registrar_pago': {'consultas': 40},
+    'prestamos:importar_pagos': {'consultas': 200, 'sql_ms': 5000, 'total_ms': 30000},
+}
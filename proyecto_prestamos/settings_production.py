@@ -35,7 +35,22 @@ DATABASES = {
         'OPTIONS': {
             'sslmode': 'require',  # Para conexiones seguras
         }
-    }
+    },
+    # Réplica de solo lectura (streaming replication de PostgreSQL) para
+    # dashboard, reportes, listados y exportaciones (ver core/replicas.py).
+    # Sin esta entrada todo se lee de 'default'.
+    'replica': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': 'db_prestamos_prod',
+        'USER': 'usuario_lectura',
+        'PASSWORD': 'password_lectura',
+        'HOST': 'replica.tu-servidor',  # Servidor de la réplica
+        'PORT': '5432',
+        'OPTIONS': {
+            'sslmode': 'require',
+        },
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
 # ===========================================